@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+compact_run launch-overhead benchmark (POSIX)
+
+Times a short command (`git --version` by default) run bare and wrapped
+the ways token_rewrite_hook.py can wrap it, and reports the median wall
+time of each and its overhead over the bare command:
+
+- direct: `<python> -I -S compact_run.py <command>` (the materialized
+  runtime if it was built, else this interpreter)
+- uv:     `uv run --no-project --script compact_run.py <command>`, when uv
+  is on PATH
+
+Every run goes through /bin/sh like a rewritten Bash tool call.
+
+    bench_launch.py [--runs N] [--command CMD] [--json]
+"""
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+COMPACT_RUN = ROOT / "hooks" / "compact_run.py"
+BENCH_TIMEOUT = 60
+
+
+def default_python() -> Path:
+    """The materialized runtime if it was built, else this interpreter."""
+    runtime = ROOT / "runtime" / "bin" / "python"
+    return runtime if runtime.exists() else Path(sys.executable)
+
+
+def launchers(command: str) -> dict[str, str]:
+    """Shell command line per launcher, the bare command first."""
+    script = shlex.quote(str(COMPACT_RUN))
+    python = shlex.quote(str(default_python()))
+    lines = {"bare": command, "direct": f"{python} -I -S {script} {command}"}
+    if shutil.which("uv"):
+        lines["uv"] = f"uv run --no-project --script {script} {command}"
+    return lines
+
+
+def time_runs(line: str, runs: int, env: dict[str, str]) -> float:
+    """Median wall time of *runs* executions of *line*, in milliseconds."""
+    samples = []
+    for _ in range(runs + 1):  # the first run warms caches and is dropped
+        start = time.perf_counter()
+        subprocess.run(  # noqa: S602
+            line,
+            shell=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            timeout=BENCH_TIMEOUT,
+            check=False,
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples[1:])
+
+
+def run(command: str, runs: int) -> dict[str, object]:
+    """Median wall time and overhead over the bare command, per launcher."""
+    # No telemetry or archive writes: only the launch is measured
+    env = {**os.environ, "COMPACT_RUN_STATS": "0", "COMPACT_RUN_ARCHIVE": "0"}
+    medians = {
+        name: time_runs(line, runs, env) for name, line in launchers(command).items()
+    }
+    return {
+        "command": command,
+        "runs": runs,
+        "python": str(default_python()),
+        "launchers": {
+            name: {
+                "median_ms": round(ms, 1),
+                "overhead_ms": round(ms - medians["bare"], 1),
+            }
+            for name, ms in medians.items()
+        },
+    }
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20, help="runs (default: 20)")
+    parser.add_argument(
+        "--command", default="git --version", help="command to wrap (shell syntax)"
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    report = run(args.command, args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"`{args.command}`, median of {args.runs} runs ({report['python']})")
+    print(f"{'launcher':<8} {'median (ms)':>12} {'overhead (ms)':>14}")
+    for name, r in report["launchers"].items():  # type: ignore[union-attr]
+        print(f"{name:<8} {r['median_ms']:>12.1f} {r['overhead_ms']:>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+compact_run peak-memory benchmark (POSIX)
+
+Runs hooks/compact_run.py over a fake `kubectl logs` that prints SIZE MB of
+varied log lines (timestamps, request ids, bursts of repeated lines), once
+with the default string capture and once with COMPACT_RUN_STREAM=1, and
+reports peak RSS and wall time of each. Both modes must print the same
+compressed output; the benchmark exits 1 if they differ.
+
+    bench_memory.py [--size-mb N] [--command logs|tail] [--json]
+
+`logs` exercises the log-dedup handler, `tail` runs `kubectl get` (the
+truncation fallback, which only needs the last MAX_LINES lines).
+"""
+
+import argparse
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+COMPACT_RUN = Path(__file__).resolve().parents[2] / "hooks" / "compact_run.py"
+
+# Writes ~size_mb MiB of log lines in 1 MiB blocks so the generator itself
+# stays small. Every 97th line repeats to give dedup something to collapse.
+FAKE_KUBECTL = """#!{python}
+import sys
+size = int({size_mb}) * 1024 * 1024
+written = 0
+i = 0
+out = sys.stdout.buffer
+while written < size:
+    block = []
+    for _ in range(8192):
+        i += 1
+        if i % 97 < 5:
+            block.append(b"WARN retrying upstream connection\\n")
+        else:
+            block.append(
+                b"2026-01-01T00:%02d:%02dZ INFO req=%08x path=/api/v1/items/%d took=%dms\\n"
+                % (i // 60 % 60, i % 60, i * 2654435761 % 2**32, i % 5000, i % 900)
+            )
+    data = b"".join(block)
+    out.write(data)
+    written += len(data)
+"""
+
+
+def make_fake_kubectl(bin_dir: Path, size_mb: int) -> None:
+    """Install an executable `kubectl` that prints *size_mb* MiB of logs."""
+    script = bin_dir / "kubectl"
+    script.write_text(
+        FAKE_KUBECTL.format(python=sys.executable, size_mb=size_mb), encoding="utf-8"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+
+
+def measure(argv: list[str], env: dict[str, str]) -> dict[str, object]:
+    """Run *argv* once; wall time, peak RSS (KiB) and output."""
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as out:
+        proc = subprocess.Popen(argv, stdout=out, stderr=subprocess.STDOUT, env=env)  # noqa: S603
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.perf_counter() - start
+        out.seek(0)
+        output = out.read().decode("utf-8", "replace")
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return {
+        "exit_code": proc.returncode,
+        "wall_s": round(wall, 2),
+        "peak_rss_kib": peak,
+        "output": output,
+    }
+
+
+def run(size_mb: int, command: str) -> dict[str, object]:
+    """Benchmark both capture modes over the same generated output."""
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = Path(tmp)
+        make_fake_kubectl(bin_dir, size_mb)
+        argv = [sys.executable, str(COMPACT_RUN), "kubectl"]
+        argv += ["logs", "app"] if command == "logs" else ["get", "pods"]
+        env = {
+            **os.environ,
+            "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            "COMPACT_RUN_TIMEOUT": "3600",
+            # Archive handles are random; both modes must print the same output
+            "COMPACT_RUN_ARCHIVE": "0",
+        }
+        results = {
+            mode: measure(argv, {**env, "COMPACT_RUN_STREAM": flag})
+            for mode, flag in (("string", "0"), ("stream", "1"))
+        }
+    outputs = {r.pop("output") for r in results.values()}  # type: ignore[attr-defined]
+    return {
+        "size_mb": size_mb,
+        "command": command,
+        "identical_output": len(outputs) == 1,
+        **results,
+    }
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--size-mb", type=int, default=1024, help="output size (default: 1024)"
+    )
+    parser.add_argument("--command", choices=("logs", "tail"), default="logs")
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    report = run(args.size_mb, args.command)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.size_mb} MiB of `kubectl {args.command}` output")
+        print(f"{'mode':<8} {'peak RSS (MiB)':>15} {'wall (s)':>9} {'exit':>5}")
+        for mode in ("string", "stream"):
+            r: dict = report[mode]  # type: ignore[assignment]
+            print(
+                f"{mode:<8} {r['peak_rss_kib'] / 1024:>15.1f} "
+                f"{r['wall_s']:>9.2f} {r['exit_code']:>5}"
+            )
+        print("outputs identical" if report["identical_output"] else "OUTPUTS DIFFER")
+    return 0 if report["identical_output"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,700 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Hook latency benchmark (POSIX)
+
+Drives every hook registered in hooks/plugin-hooks.json with synthetic
+payloads and reports p50/p95/p99 latency per hook, per event and per
+simulated tool call.
+
+A scenario is one simulated tool call (or session event): a payload, the
+hook events it fires (e.g. PreToolUse then PostToolUse) and any state files
+it needs under .claude/state. Each run executes every matching hook once,
+one at a time, in a throwaway project directory:
+
+- hook latency:      wall-clock time of one hook process
+- event latency:     slowest blocking hook of the event (Claude Code runs the
+                     matching hooks of an event in parallel)
+- tool-call latency: sum of the event latencies of the scenario
+
+Async hooks ("async": true) do not hold up the tool call; they are timed
+and reported per hook but left out of event and tool-call totals.
+
+Results are written as JSON so two commits can be compared:
+
+    bench_hooks.py run [--runs N] [--warmup N] [--scenario NAME ...]
+                       [--launcher python|uv|shell] [--no-daemon] [--output FILE]
+    bench_hooks.py compare BASE.json HEAD.json [--threshold PCT]
+
+`compare` exits 1 when any p50 regressed by more than the threshold.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+LAUNCHERS = ("python", "uv", "shell")
+ISOLATION_FLAGS = ["-I", "-S"]
+DEFAULT_TIMEOUT = 60
+LARGE_WRITE_BYTES = 4 * 1024 * 1024
+RESULTS_DIR = "results"
+
+# Keep in sync with hooks/hook_daemon.py
+DAEMON_LOCK = "hook_daemon.lock"
+DAEMON_IDLE_SECONDS = "60"
+
+LOREM_LINE = "lorem ipsum dolor sit amet " * 3 + "\n"
+SMALL_PYTHON = '''"""Example module."""
+
+
+def greet(name: str) -> str:
+    """Return a greeting."""
+    return f"Hello, {name}!"
+'''
+
+
+def default_root() -> Path:
+    """Plugin checkout containing hooks/."""
+    return Path(__file__).resolve().parent.parent.parent
+
+
+def default_python(root: Path) -> Path:
+    """The materialized runtime if it was built, else this interpreter."""
+    runtime = root / "runtime" / "bin" / "python"
+    return runtime if runtime.exists() else Path(sys.executable)
+
+
+# ---------------------------------------------------------------------------
+# Hook configuration
+# ---------------------------------------------------------------------------
+
+
+def _command_script(command: str) -> tuple[str, list[str]]:
+    """Split a `uv run --script <script> [args]` command into script and args."""
+    words = shlex.split(command)
+    if "--script" not in words or words.index("--script") + 1 >= len(words):
+        msg = f"not a uv --script hook command: {command}"
+        raise ValueError(msg)
+    index = words.index("--script")
+    return words[index + 1], words[index + 2 :]
+
+
+def hook_name(command: str) -> str:
+    """Hook script relative to hooks/, looking through hook_client.py."""
+    script, args = _command_script(command)
+    if Path(script).name == "hook_client.py" and args:
+        return args[0]
+    return "/".join(Path(script).parts[-2:])
+
+
+def load_hooks(path: Path) -> dict[str, list[dict[str, object]]]:
+    """Flatten plugin-hooks.json into {event: [hook, ...]}.
+
+    Each hook carries its group's matcher plus name, command, timeout and
+    async flag.
+    """
+    config = json.loads(path.read_text(encoding="utf-8"))
+    hooks: dict[str, list[dict[str, object]]] = {}
+    for event, groups in config.get("hooks", {}).items():
+        for group in groups:
+            for hook in group.get("hooks", []):
+                if hook.get("type") != "command":
+                    continue
+                hooks.setdefault(event, []).append(
+                    {
+                        "name": hook_name(hook["command"]),
+                        "matcher": group.get("matcher"),
+                        "command": hook["command"],
+                        "timeout": hook.get("timeout", DEFAULT_TIMEOUT),
+                        "async": bool(hook.get("async", False)),
+                    }
+                )
+    return hooks
+
+
+def matcher_accepts(matcher: str | None, value: str) -> bool:
+    """Whether a hook group's matcher selects *value* (tool name or source).
+
+    A missing, empty or "*" matcher matches everything; anything else is a
+    regex that must match the whole value.
+    """
+    if not matcher or matcher == "*":
+        return True
+    return re.fullmatch(matcher, value) is not None
+
+
+def matching_hooks(
+    hooks: dict[str, list[dict[str, object]]], event: str, value: str
+) -> list[dict[str, object]]:
+    """Hooks that fire for *event* with the given tool name or source."""
+    return [
+        h
+        for h in hooks.get(event, [])
+        if matcher_accepts(h["matcher"], value)  # type: ignore[arg-type]
+    ]
+
+
+def hook_argv(
+    hook: dict[str, object], root: Path, launcher: str, python: str
+) -> list[str]:
+    """Command line for one hook under the chosen launcher.
+
+    - python: <python> -I -S <script> [args], as the materialized runtime runs it
+    - uv:     uv run --no-project --script <script> [args]
+    - shell:  the configured command verbatim through /bin/sh
+    """
+    command = str(hook["command"])
+    if launcher == "shell":
+        return ["/bin/sh", "-c", command]
+    script, args = _command_script(command.replace("${CLAUDE_PLUGIN_ROOT}", str(root)))
+    if launcher == "uv":
+        uv = shutil.which("uv") or "uv"
+        return [uv, "run", "--no-project", "--script", script, *args]
+    return [python, *ISOLATION_FLAGS, script, *args]
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+
+def build_task_graph(waves: int, phases_per_wave: int) -> dict[str, object]:
+    """Synthetic active task graph with depth-3 atomic phases."""
+    return {
+        "current_wave": 0,
+        "waves": [
+            {
+                "wave_id": w,
+                "phases": [
+                    {
+                        "phase_id": f"phase_{w}_{p}",
+                        "description": f"Synthetic phase {p} of wave {w}",
+                        "agent": "general-purpose",
+                        "depth": 3,
+                        "is_atomic": True,
+                    }
+                    for p in range(phases_per_wave)
+                ],
+            }
+            for w in range(waves)
+        ],
+    }
+
+
+def _agent(prompt: str) -> dict[str, object]:
+    # The task graph compliance stage reads the prompt from the top level
+    return {
+        "tool_name": "Agent",
+        "prompt": prompt,
+        "tool_input": {"subagent_type": "general-purpose", "prompt": prompt},
+    }
+
+
+def build_scenarios() -> dict[str, dict[str, object]]:
+    """Every benchmark scenario by name.
+
+    ``events`` are fired in order with ``payload``; hooks are selected with
+    ``match`` when given, else the payload's tool_name. ``state`` files are
+    written to .claude/state before the scenario runs.
+    """
+    small_graph = {"active_task_graph.json": build_task_graph(3, 4)}
+    large_graph = {"active_task_graph.json": build_task_graph(50, 40)}
+    tool_call = ["PreToolUse", "PostToolUse"]
+    return {
+        "bash": {
+            "events": tool_call,
+            "payload": {
+                "tool_name": "Bash",
+                "tool_input": {"command": "git log --oneline -20"},
+            },
+        },
+        "write_small": {
+            "events": tool_call,
+            "payload": {
+                "tool_name": "Write",
+                "tool_input": {"file_path": "src/example.py", "content": SMALL_PYTHON},
+            },
+        },
+        "write_large": {
+            "events": tool_call,
+            "payload": {
+                "tool_name": "Write",
+                "tool_input": {
+                    "file_path": "docs/large.md",
+                    "content": LOREM_LINE * (LARGE_WRITE_BYTES // len(LOREM_LINE) + 1),
+                },
+            },
+        },
+        "agent_phase": {
+            "events": tool_call,
+            "payload": _agent("Phase ID: phase_0_1\nImplement the parser."),
+            "state": small_graph,
+        },
+        "agent_no_phase": {
+            "events": tool_call,
+            "payload": _agent("Implement the parser."),
+            "state": small_graph,
+        },
+        "agent_large_graph": {
+            "events": tool_call,
+            "payload": _agent("Phase ID: phase_49_39\nWrite the release notes."),
+            "state": large_graph,
+        },
+        "skill": {
+            "events": tool_call,
+            "payload": {
+                "tool_name": "Skill",
+                "tool_input": {"skill": "workflow-orchestrator:delegate"},
+            },
+        },
+        "user_prompt": {
+            "events": ["UserPromptSubmit"],
+            "payload": {"prompt": "Summarize the open issues"},
+        },
+        "session_start": {
+            "events": ["SessionStart"],
+            "match": "startup",
+            "payload": {"source": "startup"},
+        },
+        "subagent_stop": {
+            "events": ["SubagentStop"],
+            "payload": {"stop_hook_active": False},
+        },
+        "stop": {
+            "events": ["Stop"],
+            "payload": {"stop_hook_active": False},
+        },
+    }
+
+
+def _match_value(scenario: dict[str, object]) -> str:
+    payload: dict[str, object] = scenario["payload"]  # type: ignore[assignment]
+    return str(scenario.get("match") or payload.get("tool_name", ""))
+
+
+def _event_payload(scenario: dict[str, object], event: str, project: Path) -> bytes:
+    """Serialized stdin for one event, with the fields Claude Code adds."""
+    payload = {
+        "session_id": "bench",
+        "cwd": str(project),
+        "hook_event_name": event,
+        **scenario["payload"],  # type: ignore[dict-item]
+    }
+    if event == "PostToolUse":
+        payload.setdefault("tool_response", {})
+    return json.dumps(payload).encode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Count, min/max, mean and nearest-rank p50/p95/p99 in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def rank(pct: float) -> float:
+        return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+    return {
+        "n": len(ordered),
+        "min": round(ordered[0], 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": round(rank(50), 2),
+        "p95": round(rank(95), 2),
+        "p99": round(rank(99), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def _time_hook(
+    argv: list[str], stdin: bytes, env: dict[str, str], cwd: Path, timeout: float
+) -> float:
+    """Wall-clock milliseconds for one hook process (timeout counts in full)."""
+    start = time.perf_counter()
+    try:
+        subprocess.run(  # noqa: S603
+            argv,
+            input=stdin,
+            capture_output=True,
+            env=env,
+            cwd=cwd,
+            timeout=timeout,
+            check=False,
+        )
+    except subprocess.TimeoutExpired:
+        return timeout * 1000
+    return (time.perf_counter() - start) * 1000
+
+
+def _write_state(project: Path, files: dict[str, object]) -> None:
+    state_dir = project / ".claude" / "state"
+    if state_dir.exists():
+        for path in state_dir.iterdir():
+            if path.is_file() and path.name != DAEMON_LOCK and path.suffix == ".json":
+                path.unlink()
+    state_dir.mkdir(parents=True, exist_ok=True)
+    for name, content in files.items():
+        (state_dir / name).write_text(json.dumps(content), encoding="utf-8")
+
+
+def _stop_daemon(project: Path) -> None:
+    """Terminate the hook daemon the benchmark started, if any."""
+    try:
+        pid = int((project / ".claude" / "state" / DAEMON_LOCK).read_text().strip())
+        os.kill(pid, signal.SIGTERM)
+    except (OSError, ValueError):
+        pass
+
+
+def run_benchmark(
+    root: Path,
+    hooks: dict[str, list[dict[str, object]]],
+    scenarios: dict[str, dict[str, object]],
+    launcher: str,
+    python: str,
+    runs: int,
+    warmup: int,
+    daemon: bool,
+) -> dict[str, object]:
+    """Run every scenario and return the summarized result document."""
+    hook_samples: dict[str, dict[str, list[float]]] = {}
+    event_samples: dict[str, list[float]] = {}
+    call_samples: dict[str, list[float]] = {}
+
+    with tempfile.TemporaryDirectory(prefix="bench-hooks-") as tmp:
+        project = Path(tmp)
+        env = os.environ.copy()
+        env.update(
+            {
+                "CLAUDE_PROJECT_DIR": tmp,
+                "CLAUDE_PLUGIN_ROOT": str(root),
+                "CLAUDE_HOOK_DAEMON": "1" if daemon else "0",
+                "CLAUDE_HOOK_DAEMON_IDLE": DAEMON_IDLE_SECONDS,
+            }
+        )
+        try:
+            for name, scenario in scenarios.items():
+                _write_state(project, scenario.get("state", {}))  # type: ignore[arg-type]
+                value = _match_value(scenario)
+                plan = [
+                    (
+                        event,
+                        _event_payload(scenario, event, project),
+                        [
+                            (hook, hook_argv(hook, root, launcher, python))
+                            for hook in matching_hooks(hooks, event, value)
+                        ],
+                    )
+                    for event in scenario["events"]  # type: ignore[attr-defined]
+                ]
+                for iteration in range(warmup + runs):
+                    total = 0.0
+                    for event, stdin, event_hooks in plan:
+                        blocking = [0.0]
+                        for hook, argv in event_hooks:
+                            ms = _time_hook(
+                                argv,
+                                stdin,
+                                env,
+                                project,
+                                float(hook["timeout"]),  # type: ignore[arg-type]
+                            )
+                            if iteration < warmup:
+                                continue
+                            key = f"{event}:{hook['name']}"
+                            per_hook = hook_samples.setdefault(key, {})
+                            per_hook.setdefault(name, []).append(ms)
+                            if not hook["async"]:
+                                blocking.append(ms)
+                        if iteration >= warmup and event_hooks:
+                            event_samples.setdefault(event, []).append(max(blocking))
+                            total += max(blocking)
+                    if iteration >= warmup:
+                        call_samples.setdefault(name, []).append(total)
+        finally:
+            if daemon:
+                _stop_daemon(project)
+
+    return {
+        "meta": _meta(root, launcher, python, runs, warmup, daemon),
+        "tool_calls": {name: summarize(s) for name, s in call_samples.items()},
+        "events": {event: summarize(s) for event, s in event_samples.items()},
+        "hooks": {
+            key: {
+                "all": summarize([ms for s in per.values() for ms in s]),
+                **{name: summarize(s) for name, s in per.items()},
+            }
+            for key, per in sorted(hook_samples.items())
+        },
+    }
+
+
+def _git(root: Path, *args: str) -> str | None:
+    git = shutil.which("git")
+    if not git:
+        return None
+    try:
+        result = subprocess.run(  # noqa: S603
+            [git, "-C", str(root), *args],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip()
+
+
+def _meta(
+    root: Path, launcher: str, python: str, runs: int, warmup: int, daemon: bool
+) -> dict[str, object]:
+    """What was measured and where, so result files are self-describing."""
+    return {
+        "commit": _git(root, "rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git(root, "status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "launcher": launcher,
+        "python": python,
+        "daemon": daemon,
+        "runs": runs,
+        "warmup": warmup,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+
+def _row(label: str, stats: dict[str, float]) -> str:
+    if not stats.get("n"):
+        return f"| `{label}` | 0 | - | - | - |"
+    return (
+        f"| `{label}` | {stats['n']} | {stats['p50']} | {stats['p95']} "
+        f"| {stats['p99']} |"
+    )
+
+
+def format_report(doc: dict[str, object]) -> str:
+    """Markdown tables for tool calls, events and hooks."""
+    meta: dict[str, object] = doc["meta"]  # type: ignore[assignment]
+    header = ["| {} | n | p50 | p95 | p99 |", "|---|---|---|---|---|"]
+    lines = [
+        f"Hook latency in ms at {meta['commit']} (launcher: {meta['launcher']}, "
+        f"daemon: {'on' if meta['daemon'] else 'off'})",
+    ]
+    for title, label, rows in (
+        ("Overhead per simulated tool call", "Scenario", doc["tool_calls"]),
+        ("Per event (slowest blocking hook)", "Event", doc["events"]),
+    ):
+        lines += ["", title, "", header[0].format(label), header[1]]
+        lines += [_row(k, v) for k, v in rows.items()]  # type: ignore[attr-defined]
+    lines += ["", "Per hook (all scenarios)", "", header[0].format("Hook"), header[1]]
+    hooks: dict[str, dict[str, dict[str, float]]] = doc["hooks"]  # type: ignore[assignment]
+    lines += [_row(k, v["all"]) for k, v in hooks.items()]
+    return "\n".join(lines)
+
+
+def _p50s(doc: dict[str, object]) -> dict[str, float]:
+    """Flatten every comparable p50 into {"section:key": ms}."""
+    flat: dict[str, float] = {}
+    for section in ("tool_calls", "events"):
+        for key, stats in doc.get(section, {}).items():  # type: ignore[attr-defined]
+            if stats.get("n"):
+                flat[f"{section}:{key}"] = stats["p50"]
+    for key, per in doc.get("hooks", {}).items():  # type: ignore[attr-defined]
+        if per.get("all", {}).get("n"):
+            flat[f"hooks:{key}"] = per["all"]["p50"]
+    return flat
+
+
+def compare(
+    base: dict[str, object], head: dict[str, object], threshold: float
+) -> tuple[str, list[str]]:
+    """Compare p50s of two result documents.
+
+    Returns a markdown report and the keys whose p50 grew by more than
+    *threshold* percent. Keys present in only one document are listed but
+    never count as regressions.
+    """
+    old, new = _p50s(base), _p50s(head)
+    base_commit = base.get("meta", {}).get("commit")  # type: ignore[attr-defined]
+    head_commit = head.get("meta", {}).get("commit")  # type: ignore[attr-defined]
+    lines = [
+        f"p50 latency (ms): {base_commit} -> {head_commit}",
+        "",
+        "| Measurement | Base | Head | Change |",
+        "|---|---|---|---|",
+    ]
+    regressions: list[str] = []
+    for key in sorted(old.keys() | new.keys()):
+        if key not in old or key not in new:
+            lines.append(
+                f"| `{key}` | {old.get(key, '-')} | {new.get(key, '-')} | n/a |"
+            )
+            continue
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = " (regression)"
+        lines.append(f"| `{key}` | {old[key]} | {new[key]} | {change:+.1f}%{flag} |")
+    return "\n".join(lines), regressions
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    root = args.root.resolve()
+    hooks_file = args.hooks_file or root / "hooks" / "plugin-hooks.json"
+    try:
+        hooks = load_hooks(hooks_file)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Cannot load {hooks_file}: {e}", file=sys.stderr)
+        return 1
+
+    scenarios = build_scenarios()
+    if args.scenario:
+        unknown = set(args.scenario) - scenarios.keys()
+        if unknown:
+            print(f"Unknown scenario(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+            return 1
+        scenarios = {k: v for k, v in scenarios.items() if k in args.scenario}
+
+    python = str(args.python or default_python(root))
+    try:
+        doc = run_benchmark(
+            root,
+            hooks,
+            scenarios,
+            args.launcher,
+            python,
+            max(1, args.runs),
+            max(0, args.warmup),
+            not args.no_daemon,
+        )
+    except ValueError as e:
+        print(f"Cannot benchmark with launcher {args.launcher!r}: {e}", file=sys.stderr)
+        return 1
+
+    output = args.output or (
+        Path(__file__).resolve().parent
+        / RESULTS_DIR
+        / f"{doc['meta']['commit'] or 'unknown'}.json"  # type: ignore[index]
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+    print(format_report(doc))
+    print(f"\nWrote {output}")
+    return 0
+
+
+def _cmd_compare(args: argparse.Namespace) -> int:
+    try:
+        base = json.loads(args.base.read_text(encoding="utf-8"))
+        head = json.loads(args.head.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Cannot read results: {e}", file=sys.stderr)
+        return 1
+    report, regressions = compare(base, head, args.threshold)
+    print(report)
+    if regressions:
+        print(
+            f"\n{len(regressions)} p50 regression(s) over {args.threshold:g}%",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="benchmark the hooks and write a JSON result")
+    run.add_argument(
+        "--root",
+        type=Path,
+        default=default_root(),
+        help="directory containing hooks/ (default: this checkout)",
+    )
+    run.add_argument(
+        "--hooks-file",
+        type=Path,
+        help="hook configuration to drive (default: <root>/hooks/plugin-hooks.json)",
+    )
+    run.add_argument(
+        "--runs", type=int, default=20, help="runs per scenario (default 20)"
+    )
+    run.add_argument(
+        "--warmup", type=int, default=3, help="untimed runs per scenario (default 3)"
+    )
+    run.add_argument(
+        "--scenario",
+        action="append",
+        metavar="NAME",
+        help=f"scenario to run, repeatable (default: all of {', '.join(build_scenarios())})",
+    )
+    run.add_argument(
+        "--launcher",
+        choices=LAUNCHERS,
+        default="python",
+        help="how hooks are started (default: python -I -S, like the runtime)",
+    )
+    run.add_argument(
+        "--python",
+        type=Path,
+        help="interpreter for --launcher python (default: <root>/runtime, else this one)",
+    )
+    run.add_argument(
+        "--no-daemon", action="store_true", help="run with CLAUDE_HOOK_DAEMON=0"
+    )
+    run.add_argument(
+        "--output",
+        type=Path,
+        help=f"result file (default: benchmarks/hooks/{RESULTS_DIR}/<commit>.json)",
+    )
+    run.set_defaults(func=_cmd_run)
+
+    cmp = sub.add_parser("compare", help="compare two result files")
+    cmp.add_argument("base", type=Path)
+    cmp.add_argument("head", type=Path)
+    cmp.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="p50 increase in percent that counts as a regression (default 10)",
+    )
+    cmp.set_defaults(func=_cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
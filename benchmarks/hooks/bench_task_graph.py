@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Task graph validator benchmark
+
+Times the two task graph hooks' checks in-process against synthetic
+graphs of 1,000 and 10,000 phases (50 per wave, each with a description,
+a prompt and dependencies on the previous wave), and reports the median
+per call:
+
+- compliance: validate_task_graph_compliance.compliance_hint() for an
+  Agent prompt naming the last phase
+- depth:      validate_task_graph_depth.main()
+- full parse: what both did before the phase index, json.loads() of the
+  whole graph plus a scan for the phase
+
+Warm calls read the sidecar index; cold calls touch the graph first, so
+they include rebuilding it.
+
+    bench_task_graph.py [--runs N] [--phases N ...] [--json]
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from types import ModuleType
+
+ROOT = Path(__file__).resolve().parents[2]
+HOOKS = ROOT / "hooks"
+PHASES_PER_WAVE = 50
+
+
+def build_task_graph(phases: int) -> dict[str, object]:
+    """Synthetic task graph; every tenth phase is atomic and too shallow."""
+    waves = []
+    for w in range(max(1, phases // PHASES_PER_WAVE)):
+        waves.append(
+            {
+                "wave_id": w,
+                "parallel_execution": True,
+                "phases": [
+                    {
+                        "phase_id": f"phase_{w}_{p}",
+                        "type": "implementation",
+                        "agent": "general-purpose",
+                        "status": "pending",
+                        "description": f"Synthetic phase {p} of wave {w}",
+                        "prompt": f"Implement part {p} of step {w}. " * 20,
+                        "depth": 2 if p % 10 == 0 else 3,
+                        "is_atomic": True,
+                        "dependencies": [f"phase_{w - 1}_{p}"] if w else [],
+                    }
+                    for p in range(PHASES_PER_WAVE)
+                ],
+            }
+        )
+    return {"task_id": "root", "current_wave": 0, "waves": waves}
+
+
+def _load(name: str, path: Path) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+def _full_parse(graph_file: Path, phase_id: str) -> object:
+    graph = json.loads(graph_file.read_text(encoding="utf-8"))
+    for wave in graph.get("waves", []):
+        for phase in wave.get("phases", []):
+            if phase.get("phase_id") == phase_id:
+                return wave.get("wave_id")
+    return None
+
+
+def median_ms(
+    call: Callable[[], object], runs: int, before: Callable[[], None] | None = None
+) -> float:
+    """Median wall time of *runs* calls, after *before* when given."""
+    samples = []
+    for _ in range(runs):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(sizes: list[int], runs: int) -> dict[str, object]:
+    """Median milliseconds per check and graph size."""
+    compliance = _load(
+        "validate_task_graph_compliance",
+        HOOKS / "PreToolUse" / "validate_task_graph_compliance.py",
+    )
+    depth = _load(
+        "validate_task_graph_depth",
+        HOOKS / "PostToolUse" / "validate_task_graph_depth.py",
+    )
+    results: dict[str, object] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_task_graph_") as tmp:
+        os.environ["CLAUDE_PROJECT_DIR"] = tmp
+        state = Path(tmp) / ".claude" / "state"
+        state.mkdir(parents=True)
+        graph_file = state / "active_task_graph.json"
+        for size in sizes:
+            graph = build_task_graph(size)
+            graph_file.write_text(json.dumps(graph), encoding="utf-8")
+            last = graph["waves"][-1]["phases"][-1]["phase_id"]  # type: ignore[index]
+            payload = {"tool_name": "Agent", "prompt": f"Phase ID: {last}\nGo"}
+            mtime = [graph_file.stat().st_mtime_ns]
+
+            def touch(mtime: list[int] = mtime) -> None:
+                mtime[0] += 1000
+                os.utime(graph_file, ns=(mtime[0], mtime[0]))
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                checks = {
+                    "compliance": partial(compliance.compliance_hint, payload, state),
+                    "depth": depth.main,
+                }
+                row = {
+                    "graph_kb": round(graph_file.stat().st_size / 1024),
+                    "full_parse_ms": median_ms(
+                        partial(_full_parse, graph_file, last), runs
+                    ),
+                }
+                for name, check in checks.items():
+                    row[f"{name}_cold_ms"] = median_ms(check, runs, before=touch)
+                    row[f"{name}_warm_ms"] = median_ms(check, runs)
+            results[str(size)] = {
+                k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()
+            }
+    return {"runs": runs, "phases": results}
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20, help="runs (default: 20)")
+    parser.add_argument(
+        "--phases",
+        type=int,
+        nargs="+",
+        default=[1000, 10000],
+        help="graph sizes in phases (default: 1000 10000)",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    report = run(args.phases, args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    columns = (
+        "full_parse_ms",
+        "compliance_cold_ms",
+        "compliance_warm_ms",
+        "depth_cold_ms",
+        "depth_warm_ms",
+    )
+    print(f"median of {args.runs} runs, milliseconds per call")
+    names = " ".join(f"{c.removesuffix('_ms'):>16}" for c in columns)
+    print(f"{'phases':>7} {'graph KB':>9} {names}")
+    for size, row in report["phases"].items():  # type: ignore[union-attr]
+        cells = " ".join(f"{row[c]:>16.2f}" for c in columns)
+        print(f"{size:>7} {row['graph_kb']:>9} {cells}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
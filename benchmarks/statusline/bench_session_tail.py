@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Statusline context-usage benchmark
+
+Times the statusline's slow path (no ``context_window`` in the payload)
+on synthetic session transcripts of growing size, and reports the median
+per render:
+
+- full read: the former implementation, every line read and everything
+  after the last reset JSON-decoded
+- tail:      hooks/lib/session_tail.last_usage() without a cursor, a
+  backward scan from EOF
+- cursor:    last_usage() with a cursor after one more entry was appended,
+  as on consecutive renders
+
+    bench_session_tail.py [--runs N] [--mb N ...] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "hooks" / "lib"))
+from session_tail import last_usage  # noqa: E402
+
+USAGE = {
+    "input_tokens": 12,
+    "cache_read_input_tokens": 48000,
+    "cache_creation_input_tokens": 900,
+    "output_tokens": 350,
+}
+
+
+def entry(n: int) -> str:
+    """One transcript line; every third is an assistant message with usage."""
+    if n % 3:
+        text = f"tool output line {n} " * 40
+        return json.dumps({"type": "user", "message": {"content": text}})
+    message = {"content": [{"type": "text", "text": "ok " * 60}], "usage": USAGE}
+    return json.dumps({"type": "assistant", "message": message})
+
+
+def write_transcript(path: Path, mb: int) -> int:
+    """Write about *mb* MiB of transcript with a /clear near the start."""
+    n = 0
+    with path.open("w", encoding="utf-8") as f:
+        f.write(json.dumps({"message": {"content": "/clear"}}) + "\n")
+        while f.tell() < mb * 1024 * 1024:
+            f.write(entry(n) + "\n")
+            n += 1
+    return n
+
+
+def full_read(path: Path) -> dict | None:
+    """The statusline's former slow path."""
+    last_reset, lines = 0, []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f, 1):
+            lines.append(line)
+            if '"/clear"' in line or '"/compact"' in line:
+                last_reset = i
+    entries = []
+    for line in lines[last_reset:]:
+        try:
+            usage = json.loads(line).get("message", {}).get("usage", {})
+        except json.JSONDecodeError:
+            continue
+        if usage:
+            entries.append(usage)
+    return entries[-1] if entries else None
+
+
+def median_ms(
+    call: Callable[[], object], runs: int, before: Callable[[], None] | None = None
+) -> float:
+    """Median wall time of *runs* calls, after *before* when given."""
+    samples = []
+    for _ in range(runs):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(sizes: list[int], runs: int) -> dict[str, object]:
+    """Median milliseconds per render and transcript size."""
+    results: dict[str, object] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_session_tail_") as tmp:
+        path = Path(tmp) / "session.jsonl"
+        cursor = Path(tmp) / "cursor.json"
+        for mb in sizes:
+            n = write_transcript(path, mb)
+            counter = [n]
+
+            def append(counter: list[int] = counter) -> None:
+                counter[0] += 1
+                with path.open("a", encoding="utf-8") as f:
+                    f.write(entry(counter[0]) + "\n")
+
+            last_usage(path, cursor)
+            results[str(mb)] = {
+                "full_read_ms": round(median_ms(lambda: full_read(path), runs), 2),
+                "tail_ms": round(median_ms(lambda: last_usage(path), runs), 3),
+                "cursor_ms": round(
+                    median_ms(lambda: last_usage(path, cursor), runs, before=append),
+                    3,
+                ),
+            }
+            cursor.unlink()
+    return {"runs": runs, "mb": results}
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10, help="runs (default: 10)")
+    parser.add_argument(
+        "--mb",
+        type=int,
+        nargs="+",
+        default=[1, 10, 50],
+        help="transcript sizes in MiB (default: 1 10 50)",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    report = run(args.mb, args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"median of {args.runs} runs, milliseconds per render")
+    print(f"{'MiB':>5} {'full read':>12} {'tail':>10} {'cursor':>10}")
+    for mb, row in report["mb"].items():  # type: ignore[union-attr]
+        print(
+            f"{mb:>5} {row['full_read_ms']:>12.2f} {row['tail_ms']:>10.3f} "
+            f"{row['cursor_ms']:>10.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,11 +12,21 @@ import io
 import json
 import os
 import re
-import subprocess
 import sys
-import tempfile
 from pathlib import Path
 
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from lazy_import import lazy_import
+from tracing import span
+
+subprocess = lazy_import("subprocess")
+tempfile = lazy_import("tempfile")
+
+STARTUP_BUDGET_MS = 35
+
 # Force UTF-8 output on Windows (fixes emoji encoding errors)
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
@@ -35,13 +45,14 @@ def debug_log(message: str) -> None:
 def run_command(cmd: list[str], cwd: str | None = None) -> tuple[int, str, str]:
     """Run a command and return (returncode, stdout, stderr)."""
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            cwd=cwd,
-        )
+        with span("subprocess", cat="subprocess", argv0=cmd[0]):
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=30,
+                cwd=cwd,
+            )
         return result.returncode, result.stdout, result.stderr
     except subprocess.TimeoutExpired:
         return 1, "", "Command timed out"
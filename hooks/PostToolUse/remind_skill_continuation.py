@@ -5,7 +5,8 @@
 """
 Remind Claude to continue after ExitPlanMode.
 
-Creates a state file that the Stop hook checks to auto-continue workflow.
+Records a continuation request in the shared state store
+(lib/state_store.py) that the Stop hook checks to auto-continue workflow.
 Triggers on:
   - PostToolUse for ExitPlanMode tool (plan mode completion)
 This is a workaround for plugin mode where additionalContext isn't applied.
@@ -13,11 +14,20 @@ This is a workaround for plugin mode where additionalContext isn't applied.
 
 import io
 import json
-import logging
 import os
 import sys
-import tempfile
 from pathlib import Path
+from types import ModuleType
+
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from lazy_import import DEBUG as DEBUG_LEVEL
+from lazy_import import WARNING, LazyLogger
+from state_store import StateStore
+
+STARTUP_BUDGET_MS = 35
 
 # Force UTF-8 output on Windows (fixes emoji encoding errors)
 if sys.platform == "win32":
@@ -26,16 +36,26 @@ if sys.platform == "win32":
 
 # Setup debug logging (cross-platform temp path)
 DEBUG = os.environ.get("DEBUG_DELEGATION_HOOK", "0") == "1"
-if DEBUG:
-    logging.basicConfig(
-        filename=str(Path(tempfile.gettempdir()) / "delegation_hook_debug.log"),
-        level=logging.DEBUG,
-        format="%(asctime)s - remind_skill_continuation - %(message)s",
-    )
-else:
-    logging.basicConfig(level=logging.WARNING)
 
-logger = logging.getLogger(__name__)
+
+def _setup_logging(logging: ModuleType) -> None:
+    """Configure logging the first time a record is emitted."""
+    if DEBUG:
+        import tempfile
+
+        logging.basicConfig(
+            filename=str(Path(tempfile.gettempdir()) / "delegation_hook_debug.log"),
+            level=logging.DEBUG,
+            format="%(asctime)s - remind_skill_continuation - %(message)s",
+        )
+    else:
+        logging.basicConfig(level=logging.WARNING)
+
+
+logger = LazyLogger(__name__, DEBUG_LEVEL if DEBUG else WARNING, _setup_logging)
+
+# A continuation request not picked up by a Stop hook within a day is stale
+CONTINUATION_TTL_SECONDS = 24 * 3600
 
 CONTINUATION_CONTEXT = (
     "⚡ IMMEDIATELY PROCEED TO STAGE 1: EXECUTION. "
@@ -43,21 +63,23 @@ CONTINUATION_CONTEXT = (
 )
 
 
+def _state_store() -> StateStore:
+    project_dir = Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd()))
+    return StateStore(project_dir / ".claude" / "state")
+
+
 def _create_continuation_state(reason: str) -> None:
-    """Create state file and emit additionalContext for workflow continuation."""
-    state_dir = Path(".claude/state")
-    state_dir.mkdir(parents=True, exist_ok=True)
-    state_file = state_dir / "workflow_continuation_needed.json"
-    state_file.write_text(
-        json.dumps(
-            {
-                "reason": reason,
-                "action": "continue workflow execution",
-            },
-            ensure_ascii=False,
+    """Record the continuation request and emit additionalContext for it."""
+    store = _state_store()
+    try:
+        store.set(
+            "workflow_continuation",
+            {"reason": reason, "action": "continue workflow execution"},
+            ttl=CONTINUATION_TTL_SECONDS,
         )
-    )
-    logger.debug("Created state file: %s (reason: %s)", state_file, reason)
+        logger.debug("Recorded continuation in %s (reason: %s)", store.file, reason)
+    except OSError as e:
+        logger.debug("Failed to record continuation: %s", e)
 
     # Also output additionalContext (may work in some contexts)
     output = {
@@ -76,16 +98,11 @@ def _zero_violations_counter() -> None:
     right path, so the slate is clean. Subsequent direct tool calls in this
     turn start nudging from zero again.
     """
-    state_dir = Path(".claude/state")
-    counter_file = state_dir / "delegation_violations.json"
-    if not counter_file.exists():
-        return
     try:
-        data = json.loads(counter_file.read_text(encoding="utf-8"))
-        data["violations"] = 0
-        data["delegations"] = int(data.get("delegations", 0)) + 1
-        counter_file.write_text(json.dumps(data), encoding="utf-8")
-    except (json.JSONDecodeError, OSError) as e:
+        with _state_store().transaction() as txn:
+            txn.set("violations", 0)
+            txn.incr("delegations")
+    except OSError as e:
         logger.debug("Failed to zero violations counter: %s", e)
 
 
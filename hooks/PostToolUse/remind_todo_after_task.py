@@ -16,6 +16,8 @@ if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
+STARTUP_BUDGET_MS = 20
+
 
 def main() -> int:
     """Main entry point."""
@@ -11,7 +11,6 @@ the plan on the next iteration if needed.
 """
 
 import io
-import json
 import os
 import sys
 
@@ -21,36 +20,30 @@ if sys.platform == "win32":
 
 from pathlib import Path
 
-MIN_DEPTH = 3
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from phase_index import MIN_DEPTH, load_index
+
+STARTUP_BUDGET_MS = 35
 
 
 def main() -> int:
     """Main entry point. Always returns 0."""
     project_dir = Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd()))
-    task_graph_file = project_dir / ".claude" / "state" / "active_task_graph.json"
-
-    if not task_graph_file.exists():
-        return 0
-
-    try:
-        task_graph = json.loads(task_graph_file.read_text(encoding="utf-8"))
-    except (json.JSONDecodeError, OSError):
+    index = load_index(project_dir / ".claude" / "state")
+    if index is None:
         return 0
 
-    violations = []
-    execution_plan = task_graph.get("execution_plan", task_graph)
-    for wave in execution_plan.get("waves", []):
-        for phase in wave.get("phases", []):
-            if phase.get("is_atomic") is True and phase.get("depth", 0) < MIN_DEPTH:
-                violations.append(
-                    f"{phase.get('phase_id', 'unknown')} (depth: {phase.get('depth', 0)})"
-                )
+    violations = [f"{phase_id} (depth: {depth})" for phase_id, depth in index.shallow]
+    total = index.shallow_total
 
     if violations:
         sys.stderr.write(
-            f"hint: {len(violations)} atomic task(s) shallower than depth {MIN_DEPTH}: "
-            f"{', '.join(violations[:5])}"
-            + (f" (+{len(violations) - 5} more)" if len(violations) > 5 else "")
+            f"hint: {total} atomic task(s) shallower than depth {MIN_DEPTH}: "
+            f"{', '.join(violations)}"
+            + (f" (+{total - 5} more)" if total > 5 else "")
             + ". Deeper decomposition improves parallelization.\n"
         )
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+PreToolUse Hook: Single Dispatcher (cross-platform)
+
+Runs every PreToolUse check in one process. The stdin payload is read and
+parsed once, the state directory is resolved once, and each check runs as an
+in-process stage:
+
+1. validate_task_graph_compliance.compliance_hint  (Agent/Task wave hint)
+2. require_delegation.delegation_nudge             (per-turn work-tool nudge)
+3. turn_history.count_tool_call                    (per-turn tool-call count)
+4. token_rewrite_hook.rewrite_command              (Bash → compact_run.py)
+
+Stage output is merged into one hook response: hints go to stderr in stage
+order (one per line), and the rewrite is emitted as ``updatedInput`` on
+stdout. The result matches running the three scripts separately; the
+tool-call count only exists here.
+
+The individual scripts remain runnable on their own.
+
+EXIT CODES:
+- 0: always, unless a stage raised
+- 1: a stage raised and there is no rewrite to emit (non-blocking error);
+     if the rewrite stage succeeded its output wins and the error is only
+     reported on stderr, as it would be from the separate hook
+"""
+
+import io
+import json
+import os
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+# Stage modules live next to this script. sys.path[0] already points here
+# unless the interpreter runs with -P / -I, so make sure it does.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+
+import require_delegation
+import token_rewrite_hook
+import validate_task_graph_compliance
+from tracing import span
+from turn_history import count_tool_call
+
+# Force UTF-8 output on Windows (fixes emoji encoding errors)
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
+
+STARTUP_BUDGET_MS = 40
+MAX_STDIN_SIZE = 1048576
+
+# (stage name, function(payload, state_dir) -> hint or None)
+HINT_STAGES: list[tuple[str, Callable[[dict, Path], str | None]]] = [
+    ("validate_task_graph_compliance", validate_task_graph_compliance.compliance_hint),
+    ("require_delegation", require_delegation.delegation_nudge),
+    ("turn_history", count_tool_call),
+]
+
+
+def get_state_dir() -> Path:
+    """Get the state directory path (not created; stages create it on write)."""
+    project_dir = Path(os.environ.get("CLAUDE_PROJECT_DIR", str(Path.cwd()))).resolve()
+    return project_dir / ".claude" / "state"
+
+
+def dispatch(data: dict, state_dir: Path) -> tuple[list[str], dict | None, bool]:
+    """Run every stage against one parsed payload.
+
+    Returns (stderr lines, updatedInput or None, whether any stage raised).
+    A failing stage never prevents the remaining stages from running.
+    """
+    lines: list[str] = []
+    failed = False
+
+    for name, stage in HINT_STAGES:
+        try:
+            with span(name):
+                hint = stage(data, state_dir)
+        except Exception as e:  # noqa: BLE001
+            lines.append(f"{name} hook error: {e}")
+            failed = True
+            continue
+        if hint:
+            lines.append(hint)
+
+    updated_input = None
+    try:
+        with span("token_rewrite_hook"):
+            updated_input = token_rewrite_hook.rewrite_command(data)
+    except Exception as e:  # noqa: BLE001
+        lines.append(f"token_rewrite_hook hook error: {e}")
+        failed = True
+
+    return lines, updated_input, failed
+
+
+def main() -> int:
+    """Main entry point."""
+    try:
+        with span("parse payload"):
+            stdin_data = sys.stdin.read(MAX_STDIN_SIZE)
+            data = json.loads(stdin_data) if stdin_data else {}
+    except (OSError, json.JSONDecodeError):
+        return 0
+    if not isinstance(data, dict):
+        return 0
+
+    lines, updated_input, failed = dispatch(data, get_state_dir())
+
+    for line in lines:
+        sys.stderr.write(line + "\n")
+    if updated_input:
+        print(json.dumps({"updatedInput": updated_input}))  # noqa: T201
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
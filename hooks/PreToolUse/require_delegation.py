@@ -16,6 +16,8 @@ trigger nudges.
 
 Counter is reset by UserPromptSubmit (new turn) and zeroed when
 /workflow-orchestrator:delegate runs (handled by remind_skill_continuation.py).
+It lives in the shared state store (lib/state_store.py) and is incremented
+under its lock, so parallel tool calls never lose a count.
 
 EXIT CODES:
 - 0: always (this hook never blocks)
@@ -23,21 +25,38 @@ EXIT CODES:
 
 import io
 import json
-import logging
 import os
 import sys
 from pathlib import Path
+from types import ModuleType
 
-# Force UTF-8 output on Windows (fixes emoji encoding errors)
-if sys.platform == "win32":
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from lazy_import import WARNING, LazyLogger
+from state_store import StateStore
+from tracing import span
+
+STARTUP_BUDGET_MS = 35
+
+# Force UTF-8 output on Windows (fixes emoji encoding errors). Only when run
+# as a script: dispatch.py imports this module and owns the streams.
+if sys.platform == "win32" and __name__ == "__main__":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
-logger = logging.getLogger("require_delegation")
-logger.setLevel(logging.WARNING)
-_handler = logging.StreamHandler(sys.stderr)
-_handler.setFormatter(logging.Formatter("%(message)s"))
-logger.addHandler(_handler)
+
+def _setup_logging(logging: ModuleType) -> None:
+    """Configure the real logger the first time a nudge is emitted."""
+    real = logging.getLogger("require_delegation")
+    real.setLevel(logging.WARNING)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    real.addHandler(handler)
+
+
+logger = LazyLogger("require_delegation", WARNING, _setup_logging)
 
 # Stable, work-doing primitives. New Claude Code tools never appear here.
 WORK_TOOLS = {
@@ -66,24 +85,6 @@ def is_subagent() -> bool:
     )
 
 
-def load_violations(path: Path) -> dict[str, int | str]:
-    """Load violations counter, or return a fresh one."""
-    if not path.exists():
-        return {"violations": 0, "delegations": 0, "turn_id": ""}
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except (json.JSONDecodeError, OSError):
-        return {"violations": 0, "delegations": 0, "turn_id": ""}
-
-
-def save_violations(path: Path, data: dict[str, int | str]) -> None:
-    """Persist violations counter."""
-    try:
-        path.write_text(json.dumps(data), encoding="utf-8")
-    except OSError:
-        pass
-
-
 def message_for(count: int) -> str | None:
     """Pick the escalation message for a given violation count.
 
@@ -108,19 +109,42 @@ def message_for(count: int) -> str | None:
     )
 
 
-def main() -> int:
-    """Main entry point. Always returns 0."""
+def delegation_nudge(data: dict, state_dir: Path) -> str | None:
+    """Count a direct work-tool call and return its escalation message.
+
+    Stage entry point shared with dispatch.py. *data* is the parsed hook
+    payload; returns None when the call is not a violation.
+    """
     # Subagents are executing a delegation — never count their tool use.
     if is_subagent():
-        return 0
-
-    state_dir = get_state_dir()
+        return None
 
     # If a delegation is active in this session, the main agent is steering
     # subagents — direct tool use is fine.
     if (state_dir / "delegation_active").exists():
+        return None
+
+    tool_name = str(data.get("tool_name", ""))
+    if tool_name not in WORK_TOOLS:
+        return None
+
+    # Count + nudge
+    try:
+        with span("count violation", cat="state"):
+            count = StateStore(state_dir).incr("violations")
+    except OSError:
+        count = 1  # state not writable: nudge as on a fresh turn
+
+    return message_for(count)
+
+
+def main() -> int:
+    """Main entry point. Always returns 0."""
+    if is_subagent():
         return 0
 
+    state_dir = get_state_dir()
+
     # Read tool name from stdin
     try:
         stdin_data = sys.stdin.read()
@@ -128,18 +152,7 @@ def main() -> int:
     except (OSError, json.JSONDecodeError):
         return 0
 
-    tool_name = str(data.get("tool_name", ""))
-    if tool_name not in WORK_TOOLS:
-        return 0
-
-    # Count + nudge
-    counter_file = state_dir / "delegation_violations.json"
-    state = load_violations(counter_file)
-    count = int(state.get("violations", 0)) + 1
-    state["violations"] = count
-    save_violations(counter_file, state)
-
-    msg = message_for(count)
+    msg = delegation_nudge(data, state_dir)
     if msg:
         logger.warning("%s", msg)
 
@@ -9,6 +9,26 @@ Routes specific Bash commands through compact_run.py for output compression.
 Only intercepts commands that benefit from post-processing (success compression,
 log dedup, test failure extraction). Everything else passes through unchanged.
 
+Command lists (``uv sync && pytest -x``, ``cd a; git add . && git commit``)
+are split with a quote-aware lexer (lib/shell_lexer.py) and each eligible
+command is wrapped on its own. Commands in a pipeline, with a redirection or
+substitution, or run in the background are left as they are.
+
+Commands are classified past launchers (``uv run``, ``python -m``,
+``poetry run``, ``timeout``, ``env``, ``FOO=1``; see launched_command() in
+lib/command_registry.py). The launcher stays part of what compact_run runs;
+leading ``NAME=value`` assignments stay in front of the wrapper, whose
+environment the command inherits.
+
+Wrapped commands call compact_run.py (standard library only) with a Python
+interpreter directly, ``<python> -I -S compact_run.py ...``: the
+materialized runtime when scripts/build_runtime.py built one, else the
+interpreter running this hook. ``uv run --no-project --script`` is only
+used when neither is a Python >= 3.12, or when this hook itself runs in
+uv's temporary script environment, which is gone by the time the wrapped
+command runs (lib/hook_python.py). The runtime spares uv's startup on
+every wrapped git, test or log command.
+
 This hook is a rewrite-only hook — it never blocks tools (always exits 0).
 Subagents are NOT skipped, as they benefit from output compression too.
 
@@ -21,47 +41,37 @@ EXIT CODES:
 import io
 import json
 import os
-import shlex
 import sys
 from pathlib import Path
 
-# Force UTF-8 output on Windows (fixes encoding errors)
-if sys.platform == "win32":
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from command_registry import Registry, is_assignment, launched_command, load_registry
+from hook_python import is_ephemeral, runtime_python
+from lazy_import import lazy_import
+from shell_lexer import split_list
+
+shlex = lazy_import("shlex")
+
+STARTUP_BUDGET_MS = 35
+
+MIN_PYTHON = (3, 12)  # compact_run.py's requires-python
+ISOLATION_FLAGS = "-I -S"  # as scripts/build_runtime.py: stdlib only
+UV_RUNNER = "uv run --no-project --script"
+
+# Force UTF-8 output on Windows (fixes encoding errors). Only when run as a
+# script: dispatch.py imports this module and owns the streams.
+if sys.platform == "win32" and __name__ == "__main__":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
-# Shell metacharacters that indicate compound commands (unsafe to wrap).
+# Shell metacharacters that indicate compound commands (not wrapped whole).
 # Includes redirection operators (>, >>) which change semantics when wrapped,
-# backticks for command substitution, and & for background execution.
-_SHELL_META = ("|", "&&", "||", ";", "<<", "$(", ">", "`", "&")
-
-# Command families and their subcommands that should be wrapped.
-# None means the command is always wrapped regardless of subcommand.
-_COMMAND_FAMILIES: dict[str, list[str] | None] = {
-    "git": ["push", "pull", "fetch", "add", "commit", "merge", "rebase", "stash"],
-    "docker": ["logs"],
-    "podman": ["logs"],
-    "kubectl": ["logs"],
-    "pytest": None,
-    "py.test": None,
-    "cargo": ["test"],
-    "npm": ["test"],
-    "pnpm": ["test"],
-    "yarn": ["test"],
-    "bun": ["test"],
-    "npx": [
-        "vitest",
-        "jest",
-        "mocha",
-        "playwright",
-        "eslint",
-        "next",
-        "tsc",
-    ],  # filtered by _npx_safe()
-    "go": ["test"],
-    "make": ["test", "check"],
-    "next": ["lint"],
-}
+# backticks for command substitution, & for background execution and
+# newlines, which separate commands like ;.
+_SHELL_META = ("|", "&&", "||", ";", "<<", "$(", ">", "`", "&", "\n")
 
 
 def get_plugin_root() -> Path:
@@ -71,51 +81,53 @@ def get_plugin_root() -> Path:
     return Path(__file__).resolve().parent.parent.parent
 
 
-def _normalize_cmd(token: str) -> str:
-    """Normalize a command token: strip path and .exe suffix for cross-platform matching."""
-    base = os.path.basename(token)
-    name, ext = os.path.splitext(base)
-    return name.lower() if ext.lower() == ".exe" else base
+def compact_run_python(plugin_root: Path) -> str | None:
+    """Interpreter that runs compact_run.py directly, or None to go through uv.
+
+    The materialized runtime (<root>/runtime, see scripts/build_runtime.py)
+    if it exists, else this interpreter when it is new enough and not one
+    uv deletes when this hook exits.
+    """
+    runtime = runtime_python(plugin_root)
+    if runtime.is_file():
+        return str(runtime)
+    if (
+        sys.version_info >= MIN_PYTHON
+        and sys.executable
+        and not is_ephemeral(sys.executable)
+    ):
+        return sys.executable
+    return None
 
 
-def _npx_safe(parts: list[str]) -> bool:
-    """Check if an npx command is safe to wrap (not long-running).
+def compact_run_runner(plugin_root: Path) -> str:
+    """Command prefix that runs compact_run.py, ending with a space."""
+    # Shell-quote the paths to handle spaces in plugin install paths
+    script = shlex.quote(str(plugin_root / "hooks" / "compact_run.py"))
+    python = compact_run_python(plugin_root)
+    if python is None:
+        return f"{UV_RUNNER} {script} "
+    return f"{shlex.quote(python)} {ISOLATION_FLAGS} {script} "
 
-    Long-running commands like ``npx next dev``, ``npx next start``,
-    ``npx next build``, and ``npx tsc --watch`` must NOT be wrapped.
-    """
-    if len(parts) < 2:
-        return False
-    tool = parts[1]
-    third = parts[2] if len(parts) > 2 else ""
-    if tool == "next":
-        # Only `next lint` is safe; dev/start/build are long-running
-        return third == "lint"
-    if tool == "tsc":
-        # tsc is safe unless --watch is present anywhere
-        return "--watch" not in parts and "-w" not in parts
-    # vitest, jest, mocha, playwright, eslint — always safe
-    return tool in ("vitest", "jest", "mocha", "playwright", "eslint")
-
-
-def _should_wrap(command: str) -> bool:
+
+def _should_wrap(command: str, registry: Registry | None = None) -> bool:
     """Check if command matches a wrappable command family."""
-    parts = command.split()
-    if not parts:
-        return False
+    if registry is None:
+        registry = load_registry()
+    return registry.match(launched_command(command.split())) is not None
 
-    first = _normalize_cmd(parts[0])
-    second = parts[1] if len(parts) > 1 else ""
 
-    if first not in _COMMAND_FAMILIES:
-        return False
-    subcommands = _COMMAND_FAMILIES[first]
-    if subcommands is None:
-        # Entry exists with None value — always wrap (e.g., pytest)
-        return True
-    if first == "npx" and second in subcommands:
-        return _npx_safe(parts)
-    return second in subcommands
+def _command_start(command: str) -> int:
+    """Offset of *command* past its leading ``NAME=value`` assignments."""
+    i = 0
+    while True:
+        start = len(command) - len(command[i:].lstrip())
+        end = start
+        while end < len(command) and not command[end].isspace():
+            end += 1
+        if start == end or not is_assignment(command[start:end]):
+            return start
+        i = end
 
 
 def _has_shell_meta(command: str) -> bool:
@@ -123,79 +135,80 @@ def _has_shell_meta(command: str) -> bool:
     return any(meta in command for meta in _SHELL_META)
 
 
-def _extract_cd_prefix(command: str) -> tuple[str, str] | None:
-    """Extract 'cd <path> && ' prefix from command, return (prefix, rest) or None."""
-    import re
+def _wrap_list(command: str, runner: str, registry: Registry) -> str | None:
+    """*command* with *runner* before each simple command that qualifies."""
+    segments = split_list(command)
+    if segments is None:
+        return None
+    rewritten = command
+    for segment in reversed(segments):
+        if segment.simple and _should_wrap(segment.text, registry):
+            at = segment.start + _command_start(segment.text)
+            rewritten = rewritten[:at] + runner + rewritten[at:]
+    return rewritten if rewritten != command else None
 
-    m = re.match(r"^(cd\s+\S+\s*&&\s*)", command)
-    if m:
-        return m.group(1), command[m.end() :]
-    return None
 
+def rewrite_command(data: dict) -> dict[str, str] | None:
+    """Return the ``updatedInput`` for a wrappable Bash call, else None.
 
-def main() -> int:
-    """Main entry point."""
+    Stage entry point shared with dispatch.py. *data* is the parsed hook
+    payload.
+    """
     # Check gate
     if os.environ.get("CLAUDE_TOKEN_EFFICIENCY", "1") == "0":
-        return 0
-
-    # Read and parse stdin JSON
-    try:
-        stdin_data = sys.stdin.read()
-        if not stdin_data:
-            return 0
-        data = json.loads(stdin_data)
-    except (json.JSONDecodeError, OSError):
-        return 0
+        return None
 
     # Only intercept Bash tool
     tool_name = data.get("tool_name", "")
     if tool_name != "Bash":
-        return 0
+        return None
 
     # Extract command
     tool_input = data.get("tool_input", {})
     command = tool_input.get("command", "") if isinstance(tool_input, dict) else ""
     if not command:
-        return 0
+        return None
 
     # Skip if already wrapped
     if "compact_run.py" in command:
-        return 0
+        return None
+
+    # Command families: built-in plus the project's .claude/compact_run.toml
+    registry = load_registry()
+
+    runner = compact_run_runner(get_plugin_root())
 
-    # Skip if shell metacharacters present
+    # Compound command: wrap the commands of the list that qualify
     if _has_shell_meta(command):
-        # Special case: cd <path> && <command> — extract and check the command portion
-        cd_match = _extract_cd_prefix(command)
-        if cd_match:
-            prefix, rest = cd_match
-            if not _has_shell_meta(rest) and _should_wrap(rest):
-                compact_run = get_plugin_root() / "hooks" / "compact_run.py"
-                compact_run_quoted = shlex.quote(str(compact_run))
-                result = {
-                    "updatedInput": {
-                        "command": f"{prefix}uv run --no-project --script {compact_run_quoted} {rest}"
-                    }
-                }
-                print(json.dumps(result))  # noqa: T201
-        return 0
+        rewritten = _wrap_list(command, runner, registry)
+        return {"command": rewritten} if rewritten is not None else None
 
     # Check if command should be wrapped
-    if not _should_wrap(command):
+    if not _should_wrap(command, registry):
+        return None
+
+    at = _command_start(command)
+    return {"command": command[:at] + runner + command[at:]}
+
+
+def main() -> int:
+    """Main entry point."""
+    # Check gate
+    if os.environ.get("CLAUDE_TOKEN_EFFICIENCY", "1") == "0":
+        return 0
+
+    # Read and parse stdin JSON
+    try:
+        stdin_data = sys.stdin.read()
+        if not stdin_data:
+            return 0
+        data = json.loads(stdin_data)
+    except (json.JSONDecodeError, OSError):
         return 0
 
-    # Build compact_run.py path
-    compact_run = get_plugin_root() / "hooks" / "compact_run.py"
-
-    # Emit rewritten command — use uv run for cross-platform Python execution
-    # Shell-quote the path to handle spaces in plugin install paths
-    compact_run_quoted = shlex.quote(str(compact_run))
-    result = {
-        "updatedInput": {
-            "command": f"uv run --no-project --script {compact_run_quoted} {command}"
-        }
-    }
-    print(json.dumps(result))  # noqa: T201
+    updated_input = rewrite_command(data)
+    if updated_input:
+        print(json.dumps({"updatedInput": updated_input}))  # noqa: T201
 
     return 0
 
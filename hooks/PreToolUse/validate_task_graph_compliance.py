@@ -17,82 +17,89 @@ import re
 import sys
 from pathlib import Path
 
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from phase_index import load_index
+from tracing import span
+
+STARTUP_BUDGET_MS = 35
 MAX_STDIN_SIZE = 1048576
 
 
-def main() -> int:
-    """Main entry point. Always returns 0."""
-    state_dir = (
-        Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd())) / ".claude" / "state"
-    )
+def get_state_dir() -> Path:
+    """Get the state directory path."""
+    return Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd())) / ".claude" / "state"
+
+
+def compliance_hint(tool_input: dict, state_dir: Path) -> str | None:
+    """Return a hint when an Agent/Task spawn doesn't match the active wave.
 
+    Stage entry point shared with dispatch.py. *tool_input* is the parsed
+    hook payload; returns None when there is nothing to say.
+    """
     # Team mode handles its own dependency tracking
     if (state_dir / "team_mode_active").exists():
-        return 0
-
-    try:
-        stdin_json = sys.stdin.read(MAX_STDIN_SIZE)
-        tool_input = json.loads(stdin_json) if stdin_json else {}
-    except (OSError, json.JSONDecodeError):
-        return 0
+        return None
 
     tool_name = tool_input.get("tool_name", "")
-    if len(sys.argv) > 1:
-        tool_name = sys.argv[1]
-
     if tool_name not in ("Agent", "Task", "SubagentTask", "AgentTask"):
-        return 0
-
-    task_graph_file = state_dir / "active_task_graph.json"
-    if not task_graph_file.exists():
-        return 0
+        return None
 
     task_prompt = tool_input.get("prompt", "") or tool_input.get("parameters", {}).get(
         "prompt", ""
     )
     if not task_prompt:
-        return 0
+        return None
 
     if tool_input.get("subagent_type", "") == "delegation-orchestrator":
-        return 0
+        return None
 
-    try:
-        task_graph = json.loads(task_graph_file.read_text(encoding="utf-8"))
-    except (json.JSONDecodeError, OSError):
-        return 0
+    with span("read task graph", cat="state"):
+        index = load_index(state_dir)
+    if index is None:
+        return None
 
     phase_match = re.search(r"Phase ID: (phase_\d+_\d+)", task_prompt)
     phase_id = phase_match.group(1) if phase_match else ""
 
     if not phase_id:
-        sys.stderr.write(
+        return (
             "hint: Agent/Task spawn missing 'Phase ID: phase_X_Y' marker "
-            "(active task graph at .claude/state/active_task_graph.json).\n"
+            "(active task graph at .claude/state/active_task_graph.json)."
         )
-        return 0
 
-    phase_wave = None
-    for wave in task_graph.get("waves", []):
-        for phase in wave.get("phases", []):
-            if phase.get("phase_id") == phase_id:
-                phase_wave = wave.get("wave_id")
-                break
-        if phase_wave is not None:
-            break
-
-    if phase_wave is None:
-        sys.stderr.write(
-            f"hint: phase ID '{phase_id}' not found in active task graph.\n"
-        )
-        return 0
+    phase = index.phase(phase_id)
+    if phase is None:
+        return f"hint: phase ID '{phase_id}' not found in active task graph."
 
-    current_wave = task_graph.get("current_wave", 0)
+    phase_wave = phase.wave
+    current_wave = index.current_wave
     if phase_wave > current_wave:
-        sys.stderr.write(
+        return (
             f"hint: spawning {phase_id} (wave {phase_wave}) while wave "
-            f"{current_wave} is incomplete — out-of-order execution.\n"
+            f"{current_wave} is incomplete — out-of-order execution."
         )
 
+    return None
+
+
+def main() -> int:
+    """Main entry point. Always returns 0."""
+    try:
+        stdin_json = sys.stdin.read(MAX_STDIN_SIZE)
+        tool_input = json.loads(stdin_json) if stdin_json else {}
+    except (OSError, json.JSONDecodeError):
+        return 0
+
+    if len(sys.argv) > 1:
+        tool_input = {**tool_input, "tool_name": sys.argv[1]}
+
+    hint = compliance_hint(tool_input, get_state_dir())
+    if hint:
+        sys.stderr.write(hint + "\n")
+
     return 0
 
 
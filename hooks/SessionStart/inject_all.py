@@ -18,29 +18,38 @@ plugin.json's outputStyles field — no hook injection required.
 
 import io
 import json
-import logging
 import os
 import sys
-import tempfile
 from pathlib import Path
 
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from lazy_import import LazyLogger, lazy_import
+
+tempfile = lazy_import("tempfile")
+
+STARTUP_BUDGET_MS = 35
+
 # Force UTF-8 output on Windows (fixes encoding errors)
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
-logger = logging.getLogger(__name__)
+logger = LazyLogger(__name__)
 
 # Debug mode
 DEBUG_HOOK = os.environ.get("DEBUG_DELEGATION_HOOK", "0") == "1"
-DEBUG_FILE = Path(tempfile.gettempdir()) / "delegation_hook_debug.log"
+DEBUG_FILE_NAME = "delegation_hook_debug.log"
 
 
 def debug_log(message: str) -> None:
     """Write debug message if debugging is enabled."""
     if DEBUG_HOOK:
         try:
-            with DEBUG_FILE.open("a", encoding="utf-8") as f:
+            debug_file = Path(tempfile.gettempdir()) / DEBUG_FILE_NAME
+            with debug_file.open("a", encoding="utf-8") as f:
                 f.write(f"{message}\n")
         except OSError:
             pass
@@ -4,20 +4,32 @@ UserPromptSubmit Hook: Per-Turn State Reset (cross-platform)
 
 Resets per-turn state at the start of each user prompt:
 - Records turn-start timestamp (used by stop hook for duration tracking)
-- Clears delegation_violations.json (fresh per-turn nudge counter)
+- Resets the delegation violations counter (fresh per-turn nudge counter)
+- Resets the turn's tool-call count (recorded in the turn history at Stop)
 - Clears team mode state files (team_mode_active, team_config.json)
 - Clears delegation_active flag
 - Rotates the gate invocations log if oversized
 - Cleans up old validation state files (>24h)
 
+The timestamp and counter live in the shared state store
+(lib/state_store.py) and are reset in one transaction.
+
 This Python version works on Windows, macOS, and Linux.
 """
 
 import os
 import sys
-from datetime import datetime, timedelta
+import time
 from pathlib import Path
 
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from state_store import StateStore
+from turn_history import reset_tool_calls
+
+STARTUP_BUDGET_MS = 30
 MAX_LOG_SIZE = 1048576  # 1MB
 MAX_ROTATIONS = 5
 VALIDATION_FILE_MAX_AGE_HOURS = 24
@@ -29,28 +41,18 @@ def get_state_dir() -> Path:
     return project_dir / ".claude" / "state"
 
 
-def record_turn_start_timestamp(state_dir: Path) -> None:
-    """Record the timestamp when user prompt is submitted (for duration tracking)."""
-    try:
-        state_dir.mkdir(parents=True, exist_ok=True)
-        (state_dir / "turn_start_timestamp.txt").write_text(
-            str(datetime.now().timestamp()), encoding="utf-8"
-        )
-    except OSError:
-        pass
-
-
-def reset_violations_counter(state_dir: Path) -> None:
-    """Initialize a fresh per-turn violations counter."""
+def start_turn(state_dir: Path) -> None:
+    """Record the turn-start timestamp and fresh violation and tool-call counts."""
+    now = time.time()
     try:
-        state_dir.mkdir(parents=True, exist_ok=True)
-        turn_id = str(datetime.now().timestamp())
-        (state_dir / "delegation_violations.json").write_text(
-            f'{{"violations": 0, "delegations": 0, "turn_id": "{turn_id}"}}',
-            encoding="utf-8",
-        )
+        with StateStore(state_dir).transaction() as txn:
+            txn.set("turn_start", now)
+            txn.set("violations", 0)
+            txn.set("delegations", 0)
+            txn.set("turn_id", str(now))
     except OSError:
         pass
+    reset_tool_calls(state_dir)
 
 
 def clear_files(state_dir: Path, names: list[str]) -> None:
@@ -87,10 +89,10 @@ def cleanup_old_validations(validation_dir: Path) -> None:
     """Delete validation state files older than VALIDATION_FILE_MAX_AGE_HOURS."""
     if not validation_dir.exists():
         return
-    cutoff = datetime.now() - timedelta(hours=VALIDATION_FILE_MAX_AGE_HOURS)
+    cutoff = time.time() - VALIDATION_FILE_MAX_AGE_HOURS * 3600
     for file_path in validation_dir.glob("*.json"):
         try:
-            if datetime.fromtimestamp(file_path.stat().st_mtime) < cutoff:
+            if file_path.stat().st_mtime < cutoff:
                 file_path.unlink()
         except OSError:
             pass
@@ -100,8 +102,7 @@ def main() -> int:
     """Main entry point."""
     state_dir = get_state_dir()
 
-    record_turn_start_timestamp(state_dir)
-    reset_violations_counter(state_dir)
+    start_turn(state_dir)
 
     clear_files(
         state_dir,
@@ -10,8 +10,28 @@ Runs a command, captures output, and applies compression:
   - Log cmds:   dedup repeated lines + tail
   - Test cmds:  success -> summary line, failure -> failures only
 
+With COMPACT_RUN_STREAM=1 the command's stdout and stderr are read
+incrementally as bytes into bounded StreamViews that keep only what the
+handlers look at (head and tail, error regions, lines matching the command's
+summary/failure patterns, the pytest FAILURES section), so peak memory
+follows the output kept rather than the output produced. Otherwise the
+whole output is captured as strings, as before.
+
 Install: Part of workflow-orchestrator plugin (hooks/compact_run.py)
 Called by token_rewrite_hook.py, never directly by Claude.
+
+Commands run through a launcher (``uv run pytest``, ``python -m pytest``,
+``timeout 300 go test``) run exactly as given but are routed on the
+launched command (routed(), lib/command_registry.py).
+
+Whatever still has to be truncated is fitted into a token budget (head,
+error regions, tail; see lib/output_budget.py) rather than cut to a fixed
+number of trailing lines.
+
+When compression dropped a meaningful amount of output, the raw stdout and
+stderr are archived (lib/output_archive.py) and the summary ends with a
+handle; ``compact_run.py --show HANDLE [--grep RE] [--range A-B] [--stderr]``
+prints lines of the archived output without running the command again.
 """
 
 import io
@@ -19,32 +39,123 @@ import os
 import re
 import subprocess
 import sys
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+# Shared hook helpers live in hooks/lib
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
+import tracing
+from command_registry import Family, launched_command, load_registry
+from hook_python import stable_python
+from lazy_import import lazy_import
+from output_budget import (
+    CONTEXT,
+    ELIDED_MARKER,
+    HEAD_SHARE,
+    SALIENT,
+    line_tokens,
+    select,
+)
+
+# Only loaded on the paths that use them: memo, structured reports, log
+# clustering, the archive, the git push fallback and the project root
+compression_stats = lazy_import("compression_stats")
+git_meta = lazy_import("git_meta")
+log_templates = lazy_import("log_templates")
+output_archive = lazy_import("output_archive")
+run_memo = lazy_import("run_memo")
+test_reports = lazy_import("test_reports")
 
 # Force UTF-8 output on Windows (fixes encoding errors)
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
+STARTUP_BUDGET_MS = 50  # scripts/hook_startup_profile.py, wrapping a no-op command
+
 # --- Config ---
-MAX_LINES = 150  # Truncation safety net
+MAX_LINES = 150  # Truncation safety net, in lines on top of the token budget
 LOG_TAIL = 50  # Max log lines to show
+TOKEN_BUDGET = int(
+    os.environ.get("COMPACT_RUN_TOKEN_BUDGET", "2000")
+)  # Estimated tokens of output shown per stream (a family's budget wins)
 LOG_DEDUP = True  # Deduplicate log lines
+LOG_CLUSTER = (
+    os.environ.get("COMPACT_RUN_LOG_CLUSTER", "1") == "1"
+)  # Cluster long logs by template instead of showing the tail
 CMD_TIMEOUT = int(
     os.environ.get("COMPACT_RUN_TIMEOUT", "120")
 )  # Max seconds (env-configurable)
+STREAM = os.environ.get("COMPACT_RUN_STREAM", "0") == "1"  # Bounded-memory capture
+STRUCTURED = (
+    os.environ.get("COMPACT_RUN_STRUCTURED", "0") == "1"
+)  # Summarize test runs from machine-readable reports
+KILL_GRACE = 2.0  # Seconds between interrupting a timed-out command and killing it
+MEMO = os.environ.get("COMPACT_RUN_MEMO", "0") == "1"  # Replay unchanged test runs
+MEMO_BYPASS = (
+    os.environ.get("COMPACT_RUN_MEMO_BYPASS", "0") == "1"
+)  # Rerun (and re-record) even when a memo entry matches
+MEMO_MAX_AGE = int(
+    os.environ.get("COMPACT_RUN_MEMO_MAX_AGE", "86400")
+)  # Seconds a memo entry may be replayed
+ARCHIVE = (
+    os.environ.get("COMPACT_RUN_ARCHIVE", "1") == "1"
+)  # Keep raw output of compressed runs for --show
+ARCHIVE_MAX_MB = int(
+    os.environ.get("COMPACT_RUN_ARCHIVE_MAX_MB", "64")
+)  # Compressed size of all archives before the least recently used go
+ARCHIVE_MIN_BYTES = 2048  # Output dropped before a run is worth archiving
+ARCHIVE_DIR = "compact_run_archive"
+SHOW = "--show"
+
+# --- Streaming capture limits ---
+KEEP_LINES = 1000  # Pattern-matched lines retained per stream
+HEAD_LINES = int(MAX_LINES * HEAD_SHARE)  # Leading lines retained per stream
+MAX_LINE_BYTES = 65536  # Longer lines are cut (minified bundles, base64 blobs)
+READ_CHUNK = 65536
+
+# Command families (built-in plus the project's .claude/compact_run.toml):
+# which handler compresses each command, and the lines it searches for
+REGISTRY = load_registry()
+
+_NODE_SUMMARY = (
+    r"(?i)(Tests?:?\s+\d+ passed|\d+ passing|test suites?:.*passed|\d+ tests? passed)"
+)
+
+# pytest's FAILURES section is kept whole up to its last MAX_LINES lines
+# (keyed by handler, so project families using it get the section too)
+STREAM_SECTIONS: dict[str, tuple[str, str]] = {
+    "pytest": (r"^=+ FAILURES", r"^=+ short test summary"),
+}
+
+
+# Budget of the family being routed (route() sets it), else TOKEN_BUDGET
+_family_budget: int | None = None
+
+
+@contextmanager
+def family_budget(tokens: int | None) -> Iterator[None]:
+    """Use a family's token budget for truncated_output inside the block."""
+    global _family_budget
+    previous, _family_budget = _family_budget, tokens
+    try:
+        yield
+    finally:
+        _family_budget = previous
 
 
-def truncated_output(content: str) -> str:
-    """Apply truncation safety net."""
-    lines = content.splitlines()
-    total = len(lines)
-    if total > MAX_LINES:
-        truncated = lines[-MAX_LINES:]
-        return (
-            f"[truncated: {total} lines total, showing last {MAX_LINES}]\n"
-            + "\n".join(truncated)
-        )
-    return content
+def truncated_output(
+    content: str, max_lines: int = MAX_LINES, head_share: float = HEAD_SHARE
+) -> str:
+    """Fit *content* into the token budget and *max_lines* (head, errors, tail).
+
+    Text rebuilt by a StreamView is measured including the lines it dropped.
+    """
+    return select(content, _family_budget or TOKEN_BUDGET, max_lines, head_share)
 
 
 def emit_failure(stdout: str, stderr: str, exit_code: int) -> int:
@@ -56,6 +167,373 @@ def emit_failure(stdout: str, stderr: str, exit_code: int) -> int:
     return exit_code
 
 
+# --- Process groups ---
+
+# Commands run in their own session so a timeout can stop everything they
+# started (pytest-xdist workers, node children), not only the direct child.
+_NEW_GROUP: dict[str, bool] = {"start_new_session": sys.platform != "win32"}
+
+
+def interrupt_group(proc: subprocess.Popen[bytes]) -> None:
+    """SIGINT the command's process group so test runners report where they were."""
+    if sys.platform == "win32":
+        return
+    import signal
+
+    try:
+        os.killpg(proc.pid, signal.SIGINT)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def kill_group(proc: subprocess.Popen[bytes]) -> None:
+    """Kill the command and everything left in its process group."""
+    if sys.platform == "win32":
+        subprocess.run(  # noqa: S603
+            ["taskkill", "/F", "/T", "/PID", str(proc.pid)],  # noqa: S607
+            capture_output=True,
+        )
+        return
+    import signal
+
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class _ForwardSignals:
+    """Kill the command's group when compact_run itself is interrupted.
+
+    The command does not share compact_run's process group, so a Ctrl-C or
+    SIGTERM aimed at the wrapper would otherwise leave it running.
+    """
+
+    def __init__(self, proc: subprocess.Popen[bytes]) -> None:
+        self.proc = proc
+        self.saved: dict[int, object] = {}
+
+    def _handle(self, signum: int, frame: object) -> None:
+        kill_group(self.proc)
+        raise SystemExit(1)
+
+    def __enter__(self) -> "_ForwardSignals":
+        if sys.platform != "win32":
+            import signal
+            import threading
+
+            if threading.current_thread() is threading.main_thread():
+                for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+                    self.saved[signum] = signal.signal(signum, self._handle)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self.saved:
+            import signal
+
+            for signum, handler in self.saved.items():
+                signal.signal(signum, handler)  # type: ignore[arg-type]
+
+
+def _decode(data: bytes | str | None) -> str:
+    if isinstance(data, bytes):
+        return data.decode("utf-8", "replace")
+    return data or ""
+
+
+def _archive(
+    archive: "output_archive.ArchiveWriter | None", stdout: bytes, stderr: bytes
+) -> None:
+    if archive is not None:
+        archive.write("stdout", stdout)
+        archive.write("stderr", stderr)
+
+
+def run_buffered(
+    args: list[str],
+    timeout: float,
+    archive: "output_archive.ArchiveWriter | None" = None,
+) -> subprocess.CompletedProcess[str]:
+    """subprocess.run(capture_output=True, text=True) that stops the whole group.
+
+    On timeout the command's process group is interrupted, then killed after
+    KILL_GRACE seconds, and subprocess.TimeoutExpired is raised with the
+    output produced so far as its ``stdout`` and ``stderr``. The raw output
+    goes to *archive* either way.
+    """
+    with (
+        subprocess.Popen(  # noqa: S603
+            args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_NEW_GROUP
+        ) as proc,
+        _ForwardSignals(proc),
+    ):
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            interrupt_group(proc)
+            try:
+                stdout, stderr = proc.communicate(timeout=KILL_GRACE)
+            except subprocess.TimeoutExpired:
+                kill_group(proc)
+                try:
+                    stdout, stderr = proc.communicate(timeout=KILL_GRACE)
+                except subprocess.TimeoutExpired as exc:
+                    stdout, stderr = exc.output, exc.stderr
+            kill_group(proc)  # whatever outlived the interrupted leader
+            compression_stats.note(
+                raw_stdout=len(stdout or b""), raw_stderr=len(stderr or b"")
+            )
+            _archive(archive, stdout or b"", stderr or b"")
+            raise subprocess.TimeoutExpired(
+                args, timeout, output=_decode(stdout), stderr=_decode(stderr)
+            ) from None
+    compression_stats.note(raw_stdout=len(stdout), raw_stderr=len(stderr))
+    _archive(archive, stdout, stderr)
+    return subprocess.CompletedProcess(
+        args, proc.returncode, _decode(stdout), _decode(stderr)
+    )
+
+
+# --- Streaming capture ---
+
+
+class LogDedup:
+    """Collapse consecutive identical lines into a StreamView of the entries.
+
+    Fed one line at a time; the view keeps the last LOG_TAIL entries and
+    the error regions before them, and ``total`` counts every entry
+    produced. With LOG_CLUSTER, every line is also fed to a TemplateMiner
+    (``templates``) in the same pass.
+    """
+
+    def __init__(self, limit: int = LOG_TAIL) -> None:
+        self.entries = StreamView(tail=limit)
+        self.total = 0
+        self.templates = log_templates.TemplateMiner() if LOG_CLUSTER else None
+        self._prev: str | None = None
+        self._count = 0
+
+    def _append(self, entry: str) -> None:
+        self.entries.feed(entry)
+        self.total += 1
+
+    def feed(self, line: str) -> None:
+        if self.templates is not None:
+            self.templates.feed(line)
+        if line == self._prev:
+            self._count += 1
+            return
+        if self._count > 1:
+            self._append(f"  [repeated {self._count} times]")
+        if self._prev is not None or line != "":
+            self._append(line)
+        self._prev = line
+        self._count = 1
+
+    def finish(self) -> str:
+        """Flush a pending repeat count and return the retained entries."""
+        if self._count > 1:
+            self._append(f"  [repeated {self._count} times]")
+            self._count = 1
+        return self.entries.text()
+
+
+class StreamView:
+    """Bounded line-oriented view of one output stream.
+
+    Keeps the first HEAD_LINES and last *tail* lines, up to KEEP_LINES lines
+    matching *keep* and as many of SALIENT lines with their CONTEXT, and the
+    first HEAD_LINES and last MAX_LINES lines of a *section* (start/end
+    patterns): everything truncated_output and the string handlers can pick.
+    text() rebuilds what was kept in order, with an ELIDED_MARKER (lines and
+    estimated tokens) for each gap. *listeners* see every line; *spill*
+    gets the raw bytes as they are read.
+    """
+
+    def __init__(
+        self,
+        keep: re.Pattern[str] | None = None,
+        section: tuple[str, str] | None = None,
+        listeners: tuple[Callable[[str], None], ...] = (),
+        tail: int = MAX_LINES,
+        spill: Callable[[bytes], None] | None = None,
+    ) -> None:
+        self.keep = keep
+        self.section = (
+            (re.compile(section[0]), re.compile(section[1])) if section else None
+        )
+        self.listeners = listeners
+        self.spill = spill
+        self.lines = 0
+        self.bytes = 0
+        self.tokens = 0
+        self.ends_with_newline = False
+        # Retained lines are (index, line, estimated tokens before the line)
+        self._head: list[tuple[int, str, int]] = []
+        self._tail: deque[tuple[int, str, int]] = deque(maxlen=tail)
+        self._kept: list[tuple[int, str, int]] = []
+        self._salient: list[tuple[int, str, int]] = []
+        self._recent: deque[tuple[int, str, int]] = deque(maxlen=CONTEXT)
+        self._after = 0  # lines of context still owed to the last salient line
+        self._section_head: list[tuple[int, str, int]] = []
+        self._section: deque[tuple[int, str, int]] = deque(maxlen=MAX_LINES)
+        self._in_section = False
+
+    def feed(self, line: str) -> None:
+        index = self.lines
+        self.lines += 1
+        item = (index, line, self.tokens)
+        self.tokens += line_tokens(line)
+        if index < HEAD_LINES:
+            self._head.append(item)
+        self._tail.append(item)
+        if self.section is not None:
+            if self._in_section and self.section[1].search(line):
+                self._in_section = False
+            elif self._in_section:
+                if len(self._section_head) < HEAD_LINES:
+                    self._section_head.append(item)
+                self._section.append(item)
+            elif self.section[0].search(line):
+                self._in_section = True
+        if (
+            self.keep is not None
+            and len(self._kept) < KEEP_LINES
+            and self.keep.search(line)
+        ):
+            self._kept.append(item)
+        if len(self._salient) < KEEP_LINES:
+            if SALIENT.search(line.lower()):
+                self._salient.extend(self._recent)
+                self._salient.append(item)
+                self._recent.clear()
+                self._after = CONTEXT
+            elif self._after:
+                self._salient.append(item)
+                self._after -= 1
+            else:
+                self._recent.append(item)
+        for listener in self.listeners:
+            listener(line)
+
+    def feed_bytes(self, data: bytes) -> None:
+        """Feed one line (without its newline) as raw bytes."""
+        self.bytes += len(data) + 1
+        if data.endswith(b"\r"):
+            data = data[:-1]
+        self.feed(data.decode("utf-8", "replace"))
+
+    def text(self) -> str:
+        """Retained lines in order; identical to the full output if nothing was dropped."""
+        retained = {
+            index: (line, before)
+            for part in (
+                self._head,
+                self._kept,
+                self._salient,
+                self._section_head,
+                self._section,
+                self._tail,
+            )
+            for index, line, before in part
+        }
+        out: list[str] = []
+        expected = 0
+        spent = 0  # estimated tokens up to the expected line
+        for index in sorted(retained):
+            line, before = retained[index]
+            if index > expected:
+                out.append(ELIDED_MARKER.format(index - expected, before - spent))
+            out.append(line)
+            expected = index + 1
+            spent = before + line_tokens(line)
+        text = "\n".join(out)
+        return text + "\n" if out and self.ends_with_newline else text
+
+
+def _pump(stream: io.BufferedReader, view: StreamView) -> None:
+    """Split a pipe into lines for *view*, cutting lines over MAX_LINE_BYTES."""
+    pending = b""
+    cut = 0  # bytes already dropped from the current over-long line
+
+    def emit(line: bytes, newline: bool) -> None:
+        nonlocal cut
+        if len(line) > MAX_LINE_BYTES:
+            cut += len(line) - MAX_LINE_BYTES
+            line = line[:MAX_LINE_BYTES]
+        view.bytes += cut - (not newline)
+        if cut:
+            line += f" [... {cut} bytes cut]".encode()
+            cut = 0
+        view.feed_bytes(line)
+
+    while chunk := stream.read1(READ_CHUNK):
+        if view.spill is not None:
+            view.spill(chunk)
+        *lines, last = (pending + chunk).split(b"\n")
+        for line in lines:
+            emit(line, True)
+        pending = last
+        if len(pending) > MAX_LINE_BYTES:
+            cut += len(pending) - MAX_LINE_BYTES
+            pending = pending[:MAX_LINE_BYTES]
+    if pending or cut:
+        emit(pending, False)
+    else:
+        view.ends_with_newline = view.lines > 0
+
+
+def run_streaming(
+    args: list[str], stdout: StreamView, stderr: StreamView, timeout: float
+) -> int:
+    """Run *args*, feeding both pipes into views as output arrives.
+
+    On timeout the process group is interrupted, then killed after
+    KILL_GRACE seconds, and subprocess.TimeoutExpired is raised; the views
+    keep what was read until then.
+    """
+    import threading
+
+    proc = subprocess.Popen(  # noqa: S603
+        args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_NEW_GROUP
+    )
+    readers = [
+        threading.Thread(target=_pump, args=(pipe, view), daemon=True)
+        for pipe, view in ((proc.stdout, stdout), (proc.stderr, stderr))
+    ]
+    for reader in readers:
+        reader.start()
+    with _ForwardSignals(proc):
+        try:
+            exit_code = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            interrupt_group(proc)
+            try:
+                proc.wait(timeout=KILL_GRACE)
+            except subprocess.TimeoutExpired:
+                pass
+            kill_group(proc)
+            proc.wait()
+            for reader in readers:
+                reader.join(timeout=KILL_GRACE)  # a pipe held outside the group
+            raise
+        for reader in readers:
+            reader.join()
+    return exit_code
+
+
+# Handler patterns are sources: re compiles (and caches) one on first use,
+# so a run only pays for the patterns of the handler it routes to
+_GIT_PUSH_BRANCH = r"-> (\S+)"
+_GIT_FILES_CHANGED = r"\s*(\d+ files? changed.*)"
+_GIT_COMMIT = r"\[.+ ([a-f0-9]{7,})\] (.+)"
+_GIT_NEW_REF = r"(?m)^\s*(From|\[new|->)"
+_GIT_REBASED = r"Successfully rebased.*"
+_GIT_STASHED = r"(?i)saved working directory"
+_GIT_DROPPED = r"(?i)dropped"
+_GIT_NO_CHANGES = r"(?i)no local changes"
+
+
 def handle_git(args: list[str], stdout: str, stderr: str, exit_code: int) -> int:
     """Handle git command compression."""
     if exit_code != 0:
@@ -66,20 +544,16 @@ def handle_git(args: list[str], stdout: str, stderr: str, exit_code: int) -> int
 
     if second == "push":
         # Extract branch from "-> branch" pattern
-        match = re.search(r"-> (\S+)", combined)
+        match = re.search(_GIT_PUSH_BRANCH, combined)
         if match:
             branch = match.group(1)
         else:
-            result = subprocess.run(  # noqa: S603
-                ["git", "branch", "--show-current"],  # noqa: S607
-                capture_output=True,
-                text=True,
-            )
-            branch = result.stdout.strip() if result.returncode == 0 else "?"
+            current = git_meta.current_branch(Path.cwd())
+            branch = "?" if current is None else current
         print(f"ok \u2192 {branch}")  # noqa: T201
 
     elif second == "pull":
-        match = re.search(r"\s*(\d+ files? changed.*)", stdout)
+        match = re.search(_GIT_FILES_CHANGED, stdout)
         if match:
             print(f"ok \u2192 {match.group(1).strip()}")  # noqa: T201
         elif "Already up to date" in stdout:
@@ -88,7 +562,7 @@ def handle_git(args: list[str], stdout: str, stderr: str, exit_code: int) -> int
             print("ok")  # noqa: T201
 
     elif second == "commit":
-        match = re.search(r"\[.+ ([a-f0-9]{7,})\] (.+)", combined)
+        match = re.search(_GIT_COMMIT, combined)
         if match:
             hash_val = match.group(1)
             msg = match.group(2)
@@ -100,7 +574,7 @@ def handle_git(args: list[str], stdout: str, stderr: str, exit_code: int) -> int
         print("ok")  # noqa: T201
 
     elif second == "fetch":
-        new_refs = len(re.findall(r"^\s*(From|\[new|->)", combined, re.MULTILINE))
+        new_refs = len(re.findall(_GIT_NEW_REF, combined))
         if new_refs > 0:
             print(f"ok \u2192 {new_refs} new refs")  # noqa: T201
         else:
@@ -110,21 +584,21 @@ def handle_git(args: list[str], stdout: str, stderr: str, exit_code: int) -> int
         if "Already up to date" in stdout:
             print("ok \u2192 already up to date")  # noqa: T201
         else:
-            match = re.search(r"\s*(\d+ files? changed.*)", stdout)
+            match = re.search(_GIT_FILES_CHANGED, stdout)
             summary = match.group(1).strip() if match else "merged"
             print(f"ok \u2192 {summary}")  # noqa: T201
 
     elif second == "rebase":
-        match = re.search(r"Successfully rebased.*", combined)
+        match = re.search(_GIT_REBASED, combined)
         summary = match.group(0) if match else "rebased"
         print(f"ok \u2192 {summary}")  # noqa: T201
 
     elif second == "stash":
-        if re.search(r"saved working directory", stdout, re.IGNORECASE):
+        if re.search(_GIT_STASHED, stdout):
             print("ok \u2192 stashed")  # noqa: T201
-        elif re.search(r"dropped", stdout, re.IGNORECASE):
+        elif re.search(_GIT_DROPPED, stdout):
             print("ok \u2192 dropped")  # noqa: T201
-        elif re.search(r"no local changes", stdout, re.IGNORECASE):
+        elif re.search(_GIT_NO_CHANGES, stdout):
             print("ok \u2192 nothing to stash")  # noqa: T201
         else:
             # stash list, stash show, etc. — pass through
@@ -136,62 +610,85 @@ def handle_git(args: list[str], stdout: str, stderr: str, exit_code: int) -> int
     return exit_code
 
 
-def handle_container_logs(stdout: str, stderr: str, exit_code: int) -> int:
-    """Handle docker/podman/kubectl logs compression."""
+def format_clusters(miner: "log_templates.TemplateMiner") -> str:
+    """Template clusters as count, line range, template and one exemplar each.
+
+    Shows the LOG_TAIL clusters seen most recently, in order of first
+    occurrence; single-line clusters are shown as the line itself.
+    """
+    clusters = miner.clusters()
+    shown = sorted(clusters, key=lambda c: c.last)[-LOG_TAIL:]
+    shown.sort(key=lambda c: c.first)
+    header = f"[{miner.lines} lines clustered into {len(clusters)} templates"
+    if len(shown) < len(clusters):
+        header += f", showing {len(shown)} most recent"
+    out = [header + "]"]
+    for cluster in shown:
+        if cluster.count == 1:
+            out.append(f"{1:>7}x  line {cluster.first + 1}: {cluster.exemplar}")
+            continue
+        span = f"lines {cluster.first + 1}-{cluster.last + 1}"
+        out.append(f"{cluster.count:>7}x  {span}: {cluster.template}")
+        if cluster.template != cluster.exemplar:
+            out.append(f"{'':>10}e.g. {cluster.exemplar}")
+    if miner.overflow:
+        out.append(f"[{miner.overflow} lines past the template limit not clustered]")
+    return "\n".join(out)
+
+
+def handle_container_logs(
+    stdout: str, stderr: str, exit_code: int, dedup: LogDedup | None = None
+) -> int:
+    """Handle docker/podman/kubectl logs compression.
+
+    *dedup* is passed in streaming mode, where it was fed while the command
+    ran; otherwise it is built from *stdout*. Logs too long for the dedup
+    tail are summarized by template (LOG_CLUSTER) instead, unless they are
+    too long to cluster (log_templates.MAX_LINES); then the recent entries
+    and the error regions before them are shown within the token budget.
+    """
     if exit_code != 0:
         return emit_failure(stdout, stderr, exit_code)
 
     if LOG_DEDUP:
         # Deduplicate consecutive identical lines
-        lines = stdout.splitlines()
-        deduped: list[str] = []
-        prev = None
-        count = 0
-        for line in lines:
-            if line == prev:
-                count += 1
-            else:
-                if count > 1:
-                    deduped.append(f"  [repeated {count} times]")
-                if prev is not None or line != "":
-                    deduped.append(line)
-                prev = line
-                count = 1
-        if count > 1:
-            deduped.append(f"  [repeated {count} times]")
-
-        total = len(deduped)
-        if total > LOG_TAIL:
-            print(f"[showing last {LOG_TAIL} of {total} lines, duplicates collapsed]")  # noqa: T201
-            print("\n".join(deduped[-LOG_TAIL:]))  # noqa: T201
-        else:
-            print("\n".join(deduped))  # noqa: T201
+        if dedup is None:
+            dedup = LogDedup()
+            for line in stdout.splitlines():
+                dedup.feed(line)
+        entries = dedup.finish()
+        templates = dedup.templates
+        if dedup.total > LOG_TAIL and templates is not None and templates.complete:
+            print(format_clusters(templates))  # noqa: T201
+            return exit_code
+        # Line numbers in the elision markers count collapsed entries
+        print(truncated_output(entries, LOG_TAIL, head_share=0.0))  # noqa: T201
     else:
-        lines = stdout.splitlines()
-        print("\n".join(lines[-LOG_TAIL:]))  # noqa: T201
+        print(truncated_output(stdout, LOG_TAIL, head_share=0.0))  # noqa: T201
 
     return exit_code
 
 
+_PYTEST_PASSED = r"(\d+ passed in [0-9.]+s)"
+_PYTEST_FAILURES = r"(?ms)(^=+ FAILURES.*?^=+ short test summary)"
+_PYTEST_SUMMARY_LINE = r"(?m)^(?:FAILED|ERROR).*"
+
+
 def handle_pytest(stdout: str, stderr: str, exit_code: int) -> int:
     """Handle pytest output compression."""
     if exit_code == 0:
-        match = re.search(r"(\d+ passed in [0-9.]+s)", stdout)
+        match = re.search(_PYTEST_PASSED, stdout)
         summary = match.group(1) if match else "all passed"
         print(f"ok \u2192 {summary}")  # noqa: T201
         return exit_code
 
     # Show FAILURES section if present, otherwise full failure output
-    failures_match = re.search(
-        r"(^=+ FAILURES.*?^=+ short test summary)",
-        stdout,
-        re.MULTILINE | re.DOTALL,
-    )
+    failures_match = re.search(_PYTEST_FAILURES, stdout)
     if failures_match:
         failures = failures_match.group(0)
         print(truncated_output(failures))  # noqa: T201
         # Also grab FAILED/ERROR summary lines
-        summary_lines = re.findall(r"^(?:FAILED|ERROR).*", stdout, re.MULTILINE)
+        summary_lines = re.findall(_PYTEST_SUMMARY_LINE, stdout)
         for line in summary_lines[-5:]:
             print(line)  # noqa: T201
     else:
@@ -203,25 +700,26 @@ def handle_pytest(stdout: str, stderr: str, exit_code: int) -> int:
     return exit_code
 
 
+_CARGO_OK = r"test result: ok\. \d+ passed; \d+ failed"
+_CARGO_FAILURE = r"(?m)(^test .+ FAILED|^---- .+ ---|^thread.*panicked|failures:).*"
+_CARGO_FAILED = r"test result: FAILED\. \d+ passed.*"
+
+
 def handle_cargo(args: list[str], stdout: str, stderr: str, exit_code: int) -> int:
     """Handle cargo command compression."""
     second = args[1] if len(args) > 1 else ""
 
     if second == "test":
         if exit_code == 0:
-            match = re.search(r"test result: ok\. \d+ passed; \d+ failed", stdout)
+            match = re.search(_CARGO_OK, stdout)
             summary = match.group(0) if match else "all passed"
             print(f"ok \u2192 {summary}")  # noqa: T201
         else:
-            failures = re.findall(
-                r"(^test .+ FAILED|^---- .+ ---|^thread.*panicked|failures:).*",
-                stdout,
-                re.MULTILINE,
-            )
+            failures = re.findall(_CARGO_FAILURE, stdout)
             if failures:
                 for line in failures:
                     print(line)  # noqa: T201
-                match = re.search(r"test result: FAILED\. \d+ passed.*", stdout)
+                match = re.search(_CARGO_FAILED, stdout)
                 if match:
                     print(match.group(0))  # noqa: T201
             else:
@@ -242,11 +740,7 @@ def handle_cargo(args: list[str], stdout: str, stderr: str, exit_code: int) -> i
 def handle_node_test(stdout: str, stderr: str, exit_code: int) -> int:
     """Handle npm/pnpm/yarn/bun test compression."""
     if exit_code == 0:
-        match = re.search(
-            r"(Tests?:?\s+\d+ passed|\d+ passing|test suites?:.*passed|\d+ tests? passed)",
-            stdout,
-            re.IGNORECASE,
-        )
+        match = re.search(_NODE_SUMMARY, stdout)
         summary = match.group(0) if match else "all passed"
         print(f"ok \u2192 {summary}")  # noqa: T201
         return exit_code
@@ -260,11 +754,7 @@ def handle_npx(args: list[str], stdout: str, stderr: str, exit_code: int) -> int
 
     if second in ("vitest", "jest", "mocha", "playwright"):
         if exit_code == 0:
-            match = re.search(
-                r"(Tests?:?\s+\d+ passed|\d+ passing|test suites?:.*passed|\d+ tests? passed)",
-                stdout,
-                re.IGNORECASE,
-            )
+            match = re.search(_NODE_SUMMARY, stdout)
             summary = match.group(0) if match else "all passed"
             print(f"ok \u2192 {summary}")  # noqa: T201
             return exit_code
@@ -304,18 +794,20 @@ def handle_npx(args: list[str], stdout: str, stderr: str, exit_code: int) -> int
     return exit_code
 
 
+_GO_OK = r"(?m)^ok\s+.*"
+_GO_FAILURE = r"(?m)(^--- FAIL.*|^FAIL\s.*|panic:.*)"
+
+
 def handle_go(args: list[str], stdout: str, stderr: str, exit_code: int) -> int:
     """Handle go command compression."""
     second = args[1] if len(args) > 1 else ""
 
     if second == "test":
         if exit_code == 0:
-            pkg_count = len(re.findall(r"^ok\s+.*", stdout, re.MULTILINE))
+            pkg_count = len(re.findall(_GO_OK, stdout))
             print(f"ok \u2192 {pkg_count} packages passed")  # noqa: T201
         else:
-            failures = re.findall(
-                r"(^--- FAIL.*|^FAIL\s.*|panic:.*)", stdout, re.MULTILINE
-            )
+            failures = re.findall(_GO_FAILURE, stdout)
             if failures:
                 for line in failures:
                     print(line)  # noqa: T201
@@ -352,99 +844,310 @@ def handle_make(args: list[str], stdout: str, stderr: str, exit_code: int) -> in
     return exit_code
 
 
-def main() -> int:
-    """Main entry point."""
-    if len(sys.argv) < 2:
-        print("Usage: compact_run.py <command> [args...]", file=sys.stderr)  # noqa: T201
-        return 1
+def handle_container(
+    args: list[str], stdout: str, stderr: str, exit_code: int, logs: LogDedup | None
+) -> int:
+    """Handle docker/podman/kubectl: logs are compressed, the rest truncated."""
+    second = args[1] if len(args) > 1 else ""
+    if second == "logs":
+        return handle_container_logs(stdout, stderr, exit_code, logs)
+    if exit_code != 0:
+        return emit_failure(stdout, stderr, exit_code)
+    print(truncated_output(stdout))  # noqa: T201
+    return exit_code
 
-    args = sys.argv[1:]
 
-    # --- Run the actual command ---
-    # Use shell=False for safety; pass args list directly
-    # On Windows, some commands may need shell=True, but for the supported
-    # command families (git, docker, pytest, etc.) shell=False works.
-    try:
-        result = subprocess.run(  # noqa: S603
-            args,
-            capture_output=True,
-            text=True,
-            timeout=CMD_TIMEOUT,
-        )
-    except subprocess.TimeoutExpired:
-        print(  # noqa: T201
-            f"command timed out after {CMD_TIMEOUT}s: {' '.join(args)}", file=sys.stderr
-        )
-        return 1
-    except FileNotFoundError:
-        print(f"command not found: {args[0]}", file=sys.stderr)  # noqa: T201
-        return 1
-    except OSError as e:
-        print(f"error running command: {e}", file=sys.stderr)  # noqa: T201
-        return 1
+def handle_node(args: list[str], stdout: str, stderr: str, exit_code: int) -> int:
+    """Handle npm/pnpm/yarn/bun: test runs are compressed, the rest truncated."""
+    second = args[1] if len(args) > 1 else ""
+    if second == "test":
+        return handle_node_test(stdout, stderr, exit_code)
+    if stdout:
+        print(truncated_output(stdout))  # noqa: T201
+    if stderr:
+        print(truncated_output(stderr), file=sys.stderr)  # noqa: T201
+    return exit_code
+
 
-    stdout = result.stdout
-    stderr = result.stderr
-    exit_code = result.returncode
+def handle_next(args: list[str], stdout: str, stderr: str, exit_code: int) -> int:
+    """Handle next: `next lint` is compressed, the rest truncated."""
+    second = args[1] if len(args) > 1 else ""
+    if second == "lint":
+        if exit_code == 0:
+            print("ok \u2192 no issues")  # noqa: T201
+            return exit_code
+        return emit_failure(stdout, stderr, exit_code)
+    if stdout:
+        print(truncated_output(stdout))  # noqa: T201
+    if stderr:
+        print(truncated_output(stderr), file=sys.stderr)  # noqa: T201
+    return exit_code
 
-    first = args[0]
-    # Strip path and .exe suffix for cross-platform matching (e.g., /usr/bin/git -> git, git.exe -> git)
+
+def handle_summary(family: Family, stdout: str, stderr: str, exit_code: int) -> int:
+    """Declarative family: ``ok → <summary match>`` or the failure-pattern lines.
+
+    Without a matching failure line, a failed run shows stderr and the
+    output truncated to the family's max_lines and token budget.
+    """
+    max_lines = family.max_lines or MAX_LINES
+    if exit_code == 0:
+        summary = family.pattern("summary")
+        match = summary and (summary.search(stdout) or summary.search(stderr))
+        print(f"ok \u2192 {match.group(0).strip()}" if match else "ok")  # noqa: T201
+        return exit_code
+    failures = family.pattern("failures")
+    lines = [
+        match.group(0)
+        for text in (stdout, stderr)
+        for match in (failures.finditer(text) if failures else ())
+    ]
+    if not lines:
+        if stderr:
+            print(truncated_output(stderr, max_lines), file=sys.stderr)  # noqa: T201
+        if stdout:
+            print(truncated_output(stdout, max_lines))  # noqa: T201
+        return exit_code
+    if len(lines) > max_lines:
+        print(f"[showing last {max_lines} of {len(lines)} failure lines]")  # noqa: T201
+    print("\n".join(lines[-max_lines:]))  # noqa: T201
+    return exit_code
+
+
+# Handlers the registry's families name, called as
+# (family, args, stdout, stderr, exit_code, logs) -> exit code
+HANDLERS: dict[
+    str, Callable[[Family, list[str], str, str, int, LogDedup | None], int]
+] = {
+    "git": lambda f, args, out, err, code, logs: handle_git(args, out, err, code),
+    "container": lambda f, args, out, err, code, logs: handle_container(
+        args, out, err, code, logs
+    ),
+    "pytest": lambda f, args, out, err, code, logs: handle_pytest(out, err, code),
+    "cargo": lambda f, args, out, err, code, logs: handle_cargo(args, out, err, code),
+    "node": lambda f, args, out, err, code, logs: handle_node(args, out, err, code),
+    "npx": lambda f, args, out, err, code, logs: handle_npx(args, out, err, code),
+    "go": lambda f, args, out, err, code, logs: handle_go(args, out, err, code),
+    "make": lambda f, args, out, err, code, logs: handle_make(args, out, err, code),
+    "next": lambda f, args, out, err, code, logs: handle_next(args, out, err, code),
+    "summary": lambda f, args, out, err, code, logs: handle_summary(f, out, err, code),
+}
+
+
+def command_name(first: str) -> str:
+    """Strip path and .exe suffix (e.g., /usr/bin/git -> git, git.exe -> git)."""
     first_base = os.path.basename(first)
     name, ext = os.path.splitext(first_base)
     if ext.lower() == ".exe":
         first_base = name
+    return first_base
 
-    # --- Route by command type ---
 
-    if first_base == "git":
-        return handle_git(args, stdout, stderr, exit_code)
+def routed(args: list[str]) -> list[str]:
+    """The command *args* runs past launchers (``uv run``, ``python -m``, ...).
 
-    if first_base in ("docker", "podman", "kubectl"):
-        second = args[1] if len(args) > 1 else ""
-        if second == "logs":
-            return handle_container_logs(stdout, stderr, exit_code)
-        if exit_code != 0:
-            return emit_failure(stdout, stderr, exit_code)
-        print(truncated_output(stdout))  # noqa: T201
-        return exit_code
+    Families, handlers and report options are chosen from it; *args* itself
+    is what runs.
+    """
+    return launched_command(args) or args
 
-    if first_base in ("pytest", "py.test"):
-        return handle_pytest(stdout, stderr, exit_code)
 
-    if first_base == "cargo":
-        return handle_cargo(args, stdout, stderr, exit_code)
+def is_log_command(args: list[str]) -> bool:
+    """docker/podman/kubectl logs (or a project family using their handler)."""
+    command = routed(args)
+    family = REGISTRY.family(command_name(command[0]))
+    is_container = family is not None and family.handler == "container"
+    return is_container and command[1:2] == ["logs"]
+
+
+def _flag_value(args: list[str], *names: str) -> str | None:
+    """Value of the first ``--name=value`` / ``--name value`` option in *args*."""
+    for i, arg in enumerate(args):
+        for name in names:
+            if arg == name and i + 1 < len(args):
+                return args[i + 1]
+            if arg.startswith(name + "="):
+                return arg.split("=", 1)[1]
+    return None
 
-    if first_base in ("npm", "pnpm", "yarn", "bun"):
-        second = args[1] if len(args) > 1 else ""
-        if second == "test":
-            return handle_node_test(stdout, stderr, exit_code)
-        if stdout:
-            print(truncated_output(stdout))  # noqa: T201
-        if stderr:
-            print(truncated_output(stderr), file=sys.stderr)  # noqa: T201
-        return exit_code
 
-    if first_base == "npx":
-        return handle_npx(args, stdout, stderr, exit_code)
+class StructuredRun:
+    """A test command rewritten to emit a machine-readable report.
 
-    if first_base == "next":
+    plan() returns None when the command cannot report structurally (not a
+    test run, report disabled by the user, libtest JSON unavailable); the
+    caller then runs the command as-is. Options the user already set are
+    never changed: an existing --junitxml or -json is read instead of added.
+    """
+
+    def __init__(self, args: list[str]) -> None:
+        self.args = args
+        self.junit: str | None = None
+        self.events: test_reports.GoTestEvents | test_reports.LibtestEvents | None = (
+            None
+        )
+        self._tmpdir: str | None = None
+
+    @classmethod
+    def plan(cls, args: list[str]) -> "StructuredRun | None":
+        """Plan on the launched command; launchers stay in front of it."""
+        command = routed(args)
+        launcher = args[: len(args) - len(command)]
+        if launcher + command != args:
+            return None
+        run = cls._plan(command)
+        if run is not None:
+            run.args = launcher + run.args
+        return run
+
+    @classmethod
+    def _plan(cls, args: list[str]) -> "StructuredRun | None":
+        first_base = command_name(args[0])
         second = args[1] if len(args) > 1 else ""
-        if second == "lint":
-            if exit_code == 0:
-                print("ok \u2192 no issues")  # noqa: T201
-                return exit_code
-            return emit_failure(stdout, stderr, exit_code)
-        if stdout:
-            print(truncated_output(stdout))  # noqa: T201
-        if stderr:
-            print(truncated_output(stderr), file=sys.stderr)  # noqa: T201
-        return exit_code
 
-    if first_base == "go":
-        return handle_go(args, stdout, stderr, exit_code)
+        if first_base in ("pytest", "py.test"):
+            if "no:junitxml" in args:
+                return None
+            run = cls(args)
+            run.junit = _flag_value(args, "--junitxml", "--junit-xml")
+            if run.junit is None:
+                import tempfile
+
+                run._tmpdir = tempfile.mkdtemp(prefix="compact_run-")
+                run.junit = os.path.join(run._tmpdir, "junit.xml")
+                run.args = [args[0], f"--junitxml={run.junit}", *args[1:]]
+            return run
+
+        if first_base == "go" and second == "test":
+            # -json is a boolean flag: only its -json=value form takes a value
+            values = [
+                a.split("=", 1)[1] for a in args if a.startswith(("-json=", "--json="))
+            ]
+            if values and values[-1] not in ("true", "1"):
+                return None  # -json=false
+            run = cls(args)
+            if not values and "-json" not in args and "--json" not in args:
+                run.args = [*args[:2], "-json", *args[2:]]
+            run.events = test_reports.GoTestEvents()
+            return run
+
+        toolchain = os.environ.get("RUSTUP_TOOLCHAIN", "")
+        if first_base == "cargo" and second.startswith("+"):
+            toolchain, second = second[1:], (args[2] if len(args) > 2 else "")
+        if first_base == "cargo" and second == "test":
+            test_args = args[args.index("--") + 1 :] if "--" in args else []
+            run = cls(args)
+            if _flag_value(test_args, "--format") == "json":
+                run.events = (
+                    test_reports.LibtestEvents()
+                )  # the user asked for JSON already
+                return run
+            if _flag_value(test_args, "--format") is not None:
+                return None
+            # libtest JSON is unstable: only nightly toolchains accept it
+            if not (
+                toolchain.startswith("nightly")
+                or os.environ.get("RUSTC_BOOTSTRAP") == "1"
+            ):
+                return None
+            run.args = [*args, *([] if "--" in args else ["--"])]
+            run.args += ["-Z", "unstable-options", "--format", "json", "--report-time"]
+            run.events = test_reports.LibtestEvents()
+            return run
+
+        return None
+
+    @property
+    def listeners(self) -> tuple[Callable[[str], None], ...]:
+        return (self.events.feed,) if self.events else ()
+
+    def report(self) -> "test_reports.TestReport | None":
+        """The parsed report, or None when there is none to summarize."""
+        if self.junit is not None:
+            return test_reports.parse_junit(self.junit)
+        return self.events.report if self.events else None
+
+    def fallback_stdout(self, stdout: str) -> str:
+        """*stdout* as the regex handlers expect it."""
+        if isinstance(self.events, test_reports.GoTestEvents):
+            return test_reports.go_json_text(stdout)
+        return stdout
+
+    def cleanup(self) -> None:
+        if self._tmpdir is not None:
+            import shutil
+
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+def emit_report(report: "test_reports.TestReport", stderr: str, exit_code: int) -> int:
+    """Print a structured test summary; stderr only accompanies failures."""
+    print("\n".join(test_reports.render(report)))  # noqa: T201
+    if exit_code != 0 and stderr:
+        print(truncated_output(stderr), file=sys.stderr)  # noqa: T201
+    return exit_code
+
 
-    if first_base == "make":
-        return handle_make(args, stdout, stderr, exit_code)
+def run_captured(
+    args: list[str],
+    listeners: tuple[Callable[[str], None], ...] = (),
+    archive: "output_archive.ArchiveWriter | None" = None,
+) -> tuple[str, str, int, LogDedup | None]:
+    """Run *args* with COMPACT_RUN_STREAM's capture mode.
+
+    Returns stdout, stderr, exit code and, for streamed log commands, the
+    LogDedup fed while the command ran. *listeners* see every stdout line
+    (after the command exits when not streaming); the raw output goes to
+    *archive*. Raises like subprocess.run; a TimeoutExpired carries the
+    output read before the deadline.
+    """
+    if not STREAM:
+        result = run_buffered(args, CMD_TIMEOUT, archive)
+        for line in result.stdout.splitlines() if listeners else ():
+            for listener in listeners:
+                listener(line)
+        return result.stdout, result.stderr, result.returncode, None
+
+    # Lines the command's handler searches for: kept on top of the tail, so
+    # handlers find the same summaries and failures as in the full output
+    family = REGISTRY.family(command_name(routed(args)[0]))
+    keep = family.pattern("keep") if family else None
+    logs = LogDedup() if LOG_DEDUP and is_log_command(args) else None
+    out = StreamView(
+        keep=keep,
+        section=STREAM_SECTIONS.get(family.handler) if family else None,
+        listeners=((logs.feed,) if logs else ()) + listeners,
+        spill=partial(archive.write, "stdout") if archive else None,
+    )
+    err = StreamView(
+        keep=keep,
+        spill=partial(archive.write, "stderr") if archive else None,
+    )
+    try:
+        exit_code = run_streaming(args, out, err, CMD_TIMEOUT)
+    except subprocess.TimeoutExpired as exc:
+        exc.stdout, exc.stderr = out.text(), err.text()
+        raise
+    finally:
+        compression_stats.note(raw_stdout=out.bytes, raw_stderr=err.bytes)
+    return out.text(), err.text(), exit_code, logs
+
+
+def route(
+    args: list[str],
+    stdout: str,
+    stderr: str,
+    exit_code: int,
+    logs: LogDedup | None = None,
+) -> int:
+    """Compress a finished command's output with its family's handler."""
+    command = routed(args)
+    family = REGISTRY.family(command_name(command[0]))
+    if family is not None:
+        with family_budget(family.budget):
+            return HANDLERS[family.handler](
+                family, command, stdout, stderr, exit_code, logs
+            )
 
     # --- Fallback — truncation safety net only ---
     if stderr:
@@ -454,5 +1157,401 @@ def main() -> int:
     return exit_code
 
 
+# What a timed-out command was busy with, per handler (last match wins,
+# earlier patterns first): verbose test ids without a result, the location
+# pytest reports on interrupt, libtest's slow-test notice, jest's RUNS line
+_RUNNING: dict[str, tuple[str, ...]] = {
+    "pytest": (r"(?m)^(\S+::\S+) *$", r"(?m)^(\S+:\d+): KeyboardInterrupt$"),
+    "cargo": (r"(?m)^test (\S+) (?:has been running for|\.\.\. *$)",),
+    **dict.fromkeys(("node", "npx"), (r"(?m)^\s*RUNS\s+(\S+)",)),
+}
+_GO_PROGRESS = r"(?m)^\s*(?:=== (RUN|PAUSE|CONT)|--- (?:PASS|FAIL|SKIP)):? +(\S+)"
+
+
+def running_step(handler: str, stdout: str, stderr: str) -> str | None:
+    """The test or step a timed-out command was in, judged from its partial output."""
+    text = f"{stdout}\n{stderr}"
+    if handler == "go":
+        running: dict[str, None] = {}
+        for verb, name in re.findall(_GO_PROGRESS, text):
+            running.pop(name, None)
+            if verb in ("RUN", "CONT"):
+                running[name] = None
+        if running:
+            return list(running)[-1]
+    for pattern in _RUNNING.get(handler, ()):
+        matches = re.findall(pattern, text)
+        if matches:
+            return matches[-1]
+    # stderr last: after SIGINT it mostly holds the interrupt's own traceback
+    for stream in (stdout, stderr):
+        lines = [line.strip() for line in stream.splitlines() if line.strip()]
+        if lines:
+            return f"last output: {lines[-1][:200]}"
+    return None
+
+
+def report_timeout(args: list[str], stdout: str, stderr: str) -> int:
+    """Explain a timed-out command from the output it produced before the deadline.
+
+    Names what was still running, then compresses the partial output with
+    the command's usual handler as a failed run (log commands, often
+    followed with -f until the timeout, as a successful one).
+    """
+    message = f"command timed out after {CMD_TIMEOUT}s: {' '.join(args)}"
+    family = REGISTRY.family(command_name(routed(args)[0]))
+    step = running_step(family.handler if family else "", stdout, stderr)
+    if step:
+        message += f"\n[still running at the deadline: {step}]"
+    print(message, file=sys.stderr)  # noqa: T201
+    if stdout or stderr:
+        print("[partial output before the timeout]")  # noqa: T201
+        route(args, stdout, stderr, 0 if is_log_command(args) else 1)
+    return 1
+
+
+class _Tee(io.TextIOBase):
+    """Text stream that records what it forwards."""
+
+    def __init__(self, stream: io.TextIOBase, parts: list[str]) -> None:
+        self.stream = stream
+        self.parts = parts
+
+    def write(self, text: str) -> int:
+        self.parts.append(text)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+@contextmanager
+def _tee_output() -> Iterator[tuple[list[str], list[str]]]:
+    """Record what is printed to stdout and stderr while still printing it."""
+    out: list[str] = []
+    err: list[str] = []
+    saved = sys.stdout, sys.stderr
+    sys.stdout = _Tee(sys.stdout, out)  # type: ignore[arg-type]
+    sys.stderr = _Tee(sys.stderr, err)  # type: ignore[arg-type]
+    try:
+        yield out, err
+    finally:
+        sys.stdout, sys.stderr = saved
+
+
+def project_state_dir() -> Path:
+    """.claude/state of the project: CLAUDE_PROJECT_DIR, else the work tree top.
+
+    Commands run from a subdirectory (``cd sub && pytest``) keep their
+    memo, archive and stats with the project's rather than in sub/.claude.
+    Outside a work tree it is the current directory's.
+    """
+    root = os.environ.get("CLAUDE_PROJECT_DIR") or git_meta.work_tree(os.getcwd())
+    return Path(root or os.getcwd()) / ".claude" / "state"
+
+
+class MemoRun:
+    """A test command whose compressed result can be replayed (COMPACT_RUN_MEMO).
+
+    plan() returns None unless the command's family is memoizable and the
+    working directory is inside a git work tree. The key covers argv, cwd,
+    the test-relevant environment, the tree fingerprint and the family's
+    handler configuration; run() replays a stored entry or runs the command
+    and records its output when the tree did not change while it ran.
+    """
+
+    def __init__(
+        self, store: "run_memo.MemoStore", key: str, tree: str, cwd: str
+    ) -> None:
+        self.store = store
+        self.key = key
+        self.tree = tree
+        self.cwd = cwd
+
+    @classmethod
+    def plan(cls, args: list[str]) -> "MemoRun | None":
+        command = routed(args)
+        family = REGISTRY.family(command_name(command[0]))
+        if family is None or not family.memo:
+            return None
+        second = command[1] if len(command) > 1 else None
+        if family.subcommands is not None and second not in family.subcommands:
+            return None
+        cwd = os.getcwd()
+        with tracing.span("memo_fingerprint", cat="memo"):
+            tree = run_memo.tree_fingerprint(cwd)
+        if tree is None:
+            return None
+        st = os.stat(__file__)
+        salt = (
+            f"{st.st_mtime_ns}:{st.st_size}:{family.handler}:{family.summary}:"
+            f"{family.failures}:{family.max_lines}"
+        )
+        store = run_memo.MemoStore(
+            project_state_dir() / "compact_run_memo", max_age=MEMO_MAX_AGE
+        )
+        key = run_memo.memo_key(args, cwd, dict(os.environ), tree.digest, salt)
+        return cls(store, key, tree.digest, cwd)
+
+    def run(self, args: list[str]) -> int:
+        if not MEMO_BYPASS:
+            entry = self.store.get(self.key)
+            if entry is not None and self.replay(entry):
+                return int(entry["exit_code"])
+        start = time.time()
+        with _tee_output() as (out, err):
+            exit_code, complete, hint = execute(args)
+        if complete:
+            # Runs that rewrote tracked files (snapshots, formatters) are not
+            # results of the tree they were keyed on
+            after = run_memo.tree_fingerprint(self.cwd)
+            if after is not None and after.digest == self.tree:
+                self.store.put(
+                    self.key,
+                    {
+                        "argv": args,
+                        "exit_code": exit_code,
+                        "stdout": "".join(out),
+                        "stderr": "".join(err),
+                        "duration": round(time.time() - start, 2),
+                        "raw_stdout": compression_stats.noted("raw_stdout"),
+                        "raw_stderr": compression_stats.noted("raw_stderr"),
+                    },
+                )
+        if hint:
+            print(hint)  # noqa: T201
+        return exit_code
+
+    @staticmethod
+    def replay(entry: dict) -> bool:
+        """Print a stored result under a "cached from" marker; False if malformed."""
+        stdout, stderr = entry.get("stdout"), entry.get("stderr")
+        if not (
+            isinstance(entry.get("exit_code"), int)
+            and isinstance(stdout, str)
+            and isinstance(stderr, str)
+        ):
+            return False
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["created"]))
+        took = entry.get("duration")
+        took = f", run took {took:.1f}s" if isinstance(took, int | float) else ""
+        print(  # noqa: T201
+            f"[cached from {when}{took}; tree, command and environment unchanged;"
+            " COMPACT_RUN_MEMO_BYPASS=1 reruns]"
+        )
+        # Savings are measured against the output of the run being replayed
+        compression_stats.note(
+            cached=True,
+            **{
+                name: entry[name]
+                for name in ("raw_stdout", "raw_stderr")
+                if isinstance(entry.get(name), int)
+            },
+        )
+        sys.stdout.write(stdout)
+        sys.stderr.write(stderr)
+        return True
+
+
+def execute(args: list[str]) -> tuple[int, bool, str | None]:
+    """Run *args* and print its compressed output.
+
+    Returns the exit code, whether the command ran to completion (False
+    when it timed out or could not be started) and the --show hint to print
+    after the output, if any. Unless COMPACT_RUN_ARCHIVE=0, output that lost
+    at least ARCHIVE_MIN_BYTES in compression is archived. The hint is left
+    to the caller so that a memo entry never records a handle the archive
+    may have evicted by the time it is replayed.
+    """
+    if not ARCHIVE:
+        return *compress_run(args), None
+    archive = output_archive.OutputArchive(
+        project_state_dir() / ARCHIVE_DIR, ARCHIVE_MAX_MB * 1024 * 1024
+    )
+    writer = archive.writer()
+    with _tee_output() as (out, err):
+        exit_code, complete = compress_run(args, writer)
+    raw = sum(
+        compression_stats.noted(f"raw_{stream}") or 0
+        for stream in output_archive.STREAMS
+    )
+    shown = sum(len(part.encode("utf-8")) for part in out + err)
+    if raw - shown >= ARCHIVE_MIN_BYTES and writer.keep():
+        archive.evict(keep=writer.handle)
+        return exit_code, complete, show_hint(writer.handle)
+    writer.discard()
+    return exit_code, complete, None
+
+
+def compress_run(
+    args: list[str], archive: "output_archive.ArchiveWriter | None" = None
+) -> tuple[int, bool]:
+    """execute() without the archive decision; raw output goes to *archive*."""
+    # --- Run the actual command ---
+    # Use shell=False for safety; pass args list directly
+    # On Windows, some commands may need shell=True, but for the supported
+    # command families (git, docker, pytest, etc.) shell=False works.
+    structured = StructuredRun.plan(args) if STRUCTURED else None
+    try:
+        with tracing.span("subprocess", cat="subprocess", argv0=args[0], stream=STREAM):
+            stdout, stderr, exit_code, logs = run_captured(
+                structured.args if structured else args,
+                structured.listeners if structured else (),
+                archive,
+            )
+        if structured is not None:
+            report = structured.report()
+            # A failing run without failed tests (usage/collection/build
+            # error) is better explained by the runner's own output
+            if (
+                report is not None
+                and report.total
+                and (exit_code == 0 or report.unsuccessful)
+            ):
+                return emit_report(report, stderr, exit_code), True
+            stdout = structured.fallback_stdout(stdout)
+    except subprocess.TimeoutExpired as exc:
+        compression_stats.note(timed_out=True)
+        stdout, stderr = _decode(exc.stdout), _decode(exc.stderr)
+        if structured is not None:
+            stdout = structured.fallback_stdout(stdout)
+        return report_timeout(args, stdout, stderr), False
+    except FileNotFoundError:
+        print(f"command not found: {args[0]}", file=sys.stderr)  # noqa: T201
+        return 1, False
+    except OSError as e:
+        print(f"error running command: {e}", file=sys.stderr)  # noqa: T201
+        return 1, False
+    finally:
+        if structured is not None:
+            structured.cleanup()
+
+    return route(args, stdout, stderr, exit_code, logs), True
+
+
+def show_hint(handle: str) -> str:
+    """The line that tells how to read an archived run back.
+
+    Runs compact_run.py the way token_rewrite_hook.py launches it: with
+    the runtime or a stable interpreter, else through uv.
+    """
+    import shlex
+
+    script = Path(__file__).resolve()
+    python = stable_python(script.parent.parent)
+    if python is None:
+        runner = "uv run --no-project --script"
+    else:
+        runner = f"{shlex.quote(python)} -I -S"
+    return (
+        f"[full output archived: {runner} {shlex.quote(str(script))} {SHOW} {handle}"
+        " [--range A-B] [--grep REGEX] [--stderr]]"
+    )
+
+
+def _line_range(text: str) -> tuple[int, int]:
+    first, dash, last = text.partition("-")
+    start = int(first) if first else 1
+    end = int(last) if last else (sys.maxsize if dash else start)
+    if start < 1 or end < start:
+        raise ValueError(text)
+    return start, end
+
+
+def show(argv: list[str]) -> int:
+    """``--show``: numbered lines of an archived run, within the token budget."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog=f"compact_run.py {SHOW}",
+        description="Print lines of output compact_run archived for a run.",
+    )
+    parser.add_argument("handle", help="handle printed after the compressed output")
+    parser.add_argument(
+        "--range",
+        metavar="A-B",
+        help="1-based line range (A-B, A-, -B or A), as in the elision markers",
+    )
+    parser.add_argument("--grep", metavar="REGEX", help="only lines matching REGEX")
+    parser.add_argument(
+        "--stderr", action="store_true", help="read stderr instead of stdout"
+    )
+    opts = parser.parse_args(argv)
+    try:
+        start, end = _line_range(opts.range) if opts.range else (1, sys.maxsize)
+    except ValueError:
+        parser.error(f"invalid --range {opts.range!r}, expected A-B")
+    try:
+        pattern = re.compile(opts.grep) if opts.grep else None
+    except re.error as e:
+        parser.error(f"invalid --grep pattern: {e}")
+
+    stream = "stderr" if opts.stderr else "stdout"
+    archive = output_archive.OutputArchive(project_state_dir() / ARCHIVE_DIR)
+    text = archive.read(opts.handle, stream)
+    if text is None:
+        print(  # noqa: T201
+            f"no archived output for {opts.handle} (evicted or never recorded)",
+            file=sys.stderr,
+        )
+        return 1
+    lines = text.splitlines()
+    numbered = [
+        f"{number}:{line}"
+        for number, line in enumerate(lines[start - 1 : end], start)
+        if pattern is None or pattern.search(line)
+    ]
+    if not numbered:
+        message = f"no matching lines ({len(lines)} in {stream})"
+        print(message, file=sys.stderr)  # noqa: T201
+        return 1
+    print(truncated_output("\n".join(numbered)))  # noqa: T201
+    return 0
+
+
+def main() -> int:
+    """Main entry point."""
+    if len(sys.argv) < 2:
+        print(  # noqa: T201
+            "Usage: compact_run.py <command> [args...]\n"
+            f"       compact_run.py {SHOW} <handle> [options]",
+            file=sys.stderr,
+        )
+        return 1
+    if sys.argv[1] == SHOW:
+        return show(sys.argv[2:])
+
+    args = sys.argv[1:]
+    memo = MemoRun.plan(args) if MEMO else None
+    if memo is not None:
+        return memo.run(args)
+    exit_code, _, hint = execute(args)
+    if hint:
+        print(hint)  # noqa: T201
+    return exit_code
+
+
+def recorded_main() -> int:
+    """main() plus the invocation's compression_stats record."""
+    start = time.perf_counter()
+    with _tee_output() as (out, err):
+        exit_code = main()
+    if len(sys.argv) > 1 and sys.argv[1] != SHOW and compression_stats.enabled():
+        family = REGISTRY.family(command_name(routed(sys.argv[1:])[0]))
+        compression_stats.record(
+            family.command if family else None,
+            emitted=sum(len(part.encode("utf-8")) for part in out + err),
+            exit_code=exit_code,
+            wall_ms=(time.perf_counter() - start) * 1000,
+            state=project_state_dir(),
+        )
+    return exit_code
+
+
 if __name__ == "__main__":
-    sys.exit(main())
+    with tracing.invocation(
+        "compact_run",
+        cat="compact_run",
+        command=os.path.basename(sys.argv[1]) if len(sys.argv) > 1 else "",
+    ):
+        sys.exit(recorded_main())
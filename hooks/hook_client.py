@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Hook Client: thin forwarder to the per-project hook daemon (cross-platform)
+
+Usage (from plugin-hooks.json):
+    hook_client.py <Event>/<script>.py [args...]
+
+Forwards the hook payload on stdin, argv, environment and cwd to
+hook_daemon.py over .claude/state/hook_daemon.sock and relays the exit code,
+stdout and stderr unchanged.
+
+When no daemon answers (first call, stale socket, Windows, socket path too
+long, or CLAUDE_HOOK_DAEMON=0) the hook script runs in this process exactly
+as it would on its own, and a daemon is started in the background so the
+next call is served warm.
+
+EXIT CODES:
+- Whatever the hook script returns (0 allow, 1 non-blocking error, 2 block)
+- 1: usage error, or the daemon dropped the connection mid-request
+"""
+
+import io
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+# Keep in sync with hook_daemon.py
+SOCKET_NAME = "hook_daemon.sock"
+PROTOCOL_VERSION = 1
+
+# sockaddr_un.sun_path is 104 bytes on macOS/BSD, 108 on Linux
+MAX_SOCKET_PATH = 103
+
+HOOKS_DIR = os.path.dirname(os.path.realpath(__file__))
+
+# Shared hook helpers live in hooks/lib
+sys.path.insert(0, os.path.join(HOOKS_DIR, "lib"))
+import tracing
+from hook_python import stable_python
+
+
+def daemon_enabled() -> bool:
+    """True unless the daemon is disabled or unsupported on this platform."""
+    return os.environ.get("CLAUDE_HOOK_DAEMON", "1") != "0" and hasattr(
+        socket, "AF_UNIX"
+    )
+
+
+def get_project_dir() -> str:
+    """Resolve the project directory the same way the hooks do."""
+    return os.path.abspath(os.environ.get("CLAUDE_PROJECT_DIR") or os.getcwd())
+
+
+def get_socket_path(project_dir: str) -> str | None:
+    """Daemon socket for a project, or None if the path cannot be bound."""
+    path = os.path.join(project_dir, ".claude", "state", SOCKET_NAME)
+    return path if len(path.encode()) <= MAX_SOCKET_PATH else None
+
+
+def forward(
+    sock_path: str, script: str, argv: list[str], stdin: bytes
+) -> dict[str, object] | None:
+    """Send one request to the daemon.
+
+    Returns the daemon's response, or None if no daemon is listening (the
+    caller should run the hook locally). Once the request has been sent the
+    hook may already have run, so a dropped connection is reported as an
+    error rather than retried.
+    """
+    request = {
+        "v": PROTOCOL_VERSION,
+        "hooks_dir": HOOKS_DIR,
+        "script": script,
+        "argv": argv,
+        "env": dict(os.environ),
+        "cwd": os.getcwd(),
+        "stdin": stdin.decode("utf-8", "surrogateescape"),
+    }
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(sock_path)
+        except OSError:
+            return None
+        sock.sendall(json.dumps(request).encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        chunks: list[bytes] = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    except OSError as e:
+        return {"exit_code": 1, "stdout": "", "stderr": f"hook daemon error: {e}\n"}
+    finally:
+        sock.close()
+    try:
+        return json.loads(b"".join(chunks))
+    except ValueError:
+        return {"exit_code": 1, "stdout": "", "stderr": "hook daemon: no response\n"}
+
+
+def daemon_command(project_dir: str) -> list[str]:
+    """Command line that starts the project's daemon.
+
+    The daemon outlives this client, so it is never started from uv's
+    temporary script environment, which uv deletes when the client exits:
+    the materialized runtime if it was built, else this interpreter, else
+    ``uv run``, which keeps its environment for as long as the daemon runs.
+    """
+    daemon = os.path.join(HOOKS_DIR, "hook_daemon.py")
+    args = [daemon, "--project-dir", project_dir]
+    python = stable_python(Path(HOOKS_DIR).parent)
+    if python is None:
+        return ["uv", "run", "--no-project", "--script", *args]
+    if python != sys.executable:
+        return [python, "-I", "-S", *args]  # the runtime: stdlib only
+    cmd = [python]
+    if sys.flags.isolated:
+        cmd.append("-I")
+    if sys.flags.no_site:
+        cmd.append("-S")
+    return cmd + args
+
+
+def spawn_daemon(project_dir: str) -> None:
+    """Start a detached daemon for the project (best effort, non-blocking)."""
+    import subprocess
+
+    cmd = daemon_command(project_dir)
+    try:
+        subprocess.Popen(  # noqa: S603
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            close_fds=True,
+        )
+    except OSError:
+        pass
+
+
+def run_local(script: str, argv: list[str], stdin: bytes) -> None:
+    """Run the hook script in this process as ``__main__``.
+
+    Loaded through a file loader rather than exec'd from source so the
+    bytecode precompiled by scripts/build_runtime.py is used. SystemExit
+    raised by the script propagates, so the exit code is the script's own.
+    """
+    import importlib.util
+
+    sys.argv = [script, *argv]
+    sys.stdin = io.TextIOWrapper(
+        io.BytesIO(stdin), encoding=sys.stdin.encoding or "utf-8"
+    )
+    if not getattr(sys.flags, "safe_path", False):
+        sys.path[0] = os.path.dirname(script)
+
+    spec = importlib.util.spec_from_file_location("__main__", script)
+    if spec is None or spec.loader is None:
+        msg = f"cannot load hook script: {script}"
+        raise ImportError(msg)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["__main__"] = module
+    spec.loader.exec_module(module)
+
+
+def run(script: str, argv: list[str], stdin: bytes) -> int:
+    """Serve the hook from the daemon, else run it in this process."""
+    if daemon_enabled():
+        project_dir = get_project_dir()
+        sock_path = get_socket_path(project_dir)
+        if sock_path is not None:
+            with tracing.span("forward"):
+                response = forward(sock_path, script, argv, stdin)
+            if response is not None and "error" not in response:
+                tracing.annotate(mode="daemon")
+                sys.stdout.buffer.write(
+                    str(response.get("stdout", "")).encode("utf-8", "surrogateescape")
+                )
+                sys.stderr.buffer.write(
+                    str(response.get("stderr", "")).encode("utf-8", "surrogateescape")
+                )
+                return int(response.get("exit_code", 1))  # type: ignore[arg-type]
+            if response is None:
+                spawn_daemon(project_dir)
+
+    tracing.annotate(mode="local")
+    run_local(script, argv, stdin)
+    return 0
+
+
+def main() -> int:
+    """Main entry point."""
+    if len(sys.argv) < 2:
+        print("Usage: hook_client.py <Event>/<script>.py [args...]", file=sys.stderr)  # noqa: T201
+        return 1
+
+    script = os.path.join(HOOKS_DIR, sys.argv[1])
+    argv = sys.argv[2:]
+    stdin = sys.stdin.buffer.read()
+
+    args = tracing.payload_args(stdin) if tracing.enabled() else {}
+    with tracing.invocation(sys.argv[1], **args):
+        exit_code = run(script, argv, stdin)
+        tracing.annotate(exit_code=exit_code)
+        return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
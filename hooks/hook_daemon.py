@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Hook Daemon: persistent per-project hook server (POSIX only)
+
+Keeps one interpreter alive with every hook's imports already loaded, so a
+hook call costs a fork() instead of a cold interpreter start plus uv script
+resolution. Listens on a Unix socket at .claude/state/hook_daemon.sock and
+serves requests sent by hook_client.py.
+
+Each request runs in a forked child exactly as if the script had been started
+on its own: fresh module globals with __name__ == "__main__", the caller's
+argv, environment, cwd and stdin, and fds 1/2 captured. The child sends the
+exit code, stdout and stderr back to the client. Parallel hook calls therefore
+run concurrently and never share mutable state.
+
+Lifecycle:
+- Started on demand by hook_client.py (never by Claude directly)
+- One daemon per project, guarded by an flock on hook_daemon.lock
+- Exits after CLAUDE_HOOK_DAEMON_IDLE seconds without requests (default 1800),
+  on SIGTERM, or when a client from a different plugin install connects
+
+Usage:
+    hook_daemon.py --project-dir <path>
+"""
+
+import argparse
+import ast
+import builtins
+import contextlib
+import fcntl
+import importlib
+import importlib.util
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import traceback
+import types
+from pathlib import Path
+
+# Keep in sync with hook_client.py
+SOCKET_NAME = "hook_daemon.sock"
+LOCK_NAME = "hook_daemon.lock"
+PROTOCOL_VERSION = 1
+
+DEFAULT_IDLE_SECONDS = 1800
+REQUEST_READ_TIMEOUT = 5.0
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+HOOKS_DIR = Path(__file__).resolve().parent
+
+# Shared hook helpers live in hooks/lib
+sys.path.insert(0, str(HOOKS_DIR / "lib"))
+import tracing
+
+
+class HookRegistry:
+    """Compiled hook scripts, keyed by absolute path and refreshed by mtime."""
+
+    def __init__(self, hooks_dir: Path) -> None:
+        self.hooks_dir = hooks_dir
+        self._code: dict[str, tuple[int, types.CodeType]] = {}
+
+    def resolve(self, script: str) -> str | None:
+        """Return the real path of *script* if it is a hook inside hooks_dir."""
+        try:
+            path = Path(script).resolve(strict=True)
+        except (OSError, RuntimeError):
+            return None
+        if path.suffix != ".py" or self.hooks_dir not in path.parents:
+            return None
+        return str(path)
+
+    def get(self, path: str) -> types.CodeType:
+        """Return compiled code for *path*, recompiling if the file changed."""
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._code.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        source = Path(path).read_bytes()
+        code = compile(source, path, "exec", dont_inherit=True)
+        self._code[path] = (mtime, code)
+        return code
+
+    def warm(self) -> None:
+        """Compile every hook script and import the modules they use."""
+        for script in sorted(self.hooks_dir.glob("*/*.py")):
+            try:
+                self.get(str(script))
+            except (OSError, SyntaxError):
+                continue
+            _preload_imports(script, self.hooks_dir)
+
+
+def _imported_names(path: Path) -> set[str]:
+    """Collect every module name imported anywhere in a Python source file.
+
+    Includes modules deferred with ``lazy_import("name")`` (hooks/lib), so
+    the daemon still has them loaded and the deferral costs nothing.
+    """
+    names: set[str] = set()
+    try:
+        tree = ast.parse(path.read_bytes())
+    except (OSError, SyntaxError, ValueError):
+        return names
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id == "lazy_import"
+            and node.args
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+        ):
+            names.add(node.args[0].value)
+    return names
+
+
+def _preload_imports(script: Path, hooks_dir: Path) -> None:
+    """Import a script's dependencies into this process (best effort).
+
+    Sibling modules (e.g. the stage modules PreToolUse/dispatch.py imports)
+    and shared helpers in hooks/lib resolve because both directories are
+    temporarily put on sys.path. Modules that live inside hooks_dir are only
+    scanned for their own imports, never imported: they must be re-read on
+    every request so edits take effect, and module-level hook code never runs
+    in the daemon.
+    """
+    script_dir = str(script.parent)
+    lib_dir = str(hooks_dir / "lib")
+    sys.path[:0] = [script_dir, lib_dir]
+    pending = [script]
+    seen: set[Path] = set()
+    try:
+        while pending:
+            source = pending.pop()
+            if source in seen:
+                continue
+            seen.add(source)
+            for name in sorted(_imported_names(source)):
+                try:
+                    spec = importlib.util.find_spec(name)
+                except (ImportError, ValueError):
+                    continue
+                origin = Path(spec.origin).resolve() if spec and spec.origin else None
+                if origin is not None and hooks_dir in origin.parents:
+                    pending.append(origin)
+                    continue
+                with contextlib.suppress(Exception):
+                    importlib.import_module(name)
+    finally:
+        sys.path.remove(script_dir)
+        sys.path.remove(lib_dir)
+
+
+def _exit_code(code: object) -> int:
+    """Translate a SystemExit payload the way the interpreter does."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)  # noqa: T201
+    return 1
+
+
+def execute(
+    code: types.CodeType,
+    script: str,
+    argv: list[str],
+    stdin: bytes,
+    env: dict[str, str],
+    cwd: str,
+) -> tuple[int, bytes, bytes]:
+    """Run a compiled hook as ``__main__``. Must only be called in a fork.
+
+    Mutates process-global state (environment, cwd, fds 1/2, sys.argv,
+    sys.stdin, sys.modules["__main__"]), which is why the daemon never calls
+    it in the long-lived parent.
+    """
+    out = tempfile.TemporaryFile()
+    err = tempfile.TemporaryFile()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(out.fileno(), 1)
+    os.dup2(err.fileno(), 2)
+
+    os.environ.clear()
+    os.environ.update(env)
+    with contextlib.suppress(OSError):
+        os.chdir(cwd)
+    sys.argv = [script, *argv]
+    sys.stdin = io.TextIOWrapper(io.BytesIO(stdin), encoding="utf-8")
+    if not getattr(sys.flags, "safe_path", False):
+        sys.path[0] = os.path.dirname(script)
+
+    module = types.ModuleType("__main__")
+    module.__file__ = script
+    module.__builtins__ = builtins
+    sys.modules["__main__"] = module
+
+    trace_args = tracing.payload_args(stdin) if tracing.enabled() else {}
+    try:
+        with tracing.invocation(
+            os.path.relpath(script, HOOKS_DIR), cat="daemon", **trace_args
+        ):
+            exec(code, module.__dict__)  # noqa: S102
+        exit_code = 0
+    except SystemExit as e:
+        exit_code = _exit_code(e.code)
+    except BaseException:  # noqa: BLE001
+        traceback.print_exc()
+        exit_code = 1
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    out.seek(0)
+    err.seek(0)
+    return exit_code, out.read(), err.read()
+
+
+def _recv_all(conn: socket.socket) -> bytes:
+    """Read until the peer shuts down its write side."""
+    chunks: list[bytes] = []
+    size = 0
+    while chunk := conn.recv(65536):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > MAX_REQUEST_SIZE:
+            msg = "request too large"
+            raise ValueError(msg)
+    return b"".join(chunks)
+
+
+def _send(conn: socket.socket, payload: dict[str, object]) -> None:
+    """Send a JSON response and close the write side."""
+    with contextlib.suppress(OSError):
+        conn.sendall(json.dumps(payload).encode("utf-8"))
+        conn.shutdown(socket.SHUT_WR)
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", "surrogateescape")
+
+
+def _encode(text: str) -> bytes:
+    return text.encode("utf-8", "surrogateescape")
+
+
+def _serve_child(
+    conn: socket.socket, code: types.CodeType, request: dict[str, object]
+) -> None:
+    """Child side of a fork: run the hook and report the result."""
+    exit_code, stdout, stderr = execute(
+        code,
+        str(request["script"]),
+        [str(a) for a in request.get("argv", [])],  # type: ignore[union-attr]
+        _encode(str(request.get("stdin", ""))),
+        {str(k): str(v) for k, v in dict(request.get("env", {})).items()},  # type: ignore[arg-type]
+        str(request.get("cwd", "/")),
+    )
+    conn.settimeout(None)
+    _send(
+        conn,
+        {"exit_code": exit_code, "stdout": _decode(stdout), "stderr": _decode(stderr)},
+    )
+
+
+def handle_connection(conn: socket.socket, registry: HookRegistry) -> bool:
+    """Read one request and fork a child to execute it.
+
+    Returns False when the daemon should shut down (request came from a
+    different plugin install, so this daemon is serving stale code).
+    """
+    try:
+        conn.settimeout(REQUEST_READ_TIMEOUT)
+        request = json.loads(_recv_all(conn))
+    except (OSError, ValueError):
+        _send(conn, {"error": "malformed request"})
+        return True
+
+    if request.get("v") != PROTOCOL_VERSION or request.get("hooks_dir") != str(
+        registry.hooks_dir
+    ):
+        _send(conn, {"error": "hook daemon serves a different plugin install"})
+        return False
+
+    script = registry.resolve(str(request.get("script", "")))
+    if script is None:
+        _send(conn, {"error": "unknown hook script"})
+        return True
+    try:
+        code = registry.get(script)
+    except (OSError, SyntaxError) as e:
+        _send(conn, {"error": f"cannot load hook script: {e}"})
+        return True
+    request["script"] = script
+
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        try:
+            _serve_child(conn, code, request)
+        finally:
+            os._exit(0)
+    return True
+
+
+def socket_path(project_dir: Path) -> Path:
+    """Location of the daemon socket for a project."""
+    return project_dir / ".claude" / "state" / SOCKET_NAME
+
+
+def serve(project_dir: Path, idle_seconds: float) -> int:
+    """Run the daemon until idle timeout, SIGTERM or a plugin mismatch."""
+    state_dir = project_dir / ".claude" / "state"
+    state_dir.mkdir(parents=True, exist_ok=True)
+
+    lock_fd = os.open(state_dir / LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        # Another daemon already serves this project
+        os.close(lock_fd)
+        return 0
+    os.ftruncate(lock_fd, 0)
+    os.write(lock_fd, str(os.getpid()).encode())
+
+    path = socket_path(project_dir)
+    path.unlink(missing_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(str(path))
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+    server.settimeout(idle_seconds)
+    bound_inode = path.stat().st_ino
+
+    def _terminate(_signum: int, _frame: object) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, _terminate)
+    # Children are never waited on; let the kernel reap them.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    registry = HookRegistry(HOOKS_DIR)
+    registry.warm()
+
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except TimeoutError:
+                break
+            with conn:
+                if not handle_connection(conn, registry):
+                    break
+    finally:
+        server.close()
+        with contextlib.suppress(OSError):
+            if path.stat().st_ino == bound_inode:
+                path.unlink()
+        os.close(lock_fd)
+    return 0
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--project-dir", required=True, type=Path)
+    args = parser.parse_args()
+
+    if not hasattr(socket, "AF_UNIX"):
+        return 1
+
+    idle = float(os.environ.get("CLAUDE_HOOK_DAEMON_IDLE", DEFAULT_IDLE_SECONDS))
+
+    # Detach from the caller's cwd and make captured output UTF-8 regardless
+    # of the locale the daemon happened to be started with.
+    os.chdir("/")
+    for stream in (sys.stdout, sys.stderr):
+        if isinstance(stream, io.TextIOWrapper):
+            stream.reconfigure(encoding="utf-8")
+
+    return serve(args.project_dir.resolve(), idle)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
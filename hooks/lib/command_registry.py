@@ -0,0 +1,524 @@
+"""
+Command family registry (cross-platform)
+
+One table decides both which Bash commands token_rewrite_hook.py wraps with
+compact_run.py and which compact_run handler compresses their output:
+
+    from command_registry import load_registry
+
+    registry = load_registry()
+    registry.match(["git", "push", "origin"])  # Family to wrap with, or None
+    registry.family("git")                     # Family compact_run routes to
+
+Lookups are dict hits on (command, subcommand) and (command, None), the
+latter for families wrapped whatever their subcommand (pytest).
+
+Commands are classified past the launchers that usually run them:
+launched_command() peels environment assignments and known launchers
+(``env``, ``uv run``, ``poetry``/``pdm``/``pipenv run``, ``python -m``,
+``timeout``) and npx's own flags, so ``FOO=1 uv run python -m pytest -x``
+is matched, and routed by compact_run, as ``pytest -x``:
+
+    launched_command(["timeout", "300", "go", "test", "./..."])
+    # ["go", "test", "./..."]
+
+BUILTIN_FAMILIES holds the plugin's own families. Projects add families, or
+replace built-in ones, in .claude/compact_run.toml:
+
+    [families.terraform]
+    subcommands = ["plan", "validate"]     # omit to wrap every invocation
+    summary = 'Plan: \\d+ to add, \\d+ to change, \\d+ to destroy'
+    failures = '^Error: .*'
+    max_lines = 80
+    budget = 1200                          # estimated output tokens shown
+    memo = true                            # replay runs on an unchanged tree
+
+    [families.nerdctl]
+    subcommands = ["logs"]
+    handler = "container"                  # reuse a built-in handler
+
+Project families use the declarative "summary" handler unless they name a
+built-in one. The file is validated once per change (entries with unknown
+handlers or bad patterns are dropped and listed in ``errors``) and cached
+as JSON in .claude/state keyed by its mtime and size, so the hook path never
+imports tomllib or compiles patterns for an unchanged file.
+"""
+
+import json
+import os
+import re
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+PROJECT_FILE = Path(".claude") / "compact_run.toml"
+CACHE_FILE = Path(".claude") / "state" / "compact_run_families.json"
+
+PATTERN_FIELDS = ("keep", "summary", "failures")
+
+
+def npx_safe(parts: list[str]) -> bool:
+    """Check if an npx command is safe to wrap (not long-running).
+
+    Long-running commands like ``npx next dev``, ``npx next start``,
+    ``npx next build``, and ``npx tsc --watch`` must NOT be wrapped.
+    """
+    if len(parts) < 2:
+        return False
+    tool = parts[1]
+    third = parts[2] if len(parts) > 2 else ""
+    if tool == "next":
+        # Only `next lint` is safe; dev/start/build are long-running
+        return third == "lint"
+    if tool == "tsc":
+        # tsc is safe unless --watch is present anywhere
+        return no_watch(parts)
+    # vitest, jest, mocha, playwright, eslint — always safe
+    return tool in ("vitest", "jest", "mocha", "playwright", "eslint")
+
+
+def no_watch(parts: list[str]) -> bool:
+    """Not in watch mode (``--watch``/``-w``), which never exits."""
+    return "--watch" not in parts and "-w" not in parts
+
+
+# Safety predicates families can name; False keeps the command unwrapped
+SAFETY: dict[str, Callable[[list[str]], bool]] = {
+    "npx": npx_safe,
+    "no_watch": no_watch,
+}
+
+
+class Family:
+    """A command family: what to wrap and how compact_run compresses it.
+
+    ``subcommands`` lists the wrapped subcommands (None: every invocation).
+    ``handler`` names a compact_run handler; ``keep``, ``summary`` and
+    ``failures`` are regex sources compiled on first use by pattern().
+    ``max_lines`` is the output budget of the summary handler and
+    ``budget`` the estimated tokens of output any handler shows (None:
+    COMPACT_RUN_TOKEN_BUDGET). ``memo`` lets compact_run replay a run of a
+    wrapped subcommand on an unchanged tree.
+    """
+
+    __slots__ = (
+        "_compiled",
+        "budget",
+        "command",
+        "failures",
+        "handler",
+        "keep",
+        "max_lines",
+        "memo",
+        "safe",
+        "subcommands",
+        "summary",
+    )
+
+    def __init__(
+        self,
+        command: str,
+        subcommands: Iterable[str] | None,
+        handler: str,
+        *,
+        safe: str | None = None,
+        keep: str | None = None,
+        summary: str | None = None,
+        failures: str | None = None,
+        max_lines: int | None = None,
+        budget: int | None = None,
+        memo: bool = False,
+    ) -> None:
+        self.command = command
+        self.subcommands = tuple(subcommands) if subcommands is not None else None
+        self.handler = handler
+        self.safe = safe
+        self.keep = keep
+        self.summary = summary
+        self.failures = failures
+        self.max_lines = max_lines
+        self.budget = budget
+        self.memo = memo
+        self._compiled: dict[str, re.Pattern[str] | None] = {}
+
+    def pattern(self, field: str) -> "re.Pattern[str] | None":
+        """The compiled ``keep``/``summary``/``failures`` pattern (multiline)."""
+        if field not in self._compiled:
+            source = getattr(self, field)
+            self._compiled[field] = re.compile(source, re.MULTILINE) if source else None
+        return self._compiled[field]
+
+
+_NODE_SUMMARY = (
+    r"(?i:Tests?:?\s+\d+ passed|\d+ passing|test suites?:.*passed|\d+ tests? passed)"
+)
+_PYTEST_KEEP = (
+    r"\d+ passed in [0-9.]+s|^(?:FAILED|ERROR)|^=+ (?:FAILURES|short test summary)"
+)
+_LOGS = ["logs"]
+_NODE = ["test"]
+
+# The plugin's own families. ``keep`` lists the lines each handler searches
+# for; streaming mode keeps every matching line on top of the tail.
+BUILTIN_FAMILIES: tuple[Family, ...] = (
+    Family(
+        "git",
+        ["push", "pull", "fetch", "add", "commit", "merge", "rebase", "stash"],
+        "git",
+        keep=r"->|files? changed|Already up to date|\[.+ [a-f0-9]{7,}\] "
+        r"|^\s*(?:From|\[new)|Successfully rebased"
+        r"|(?i:saved working directory|dropped|no local changes)",
+    ),
+    Family("docker", _LOGS, "container"),
+    Family("podman", _LOGS, "container"),
+    Family("kubectl", _LOGS, "container"),
+    Family("pytest", None, "pytest", keep=_PYTEST_KEEP, memo=True),
+    Family("py.test", None, "pytest", keep=_PYTEST_KEEP, memo=True),
+    Family(
+        "cargo",
+        ["test"],
+        "cargo",
+        keep=r"^test result: |^test .+ FAILED|^---- .+ ---|^thread.*panicked|failures:",
+        memo=True,
+    ),
+    Family("npm", _NODE, "node", keep=_NODE_SUMMARY, memo=True),
+    Family("pnpm", _NODE, "node", keep=_NODE_SUMMARY, memo=True),
+    Family("yarn", _NODE, "node", keep=_NODE_SUMMARY, memo=True),
+    Family("bun", _NODE, "node", keep=_NODE_SUMMARY, memo=True),
+    Family(
+        "npx",
+        ["vitest", "jest", "mocha", "playwright", "eslint", "next", "tsc"],
+        "npx",
+        safe="npx",
+        keep=_NODE_SUMMARY,
+    ),
+    Family("go", ["test"], "go", keep=r"^ok\s|^--- FAIL|^FAIL\s|panic:", memo=True),
+    Family("make", ["test", "check"], "make"),
+    Family("next", ["lint"], "next"),
+)
+
+# Handlers project families may name, besides the declarative "summary"
+HANDLERS = frozenset(f.handler for f in BUILTIN_FAMILIES) | {"summary"}
+
+
+class Registry:
+    """Families indexed by command and by (command, subcommand)."""
+
+    def __init__(
+        self, families: Iterable[Family], errors: list[str] | None = None
+    ) -> None:
+        self.errors = errors or []
+        self._by_command: dict[str, Family] = {}
+        for family in families:
+            self._by_command[family.command] = family  # later entries win
+        self._wrap: dict[tuple[str, str | None], Family] = {}
+        for family in self._by_command.values():
+            for sub in family.subcommands if family.subcommands is not None else [None]:
+                self._wrap[(family.command, sub)] = family
+
+    def families(self) -> list[Family]:
+        return list(self._by_command.values())
+
+    def family(self, command: str) -> Family | None:
+        """The family compact_run routes *command* (path/.exe stripped) to."""
+        return self._by_command.get(command)
+
+    def match(self, parts: list[str]) -> Family | None:
+        """The family to wrap a split command line with, or None."""
+        if not parts:
+            return None
+        command = normalize_command(parts[0])
+        second = parts[1] if len(parts) > 1 else ""
+        family = self._wrap.get((command, second)) or self._wrap.get((command, None))
+        if family is None:
+            return None
+        if family.safe and not SAFETY[family.safe](parts):
+            return None
+        return family
+
+
+def normalize_command(token: str) -> str:
+    """Strip path and .exe suffix (e.g., /usr/bin/git -> git, git.exe -> git)."""
+    base = os.path.basename(token)
+    name, ext = os.path.splitext(base)
+    return name.lower() if ext.lower() == ".exe" else base
+
+
+# --- Launchers ---
+
+
+class Launcher:
+    """A command that runs another one: ``<name> [subcommand] [options] command``.
+
+    ``flags`` take no value, ``options`` take one (``-o v`` or ``--opt=v``);
+    ``positionals`` arguments precede the command (timeout's duration).
+    A ``keep`` launcher stays the command's name once its own options are
+    dropped (``npx --yes vitest`` runs as ``npx vitest``).
+    """
+
+    __slots__ = ("flags", "keep", "options", "positionals", "subcommand")
+
+    def __init__(
+        self,
+        subcommand: str | None = None,
+        flags: Iterable[str] = (),
+        options: Iterable[str] = (),
+        *,
+        positionals: int = 0,
+        keep: bool = False,
+    ) -> None:
+        self.subcommand = subcommand
+        self.flags = frozenset(flags)
+        self.options = frozenset(options)
+        self.positionals = positionals
+        self.keep = keep
+
+    def command_index(self, parts: list[str], i: int) -> int | None:
+        """Index of the command in *parts* after this launcher at *i*, or None.
+
+        None when an option is not known: it might take a value, and guessing
+        could classify the wrong word.
+        """
+        i += 1
+        if self.subcommand is not None:
+            if parts[i : i + 1] != [self.subcommand]:
+                return None
+            i += 1
+        while i < len(parts) and parts[i].startswith("-") and parts[i] != "-":
+            word = parts[i]
+            if word == "--":
+                i += 1
+                break
+            name = word.split("=", 1)[0]
+            if word in self.flags or (name in self.options and "=" in word):
+                i += 1
+            elif word in self.options:
+                i += 2
+            else:
+                return None
+        i += self.positionals
+        return i if i < len(parts) else None
+
+
+_UV_RUN_FLAGS = (
+    "--no-project", "--frozen", "--locked", "--isolated", "--no-sync",
+    "--all-extras", "--no-dev", "--only-dev", "--all-packages", "--active",
+    "--no-active", "--exact", "--offline", "--no-cache", "--no-editable",
+    "--no-env-file", "--all-groups", "--no-default-groups", "-m", "--module",
+    "-q", "--quiet", "-v", "--verbose",
+)  # fmt: skip
+_UV_RUN_OPTIONS = (
+    "--with", "--with-editable", "--with-requirements", "--python", "-p",
+    "--project", "--directory", "--package", "--extra", "--group",
+    "--only-group", "--no-group", "--env-file", "--index", "--default-index",
+    "--index-url", "--extra-index-url", "--cache-dir", "--config-file",
+    "--color",
+)  # fmt: skip
+_PROJECT_RUN_FLAGS = ("-q", "--quiet", "-v", "-vv", "-vvv", "--verbose")
+
+LAUNCHERS: dict[str, Launcher] = {
+    "env": Launcher(
+        flags=("-i", "--ignore-environment", "-0", "--null"),
+        options=("-u", "--unset", "-C", "--chdir"),
+    ),
+    "uv": Launcher("run", _UV_RUN_FLAGS, _UV_RUN_OPTIONS),
+    "poetry": Launcher(
+        "run",
+        (*_PROJECT_RUN_FLAGS, "-n", "--no-interaction", "--no-ansi", "--ansi"),
+        ("-C", "--directory", "-P", "--project"),
+    ),
+    "pdm": Launcher("run", _PROJECT_RUN_FLAGS, ("-p", "--project")),
+    "pipenv": Launcher("run"),
+    "timeout": Launcher(
+        flags=("--preserve-status", "--foreground", "-v", "--verbose"),
+        options=("-s", "--signal", "-k", "--kill-after"),
+        positionals=1,
+    ),
+    "npx": Launcher(
+        flags=("-y", "--yes", "--no", "-q", "--quiet", "--no-install"),
+        keep=True,
+    ),
+}
+
+# python -m <module>: options before -m that leave the module as the command
+PYTHON_FLAGS = frozenset(("-u", "-B", "-O", "-OO", "-I", "-E", "-s", "-S", "-q", "-P"))
+PYTHON_OPTIONS = frozenset(("-X", "-W"))
+
+
+def _is_python(name: str) -> bool:
+    """python, python3, python3.12 or the Windows py launcher."""
+    version = name.removeprefix("python")
+    return name == "py" or (
+        version != name and (not version or version.replace(".", "").isdigit())
+    )
+
+
+def _python_module(parts: list[str], i: int) -> int | None:
+    """Index of the module name in ``python [options] -m module``, or None."""
+    i += 1
+    while i < len(parts) and parts[i] != "-m":
+        if parts[i] in PYTHON_FLAGS:
+            i += 1
+        elif parts[i] in PYTHON_OPTIONS:
+            i += 2
+        else:
+            return None
+    return i + 1 if i + 1 < len(parts) else None
+
+
+def is_assignment(word: str) -> bool:
+    """``NAME=value``: an environment assignment in front of a command."""
+    name, eq, _ = word.partition("=")
+    return bool(eq) and name.isidentifier()
+
+
+def launched_command(parts: list[str]) -> list[str]:
+    """*parts* past environment assignments and known launchers.
+
+    The result is what the family table classifies: a suffix of *parts*
+    (``python -m pytest`` gives ``pytest``), except after npx's own flags,
+    which are dropped. A launcher with options it does not know is left in
+    place, so the command stays unclassified.
+    """
+    i = 0
+    while i < len(parts):
+        if is_assignment(parts[i]):
+            i += 1
+            continue
+        name = normalize_command(parts[i])
+        launcher = LAUNCHERS.get(name)
+        if _is_python(name):
+            start = _python_module(parts, i)
+        elif launcher is not None:
+            start = launcher.command_index(parts, i)
+        else:
+            break
+        if start is None:
+            break
+        if launcher is not None and launcher.keep:
+            return [parts[i], *parts[start:]]
+        i = start
+    return parts[i:]
+
+
+BUILTIN = Registry(BUILTIN_FAMILIES)
+
+
+# --- Project families ---
+
+
+def parse_families(data: dict) -> tuple[dict[str, dict[str, object]], list[str]]:
+    """Validated family entries from a parsed compact_run.toml, plus errors."""
+    builtin_keep = {f.handler: f.keep for f in reversed(BUILTIN_FAMILIES)}
+    families: dict[str, dict[str, object]] = {}
+    errors: list[str] = []
+    table = data.get("families", {})
+    if not isinstance(table, dict):
+        return {}, ["[families] must be a table"]
+    for command, entry in table.items():
+        if not isinstance(entry, dict):
+            errors.append(f"{command}: must be a table")
+            continue
+        problem = _entry_problem(entry)
+        if problem:
+            errors.append(f"{command}: {problem}")
+            continue
+        handler = entry.get("handler", "summary")
+        keep = entry.get("keep")
+        if keep is None and handler == "summary":
+            sources = [entry[f] for f in ("summary", "failures") if entry.get(f)]
+            keep = "|".join(f"(?:{s})" for s in sources) or None
+        elif keep is None:
+            keep = builtin_keep.get(handler)
+        families[command] = {
+            "subcommands": entry.get("subcommands"),
+            "handler": handler,
+            "safe": entry.get("safe"),
+            "keep": keep,
+            "summary": entry.get("summary"),
+            "failures": entry.get("failures"),
+            "max_lines": entry.get("max_lines"),
+            "budget": entry.get("budget"),
+            "memo": entry.get("memo", False),
+        }
+    return families, errors
+
+
+def _entry_problem(entry: dict) -> str | None:
+    subcommands = entry.get("subcommands")
+    if subcommands is not None and not (
+        isinstance(subcommands, list) and all(isinstance(s, str) for s in subcommands)
+    ):
+        return "subcommands must be a list of strings"
+    if entry.get("handler", "summary") not in HANDLERS:
+        return f"unknown handler {entry.get('handler')!r}"
+    if entry.get("safe") is not None and entry.get("safe") not in SAFETY:
+        return f"unknown safety predicate {entry.get('safe')!r}"
+    if not isinstance(entry.get("memo", False), bool):
+        return "memo must be true or false"
+    for field in ("max_lines", "budget"):
+        value = entry.get(field)
+        if value is not None and not (
+            isinstance(value, int) and not isinstance(value, bool) and value > 0
+        ):
+            return f"{field} must be a positive integer"
+    for field in PATTERN_FIELDS:
+        source = entry.get(field)
+        if source is None:
+            continue
+        if not isinstance(source, str):
+            return f"{field} must be a string"
+        try:
+            re.compile(source)
+        except re.error as exc:
+            return f"bad {field} pattern: {exc}"
+    return None
+
+
+def _project_dir() -> Path:
+    return Path(os.environ.get("CLAUDE_PROJECT_DIR") or os.getcwd())
+
+
+def load_registry(project_dir: str | Path | None = None) -> Registry:
+    """Built-in families plus the project's compact_run.toml, if any.
+
+    An unreadable or malformed file leaves the built-in registry in place.
+    """
+    root = Path(project_dir) if project_dir is not None else _project_dir()
+    source = root / PROJECT_FILE
+    try:
+        st = source.stat()
+    except OSError:
+        return BUILTIN
+    stamp = [st.st_mtime_ns, st.st_size]
+    cache = root / CACHE_FILE
+    try:
+        cached = json.loads(cache.read_text(encoding="utf-8"))
+        if cached.get("stamp") != stamp:
+            cached = None
+    except (OSError, ValueError, AttributeError):
+        cached = None
+    if cached is None:
+        import tomllib
+
+        try:
+            data = tomllib.loads(source.read_text(encoding="utf-8"))
+        except (OSError, UnicodeDecodeError, tomllib.TOMLDecodeError) as exc:
+            return Registry(BUILTIN_FAMILIES, [f"{source}: {exc}"])
+        families, errors = parse_families(data)
+        cached = {"stamp": stamp, "families": families, "errors": errors}
+        _write_cache(cache, cached)
+    project = [
+        Family(command, **entry)  # type: ignore[arg-type]
+        for command, entry in cached["families"].items()
+    ]
+    return Registry((*BUILTIN_FAMILIES, *project), list(cached["errors"]))
+
+
+def _write_cache(cache: Path, data: dict) -> None:
+    tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, cache)
+    except OSError:
+        tmp.unlink(missing_ok=True)
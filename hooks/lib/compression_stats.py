@@ -0,0 +1,96 @@
+"""
+Compression telemetry for compact_run (cross-platform)
+
+Every compact_run invocation appends one record to
+.claude/state/compact_run_stats.jsonl: the command family, the raw stdout and
+stderr bytes the command produced, the bytes compact_run printed instead,
+the estimated tokens that saved, the exit code and the wall time. Layers that
+know a field note() it while the command runs; record() adds the rest and
+appends the line:
+
+    import compression_stats
+
+    compression_stats.note(raw_stdout=1234, raw_stderr=0)
+    compression_stats.record(family="git", emitted=42, exit_code=0, wall_ms=310)
+
+The file is a ring like the trace file: past COMPACT_RUN_STATS_MAX_KB
+(default 512) the oldest half is dropped. COMPACT_RUN_STATS=0 turns
+recording off. scripts/compression_report.py aggregates the records into
+per-family and per-day savings tables.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from output_budget import CHARS_PER_TOKEN
+from tracing import append_ring, state_dir
+
+STATS_ENV = "COMPACT_RUN_STATS"
+MAX_KB_ENV = "COMPACT_RUN_STATS_MAX_KB"
+DEFAULT_MAX_KB = 512
+STATS_FILE = "compact_run_stats.jsonl"
+
+_fields: dict[str, int | bool] = {}
+
+
+def enabled() -> bool:
+    """False when COMPACT_RUN_STATS=0."""
+    return os.environ.get(STATS_ENV, "1") != "0"
+
+
+def stats_path(state: Path | None = None) -> Path:
+    """Stats ring inside a state directory."""
+    return (state or state_dir()) / STATS_FILE
+
+
+def note(**fields: int | bool) -> None:
+    """Remember fields (raw byte counts, timeouts) for this invocation's record."""
+    _fields.update(fields)
+
+
+def noted(name: str) -> int | bool | None:
+    """A field noted so far, or None."""
+    return _fields.get(name)
+
+
+def tokens_saved(raw_bytes: int, emitted_bytes: int) -> int:
+    """Estimated tokens kept out of the context (negative if output grew)."""
+    return (raw_bytes - emitted_bytes) // CHARS_PER_TOKEN
+
+
+def _max_bytes() -> int:
+    try:
+        return max(1, int(os.environ.get(MAX_KB_ENV, DEFAULT_MAX_KB))) * 1024
+    except ValueError:
+        return DEFAULT_MAX_KB * 1024
+
+
+def record(
+    family: str | None,
+    emitted: int,
+    exit_code: int,
+    wall_ms: float,
+    state: Path | None = None,
+) -> None:
+    """Append this invocation's record with the noted fields (best effort)."""
+    fields = dict(_fields)
+    _fields.clear()
+    if not enabled():
+        return
+    raw_stdout = int(fields.pop("raw_stdout", 0))
+    raw_stderr = int(fields.pop("raw_stderr", 0))
+    entry = {
+        "ts": round(time.time(), 3),
+        "family": family,
+        "raw_stdout": raw_stdout,
+        "raw_stderr": raw_stderr,
+        "emitted": emitted,
+        "saved_tokens": tokens_saved(raw_stdout + raw_stderr, emitted),
+        "exit_code": exit_code,
+        "wall_ms": round(wall_ms, 1),
+        **fields,
+    }
+    line = json.dumps(entry, separators=(",", ":")) + "\n"
+    append_ring(stats_path(state), line.encode("utf-8"), _max_bytes())
@@ -0,0 +1,495 @@
+"""
+Git metadata without spawning git (cross-platform)
+
+The statusline, compact_run and the stop hook ask git small questions on
+hot paths: which branch is checked out, is this a repository, what is
+staged. This module answers them from the files under .git:
+
+    from git_meta import current_branch, in_git_repo, staged_changes
+
+    current_branch(cwd)   # "main"; "" when HEAD is detached; None outside a repo
+    in_git_repo(cwd)      # like `git rev-parse --git-dir` succeeding
+    work_tree(cwd)        # like `git rev-parse --show-toplevel`; None outside
+    staged_changes(cwd, cache_file)
+    # [("M", "src/app.py"), ("A", "new.py")], as `git diff --cached
+    # --name-status`; None outside a repo
+
+The repository is found by walking up from *cwd* to a ``.git`` directory
+or a worktree's ``.git`` file (``gitdir: ...``); refs and objects are read
+from the ``commondir`` it names. HEAD is resolved through symbolic refs,
+loose refs and packed-refs. Staged changes come from the index: when its
+cache-tree root matches HEAD's tree nothing is staged; on an unborn branch
+every index entry is an addition. Otherwise ``git diff --cached`` runs,
+and its result is cached in *cache_file* keyed by the index file's stat
+and the HEAD commit, so it runs again only after the index or HEAD moved.
+
+Layouts this module does not read (GIT_DIR and friends in the
+environment, reftable refs, SHA-256 repositories, split or sparse
+indexes, unmerged entries, deltified or missing commit objects) fall back
+to running git.
+"""
+
+import bisect
+import json
+import os
+import stat
+import struct
+from pathlib import Path
+from typing import NamedTuple
+
+from lazy_import import lazy_import
+
+subprocess = lazy_import("subprocess")
+zlib = lazy_import("zlib")
+
+GIT_TIMEOUT = 10
+# Environment that changes where git finds the repository or its index
+GIT_ENV = (
+    "GIT_DIR",
+    "GIT_WORK_TREE",
+    "GIT_COMMON_DIR",
+    "GIT_INDEX_FILE",
+    "GIT_CEILING_DIRECTORIES",
+)
+SYMREF_DEPTH = 5
+
+
+class _Unsupported(Exception):
+    """The repository uses a layout only git itself reads."""
+
+
+class GitDir(NamedTuple):
+    path: Path  # this worktree's git dir: HEAD, index
+    common: Path  # shared by all worktrees: refs, packed-refs, objects
+    work_tree: Path
+
+
+def find_git_dir(cwd: Path | str) -> GitDir | None:
+    """The repository whose work tree contains *cwd*, or None.
+
+    Raises _Unsupported when git might see it differently.
+    """
+    if any(name in os.environ for name in GIT_ENV):
+        raise _Unsupported
+    start = os.path.abspath(cwd)
+    if ".git" in Path(start).parts:
+        raise _Unsupported  # inside a git dir: git treats that as a repository
+    directory = start
+    while True:
+        dotgit = os.path.join(directory, ".git")
+        try:
+            st = os.stat(dotgit)
+        except OSError:
+            st = None
+        if st is not None:
+            return _git_dir(dotgit, st, directory)
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _git_dir(dotgit: str, st: os.stat_result, work_tree: str) -> GitDir:
+    if stat.S_ISDIR(st.st_mode):
+        path = dotgit
+    else:
+        try:
+            with open(dotgit, encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, ValueError):
+            raise _Unsupported from None
+        if not text.startswith("gitdir: "):
+            raise _Unsupported
+        path = os.path.join(work_tree, text[len("gitdir: ") :].strip())
+    path = os.path.normpath(path)
+    if not os.path.isfile(os.path.join(path, "HEAD")):
+        raise _Unsupported
+    common = path
+    try:
+        with open(os.path.join(path, "commondir"), encoding="utf-8") as f:
+            common = os.path.normpath(os.path.join(path, f.read().strip()))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError):
+        raise _Unsupported from None
+    if os.path.isdir(os.path.join(common, "reftable")):
+        raise _Unsupported
+    return GitDir(Path(path), Path(common), Path(work_tree))
+
+
+def _run_git(cwd: Path | str, *args: str) -> "subprocess.CompletedProcess | None":
+    try:
+        return subprocess.run(  # noqa: S603
+            ["git", *args],  # noqa: S607
+            cwd=cwd,
+            capture_output=True,
+            timeout=GIT_TIMEOUT,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired, TypeError):
+        return None
+
+
+# --- Refs ---
+
+_packed_refs: dict[str, tuple[tuple[int, int], dict[str, str]]] = {}
+
+
+def _read_packed_refs(common: Path) -> dict[str, str]:
+    """Ref name to object id from packed-refs, cached by its stat."""
+    path = common / "packed-refs"
+    try:
+        st = path.stat()
+    except OSError:
+        return {}
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _packed_refs.get(str(path))
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    refs: dict[str, str] = {}
+    try:
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(("#", "^")):
+                    continue
+                oid, _, name = line.rstrip("\n").partition(" ")
+                if name:
+                    refs[name] = oid
+    except (OSError, ValueError):
+        raise _Unsupported from None
+    _packed_refs[str(path)] = (key, refs)
+    return refs
+
+
+def _read_head(git: GitDir) -> tuple[str | None, str | None]:
+    """(ref HEAD points at or None when detached, commit id or None if unborn)."""
+    try:
+        text = (git.path / "HEAD").read_text(encoding="utf-8").strip()
+    except (OSError, ValueError):
+        raise _Unsupported from None
+    if not text.startswith("ref: "):
+        return None, _object_id(text)
+    ref = text[len("ref: ") :]
+    return ref, _resolve(git, ref)
+
+
+def _object_id(text: str) -> str:
+    if len(text) != 40 or not all(c in "0123456789abcdef" for c in text):
+        raise _Unsupported  # SHA-256 ids, or something unexpected
+    return text
+
+
+def _resolve(git: GitDir, ref: str) -> str | None:
+    """Commit id a ref points at, following symbolic refs; None if unborn."""
+    for _ in range(SYMREF_DEPTH):
+        base = git.common if ref.startswith("refs/") else git.path
+        try:
+            text = (base / ref).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            oid = _read_packed_refs(git.common).get(ref)
+            return None if oid is None else _object_id(oid)
+        except (OSError, ValueError):
+            raise _Unsupported from None
+        if not text.startswith("ref: "):
+            return _object_id(text)
+        ref = text[len("ref: ") :]
+    raise _Unsupported
+
+
+def current_branch(cwd: Path | str) -> str | None:
+    """Checked-out branch name, "" when HEAD is detached, None outside a repo.
+
+    Matches ``git branch --show-current``.
+    """
+    try:
+        git = find_git_dir(cwd)
+        if git is None:
+            return None
+        text = (git.path / "HEAD").read_text(encoding="utf-8").strip()
+        if not text.startswith("ref: "):
+            return ""
+        return text[len("ref: ") :].removeprefix("refs/heads/")
+    except (_Unsupported, OSError, ValueError):
+        pass
+    result = _run_git(cwd, "branch", "--show-current")
+    if result is None or result.returncode != 0:
+        return None
+    return os.fsdecode(result.stdout).strip()
+
+
+def head_commit(cwd: Path | str) -> str | None:
+    """Commit id HEAD resolves to, or None outside a repo or on an unborn branch."""
+    try:
+        git = find_git_dir(cwd)
+        return None if git is None else _read_head(git)[1]
+    except _Unsupported:
+        pass
+    result = _run_git(cwd, "rev-parse", "--verify", "-q", "HEAD")
+    if result is None or result.returncode != 0:
+        return None
+    return os.fsdecode(result.stdout).strip() or None
+
+
+def in_git_repo(cwd: Path | str) -> bool:
+    """Whether *cwd* is inside a git repository."""
+    try:
+        return find_git_dir(cwd) is not None
+    except _Unsupported:
+        pass
+    result = _run_git(cwd, "rev-parse", "--git-dir")
+    return result is not None and result.returncode == 0
+
+
+def work_tree(cwd: Path | str) -> Path | None:
+    """Top directory of the work tree containing *cwd*, or None."""
+    try:
+        git = find_git_dir(cwd)
+    except _Unsupported:
+        pass
+    else:
+        return None if git is None else git.work_tree
+    result = _run_git(cwd, "rev-parse", "--show-toplevel")
+    if result is None or result.returncode != 0 or not result.stdout.strip():
+        return None
+    return Path(os.fsdecode(result.stdout.strip()))
+
+
+# --- Objects: just enough to find a commit's tree ---
+
+
+def _commit_tree(git: GitDir, commit: str) -> str:
+    """Tree id of *commit*, from a loose object or a pack."""
+    loose = git.common / "objects" / commit[:2] / commit[2:]
+    try:
+        data = zlib.decompress(loose.read_bytes())
+    except FileNotFoundError:
+        data = _packed_commit(git.common / "objects" / "pack", bytes.fromhex(commit))
+    except (OSError, zlib.error):
+        raise _Unsupported from None
+    header, _, body = data.partition(b"\0")
+    if not header.startswith(b"commit ") or not body.startswith(b"tree "):
+        raise _Unsupported
+    return _object_id(body[5:45].decode("ascii", "replace"))
+
+
+def _packed_commit(pack_dir: Path, oid: bytes) -> bytes:
+    """Loose-object form of an undeltified commit stored in a pack."""
+    try:
+        indexes = [p for p in os.scandir(pack_dir) if p.name.endswith(".idx")]
+    except OSError:
+        raise _Unsupported from None
+    for idx in indexes:
+        offset = _pack_offset(Path(idx.path), oid)
+        if offset is None:
+            continue
+        with open(idx.path[: -len(".idx")] + ".pack", "rb") as f:
+            f.seek(offset)
+            head = f.read(4096)
+            kind = (head[0] >> 4) & 7
+            size = head[0] & 15
+            shift, i = 4, 0
+            while head[i] & 0x80:
+                i += 1
+                size |= (head[i] & 0x7F) << shift
+                shift += 7
+            if kind != 1:  # deltified (or not a commit)
+                raise _Unsupported
+            inflate = zlib.decompressobj()
+            data = inflate.decompress(head[i + 1 :], size)
+            while len(data) < size and not inflate.eof:
+                chunk = f.read(4096)
+                if not chunk:
+                    break
+                data += inflate.decompress(inflate.unconsumed_tail + chunk, size)
+            return b"commit %d\0" % size + data
+    raise _Unsupported  # in an alternate object store, or missing
+
+
+def _pack_offset(idx: Path, oid: bytes) -> int | None:
+    """Offset of *oid* in the pack of a version 2 .idx file, or None."""
+    with idx.open("rb") as f:
+        header = f.read(8 + 256 * 4)
+        if header[:8] != b"\377tOc\0\0\0\2":
+            raise _Unsupported
+        fanout = struct.unpack(">256I", header[8:])
+        lo = fanout[oid[0] - 1] if oid[0] else 0
+        hi, total = fanout[oid[0]], fanout[255]
+
+        class _Ids:
+            def __len__(self) -> int:
+                return hi
+
+            def __getitem__(self, n: int) -> bytes:
+                f.seek(8 + 256 * 4 + n * 20)
+                return f.read(20)
+
+        n = bisect.bisect_left(_Ids(), oid, lo, hi)
+        if n == hi or _Ids()[n] != oid:
+            return None
+        offsets = 8 + 256 * 4 + total * 24
+        f.seek(offsets + n * 4)
+        (offset,) = struct.unpack(">I", f.read(4))
+        if offset & 0x80000000:
+            f.seek(offsets + total * 4 + (offset & 0x7FFFFFFF) * 8)
+            (offset,) = struct.unpack(">Q", f.read(8))
+        return offset
+
+
+# --- Index ---
+
+
+class IndexEntry(NamedTuple):
+    path: str
+    mode: int
+    oid: str
+    stage: int
+
+
+def read_index(
+    index_file: Path,
+) -> tuple[list[IndexEntry], str | None]:
+    """Entries of a git index and its cache-tree root id (None if invalid).
+
+    Reads versions 2 to 4. Raises _Unsupported for split indexes, sparse
+    directory entries and anything else it does not parse.
+    """
+    try:
+        data = index_file.read_bytes()
+    except FileNotFoundError:
+        return [], None
+    except OSError:
+        raise _Unsupported from None
+    if len(data) < 12 or data[:4] != b"DIRC":
+        raise _Unsupported
+    version, count = struct.unpack(">II", data[4:12])
+    if version not in (2, 3, 4):
+        raise _Unsupported
+    entries: list[IndexEntry] = []
+    pos, previous = 12, b""
+    try:
+        for _ in range(count):
+            mode = struct.unpack(">I", data[pos + 24 : pos + 28])[0]
+            oid = data[pos + 40 : pos + 60].hex()
+            flags = struct.unpack(">H", data[pos + 60 : pos + 62])[0]
+            start = pos + 62 + (2 if version >= 3 and flags & 0x4000 else 0)
+            if version == 4:
+                strip = 0
+                while True:  # offset varint: bytes to drop from the last path
+                    byte = data[start]
+                    start += 1
+                    strip = (strip << 7) | (byte & 0x7F)
+                    if not byte & 0x80:
+                        break
+                    strip += 1
+                end = data.index(b"\0", start)
+                name = previous[: len(previous) - strip] + data[start:end]
+                pos = end + 1
+            else:
+                end = data.index(b"\0", start)
+                name = data[start:end]
+                pos += (end - pos + 8) & ~7
+            previous = name
+            if stat.S_ISDIR(mode):
+                raise _Unsupported  # sparse index directory entry
+            entries.append(IndexEntry(os.fsdecode(name), mode, oid, (flags >> 12) & 3))
+        root = _cache_tree_root(data, pos)
+    except (struct.error, IndexError, ValueError):
+        raise _Unsupported from None
+    return entries, root
+
+
+def _cache_tree_root(data: bytes, pos: int) -> str | None:
+    """Root tree id from the TREE extension after the entries, if valid."""
+    end = len(data) - 20  # trailing checksum
+    while pos + 8 <= end:
+        signature = data[pos : pos + 4]
+        (size,) = struct.unpack(">I", data[pos + 4 : pos + 8])
+        body = data[pos + 8 : pos + 8 + size]
+        if signature == b"link":
+            raise _Unsupported  # split index: entries live in a shared file
+        if signature == b"TREE" and body.startswith(b"\0"):
+            header, _, rest = body[1:].partition(b"\n")
+            entry_count = int(header.split(b" ")[0])
+            return rest[:20].hex() if entry_count >= 0 else None
+        pos += 8 + size
+    return None
+
+
+# --- Staged changes ---
+
+
+def _parse_name_status(output: bytes) -> list[tuple[str, str]]:
+    """(status, path) pairs from ``git diff --name-status -z``."""
+    fields = output.split(b"\0")
+    changes: list[tuple[str, str]] = []
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i].decode("ascii", "replace")
+        paths = 2 if status[:1] in ("R", "C") else 1
+        path = fields[i + paths] if i + paths < len(fields) else b""
+        changes.append((status, os.fsdecode(path)))
+        i += 1 + paths
+    return changes
+
+
+def _native_staged(git: GitDir) -> list[tuple[str, str]] | None:
+    """Staged changes read from the index, or None when git must diff."""
+    entries, root = read_index(git.path / "index")
+    if any(entry.stage for entry in entries):
+        raise _Unsupported  # unmerged paths
+    _, commit = _read_head(git)
+    if commit is None:
+        return [("A", entry.path) for entry in entries]
+    if root is not None and root == _commit_tree(git, commit):
+        return []
+    return None
+
+
+def staged_changes(
+    cwd: Path | str, cache_file: Path | None = None
+) -> list[tuple[str, str]] | None:
+    """``git diff --cached --name-status`` as (status, path) pairs.
+
+    Renames and copies are reported with their new path. Returns None
+    outside a repository or when git fails.
+    """
+    stamp = None
+    try:
+        git = find_git_dir(cwd)
+        if git is None:
+            return None
+        native = _native_staged(git)
+        if native is not None:
+            return native
+        try:
+            st = (git.path / "index").stat()
+            index_stamp = [st.st_ino, st.st_mtime_ns, st.st_size]
+        except OSError:
+            index_stamp = None
+        stamp = [str(git.path), index_stamp, _read_head(git)[1]]
+    except _Unsupported:
+        pass
+    if stamp is not None and cache_file is not None:
+        try:
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+            if cached["stamp"] == stamp:
+                return [(status, path) for status, path in cached["changes"]]
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+    result = _run_git(cwd, "diff", "--cached", "--name-status", "-z")
+    if result is None or result.returncode != 0:
+        return None
+    changes = _parse_name_status(result.stdout)
+    if stamp is not None and cache_file is not None:
+        _write_cache(cache_file, {"stamp": stamp, "changes": changes})
+    return changes
+
+
+def _write_cache(cache_file: Path, data: dict) -> None:
+    tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, cache_file)
+    except OSError:
+        tmp.unlink(missing_ok=True)
@@ -0,0 +1,57 @@
+"""
+Interpreter for hook subprocesses (cross-platform)
+
+Hooks run under ``uv run --no-project --script``, whose interpreter lives
+in a temporary environment in uv's cache that uv deletes when the hook
+exits. A process that outlives the hook (the hook daemon) or a command
+run later (a wrapped ``compact_run.py``) must not be started from it:
+
+    from hook_python import stable_python
+
+    python = stable_python(plugin_root)  # or None: go through uv
+
+The materialized runtime (<root>/runtime, see scripts/build_runtime.py)
+is preferred. It is checked on every call, so a runtime built while the
+hook daemon runs is picked up by its next request.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+UV_CACHE_ENV = "UV_CACHE_DIR"
+
+
+def runtime_python(plugin_root: Path) -> Path:
+    """The materialized runtime's interpreter (which may not exist)."""
+    if sys.platform == "win32":
+        return plugin_root / "runtime" / "Scripts" / "python.exe"
+    return plugin_root / "runtime" / "bin" / "python"
+
+
+def uv_cache_dir() -> Path:
+    """uv's cache directory, as uv resolves it."""
+    if cache := os.environ.get(UV_CACHE_ENV):
+        return Path(cache)
+    if sys.platform == "win32":
+        local = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+        return Path(local) / "uv" / "cache"
+    xdg = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg) / "uv"
+
+
+def is_ephemeral(executable: str) -> bool:
+    """Whether *executable* is in uv's cache (a ``uv run``/``uvx`` environment)."""
+    # Not resolved: a cached environment's python links to a stable one
+    path = Path(os.path.abspath(executable))
+    return path.is_relative_to(os.path.abspath(uv_cache_dir()))
+
+
+def stable_python(plugin_root: Path) -> str | None:
+    """The runtime, else this interpreter unless uv may delete it, else None."""
+    runtime = runtime_python(plugin_root)
+    if runtime.is_file():
+        return str(runtime)
+    if sys.executable and not is_ephemeral(sys.executable):
+        return sys.executable
+    return None
@@ -0,0 +1,100 @@
+"""
+Lazy imports for hook scripts (cross-platform)
+
+Every hook is a fresh interpreter, so each module imported at the top of a
+hook is paid on every tool call even when the code path that needs it never
+runs. Hooks put this directory on sys.path and use:
+
+    from lazy_import import LazyLogger, lazy_import
+
+    subprocess = lazy_import("subprocess")  # imported on first attribute access
+    logger = LazyLogger(__name__)           # logging imported on first emitted record
+
+scripts/hook_startup_profile.py measures what each hook still imports at
+startup against its STARTUP_BUDGET_MS.
+"""
+
+import importlib
+import importlib.util
+import sys
+import types
+from collections.abc import Callable
+
+# logging level numbers, so level checks never need the logging module
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return *name* as a module that is only executed on first attribute access.
+
+    Already-imported modules are returned as-is. Built-in and frozen modules,
+    which cost nothing to import, are imported immediately.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    parent, _, _ = name.rpartition(".")
+    if parent:
+        importlib.import_module(parent)
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        msg = f"No module named {name!r}"
+        raise ModuleNotFoundError(msg, name=name)
+    if spec.loader is None or spec.origin in ("built-in", "frozen"):
+        return importlib.import_module(name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class LazyLogger:
+    """Stand-in for ``logging.getLogger(name)`` that defers importing logging.
+
+    Records below *level* are dropped without touching the logging module,
+    matching a logger whose effective level is *level*. The first record at
+    or above it imports logging, runs *setup* (e.g. ``logging.basicConfig``)
+    and forwards to the real logger from then on.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        level: int = WARNING,
+        setup: Callable[[types.ModuleType], None] | None = None,
+    ) -> None:
+        self.name = name
+        self.level = level
+        self._setup = setup
+        self._logger: object | None = None
+
+    def _get(self) -> object:
+        if self._logger is None:
+            logging = importlib.import_module("logging")
+            if self._setup is not None:
+                self._setup(logging)
+            self._logger = logging.getLogger(self.name)
+        return self._logger
+
+    def _log(self, level: int, method: str, msg: object, *args: object) -> None:
+        if level >= self.level:
+            getattr(self._get(), method)(msg, *args)
+
+    def debug(self, msg: object, *args: object) -> None:
+        self._log(DEBUG, "debug", msg, *args)
+
+    def info(self, msg: object, *args: object) -> None:
+        self._log(INFO, "info", msg, *args)
+
+    def warning(self, msg: object, *args: object) -> None:
+        self._log(WARNING, "warning", msg, *args)
+
+    def error(self, msg: object, *args: object) -> None:
+        self._log(ERROR, "error", msg, *args)
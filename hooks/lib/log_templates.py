@@ -0,0 +1,133 @@
+"""
+Single-pass log template clustering (cross-platform)
+
+Groups log lines that differ only in their variable parts, in the spirit of
+the Drain log parser. Each line is masked (timestamps, UUIDs, IPs, hex ids,
+numbers become <TS>, <UUID>, <IP>, <HEX>, <NUM>), split on whitespace, and
+matched against the clusters that share its token count and first token. A
+line joins the most similar cluster when at least SIMILARITY of its tokens
+agree; tokens that still differ become <*> in the cluster's template.
+
+    from log_templates import TemplateMiner
+
+    miner = TemplateMiner()
+    for line in lines:
+        miner.feed(line)
+    for cluster in miner.clusters():
+        print(cluster.count, cluster.first, cluster.last, cluster.template)
+
+Memory is bounded by MAX_CLUSTERS; lines that would open a cluster past the
+limit are only counted (``overflow``). Masking costs far more than reading a
+line, so the miner stops after MAX_LINES lines and only counts the rest
+(``skipped``); callers fall back to a plain tail when ``complete`` is false.
+"""
+
+import re
+
+SIMILARITY = 0.5  # Fraction of agreeing tokens needed to join a cluster
+MAX_CLUSTERS = 1000
+MAX_LINES = 200_000
+MAX_EXEMPLAR = 500  # Characters kept of each cluster's exemplar line
+WILDCARD = "<*>"
+
+# One alternation so each line is masked in a single regex pass; the group
+# name is the mask. Order matters: longer shapes before the numbers they contain.
+_MASKS = re.compile(
+    r"(?P<UUID>\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b)"
+    r"|(?P<TS>\b\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)?"
+    r"|\b\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?)"
+    r"|(?P<IP>\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b)"
+    r"|(?P<HEX>\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{6,}\b)"
+    r"|(?P<NUM>(?<![A-Za-z])[-+]?\d+(?:\.\d+)?)"
+)
+
+
+def _mask(match: re.Match[str]) -> str:
+    return f"<{match.lastgroup}>"
+
+
+def mask(line: str) -> str:
+    """Replace the variable parts of a log line with <KIND> placeholders."""
+    return _MASKS.sub(_mask, line)
+
+
+class LogCluster:
+    """Lines sharing one template: count, first/last line number and an exemplar."""
+
+    __slots__ = ("count", "exemplar", "first", "last", "tokens")
+
+    def __init__(self, tokens: list[str], line: str, index: int) -> None:
+        self.tokens = tokens
+        self.count = 1
+        self.first = index
+        self.last = index
+        self.exemplar = (
+            line if len(line) <= MAX_EXEMPLAR else line[:MAX_EXEMPLAR] + "..."
+        )
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def similarity(self, tokens: list[str]) -> float:
+        same = sum(1 for a, b in zip(self.tokens, tokens) if a == b or a == WILDCARD)
+        return same / len(tokens) if tokens else 1.0
+
+    def absorb(self, tokens: list[str], index: int) -> None:
+        for i, (a, b) in enumerate(zip(self.tokens, tokens)):
+            if a != b and a != WILDCARD:
+                self.tokens[i] = WILDCARD
+        self.count += 1
+        self.last = index
+
+
+class TemplateMiner:
+    """Cluster log lines by template in one streaming pass."""
+
+    def __init__(
+        self, max_clusters: int = MAX_CLUSTERS, max_lines: int = MAX_LINES
+    ) -> None:
+        self.max_clusters = max_clusters
+        self.max_lines = max_lines
+        self.lines = 0
+        self.overflow = 0
+        self.skipped = 0
+        self._clusters: list[LogCluster] = []
+        self._groups: dict[tuple[int, str], list[LogCluster]] = {}
+
+    def feed(self, line: str) -> None:
+        """Add the next line (blank lines are counted but not clustered)."""
+        index = self.lines
+        self.lines += 1
+        if index >= self.max_lines:
+            self.skipped += 1
+            return
+        tokens = mask(line).split()
+        if not tokens:
+            return
+        group = self._groups.setdefault((len(tokens), tokens[0]), [])
+        best: LogCluster | None = None
+        best_score = SIMILARITY
+        for cluster in group:
+            score = cluster.similarity(tokens)
+            if score >= best_score:
+                best, best_score = cluster, score
+                if score == 1.0:
+                    break
+        if best is not None:
+            best.absorb(tokens, index)
+        elif len(self._clusters) < self.max_clusters:
+            cluster = LogCluster(tokens, line, index)
+            group.append(cluster)
+            self._clusters.append(cluster)
+        else:
+            self.overflow += 1
+
+    @property
+    def complete(self) -> bool:
+        """True when every line fed was clustered (none past max_lines)."""
+        return self.skipped == 0
+
+    def clusters(self) -> list[LogCluster]:
+        """Clusters in order of first occurrence."""
+        return list(self._clusters)
@@ -0,0 +1,158 @@
+"""
+Lossless archive of compact_run's raw output (cross-platform)
+
+compact_run keeps the raw stdout and stderr of a command whose output it
+compressed, so the lines it dropped can be read back without running the
+command again:
+
+    from output_archive import OutputArchive
+
+    archive = OutputArchive(state_dir / "compact_run_archive")
+    writer = archive.writer()           # one per run, named by a random handle
+    writer.write("stdout", chunk)       # raw bytes, as they arrive
+    if writer.keep():                   # or writer.discard()
+        archive.evict(keep=writer.handle)
+        print(writer.handle)
+    text = archive.read(handle, "stdout")   # None once evicted
+
+Each stream is a gzip file ``<handle>.<stream>.gz``. Writes stay in memory
+until a stream passes SPILL_BYTES, so short outputs that end up discarded
+never touch the disk; past RUN_LIMIT raw bytes a stream stops growing and
+ends with a note. evict() drops the least recently used archives (read()
+refreshes an archive's mtime) until the directory fits in max_bytes.
+"""
+
+import os
+from pathlib import Path
+
+from lazy_import import lazy_import
+
+gzip = lazy_import("gzip")  # only once a run outgrows SPILL_BYTES, or on read
+
+STREAMS = ("stdout", "stderr")
+MAX_BYTES = 64 * 1024 * 1024  # Compressed size of all archives
+RUN_LIMIT = 256 * 1024 * 1024  # Raw bytes archived per stream
+SPILL_BYTES = 64 * 1024  # Buffered in memory before a stream's file is opened
+LEVEL = 1  # gzip level: fast enough to keep up with a streaming command
+
+
+class ArchiveWriter:
+    """Raw output of one run, buffered in memory until it is large or kept.
+
+    Each stream may be written by its own thread.
+    """
+
+    def __init__(self, path: Path, handle: str, limit: int = RUN_LIMIT) -> None:
+        self.path = path
+        self.handle = handle
+        self.limit = limit
+        self._pending: dict[str, list[bytes]] = {s: [] for s in STREAMS}
+        self._sizes = dict.fromkeys(STREAMS, 0)
+        self._files: dict[str, gzip.GzipFile] = {}
+        self._failed = False
+
+    def file(self, stream: str) -> Path:
+        return self.path / f"{self.handle}.{stream}.gz"
+
+    def write(self, stream: str, data: bytes) -> None:
+        """Append raw *data* to *stream* (best effort, never raises)."""
+        size = self._sizes[stream]
+        if self._failed or size >= self.limit or not data:
+            return
+        data = data[: self.limit - size]
+        self._sizes[stream] = size + len(data)
+        if self._sizes[stream] >= self.limit:
+            note = f"\n[... archive stopped after {self.limit} bytes]\n"
+            data += note.encode()
+        self._pending[stream].append(data)
+        if stream in self._files or self._sizes[stream] > SPILL_BYTES:
+            self._spill(stream)
+
+    def _spill(self, stream: str) -> None:
+        try:
+            if stream not in self._files:
+                self.path.mkdir(parents=True, exist_ok=True)
+                self._files[stream] = gzip.open(self.file(stream), "wb", LEVEL)
+            self._files[stream].write(b"".join(self._pending[stream]))
+        except OSError:
+            self._failed = True
+        self._pending[stream].clear()
+
+    def keep(self) -> bool:
+        """Write what is still buffered and close; False if nothing was archived."""
+        for stream in STREAMS:
+            if self._pending[stream]:
+                self._spill(stream)
+        self._close()
+        if self._failed or not self._files:
+            self.discard()
+            return False
+        return True
+
+    def discard(self) -> None:
+        """Drop this run's archive."""
+        self._close()
+        for stream in self._files:
+            self.file(stream).unlink(missing_ok=True)
+        self._pending = {s: [] for s in STREAMS}
+
+    def _close(self) -> None:
+        for f in self._files.values():
+            try:
+                f.close()
+            except OSError:
+                self._failed = True
+
+
+class OutputArchive:
+    """Directory of per-run gzip archives with least-recently-used eviction."""
+
+    def __init__(self, path: Path, max_bytes: int = MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def writer(self) -> ArchiveWriter:
+        return ArchiveWriter(self.path, os.urandom(4).hex())
+
+    def read(self, handle: str, stream: str) -> str | None:
+        """A stream of an archived run, or None; marks the run as recently used.
+
+        A run that archived only its other stream reads as "".
+        """
+        if not handle.isalnum() or stream not in STREAMS:
+            return None
+        files = [self.path / f"{handle}.{s}.gz" for s in STREAMS]
+        if not any(f.exists() for f in files):
+            return None
+        target = self.path / f"{handle}.{stream}.gz"
+        try:
+            for path in files:
+                if path.exists():
+                    os.utime(path)
+            if not target.exists():
+                return ""
+            with gzip.open(target, "rb") as f:
+                return f.read().decode("utf-8", "replace")
+        except (OSError, EOFError):
+            return None
+
+    def evict(self, keep: str = "") -> None:
+        """Drop the least recently used runs, never *keep*, until under max_bytes."""
+        runs: dict[str, list[tuple[float, int, Path]]] = {}
+        for path in self.path.glob("*.gz"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            runs.setdefault(path.name.split(".")[0], []).append(
+                (st.st_mtime, st.st_size, path)
+            )
+        total = sum(size for files in runs.values() for _, size, _ in files)
+        for handle, files in sorted(runs.items(), key=lambda run: max(run[1])[0]):
+            if total <= self.max_bytes:
+                break
+            if handle == keep:
+                continue
+            for _, size, path in files:
+                path.unlink(missing_ok=True)
+                total -= size
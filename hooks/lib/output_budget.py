@@ -0,0 +1,174 @@
+"""
+Token-budgeted output selection (cross-platform)
+
+compact_run fits a command's output into a token budget instead of keeping a
+fixed number of trailing lines, so a single minified stack line cannot blow
+the context and an error far above the tail is not dropped:
+
+    from output_budget import select
+
+    print(select(text, tokens=2000, max_lines=150))
+
+Tokens are estimated as one per CHARS_PER_TOKEN characters plus one per line
+(no tokenizer). Output within both limits is returned unchanged. Otherwise
+the budget is split between the head (HEAD_SHARE), error-salient regions
+(SALIENT_SHARE: lines matching SALIENT with CONTEXT lines either side,
+earliest first, as the first error is usually the cause) and the tail, which
+also gets whatever the other two left unused. No line may take more than
+1/LINE_SHARE of the budget (at least LINE_TOKENS); longer ones are cut in
+the middle.
+
+Every gap becomes a marker naming the lines and tokens it stands for:
+
+    [truncated: 3001 lines total, showing 148]
+    ...
+    [... lines 31-2950 elided: 2920 lines, ~8760 tokens ...]
+
+Text rebuilt by a compact_run StreamView carries ELIDED_MARKER lines for the
+lines it never kept; they are counted as the lines and tokens they replace.
+"""
+
+import re
+from collections.abc import Iterator
+
+CHARS_PER_TOKEN = 4
+HEAD_SHARE = 0.2  # Of the token and line budget, for the first lines
+SALIENT_SHARE = 0.4  # For error regions; the rest goes to the tail
+CONTEXT = 2  # Lines shown either side of a salient line
+LINE_SHARE = 16  # A line may use at most 1/LINE_SHARE of the budget...
+LINE_TOKENS = 32  # ...or this many tokens, whichever is more
+
+# Matched against lowercased lines (far cheaper than re.IGNORECASE)
+SALIENT = re.compile(
+    r"error|exception|traceback|fail|fatal|panic|abort|assert|denied|refused"
+    r"|segmentation fault|cannot|unable to|not found|undefined"
+)
+
+# Stand-in for lines a StreamView dropped
+ELIDED_MARKER = "[... {} lines elided, ~{} tokens ...]"
+_ELIDED = re.compile(r"^\[\.\.\. (\d+) lines elided, ~(\d+) tokens \.\.\.\]$")
+
+
+def line_tokens(line: str) -> int:
+    """Estimated tokens of one line, its newline included."""
+    return len(line) // CHARS_PER_TOKEN + 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated tokens of *text*."""
+    return sum(line_tokens(line) for line in text.splitlines())
+
+
+def clip_line(line: str, tokens: int) -> str:
+    """*line* cut in the middle to about *tokens* tokens."""
+    if line_tokens(line) <= tokens:
+        return line
+    keep = max(tokens * CHARS_PER_TOKEN // 2 - 12, 1)
+    clipped = f"{line[:keep]} [... {len(line) - 2 * keep} chars cut] {line[-keep:]}"
+    return clipped if len(clipped) < len(line) else line
+
+
+def _gap(first: int, last: int, tokens: int) -> str:
+    if first == last:
+        return f"[... line {first + 1} elided: ~{tokens} tokens ...]"
+    span = f"{first + 1}-{last + 1}"
+    return f"[... lines {span} elided: {last - first + 1} lines, ~{tokens} tokens ...]"
+
+
+def select(
+    content: str,
+    tokens: int,
+    max_lines: int,
+    head_share: float = HEAD_SHARE,
+    salient: re.Pattern[str] = SALIENT,
+) -> str:
+    """*content* within *tokens* estimated tokens and *max_lines* lines.
+
+    *head_share* of both limits goes to the first lines (0 for logs, whose
+    start rarely matters), SALIENT_SHARE to salient regions, the rest to
+    the tail. The header and gap markers are not counted.
+    """
+    lines: list[str] = []
+    numbers: list[int] = []  # original 0-based line number of each line
+    before: list[int] = []  # original tokens preceding each line
+    total = spent = 0
+    for line in content.splitlines():
+        elided = _ELIDED.match(line) if line.startswith("[... ") else None
+        if elided:
+            total += int(elided.group(1))
+            spent += int(elided.group(2))
+            continue
+        lines.append(line)
+        numbers.append(total)
+        before.append(spent)
+        total += 1
+        spent += line_tokens(line)
+    if total <= max_lines and spent <= tokens:
+        return content
+
+    cap = max(tokens // LINE_SHARE, LINE_TOKENS)
+    shown: dict[int, str] = {}  # chosen lines, clipped to cap
+    budget = [tokens, max_lines]  # left overall
+
+    def take(indices: list[int], share: list[int] | None) -> bool:
+        """Choose *indices* if they fit the overall budget and *share* of it."""
+        new = {i: clip_line(lines[i], cap) for i in indices if i not in shown}
+        cost = sum(line_tokens(line) for line in new.values())
+        limits = (budget, share) if share is not None else (budget,)
+        if any(cost > left[0] or len(new) > left[1] for left in limits):
+            return False
+        shown.update(new)
+        for left in limits:
+            left[0] -= cost
+            left[1] -= len(new)
+        return True
+
+    def run(start: int, step: int) -> Iterator[int]:
+        """Indices from *start* while original lines stay contiguous."""
+        i = start
+        yield i
+        while 0 <= i + step < len(lines) and numbers[i + step] == numbers[i] + step:
+            i += step
+            yield i
+
+    head = [int(tokens * head_share), int(max_lines * head_share)]
+    if lines and numbers[0] == 0:
+        for i in run(0, 1):
+            if not take([i], head):
+                break
+    tail_share = 1 - head_share - SALIENT_SHARE
+    tail = [int(tokens * tail_share), int(max_lines * tail_share)]
+    at_end = bool(lines) and numbers[-1] == total - 1
+    for i in run(len(lines) - 1, -1) if at_end else ():
+        if not take([i], tail):
+            break
+    regions = [int(tokens * SALIENT_SHARE), int(max_lines * SALIENT_SHARE)]
+    for i, line in enumerate(lines):
+        if i in shown or not salient.search(line.lower()):
+            continue
+        window = [
+            j
+            for j in range(i - CONTEXT, i + CONTEXT + 1)
+            if 0 <= j < len(lines) and abs(numbers[j] - numbers[i]) <= CONTEXT
+        ]
+        if not take(window, regions):
+            break
+    for i in run(len(lines) - 1, -1) if at_end else ():
+        if not take([i], None):  # unused head and region budget
+            break
+
+    out: list[str] = []
+    previous = -1  # original number of the last line shown
+    spent_before = 0  # original tokens up to and including it
+    for i in sorted(shown):
+        if numbers[i] > previous + 1:
+            out.append(_gap(previous + 1, numbers[i] - 1, before[i] - spent_before))
+        out.append(shown[i])
+        previous = numbers[i]
+        spent_before = before[i] + line_tokens(lines[i])
+    if previous < total - 1:
+        out.append(_gap(previous + 1, total - 1, spent - spent_before))
+    first = numbers[min(shown)] if shown else 0
+    pure_tail = 0 < first and previous - first == len(shown) - 1 == total - 1 - first
+    showing = f"last {len(shown)}" if pure_tail else str(len(shown))
+    return f"[truncated: {total} lines total, showing {showing}]\n" + "\n".join(out)
@@ -0,0 +1,144 @@
+"""
+Precompiled index of the active task graph (cross-platform)
+
+validate_task_graph_compliance (every Agent spawn) and
+validate_task_graph_depth (every tool call) only need a few facts about
+the plan in .claude/state/active_task_graph.json, which grows with every
+phase's description and prompt. The index keeps just those facts:
+
+    from phase_index import load_index
+
+    index = load_index(state_dir)        # None without a readable graph
+    index.current_wave
+    index.phase("phase_2_1")             # Phase(wave, depth, is_atomic,
+                                         #       dependencies), or None
+    index.shallow, index.shallow_total   # atomic phases below MIN_DEPTH
+
+It is a sidecar file, active_task_graph.index, rebuilt only when the
+graph's mtime or size changes. The first line is a JSON header (the
+graph's stamp, current_wave and the shallow phases); every other line is
+``<phase_id>\\t<JSON [wave, depth, is_atomic, dependencies]>``. A lookup
+finds its line with one substring search and decodes only that line, so
+neither hook parses the plan, or the whole index, on the hot path.
+
+Waves are read from ``execution_plan`` when the graph nests them there.
+A phase ID listed twice keeps its first wave; phases of a wave without a
+wave_id are left out of the lookup table.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+GRAPH_FILE = "active_task_graph.json"
+INDEX_FILE = "active_task_graph.index"
+
+MIN_DEPTH = 3
+# Shallow phases kept in the header; the depth hint names at most five
+SHALLOW_KEPT = 5
+
+
+class Phase(NamedTuple):
+    wave: object  # the wave's wave_id
+    depth: int
+    is_atomic: bool
+    dependencies: list[str]
+
+
+class PhaseIndex:
+    """Lookups into one build of the index."""
+
+    def __init__(self, header: dict, body: str) -> None:
+        self.current_wave = header["current_wave"]
+        self.shallow: list[tuple[str, object]] = [
+            (phase_id, depth) for phase_id, depth in header["shallow"]
+        ]
+        self.shallow_total: int = header["shallow_total"]
+        self._body = body  # the phase lines, each starting with "\n"
+
+    def phase(self, phase_id: str) -> Phase | None:
+        """The indexed facts about *phase_id*, or None if it is not in the graph."""
+        start = self._body.find(f"\n{phase_id}\t")
+        if start < 0:
+            return None
+        start += len(phase_id) + 2
+        end = self._body.find("\n", start)
+        wave, depth, is_atomic, deps = json.loads(
+            self._body[start : end if end >= 0 else None]
+        )
+        return Phase(wave, depth, is_atomic, deps)
+
+
+def build_index(graph: dict, stamp: list[int]) -> str:
+    """Index file text for a parsed task graph."""
+    plan = graph.get("execution_plan", graph)
+    if not isinstance(plan, dict):
+        plan = {}
+    lines: list[str] = []
+    seen: set[str] = set()
+    shallow: list[list[object]] = []
+    shallow_total = 0
+    for wave in plan.get("waves", []):
+        for phase in wave.get("phases", []):
+            phase_id = phase.get("phase_id")
+            depth = phase.get("depth", 0)
+            is_atomic = phase.get("is_atomic") is True
+            if is_atomic and depth < MIN_DEPTH:
+                shallow_total += 1
+                if len(shallow) < SHALLOW_KEPT:
+                    shallow.append([phase.get("phase_id", "unknown"), depth])
+            if not isinstance(phase_id, str) or phase_id in seen:
+                continue
+            if "\t" in phase_id or "\n" in phase_id or wave.get("wave_id") is None:
+                continue
+            seen.add(phase_id)
+            deps = phase.get("dependencies", [])
+            entry = [wave["wave_id"], depth, is_atomic, deps]
+            lines.append(f"{phase_id}\t{json.dumps(entry)}")
+    header = {
+        "stamp": stamp,
+        "current_wave": graph.get("current_wave", plan.get("current_wave", 0)),
+        "shallow": shallow,
+        "shallow_total": shallow_total,
+    }
+    return "\n".join([json.dumps(header), *lines]) + "\n"
+
+
+def load_index(state_dir: Path) -> PhaseIndex | None:
+    """The index of the active task graph, rebuilt if the graph changed.
+
+    Returns None when there is no graph or it cannot be read or parsed.
+    """
+    graph_file = state_dir / GRAPH_FILE
+    try:
+        st = graph_file.stat()
+    except OSError:
+        return None
+    stamp = [st.st_mtime_ns, st.st_size]
+    index_file = state_dir / INDEX_FILE
+    try:
+        text = index_file.read_text(encoding="utf-8")
+        first, _, rest = text.partition("\n")
+        header = json.loads(first)
+        if header.get("stamp") == stamp:
+            return PhaseIndex(header, "\n" + rest)
+    except (OSError, ValueError, AttributeError, KeyError, TypeError):
+        pass
+    try:
+        graph = json.loads(graph_file.read_text(encoding="utf-8"))
+        text = build_index(graph, stamp)
+    except (OSError, ValueError, AttributeError, TypeError):
+        return None
+    _write_index(index_file, text)
+    first, _, rest = text.partition("\n")
+    return PhaseIndex(json.loads(first), "\n" + rest)
+
+
+def _write_index(index_file: Path, text: str) -> None:
+    tmp = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, index_file)
+    except OSError:
+        tmp.unlink(missing_ok=True)
@@ -0,0 +1,210 @@
+"""
+Content-addressed memo of wrapped test runs (cross-platform)
+
+compact_run's memo mode (COMPACT_RUN_MEMO=1) replays the compressed result
+of a test run instead of rerunning it when nothing it depends on changed.
+A run is keyed on its argv, working directory, the environment variables
+that steer test runners, and a fingerprint of the git working tree:
+
+    from run_memo import MemoStore, memo_key, tree_fingerprint
+
+    tree = tree_fingerprint(cwd)            # None outside a git work tree
+    key = memo_key(argv, cwd, env, tree.digest)
+    store = MemoStore(state_dir / "compact_run_memo")
+    entry = store.get(key)                  # dict or None (missing/expired)
+    store.put(key, {"exit_code": 0, "stdout": "...", "stderr": ""})
+
+The fingerprint hashes `git ls-files --stage` (the blob id of every indexed
+file) and `git status --porcelain` plus the content of every modified,
+deleted or untracked (non-ignored) file it lists, so an edit anywhere in
+the tracked tree, staged or not, changes the key. Ignored files, .claude/state
+and state outside the repository (databases, services, network) are not
+covered.
+
+Entries are small JSON files named by key. put() evicts entries older than
+max_age and then the oldest ones until the store fits in max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+
+MAX_AGE = 86400  # Seconds an entry may be replayed
+MAX_BYTES = 4 * 1024 * 1024  # Store size before the oldest entries go
+HASH_LIMIT = 64 * 1024 * 1024  # Larger dirty files are fingerprinted by stat
+
+# Hook bookkeeping (including this store) changes on every call and is no
+# test input; left out of the fingerprint
+EXCLUDE = (":(exclude).claude/state",)
+
+# Environment that changes what a test run does or prints: exact names and
+# prefixes. COMPACT_RUN_MEMO* only decides whether to replay.
+ENV_NAMES = ("PATH", "VIRTUAL_ENV", "CONDA_PREFIX", "LANG", "TZ", "CI")
+ENV_PREFIXES = (
+    "PYTEST",
+    "PYTHON",
+    "GO",
+    "CGO_",
+    "CARGO",
+    "RUST",
+    "NODE",
+    "NPM_CONFIG_",
+    "JEST",
+    "VITEST",
+    "LC_",
+    "COMPACT_RUN_",
+)
+
+
+class TreeFingerprint:
+    """Digest of a git working tree's tracked and untracked content."""
+
+    __slots__ = ("digest", "root")
+
+    def __init__(self, root: Path, digest: str) -> None:
+        self.root = root
+        self.digest = digest
+
+
+def _git(cwd: Path | str, *args: str) -> bytes | None:
+    try:
+        result = subprocess.run(  # noqa: S603
+            ["git", *args],  # noqa: S607
+            cwd=cwd,
+            capture_output=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _status_paths(status: bytes) -> list[str]:
+    """Paths named by ``git status --porcelain -z --no-renames``."""
+    return [os.fsdecode(record[3:]) for record in status.split(b"\0") if record[3:]]
+
+
+def _file_digest(path: Path) -> bytes:
+    try:
+        if path.is_symlink():
+            return os.fsencode(os.readlink(path))
+        st = path.stat()
+        if not path.is_file():
+            return b"not-a-file"
+        if st.st_size > HASH_LIMIT:
+            return f"stat:{st.st_size}:{st.st_mtime_ns}".encode()
+        digest = hashlib.blake2b(digest_size=20)
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.digest()
+    except OSError:
+        return b"missing"
+
+
+def tree_fingerprint(cwd: Path | str) -> TreeFingerprint | None:
+    """Fingerprint the git work tree containing *cwd*, or None if there is none."""
+    top = _git(cwd, "rev-parse", "--show-toplevel")
+    if not top:
+        return None
+    root = Path(os.fsdecode(top.strip()))
+    index = _git(root, "ls-files", "--stage", "-z", "--", ".", *EXCLUDE)
+    status = _git(
+        root,
+        "status",
+        "--porcelain",
+        "-z",
+        "--untracked-files=all",
+        "--no-renames",
+        "--",
+        ".",
+        *EXCLUDE,
+    )
+    if index is None or status is None:
+        return None
+    digest = hashlib.blake2b(index, digest_size=20)
+    digest.update(b"\0status\0" + status)
+    for path in sorted(set(_status_paths(status))):
+        digest.update(os.fsencode(path) + b"\0" + _file_digest(root / path))
+    return TreeFingerprint(root, digest.hexdigest())
+
+
+def relevant_env(env: dict[str, str]) -> dict[str, str]:
+    """The part of *env* that can change a test run's outcome or output."""
+    return {
+        name: value
+        for name, value in sorted(env.items())
+        if (name in ENV_NAMES or name.startswith(ENV_PREFIXES))
+        and not name.startswith("COMPACT_RUN_MEMO")
+    }
+
+
+def memo_key(
+    argv: list[str], cwd: Path | str, env: dict[str, str], tree: str, salt: str = ""
+) -> str:
+    """Key of a run: argv, cwd, relevant environment, tree digest and *salt*."""
+    material = json.dumps(
+        [argv, str(cwd), relevant_env(env), tree, salt], separators=(",", ":")
+    )
+    return hashlib.blake2b(material.encode(), digest_size=20).hexdigest()
+
+
+class MemoStore:
+    """Directory of ``<key>.json`` entries with age and size eviction."""
+
+    def __init__(
+        self, path: Path, max_age: float = MAX_AGE, max_bytes: int = MAX_BYTES
+    ) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+    def get(self, key: str) -> dict | None:
+        """The entry stored under *key*, unless missing, unreadable or expired."""
+        try:
+            entry = json.loads((self.path / f"{key}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict):
+            return None
+        created = entry.get("created")
+        if not isinstance(created, int | float) or time.time() - created > self.max_age:
+            return None
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        """Store *entry* (stamped with ``created``), then evict; best effort."""
+        entry = {**entry, "created": time.time()}
+        target = self.path / f"{key}.json"
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(entry), encoding="utf-8")
+            os.replace(tmp, target)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then the oldest until under max_bytes."""
+        now = time.time()
+        entries = []
+        for path in self.path.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,176 @@
+"""
+Concurrent statusline segments under a render deadline (cross-platform)
+
+Each statusline segment (version, context usage, git branch, turn
+duration) may touch the filesystem or spawn a process. Instead of
+computing them one after another, the statusline starts every provider
+on its own thread and renders whatever is ready when the deadline comes:
+
+    from segments import Segments
+
+    segments = Segments(cache_file)
+    segments.add("git branch", lambda: get_git_branch(cwd), key=cwd, timeout=1.0)
+    results = segments.collect(deadline=0.2)
+    results["git branch"]  # Result(value="main", stale=False)
+    ...render and flush...
+    segments.settle()
+
+A provider that has not returned by the deadline (or by its own
+*timeout*, if sooner), or that raised, yields its last value cached
+under the same *key*, marked stale, or its *default* when none is
+cached. Render latency is bounded by the deadline, not by the slowest
+provider. settle(), called once the output is flushed, gives late
+providers until their own timeout to finish so that their values are
+cached for the next render. Threads are daemons: a provider still
+running after that does not hold up process exit.
+
+Fresh values are cached in *cache_file* as JSON, at most MAX_KEYS keys
+per segment, so values must be JSON-serializable; a cached value comes
+back as decoded JSON (lists for tuples).
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+import tracing
+
+MAX_KEYS = 16
+
+
+class Result(NamedTuple):
+    value: object
+    stale: bool
+
+
+class _Job:
+    def __init__(
+        self,
+        name: str,
+        compute: Callable[[], object],
+        key: str,
+        timeout: float,
+        default: object,
+        cat: str,
+    ) -> None:
+        self.name = name
+        self.compute = compute
+        self.key = key
+        self.default = default
+        self.cat = cat
+        self.deadline = time.monotonic() + timeout
+        self.value: object = None
+        self.ok = False
+        self.cached = False  # value written to the cache file
+        self.thread = threading.Thread(
+            target=self._run, name=f"segment: {name}", daemon=True
+        )
+        self.thread.start()
+
+    def _run(self) -> None:
+        try:
+            with tracing.span(self.name, cat=self.cat):
+                self.value = self.compute()
+            self.ok = True
+        except Exception:  # noqa: BLE001, S110 - rendered as stale
+            pass
+
+    def wait(self, until: float) -> bool:
+        """Whether the provider returned a value by *until* (monotonic)."""
+        remaining = min(until, self.deadline) - time.monotonic()
+        if remaining > 0:
+            self.thread.join(remaining)
+        return self.ok
+
+
+class Segments:
+    """Segment providers running concurrently for one render."""
+
+    def __init__(self, cache_file: Path | None = None) -> None:
+        self.cache_file = cache_file
+        self.started = time.monotonic()
+        self._jobs: list[_Job] = []
+
+    def add(
+        self,
+        name: str,
+        compute: Callable[[], object],
+        *,
+        key: str = "",
+        timeout: float = 1.0,
+        default: object = None,
+        cat: str = "state",
+    ) -> None:
+        """Start *compute* for the segment *name* on its own thread."""
+        self._jobs.append(_Job(name, compute, key, timeout, default, cat))
+
+    def collect(self, deadline: float) -> dict[str, Result]:
+        """Every segment's value, waiting at most *deadline* seconds overall."""
+        until = self.started + deadline
+        results: dict[str, Result] = {}
+        cache = None
+        for job in self._jobs:
+            if job.wait(until):
+                results[job.name] = Result(job.value, stale=False)
+                continue
+            if cache is None:
+                cache = self._load()
+            by_key = cache.get(job.name)
+            if isinstance(by_key, dict) and job.key in by_key:
+                results[job.name] = Result(by_key[job.key], stale=True)
+            else:
+                results[job.name] = Result(job.default, stale=True)
+        self._save(cache)
+        return results
+
+    def settle(self) -> None:
+        """Let late providers finish within their timeouts and cache them."""
+        for job in self._jobs:
+            job.wait(job.deadline)
+        self._save()
+
+    def _load(self) -> dict[str, object]:
+        if self.cache_file is None:
+            return {}
+        try:
+            cache = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _save(self, cache: dict[str, object] | None = None) -> None:
+        """Write values computed since the last save, if any changed."""
+        done = [job for job in self._jobs if job.ok and not job.cached]
+        if self.cache_file is None or not done:
+            return
+        if cache is None:
+            cache = self._load()
+        changed = False
+        for job in done:
+            job.cached = True
+            by_key = cache.get(job.name)
+            if not isinstance(by_key, dict):
+                by_key = cache[job.name] = {}
+            try:
+                value = json.loads(json.dumps(job.value))
+            except (TypeError, ValueError):
+                continue
+            if by_key.get(job.key, ...) == value and list(by_key)[-1] == job.key:
+                continue
+            by_key.pop(job.key, None)
+            by_key[job.key] = value  # most recent last
+            for old in list(by_key)[:-MAX_KEYS]:
+                del by_key[old]
+            changed = True
+        if not changed:
+            return
+        tmp = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(cache), encoding="utf-8")
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            tmp.unlink(missing_ok=True)
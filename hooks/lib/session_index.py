@@ -0,0 +1,145 @@
+"""
+Session ID to transcript path index (cross-platform)
+
+The statusline finds a session's .jsonl by guessing its project directory
+from the cwd, which misses for worktrees and renamed directories. Instead
+of walking every transcript under ~/.claude on each such render, it asks
+the index:
+
+    from session_index import locate
+
+    locate(session_id, Path.home() / ".claude" / "projects", index_file)
+    # Path to <project dir>/<session_id>.jsonl, or None
+
+The index file's first line is a JSON header with the mtime of every
+project directory it has listed; every other line is
+``<session_id>\t<path>``. A hit is one substring search plus one stat,
+without decoding the rest of the file. On a miss, only project
+directories whose mtime changed since they were last listed (a transcript
+was added or removed) are listed again, newest first and at most
+MAX_RESCAN_DIRS per call, so a render costs one stat per project
+directory plus a bounded number of listings however many projects have
+been opened. Directories still being written to (mtime within
+MTIME_SETTLE_SECONDS) are listed but not marked as listed, since a
+coarse mtime could hide a transcript created right after the listing.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+MAX_RESCAN_DIRS = 32
+MTIME_SETTLE_SECONDS = 2
+
+
+def _read(index_file: Path) -> str:
+    try:
+        return index_file.read_text(encoding="utf-8")
+    except (OSError, ValueError):
+        return ""
+
+
+def _lookup(text: str, session_id: str) -> str | None:
+    """The indexed path of *session_id*, or None."""
+    start = text.find(f"\n{session_id}\t")
+    if start < 0:
+        return None
+    start += len(session_id) + 2
+    end = text.find("\n", start)
+    return text[start : end if end >= 0 else None]
+
+
+def _dirs(text: str) -> dict[str, int]:
+    """Listed project directory to mtime, from the index header."""
+    try:
+        dirs = json.loads(text.partition("\n")[0])["dirs"]
+    except (ValueError, TypeError, KeyError):
+        return {}
+    return dirs if isinstance(dirs, dict) else {}
+
+
+def _sessions(text: str) -> dict[str, str]:
+    """Session ID to path, from the index body."""
+    sessions = {}
+    for line in text.splitlines()[1:]:
+        session_id, tab, path = line.partition("\t")
+        if tab:
+            sessions[session_id] = path
+    return sessions
+
+
+def _write(index_file: Path, sessions: dict[str, str], dirs: dict[str, int]) -> None:
+    lines = [json.dumps({"dirs": dirs})]
+    lines.extend(f"{sid}\t{path}" for sid, path in sessions.items())
+    tmp = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, index_file)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def _transcripts(directory: str) -> dict[str, str]:
+    """Session ID to path of the .jsonl files directly in *directory*."""
+    found: dict[str, str] = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                session_id = entry.name.removesuffix(".jsonl")
+                # Tabs and newlines would break the index's line format
+                if session_id == entry.name or any(c in entry.path for c in "\t\n"):
+                    continue
+                if entry.is_file():
+                    found[session_id] = entry.path
+    except OSError:
+        pass
+    return found
+
+
+def locate(session_id: str, projects_dir: Path, index_file: Path) -> Path | None:
+    """The transcript of *session_id* under *projects_dir*, or None."""
+    text = _read(index_file)
+    path = _lookup(text, session_id)
+    if path and os.path.isfile(path):
+        return Path(path)
+    dirs = _dirs(text)
+
+    try:
+        with os.scandir(projects_dir) as entries:
+            current = {
+                entry.path: entry.stat().st_mtime_ns
+                for entry in entries
+                if entry.is_dir()
+            }
+    except OSError:
+        return None
+    changed = sorted(
+        (d for d, mtime in current.items() if dirs.get(d) != mtime),
+        key=current.__getitem__,
+        reverse=True,
+    )
+    if not changed and path is None:
+        return None  # nothing new since the last listing
+
+    # Forget directories that are gone, and sessions that are gone or in
+    # a directory about to be listed again
+    relisted = set(changed[:MAX_RESCAN_DIRS])
+    dirs = {d: mtime for d, mtime in dirs.items() if d in current}
+    sessions = {
+        sid: p
+        for sid, p in _sessions(text).items()
+        if os.path.dirname(p) in dirs
+        and os.path.dirname(p) not in relisted
+        and sid != session_id
+    }
+    settled = (time.time() - MTIME_SETTLE_SECONDS) * 1e9
+    for directory in changed[:MAX_RESCAN_DIRS]:
+        sessions.update(_transcripts(directory))
+        if current[directory] < settled:
+            dirs[directory] = current[directory]
+        else:
+            dirs.pop(directory, None)
+    _write(index_file, sessions, dirs)
+    path = sessions.get(session_id)
+    return Path(path) if path else None
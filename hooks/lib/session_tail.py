@@ -0,0 +1,146 @@
+"""
+Last token usage of a session transcript, read from the tail (cross-platform)
+
+The statusline's slow path shows the context size of the last assistant
+message after the last ``/clear`` or ``/compact``. Session .jsonl files
+grow to tens of MB over a long session, so instead of reading them front
+to back it scans backward from EOF in blocks and stops at the first line
+that decides the answer: a usage-bearing entry, or a reset (nothing after
+it has usage yet):
+
+    from session_tail import last_usage
+
+    usage = last_usage(session_file, cursor_file)
+    # {"input": ..., "cache_read": ..., "cache_create": ..., "output": ...}
+    # or None
+
+With a *cursor_file*, the result for the complete lines read so far is
+saved with the transcript's identity (device, inode), the byte offset it
+covers and, when a reset decided it, that reset line's offset. The next
+call only scans the bytes appended since, back to that offset, and falls
+back to the saved usage when they settle nothing. A replaced, truncated
+or rewritten transcript is scanned afresh. Only lines containing
+``"usage"`` are JSON-decoded.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import BinaryIO
+
+BLOCK_SIZE = 64 * 1024
+RESET_MARKERS = (b'"/clear"', b'"/compact"')
+USAGE_MARKER = b'"usage"'
+
+
+def _entry_usage(line: bytes) -> dict[str, int] | None:
+    """Token counts of a usage-bearing entry, None for any other line."""
+    if USAGE_MARKER not in line:
+        return None
+    try:
+        usage = json.loads(line).get("message", {}).get("usage", {})
+    except (ValueError, AttributeError):
+        return None
+    if not usage or not isinstance(usage, dict):
+        return None
+    return {
+        "input": usage.get("input_tokens", 0),
+        "cache_read": usage.get("cache_read_input_tokens", 0),
+        "cache_create": usage.get("cache_creation_input_tokens", 0),
+        "output": usage.get("output_tokens", 0),
+    }
+
+
+def _decide(line: bytes) -> tuple[bool, dict[str, int] | None] | None:
+    """(True, None) for a reset, (False, usage) for usage, else None."""
+    if any(marker in line for marker in RESET_MARKERS):
+        return True, None
+    usage = _entry_usage(line)
+    return None if usage is None else (False, usage)
+
+
+def scan_back(
+    f: BinaryIO, start: int, end: int
+) -> tuple[int, dict[str, int] | None] | None:
+    """The last deciding line among the lines of ``[start, end)``.
+
+    *start* must be a line start and *end* a line end. Returns the line's
+    offset and its usage (None for a reset), or None when no line decides.
+    """
+    pos = end
+    carry = b""  # the leading partial line of the block read last
+    while pos > start:
+        size = min(BLOCK_SIZE, pos - start)
+        pos -= size
+        f.seek(pos)
+        chunk = f.read(size) + carry
+        lines = chunk.split(b"\n")
+        carry = lines.pop(0) if pos > start else b""
+        line_end = pos + len(chunk)
+        for line in reversed(lines):
+            line_start = line_end - len(line)
+            decided = _decide(line) if line.strip() else None
+            if decided is not None:
+                return line_start, decided[1]
+            line_end = line_start - 1
+    return None
+
+
+def _line_end(f: BinaryIO, before: int) -> int:
+    """Offset just past the last newline before *before*, or 0."""
+    pos = before
+    while pos > 0:
+        size = min(BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        newline = f.read(size).rfind(b"\n")
+        if newline >= 0:
+            return pos + newline + 1
+    return 0
+
+
+def _read_cursor(cursor_file: Path, st: os.stat_result, f: BinaryIO) -> dict | None:
+    """The saved cursor if it still describes a prefix of the open file."""
+    try:
+        cursor = json.loads(cursor_file.read_text(encoding="utf-8"))
+        offset = cursor["offset"]
+        if cursor["file"] != [st.st_dev, st.st_ino] or not 0 < offset <= st.st_size:
+            return None
+        f.seek(offset - 1)
+        return cursor if f.read(1) == b"\n" else None
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def _write_cursor(cursor_file: Path, cursor: dict) -> None:
+    tmp = cursor_file.with_name(f"{cursor_file.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(json.dumps(cursor), encoding="utf-8")
+        os.replace(tmp, cursor_file)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def last_usage(path: Path, cursor_file: Path | None = None) -> dict[str, int] | None:
+    """Token counts of the last usage entry after the last reset, or None.
+
+    Raises OSError when the transcript cannot be read.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        # Lines up to the last newline are complete; a line still being
+        # written is decided on its own and never saved in the cursor
+        end = _line_end(f, st.st_size)
+        saved = _read_cursor(cursor_file, st, f) if cursor_file else None
+        cursor = saved or {"offset": 0, "usage": None, "reset": None}
+        found = scan_back(f, cursor["offset"], end)
+        if found is not None:
+            offset, usage = found
+            cursor = {"usage": usage, "reset": offset if usage is None else None}
+        cursor = {**cursor, "file": [st.st_dev, st.st_ino], "offset": end}
+        if cursor_file is not None and end and cursor != saved:
+            _write_cursor(cursor_file, cursor)
+
+        f.seek(end)
+        partial = _decide(f.read()) if end < st.st_size else None
+    return cursor["usage"] if partial is None else partial[1]
@@ -0,0 +1,275 @@
+"""
+POSIX shell command lists, split without a shell (cross-platform)
+
+token_rewrite_hook wraps each eligible command of a list such as
+``uv sync && pytest -x`` on its own, so it has to know where one command
+ends and the next begins without being fooled by quotes:
+
+    from shell_lexer import split_list
+
+    for segment in split_list("cd a && git commit -m 'x; y' || true"):
+        segment.start, segment.end   # span in the original string
+        segment.text                 # "cd a", "git commit -m 'x; y'", "true"
+        segment.simple               # safe to prefix with a wrapper
+
+Commands are separated by unquoted ``&&``, ``||``, ``;``, ``&`` and
+newlines. Quotes, backslash escapes, comments, parameter expansions
+(``${X:-a && b}``) and nested command substitutions are skipped over,
+never split. A segment is *simple* when
+prefixing it with another command keeps its meaning: no pipe, redirection,
+command or process substitution, and not run in the background.
+
+split_list() returns None when the list cannot be split safely: unbalanced
+quotes or parentheses, here-documents (whose bodies span lines), ``;;``
+and subshell or brace groups. Callers then leave the command alone.
+"""
+
+# First words that open or close a group, whose commands are not split
+GROUPING = frozenset(("{", "}"))
+
+
+class Segment:
+    """One command of a list: its span, text and whether it may be wrapped."""
+
+    __slots__ = ("end", "simple", "start", "text")
+
+    def __init__(self, start: int, end: int, text: str, simple: bool) -> None:
+        self.start = start
+        self.end = end
+        self.text = text
+        self.simple = simple
+
+    def __repr__(self) -> str:
+        return f"Segment({self.start}, {self.end}, {self.text!r}, {self.simple})"
+
+
+class _Unsplittable(Exception):
+    """The command uses syntax split_list does not handle."""
+
+
+def _skip_single(s: str, i: int) -> int:
+    """Index after the single-quoted string opening at *i*."""
+    end = s.find("'", i + 1)
+    if end < 0:
+        raise _Unsplittable
+    return end + 1
+
+
+def _skip_double(s: str, i: int) -> tuple[int, bool]:
+    """Index after the double-quoted string at *i*, and whether it substitutes."""
+    i += 1
+    substitutes = False
+    while i < len(s):
+        c = s[i]
+        if c == "\\":
+            i += 2
+        elif c == '"':
+            return i + 1, substitutes
+        elif c == "`":
+            i = _skip_backtick(s, i)
+            substitutes = True
+        elif s.startswith("$(", i):
+            i = _skip_parens(s, i + 1)
+            substitutes = True
+        elif s.startswith("${", i):
+            i, inner = _skip_braces(s, i)
+            substitutes = substitutes or inner
+        else:
+            i += 1
+    raise _Unsplittable
+
+
+def _skip_braces(s: str, i: int) -> tuple[int, bool]:
+    """Index after the ``${...}`` expansion at *i*, and whether it substitutes."""
+    i += 2
+    substitutes = False
+    while i < len(s):
+        c = s[i]
+        if c == "\\":
+            i += 2
+        elif c == "'":
+            i = _skip_single(s, i)
+        elif c == '"':
+            i, inner = _skip_double(s, i)
+            substitutes = substitutes or inner
+        elif c == "`":
+            i = _skip_backtick(s, i)
+            substitutes = True
+        elif s.startswith("$(", i):
+            i = _skip_parens(s, i + 1)
+            substitutes = True
+        elif s.startswith("${", i):
+            i, inner = _skip_braces(s, i)
+            substitutes = substitutes or inner
+        elif c == "}":  # a plain { does not nest: ${A:-{x}} is "{x" and "}"
+            return i + 1, substitutes
+        else:
+            i += 1
+    raise _Unsplittable
+
+
+def _skip_backtick(s: str, i: int) -> int:
+    """Index after the backtick substitution opening at *i*."""
+    i += 1
+    while i < len(s):
+        if s[i] == "\\":
+            i += 2
+        elif s[i] == "`":
+            return i + 1
+        else:
+            i += 1
+    raise _Unsplittable
+
+
+def _skip_parens(s: str, i: int) -> int:
+    """Index after the parenthesized text opening at *i* (``$(``, ``<(``)."""
+    depth = 0
+    while i < len(s):
+        c = s[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "'":
+            i = _skip_single(s, i)
+            continue
+        if c == '"':
+            i = _skip_double(s, i)[0]
+            continue
+        if c == "`":
+            i = _skip_backtick(s, i)
+            continue
+        if s.startswith("${", i):
+            i = _skip_braces(s, i)[0]
+            continue
+        if c == "#" and (i == 0 or s[i - 1] in " \t\n("):
+            i = s.find("\n", i)
+            if i < 0:
+                raise _Unsplittable
+            continue
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise _Unsplittable
+
+
+def _skip_ansi_c(s: str, i: int) -> int:
+    """Index after the ``$'...'`` string opening at *i*."""
+    i += 2
+    while i < len(s):
+        if s[i] == "\\":
+            i += 2
+        elif s[i] == "'":
+            return i + 1
+        else:
+            i += 1
+    raise _Unsplittable
+
+
+def _split(s: str) -> list[Segment]:
+    segments: list[Segment] = []
+    start = 0  # of the current segment
+    simple = True
+    word_start = True  # the next character begins a word
+    first_word = True  # ...the segment's first word
+    continued = False  # after && || |, where a newline is only whitespace
+    i = 0
+
+    def close(end: int, wrappable: bool) -> None:
+        text = s[start:end]
+        stripped = text.strip()
+        if stripped:  # empty commands ("a;", blank lines) are skipped
+            first = start + len(text) - len(text.lstrip())
+            segments.append(Segment(first, first + len(stripped), stripped, wrappable))
+
+    while i < len(s):
+        c = s[i]
+        if c in " \t" or (c == "\n" and continued):
+            word_start = True
+            i += 1
+            continue
+        if c == "\n":
+            close(i, simple)
+            start = i = i + 1
+            simple = word_start = first_word = True
+            continue
+        continued = False
+        at_word = word_start
+        word_start = False
+        if at_word and first_word:
+            first_word = False
+            end = i
+            while end < len(s) and s[end] not in " \t\n;&|<>":
+                end += 1
+            if s[i:end] in GROUPING:
+                raise _Unsplittable
+        if c == "\\":
+            i += 2
+        elif c == "'":
+            i = _skip_single(s, i)
+        elif c == '"':
+            i, substitutes = _skip_double(s, i)
+            simple = simple and not substitutes
+        elif c == "`":
+            i = _skip_backtick(s, i)
+            simple = False
+        elif c == "#" and at_word:
+            end = s.find("\n", i)
+            i = len(s) if end < 0 else end
+        elif s.startswith("$'", i):
+            i = _skip_ansi_c(s, i)
+        elif s.startswith("${", i):
+            i, substitutes = _skip_braces(s, i)
+            simple = simple and not substitutes
+        elif s.startswith("$(", i):
+            i = _skip_parens(s, i + 1)
+            simple = False
+        elif c in "<>" and s.startswith("(", i + 1):
+            i = _skip_parens(s, i + 1)
+            simple = False
+        elif s.startswith("<<", i):
+            raise _Unsplittable
+        elif c in "<>":
+            # >file, 2>&1, >|file, <>file, >>file
+            simple = False
+            i += 2 if i + 1 < len(s) and s[i + 1] in "&|<>" else 1
+            word_start = True
+        elif s.startswith(("&&", "||"), i):
+            close(i, simple)
+            start = i = i + 2
+            simple = word_start = first_word = continued = True
+        elif s.startswith(";;", i) or c in "()":
+            raise _Unsplittable
+        elif c == ";":
+            close(i, simple)
+            start = i = i + 1
+            simple = word_start = first_word = True
+        elif s.startswith("&>", i):
+            simple = False
+            i += 2
+            word_start = True
+        elif c == "&":
+            close(i, False)  # run in the background
+            start = i = i + 1
+            simple = word_start = first_word = True
+        elif c == "|":
+            simple = False  # a pipeline is one segment
+            i += 2 if s.startswith("|&", i) else 1
+            word_start = continued = True
+        else:
+            i += 1
+    if i > len(s):
+        raise _Unsplittable  # trailing backslash
+    close(len(s), simple)
+    return segments
+
+
+def split_list(command: str) -> list[Segment] | None:
+    """The commands of a shell list in order, or None if it cannot be split."""
+    try:
+        return _split(command)
+    except _Unsplittable:
+        return None
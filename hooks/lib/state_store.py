@@ -0,0 +1,221 @@
+"""
+Transactional key/value store for .claude/state (cross-platform)
+
+Hooks that Claude Code runs in parallel share per-turn state (the delegation
+nudge counter, turn timing, the workflow continuation request). Each update
+is a read-modify-write, so it runs under an exclusive lock:
+
+    from state_store import StateStore
+
+    store = StateStore(state_dir)
+    store.incr("violations")                  # atomic, returns the new value
+    store.set("workflow_continuation", {...}, ttl=86400)
+    store.get("last_turn_duration")           # lock-free read
+    with store.transaction() as txn:          # several updates, one commit
+        txn.set("violations", 0)
+        txn.incr("delegations")
+
+Everything lives in one JSON record, state.json, replaced atomically
+(os.replace) on commit, so readers never see a partial write and need no
+lock. Writers serialize on state.lock (flock, or msvcrt.locking on Windows).
+Entries written with a ttl read as absent once it has passed and are
+dropped by the next commit.
+
+A single lock-protected file rather than SQLite: importing sqlite3 alone
+costs more than most hooks' STARTUP_BUDGET_MS.
+
+The per-turn files hooks used to keep (LEGACY_FILES) are folded into the
+record by the first commit and removed. Until then reads see their values.
+Flag and plan files the orchestrator writes with its own tools
+(delegation_active, team_mode_active, approved_execution_plan.json, ...)
+stay plain files.
+"""
+
+import json
+import os
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock(fd: int) -> None:
+        # LK_LOCK retries for about 10 seconds before raising OSError
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    def _unlock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+STATE_FILE = "state.json"
+LOCK_FILE = "state.lock"
+
+
+# Former per-turn state files, folded into the record on first commit
+LEGACY_FILES = (
+    "delegation_violations.json",
+    "turn_start_timestamp.txt",
+    "last_turn_duration.txt",
+    "turn_durations.json",
+    "workflow_continuation_needed.json",
+)
+
+
+def _legacy_values(name: str, text: str) -> dict[str, object]:
+    """Store keys for the contents of one former state file."""
+    if name == "turn_start_timestamp.txt":
+        return {"turn_start": float(text)}
+    if name == "last_turn_duration.txt":
+        return {"last_turn_duration": text.strip()}
+    data = json.loads(text)
+    if name == "workflow_continuation_needed.json":
+        return {"workflow_continuation": data}
+    if name == "turn_durations.json":
+        return {"turn_durations": list(data["durations"])}
+    keys = ("violations", "delegations", "turn_id")
+    return {key: data[key] for key in keys if key in data}
+
+
+class Transaction:
+    """Mutable view of the store inside StateStore.transaction()."""
+
+    def __init__(self, values: dict[str, object], expires: dict[str, float]) -> None:
+        self.values = values
+        self.expires = expires
+
+    def get(self, key: str, default: object = None) -> object:
+        return self.values.get(key, default)
+
+    def set(self, key: str, value: object, ttl: float | None = None) -> None:
+        """Store *value*; with *ttl* it reads as absent after that many seconds."""
+        self.values[key] = value
+        if ttl is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = time.time() + ttl
+
+    def incr(self, key: str, by: int = 1) -> int:
+        """Add *by* to an integer counter (absent or not an int counts as 0)."""
+        current = self.values.get(key)
+        if not isinstance(current, int) or isinstance(current, bool):
+            current = 0
+        self.set(key, current + by)
+        return current + by
+
+    def pop(self, key: str, default: object = None) -> object:
+        self.expires.pop(key, None)
+        return self.values.pop(key, default)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.pop(key)
+
+
+class StateStore:
+    """Key/value state of one project, shared by concurrent hook processes."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path  # the .claude/state directory
+
+    @property
+    def file(self) -> Path:
+        return self.path / STATE_FILE
+
+    def _load(self) -> tuple[dict[str, object], dict[str, float], bool]:
+        """(values, expiry times, whether the record exists), expired dropped."""
+        try:
+            data = json.loads(self.file.read_text(encoding="utf-8"))
+            values, expires = data["values"], data.get("expires", {})
+            exists = isinstance(values, dict) and isinstance(expires, dict)
+        except (OSError, ValueError, TypeError, KeyError):
+            exists = False
+        if not exists:
+            values, expires = self._legacy(), {}
+        now = time.time()
+        for key, at in list(expires.items()):
+            if not isinstance(at, int | float) or at <= now:
+                values.pop(key, None)
+                del expires[key]
+        return values, expires, exists
+
+    def _legacy(self) -> dict[str, object]:
+        """Values of the former per-turn files that exist."""
+        values: dict[str, object] = {}
+        for name in LEGACY_FILES:
+            try:
+                text = (self.path / name).read_text(encoding="utf-8")
+                values.update(_legacy_values(name, text))
+            except (OSError, ValueError, TypeError, KeyError):
+                continue
+        return values
+
+    def snapshot(self) -> dict[str, object]:
+        """All current values (lock-free)."""
+        return self._load()[0]
+
+    def get(self, key: str, default: object = None) -> object:
+        """One value (lock-free)."""
+        return self._load()[0].get(key, default)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """Read-modify-write under the store lock, committed atomically.
+
+        Nothing is written if the block raises. Raises OSError when the
+        state directory cannot be written.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _lock(fd)
+            try:
+                values, expires, exists = self._load()
+                txn = Transaction(values, expires)
+                yield txn
+                self._commit(txn)
+                if not exists:
+                    for name in LEGACY_FILES:
+                        (self.path / name).unlink(missing_ok=True)
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def _commit(self, txn: Transaction) -> None:
+        tmp = self.file.with_name(f"{STATE_FILE}.{os.getpid()}.tmp")
+        data = {"values": txn.values, "expires": txn.expires}
+        try:
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp, self.file)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def set(self, key: str, value: object, ttl: float | None = None) -> None:
+        with self.transaction() as txn:
+            txn.set(key, value, ttl)
+
+    def incr(self, key: str, by: int = 1) -> int:
+        with self.transaction() as txn:
+            return txn.incr(key, by)
+
+    def pop(self, key: str, default: object = None) -> object:
+        with self.transaction() as txn:
+            return txn.pop(key, default)
+
+    def delete(self, *keys: str) -> None:
+        with self.transaction() as txn:
+            txn.delete(*keys)
@@ -0,0 +1,275 @@
+"""
+Machine-readable test report parsing (cross-platform)
+
+compact_run's structured mode (COMPACT_RUN_STRUCTURED=1) has test runners
+write a machine-readable report and summarizes that instead of scraping
+their human-readable output:
+
+- pytest:     JUnit XML (--junitxml), read with iterparse
+- go test:    test2json events (-json), fed line by line
+- cargo test: libtest JSON events (-Z unstable-options --format json)
+
+Every parser produces a TestReport; render() turns it into the summary
+compact_run prints. Reports count every test but keep only the first
+MAX_FAILURES failures, each with at most MESSAGE_LINES lines of message.
+"""
+
+import json
+from collections import deque
+from pathlib import Path
+
+MAX_FAILURES = 20  # Failures listed in the summary
+MESSAGE_LINES = 8  # Message lines kept per failure
+MAX_LINE = 300  # Characters kept per message line
+
+
+def _clip(lines: list[str]) -> list[str]:
+    kept = [line.rstrip() for line in lines if line.strip()][:MESSAGE_LINES]
+    return [line if len(line) <= MAX_LINE else line[:MAX_LINE] + "..." for line in kept]
+
+
+class Failure:
+    """One failed (or errored) test: id, message lines and duration."""
+
+    __slots__ = ("duration", "kind", "message", "test_id")
+
+    def __init__(
+        self,
+        test_id: str,
+        message: list[str],
+        duration: float | None = None,
+        kind: str = "FAILED",
+    ) -> None:
+        self.test_id = test_id
+        self.message = _clip(message)
+        self.duration = duration
+        self.kind = kind
+
+
+class TestReport:
+    """Counts, wall time and the first MAX_FAILURES failures of a test run."""
+
+    __test__ = False  # not a pytest test class
+
+    def __init__(self) -> None:
+        self.passed = 0
+        self.failed = 0
+        self.errors = 0  # pytest setup/teardown errors
+        self.skipped = 0
+        self.duration: float | None = None
+        self.failures: list[Failure] = []
+
+    @property
+    def total(self) -> int:
+        return self.passed + self.failed + self.errors + self.skipped
+
+    @property
+    def unsuccessful(self) -> int:
+        return self.failed + self.errors
+
+    def fail(self, failure: Failure) -> None:
+        if failure.kind == "ERROR":
+            self.errors += 1
+        else:
+            self.failed += 1
+        if len(self.failures) < MAX_FAILURES:
+            self.failures.append(failure)
+
+    def add_time(self, seconds: object) -> None:
+        if isinstance(seconds, int | float):
+            self.duration = (self.duration or 0.0) + seconds
+
+
+def render(report: TestReport) -> list[str]:
+    """Summary lines: "ok → ..." when nothing failed, else each failure + counts."""
+    counts = ", ".join(
+        f"{n} {label}"
+        for n, label in (
+            (report.failed, "failed"),
+            (report.passed, "passed"),
+            (report.skipped, "skipped"),
+            (report.errors, "errors" if report.errors > 1 else "error"),
+        )
+        if n
+    )
+    took = f" in {report.duration:.2f}s" if report.duration is not None else ""
+    if not report.unsuccessful:
+        return [f"ok → {counts}{took}"]
+    lines = []
+    for failure in report.failures:
+        duration = f" ({failure.duration:.2f}s)" if failure.duration is not None else ""
+        lines.append(f"{failure.kind} {failure.test_id}{duration}")
+        lines.extend(f"  {line}" for line in failure.message)
+    if report.unsuccessful > len(report.failures):
+        more = report.unsuccessful - len(report.failures)
+        lines.append(f"[... {more} more failures]")
+    lines.append(f"{counts}{took}")
+    return lines
+
+
+# --- pytest: JUnit XML ---
+
+
+def parse_junit(path: str | Path) -> TestReport | None:
+    """Report from a JUnit XML file, or None if it is missing or malformed."""
+    import xml.etree.ElementTree as ET  # noqa: N817
+
+    report = TestReport()
+    try:
+        for _, elem in ET.iterparse(path, events=("end",)):  # noqa: S314
+            if elem.tag == "testcase":
+                _junit_case(report, elem)
+                elem.clear()
+            elif elem.tag == "testsuite":
+                report.add_time(_float(elem.get("time")))
+                elem.clear()
+    except (OSError, ET.ParseError):
+        return None
+    return report
+
+
+def _float(value: str | None) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _junit_case(report: TestReport, case: object) -> None:
+    classname = case.get("classname", "")  # type: ignore[attr-defined]
+    name = case.get("name", "")  # type: ignore[attr-defined]
+    test_id = f"{classname}::{name}" if classname else name
+    for child in case:  # type: ignore[attr-defined]
+        if child.tag in ("failure", "error"):
+            message = child.get("message") or ""
+            if not message.strip():
+                message = (child.text or "").strip().splitlines()[-1:] or [""]
+                message = message[0]
+            report.fail(
+                Failure(
+                    test_id,
+                    message.splitlines(),
+                    _float(case.get("time")),  # type: ignore[attr-defined]
+                    "FAILED" if child.tag == "failure" else "ERROR",
+                )
+            )
+            return
+        if child.tag == "skipped":
+            report.skipped += 1
+            return
+    report.passed += 1
+
+
+# --- go test -json (test2json) ---
+
+
+class GoTestEvents:
+    """test2json event stream; feed() one stdout line at a time."""
+
+    def __init__(self) -> None:
+        self.report = TestReport()
+        self._output: dict[tuple[str, str], deque[str]] = {}
+        # (package, "") and (package, test) keys with a failing test below them
+        self._failed_parents: set[tuple[str, str]] = set()
+
+    def feed(self, line: str) -> None:
+        if not line.startswith("{"):
+            return
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        action = event.get("Action")
+        key = (event.get("Package", ""), event.get("Test") or "")
+        if action == "output":
+            text = str(event.get("Output", "")).rstrip("\n")
+            if not text.lstrip().startswith(("=== ", "--- ", "PASS", "FAIL", "ok ")):
+                self._output.setdefault(key, deque(maxlen=MESSAGE_LINES)).append(
+                    text.strip()
+                )
+        elif action in ("pass", "fail", "skip"):
+            self._finish(key, action, event.get("Elapsed"))
+
+    def _finish(self, key: tuple[str, str], action: str, elapsed: object) -> None:
+        package, test = key
+        output = list(self._output.pop(key, ()))
+        report = self.report
+        if not test:
+            # Package result: wall time, or a failure no test accounts for
+            # (build error, panic in TestMain)
+            if isinstance(elapsed, int | float):
+                report.duration = max(report.duration or 0.0, elapsed)
+            if action == "fail" and (package, "") not in self._failed_parents:
+                report.fail(Failure(package, output or ["package failed"]))
+            return
+        if action == "pass":
+            report.passed += 1
+        elif action == "skip":
+            report.skipped += 1
+        else:
+            self._failed_parents.add((package, ""))
+            parent = test.rpartition("/")[0]
+            if parent:
+                self._failed_parents.add((package, parent))
+            # A parent without output of its own is covered by its subtests
+            if key not in self._failed_parents or output:
+                duration = elapsed if isinstance(elapsed, int | float) else None
+                report.fail(Failure(f"{package}::{test}", output, duration))
+
+
+def go_json_text(stdout: str) -> str:
+    """Human-readable go test output recovered from test2json events."""
+    out = []
+    for line in stdout.splitlines():
+        try:
+            event = json.loads(line) if line.startswith("{") else None
+        except ValueError:
+            event = None
+        if isinstance(event, dict):
+            if event.get("Action") == "output":
+                out.append(str(event.get("Output", "")))
+        else:
+            out.append(line + "\n")
+    return "".join(out)
+
+
+# --- cargo test: libtest JSON ---
+
+
+class LibtestEvents:
+    """libtest JSON event stream (one test binary or many); feed() per line."""
+
+    def __init__(self) -> None:
+        self.report = TestReport()
+
+    def feed(self, line: str) -> None:
+        if not line.startswith("{"):
+            return
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        kind, status = event.get("type"), event.get("event")
+        if kind == "suite" and status in ("ok", "failed"):
+            self.report.add_time(event.get("exec_time"))
+        elif kind == "test" and status == "ok":
+            self.report.passed += 1
+        elif kind == "test" and status == "ignored":
+            self.report.skipped += 1
+        elif kind == "test" and status in ("failed", "timeout"):
+            output = str(event.get("stdout", "")).split("\nstack backtrace:")[0]
+            message = [
+                line for line in output.splitlines() if not line.startswith("note: ")
+            ]
+            duration = event.get("exec_time")
+            self.report.fail(
+                Failure(
+                    str(event.get("name", "?")),
+                    message,
+                    duration if isinstance(duration, int | float) else None,
+                )
+            )
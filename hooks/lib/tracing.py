@@ -0,0 +1,245 @@
+"""
+Opt-in invocation tracing for hooks, compact_run and the statusline (cross-platform)
+
+With CLAUDE_HOOK_TRACE=1, every hook invocation, wrapped command and
+statusline render records a span for the whole invocation plus spans for its
+sub-stages (payload parse, state I/O, subprocess runs). Spans are buffered in
+memory and appended in one write when the invocation ends to
+.claude/state/trace_events.jsonl, one Chrome trace event per line. The file is
+a bounded ring: once it grows past CLAUDE_HOOK_TRACE_MAX_KB (default 2048) the
+oldest half is dropped.
+
+    from tracing import invocation, span
+
+    with invocation("compact_run", cat="compact_run", command="git"):
+        with span("subprocess", argv0="git"):
+            ...
+
+scripts/trace_export.py turns the file into trace_event JSON for Perfetto or
+chrome://tracing. When tracing is off, span() and invocation() are no-ops
+that cost an environment lookup.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+TRACE_ENV = "CLAUDE_HOOK_TRACE"
+MAX_KB_ENV = "CLAUDE_HOOK_TRACE_MAX_KB"
+DEFAULT_MAX_KB = 2048
+TRACE_FILE = "trace_events.jsonl"
+
+_events: list[dict[str, object]] = []
+_current: "_Span | None" = None
+
+
+def enabled() -> bool:
+    """True when CLAUDE_HOOK_TRACE=1 (read per call: the daemon sets env late)."""
+    return os.environ.get(TRACE_ENV) == "1"
+
+
+def state_dir() -> Path:
+    """.claude/state of the current project."""
+    return (
+        Path(os.environ.get("CLAUDE_PROJECT_DIR") or os.getcwd()) / ".claude" / "state"
+    )
+
+
+def trace_path(state: Path | None = None) -> Path:
+    """Ring-buffer file inside a state directory."""
+    return (state or state_dir()) / TRACE_FILE
+
+
+class _Span:
+    """A Chrome "complete" event ("ph": "X") timed around a with-block."""
+
+    def __init__(self, name: str, cat: str, args: dict[str, object]) -> None:
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self._ts = 0
+        self._start = 0
+
+    def __enter__(self) -> "_Span":
+        self._ts = time.time_ns() // 1000
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, tb: object) -> None:
+        if exc_type is not None and exc_type is not SystemExit:
+            self.args["error"] = getattr(exc_type, "__name__", str(exc_type))
+        pid = os.getpid()
+        _events.append(
+            {
+                "name": self.name,
+                "cat": self.cat,
+                "ph": "X",
+                "ts": self._ts,
+                "dur": (time.perf_counter_ns() - self._start) // 1000,
+                "pid": pid,
+                "tid": pid,
+                "args": self.args,
+            }
+        )
+
+
+class _Invocation(_Span):
+    """Outermost span of a process: records the exit code and flushes."""
+
+    def __init__(
+        self, name: str, cat: str, args: dict[str, object], state: Path | None
+    ) -> None:
+        super().__init__(name, cat, args)
+        self.state = state
+
+    def __enter__(self) -> "_Invocation":
+        global _current
+        _current = self
+        super().__enter__()
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, tb: object) -> None:
+        global _current
+        if exc_type is SystemExit:
+            code = getattr(exc, "code", None)
+            self.args["exit_code"] = (
+                code if isinstance(code, int) else int(code is not None)
+            )
+        super().__exit__(exc_type, exc, tb)
+        _current = None
+        flush(self.state)
+
+
+class _NoSpan:
+    """Stand-in returned while tracing is off."""
+
+    @property
+    def args(self) -> dict[str, object]:
+        return {}
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, tb: object) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, cat: str = "stage", **args: object) -> "_Span | _NoSpan":
+    """Time a sub-stage of the current invocation."""
+    if not enabled():
+        return _NO_SPAN
+    return _Span(name, cat, args)
+
+
+def invocation(
+    name: str, cat: str = "hook", state: Path | None = None, **args: object
+) -> "_Invocation | _NoSpan":
+    """Time a whole invocation and append its spans to the ring on exit.
+
+    *state* overrides the .claude/state directory the spans are written to.
+    """
+    if not enabled():
+        return _NO_SPAN
+    return _Invocation(name, cat, args, state)
+
+
+def annotate(**args: object) -> None:
+    """Attach args (e.g. tool name, exit code) to the current invocation."""
+    if _current is not None:
+        _current.args.update(args)
+
+
+def payload_args(stdin: bytes | str) -> dict[str, object]:
+    """Event and tool name of a hook payload, for invocation args."""
+    try:
+        data = json.loads(stdin or "{}")
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {
+        k: v
+        for k, v in (
+            ("event", data.get("hook_event_name")),
+            ("tool", data.get("tool_name")),
+        )
+        if isinstance(v, str) and v
+    }
+
+
+def _max_bytes() -> int:
+    try:
+        return max(1, int(os.environ.get(MAX_KB_ENV, DEFAULT_MAX_KB))) * 1024
+    except ValueError:
+        return DEFAULT_MAX_KB * 1024
+
+
+def _trim(fd: int, limit: int) -> None:
+    """Keep the newest lines that fit in half of *limit* bytes."""
+    os.lseek(fd, 0, os.SEEK_SET)
+    chunks = []
+    while chunk := os.read(fd, 1 << 20):
+        chunks.append(chunk)
+    data = b"".join(chunks)
+    tail = data[-(limit // 2) :]
+    newline = tail.find(b"\n")
+    keep = tail[newline + 1 :] if len(tail) < len(data) and newline >= 0 else tail
+    os.ftruncate(fd, 0)
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.write(fd, keep)
+
+
+def append_ring(path: Path, data: bytes, limit: int) -> None:
+    """Append *data* to a ring file, dropping its oldest half past *limit* bytes.
+
+    Writers are serialized with flock where available; best effort, never
+    raises.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+    except OSError:
+        return
+    try:
+        if sys.platform != "win32":
+            import fcntl
+
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        os.write(fd, data)
+        if os.fstat(fd).st_size > limit:
+            _trim(fd, limit)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def flush(state: Path | None = None) -> None:
+    """Append buffered spans to the ring file (best effort, never raises)."""
+    if not _events:
+        return
+    data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in _events)
+    _events.clear()
+    append_ring(trace_path(state), data.encode("utf-8"), _max_bytes())
+
+
+def read_events(path: Path) -> list[dict[str, object]]:
+    """Every event in a ring file, skipping lines cut short by a crash."""
+    events = []
+    try:
+        lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return []
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict):
+            events.append(event)
+    return events
@@ -0,0 +1,149 @@
+"""
+Turn latency history (cross-platform)
+
+The Stop hook records every turn's start, end and tool-call count in a
+ring kept in the state store (lib/state_store.py) under ``turn_history``;
+the statusline renders the durations as a sparkline with p50/p90:
+
+    from turn_history import record_turn, trend
+
+    with store.transaction() as txn:
+        record_turn(txn, start, end, tool_calls_this_turn(state_dir))
+
+    trend(store.get(HISTORY_KEY))  # "▂▃▂▅▇ p50 41s p90 2m 5s", or None
+
+Entries are compact ``[start, end, tool_calls]`` lists (epoch seconds,
+0.1 s resolution), oldest first, at most CLAUDE_TURN_HISTORY_SIZE
+(default 100) of them.
+
+Tool calls are counted by the PreToolUse dispatcher appending one byte to
+.claude/state/turn_tool_calls, which UserPromptSubmit empties when a turn
+starts. An O_APPEND write needs no lock and no JSON round trip, so the
+count costs every tool call about as much as opening a file, and parallel
+tool calls never lose a count.
+"""
+
+import os
+from pathlib import Path
+
+from state_store import Transaction
+
+HISTORY_KEY = "turn_history"
+LEGACY_KEY = "turn_durations"  # durations only, no start/end: dropped
+SIZE_ENV = "CLAUDE_TURN_HISTORY_SIZE"
+DEFAULT_SIZE = 100
+TOOL_CALLS_FILE = "turn_tool_calls"
+SPARK_WIDTH = 12
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def history_size() -> int:
+    """Ring size from CLAUDE_TURN_HISTORY_SIZE (at least 1)."""
+    try:
+        return max(1, int(os.environ.get(SIZE_ENV, DEFAULT_SIZE)))
+    except ValueError:
+        return DEFAULT_SIZE
+
+
+def count_tool_call(data: dict, state_dir: Path) -> None:
+    """Count one tool call of the current turn (PreToolUse dispatcher stage).
+
+    Best effort: an unwritable state directory loses the count, never the
+    tool call.
+    """
+    path = state_dir / TOOL_CALLS_FILE
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+    try:
+        try:
+            fd = os.open(path, flags, 0o644)
+        except FileNotFoundError:
+            state_dir.mkdir(parents=True, exist_ok=True)
+            fd = os.open(path, flags, 0o644)
+        try:
+            os.write(fd, b".")
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def reset_tool_calls(state_dir: Path) -> None:
+    """Start counting a new turn's tool calls."""
+    try:
+        (state_dir / TOOL_CALLS_FILE).write_bytes(b"")
+    except OSError:
+        pass
+
+
+def tool_calls_this_turn(state_dir: Path) -> int:
+    """Tool calls counted since the turn started."""
+    try:
+        return (state_dir / TOOL_CALLS_FILE).stat().st_size
+    except OSError:
+        return 0
+
+
+def entries(history: object) -> list[list[float]]:
+    """Well-formed ``[start, end, tool_calls]`` entries of a stored ring."""
+    if not isinstance(history, list):
+        return []
+    return [
+        entry
+        for entry in history
+        if isinstance(entry, list)
+        and len(entry) == 3
+        and all(isinstance(x, int | float) and not isinstance(x, bool) for x in entry)
+    ]
+
+
+def record_turn(txn: Transaction, start: float, end: float, tool_calls: int) -> None:
+    """Append one turn to the ring in an open state store transaction."""
+    ring = entries(txn.get(HISTORY_KEY))
+    ring.append([round(start, 1), round(end, 1), tool_calls])
+    txn.set(HISTORY_KEY, ring[-history_size() :])
+    txn.pop(LEGACY_KEY)
+
+
+def durations(history: object) -> list[float]:
+    """Turn durations in seconds, oldest first."""
+    return [end - start for start, end, _ in entries(history) if end >= start]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil, at least the first
+    return ordered[int(rank) - 1]
+
+
+def sparkline(values: list[float], width: int = SPARK_WIDTH) -> str:
+    """The last *width* values as block characters scaled to their range."""
+    values = values[-width:]
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARS[0] * len(values)
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[round((v - low) / (high - low) * top)] for v in values)
+
+
+def format_duration(seconds: float) -> str:
+    """Human-readable duration: "45s", "1m 23s", "2h 5m"."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        minutes, rest = divmod(seconds, 60)
+        return f"{minutes}m {rest}s" if rest else f"{minutes}m"
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}h {rest // 60}m" if rest >= 60 else f"{hours}h"
+
+
+def trend(history: object) -> str | None:
+    """Sparkline plus p50/p90 turn latency, or None before two turns."""
+    values = durations(history)
+    if len(values) < 2:
+        return None
+    return (
+        f"{sparkline(values)} p50 {format_duration(percentile(values, 50))}"
+        f" p90 {format_duration(percentile(values, 90))}"
+    )
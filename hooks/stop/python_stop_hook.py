@@ -3,6 +3,7 @@
 Stop Hook: Workflow Continuation + Code Quality Analysis (cross-platform)
 
 1. Checks if workflow continuation is needed (after plan mode completes via ExitPlanMode)
+   - Recorded in the shared state store (lib/state_store.py) with the turn timing
    - If so, blocks stop and injects "continue" as user message
 2. Runs code quality checks on staged Python files (informational only)
 
@@ -11,13 +12,28 @@ This Python version works on Windows, macOS, and Linux.
 
 import io
 import json
-import logging
 import os
-import subprocess
 import sys
-import tempfile
-from datetime import datetime
 from pathlib import Path
+from types import ModuleType
+
+# Shared hook helpers live in hooks/lib
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+)
+from git_meta import in_git_repo, staged_changes
+from lazy_import import DEBUG as DEBUG_LEVEL
+from lazy_import import WARNING, LazyLogger, lazy_import
+from state_store import StateStore
+from turn_history import format_duration, record_turn, tool_calls_this_turn
+
+datetime = lazy_import("datetime")
+subprocess = lazy_import("subprocess")
+tempfile = lazy_import("tempfile")
+
+STARTUP_BUDGET_MS = 40
+# `git diff --cached` result, reused until the index or HEAD changes
+STAGED_CACHE_FILE = "git_staged.json"
 
 # Force UTF-8 output on Windows (fixes emoji encoding errors)
 if sys.platform == "win32":
@@ -26,151 +42,85 @@ if sys.platform == "win32":
 
 # Setup debug logging
 DEBUG = os.environ.get("DEBUG_DELEGATION_HOOK", "0") == "1"
-if DEBUG:
-    logging.basicConfig(
-        filename=str(Path(tempfile.gettempdir()) / "delegation_hook_debug.log"),
-        level=logging.DEBUG,
-        format="%(asctime)s - python_stop_hook - %(message)s",
-    )
-else:
-    logging.basicConfig(level=logging.WARNING)
-
-logger = logging.getLogger(__name__)
-
-
-def format_duration(seconds: float) -> str:
-    """Format duration in seconds to a human-readable string.
 
-    Args:
-        seconds: Duration in seconds.
 
-    Returns:
-        Formatted string like "45s" or "1m 23s" or "2h 5m".
-    """
-    seconds = int(seconds)
-    if seconds < 60:
-        return f"{seconds}s"
-    elif seconds < 3600:
-        minutes = seconds // 60
-        remaining_seconds = seconds % 60
-        if remaining_seconds == 0:
-            return f"{minutes}m"
-        return f"{minutes}m {remaining_seconds}s"
+def _setup_logging(logging: ModuleType) -> None:
+    """Configure logging the first time a record is emitted."""
+    if DEBUG:
+        logging.basicConfig(
+            filename=str(Path(tempfile.gettempdir()) / "delegation_hook_debug.log"),
+            level=logging.DEBUG,
+            format="%(asctime)s - python_stop_hook - %(message)s",
+        )
     else:
-        hours = seconds // 3600
-        remaining_minutes = (seconds % 3600) // 60
-        if remaining_minutes == 0:
-            return f"{hours}h"
-        return f"{hours}h {remaining_minutes}m"
-
-
-def append_duration_to_history(state_dir: Path, duration_seconds: float) -> None:
-    """Append duration to history file for sparkline visualization.
+        logging.basicConfig(level=logging.WARNING)
 
-    Maintains a JSON file with the last 10 turn durations for sparkline display.
-    Uses FIFO to keep only the most recent 10 entries.
 
-    Args:
-        state_dir: Path to .claude/state directory.
-        duration_seconds: Raw duration in seconds (float).
-    """
-    history_file = state_dir / "turn_durations.json"
-    max_entries = 10
-
-    try:
-        # Load existing history
-        durations: list[float] = []
-        if history_file.exists():
-            try:
-                data = json.loads(history_file.read_text(encoding="utf-8"))
-                durations = data.get("durations", [])
-                # Ensure it's a list of numbers
-                durations = [float(d) for d in durations if isinstance(d, int | float)]
-            except (json.JSONDecodeError, ValueError):
-                durations = []
-
-        # Append new duration and keep only last N entries (FIFO)
-        durations.append(duration_seconds)
-        durations = durations[-max_entries:]
-
-        # Write updated history
-        history_file.write_text(
-            json.dumps({"durations": durations}),
-            encoding="utf-8",
-        )
-        logger.debug(f"Updated duration history: {durations}")
-
-    except OSError as e:
-        logger.debug(f"Error updating duration history: {e}")
+logger = LazyLogger(__name__, DEBUG_LEVEL if DEBUG else WARNING, _setup_logging)
 
 
-def calculate_and_record_turn_duration() -> None:
+def calculate_and_record_turn_duration(store: StateStore) -> None:
     """Calculate turn duration from start timestamp and record it.
 
-    Reads the start timestamp written by UserPromptSubmit hook,
-    calculates duration, and writes the formatted duration to a file
-    for the statusline to display. Also appends raw duration to history
-    for sparkline visualization.
+    Reads the start timestamp recorded by the UserPromptSubmit hook,
+    calculates duration, and stores the formatted duration for the
+    statusline to display. Also appends the turn's start, end and tool-call
+    count to the turn history ring for the statusline's latency sparkline.
+    All in one state store transaction.
     """
-    state_dir = (
-        Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd())) / ".claude" / "state"
-    )
-    timestamp_file = state_dir / "turn_start_timestamp.txt"
-    duration_file = state_dir / "last_turn_duration.txt"
-
-    if not timestamp_file.exists():
-        logger.debug("No turn start timestamp file found")
-        return
-
     try:
-        start_timestamp = float(timestamp_file.read_text(encoding="utf-8").strip())
-        end_timestamp = datetime.now().timestamp()
-        duration_seconds = end_timestamp - start_timestamp
-
-        if duration_seconds < 0:
-            logger.debug(f"Invalid duration: {duration_seconds}s (negative)")
-            return
-
-        formatted_duration = format_duration(duration_seconds)
-
-        # Write formatted duration for statusline to read
-        duration_file.write_text(formatted_duration, encoding="utf-8")
-        logger.debug(
-            f"Recorded turn duration: {formatted_duration} ({duration_seconds:.1f}s)"
-        )
+        with store.transaction() as txn:
+            start_timestamp = txn.get("turn_start")
+            if not isinstance(start_timestamp, int | float):
+                logger.debug("No turn start timestamp recorded")
+                return
+
+            end_timestamp = datetime.datetime.now().timestamp()
+            duration_seconds = end_timestamp - start_timestamp
+
+            if duration_seconds < 0:
+                logger.debug(f"Invalid duration: {duration_seconds}s (negative)")
+                return
+
+            formatted_duration = format_duration(duration_seconds)
+
+            # Store formatted duration for statusline to read
+            txn.set("last_turn_duration", formatted_duration)
+            logger.debug(
+                f"Recorded turn duration: {formatted_duration} "
+                f"({duration_seconds:.1f}s)"
+            )
 
-        # Append raw duration to history for sparkline visualization
-        append_duration_to_history(state_dir, duration_seconds)
+            # Append the turn to the history ring for the latency sparkline
+            tool_calls = tool_calls_this_turn(store.path)
+            record_turn(txn, start_timestamp, end_timestamp, tool_calls)
+            logger.debug(f"Recorded turn history entry ({tool_calls} tool calls)")
 
-        # Clean up timestamp file
-        timestamp_file.unlink()
+            # Clean up timestamp
+            txn.pop("turn_start")
 
-    except (ValueError, OSError) as e:
+    except OSError as e:
         logger.debug(f"Error calculating turn duration: {e}")
 
 
-def check_workflow_continuation() -> bool:
+def check_workflow_continuation(store: StateStore) -> bool:
     """Check if workflow continuation is needed and handle it.
 
     Returns True if stop should be blocked (continuation needed).
     Returns False to allow normal stop processing.
     """
     project_root = Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd()))
-    state_file = (
-        project_root / ".claude" / "state" / "workflow_continuation_needed.json"
-    )
 
-    if not state_file.exists():
-        logger.debug("No continuation state file found")
+    if store.get("workflow_continuation") is None:
+        logger.debug("No continuation requested")
         return False
 
-    logger.debug(f"Found continuation state file: {state_file}")
-
     try:
-        # Read and remove state file
-        state_data = json.loads(state_file.read_text())
-        state_file.unlink()
-        logger.debug(f"State data: {state_data}, file removed")
+        # Take the request, so only one Stop hook acts on it
+        state_data = store.pop("workflow_continuation")
+        if state_data is None:
+            return False
+        logger.debug(f"State data: {state_data}, removed from state store")
 
         # Attempt to recover the persisted execution plan so the agent has
         # the plan available even after context compaction / clear.
@@ -225,13 +175,8 @@ def check_workflow_continuation() -> bool:
         logger.debug("Output block decision with 'continue' reason")
         return True
 
-    except (json.JSONDecodeError, OSError) as e:
-        logger.debug(f"Error processing state file: {e}")
-        # Clean up corrupted file
-        try:
-            state_file.unlink()
-        except OSError:
-            pass
+    except OSError as e:
+        logger.debug(f"Error processing continuation request: {e}")
         return False
 
 
@@ -256,26 +201,20 @@ def run_command(cmd: list[str], cwd: str | None = None) -> tuple[int, str, str]:
 
 def is_git_repo() -> bool:
     """Check if we're in a git repository."""
-    returncode, _, _ = run_command(["git", "rev-parse", "--git-dir"])
-    return returncode == 0
+    return in_git_repo(Path.cwd())
 
 
-def get_staged_python_files() -> list[str]:
+def get_staged_python_files(cache_file: Path | None = None) -> list[str]:
     """Get staged Python files that are not deleted."""
-    returncode, stdout, _ = run_command(["git", "diff", "--cached", "--name-status"])
-    if returncode != 0:
+    changes = staged_changes(Path.cwd(), cache_file)
+    if changes is None:
         return []
 
     files = []
-    for line in stdout.strip().split("\n"):
-        if not line:
-            continue
-        parts = line.split("\t")
-        if len(parts) >= 2:
-            status, file_path = parts[0], parts[-1]
-            if status in ("A", "M") and file_path.endswith(".py"):
-                if Path(file_path).exists():
-                    files.append(file_path)
+    for status, file_path in changes:
+        if status in ("A", "M") and file_path.endswith(".py"):
+            if Path(file_path).exists():
+                files.append(file_path)
     return files
 
 
@@ -327,12 +266,15 @@ def print_header(title: str) -> None:
 
 def main() -> int:
     """Main entry point."""
+    project_dir = Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd()))
+    store = StateStore(project_dir / ".claude" / "state")
+
     # Calculate and record turn duration for statusline
-    calculate_and_record_turn_duration()
+    calculate_and_record_turn_duration(store)
 
     # Check if workflow continuation is needed first
     # If so, block stop and inject "continue" - skip quality analysis
-    if check_workflow_continuation():
+    if check_workflow_continuation(store):
         return 0
 
     print_header("🚀 Claude Code Enhanced Quality Analysis")
@@ -344,7 +286,7 @@ def main() -> int:
         return 0
 
     # Get staged Python files
-    staged_files = get_staged_python_files()
+    staged_files = get_staged_python_files(store.path / STAGED_CACHE_FILE)
 
     if not staged_files:
         print("ℹ️  No staged Python files to analyze")  # noqa: T201
@@ -394,11 +336,11 @@ def main() -> int:
     # Generate report file
     report_file = (
         Path(tempfile.gettempdir())
-        / f"claude_quality_report_{datetime.now():%Y%m%d_%H%M%S}.md"
+        / f"claude_quality_report_{datetime.datetime.now():%Y%m%d_%H%M%S}.md"
     )
     try:
         report_content = f"""# Claude Code Quality Report
-Date: {datetime.now():%Y-%m-%d %H:%M:%S}
+Date: {datetime.datetime.now():%Y-%m-%d %H:%M:%S}
 Files analyzed: {len(staged_files)}
 Quality Score: {score}%
 
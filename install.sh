@@ -577,6 +577,42 @@ generate_settings_json() {
     fi
 }
 
+# Build the materialized hook runtime (pinned interpreter + precompiled
+# bytecode) and point settings.json hook/statusline commands at it.
+# Best effort: commands fall back to `uv run --script` when the runtime is
+# missing, so a failed build never breaks the installation.
+build_hook_runtime() {
+    local claude_dir=$1
+    local builder="$claude_dir/scripts/build_runtime.py"
+
+    print_info "Building hook runtime..."
+
+    if [[ "$OSTYPE" == msys* || "$OSTYPE" == cygwin* ]]; then
+        print_info "Skipping hook runtime on Windows (hooks use uv run)"
+        return 0
+    fi
+
+    local -a runner
+    if command -v uv &>/dev/null; then
+        runner=(uv run --no-project --script)
+    elif python3 -c 'import sys; sys.exit(sys.version_info < (3, 12))' 2>/dev/null; then
+        runner=(python3)
+    else
+        print_warning "Neither uv nor Python >= 3.12 found - hooks will use uv run"
+        return 0
+    fi
+
+    # Only the installed copies: the builder never touches files it is not given
+    if "${runner[@]}" "$builder" --root "$claude_dir" \
+        --settings "$claude_dir/settings.json" \
+        --settings "$claude_dir/hooks/plugin-hooks.json"; then
+        print_success "Built hook runtime: $claude_dir/runtime"
+    else
+        print_warning "Hook runtime build failed - hooks will use uv run"
+    fi
+    return 0
+}
+
 # Main installation function
 main() {
     # Parse arguments
@@ -671,6 +707,10 @@ main() {
     fi
     echo
 
+    # Build hook runtime (needs copied scripts and generated settings.json)
+    build_hook_runtime "$claude_dir"
+    echo
+
     # Print success summary with dual-mode info
     print_completion_banner "$claude_dir" "$installation_scope"
 
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Build the materialized hook runtime (cross-platform build, POSIX rewrite)
+
+`uv run --no-project --script` parses the inline script metadata and checks a
+cached environment on every hook call and every statusline render. This script
+does that work once, at install time:
+
+1. Creates a pinned interpreter environment at <root>/runtime (uv venv when uv
+   is available, otherwise `python -m venv` from a >=3.12 interpreter).
+2. Precompiles every hook and script under <root> to bytecode with that
+   interpreter.
+3. Rewrites every `uv run --no-project --script <script> [args]` command in
+   the given settings/hook JSON files to call the runtime directly with
+   `-I -S`, falling back to the original uv command when the runtime is
+   missing:
+
+       [ -x "<root>/runtime/bin/python" ] && exec "<root>/runtime/bin/python" -I -S <script> [args] || exec uv run --no-project --script <script> [args]
+
+The runtime path is derived from each command's own script path, so
+${CLAUDE_PLUGIN_ROOT}, ./.claude and $HOME/.claude prefixes all keep working.
+Rewriting is idempotent. Hooks and scripts use only the standard library,
+which is why -S (no site-packages) is safe.
+
+Command rewriting is skipped on Windows, where hook commands do not run
+through a POSIX shell; uv run stays in place there.
+
+Usage:
+    build_runtime.py [--root DIR] [--settings FILE ...] [--bench [N]]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+RUNTIME_DIR = "runtime"
+RUNTIME_INFO = "runtime.json"
+MIN_PYTHON = (3, 12)
+ISOLATION_FLAGS = "-I -S"
+UV_SCRIPT_PREFIX = "uv run --no-project --script "
+BUILD_TIMEOUT = 300
+BENCH_TIMEOUT = 30
+
+# <script> is the first word after the uv prefix: "quoted path" or bare path
+_UV_COMMAND = re.compile(
+    r"^uv run --no-project --script (?P<script>\"[^\"]+\"|\S+)(?P<args>.*)$"
+)
+# Installation prefix of a script path: everything before /hooks/ or /scripts/
+_SCRIPT_ROOT = re.compile(r"^(?P<prefix>.*?)/(?:hooks|scripts)/")
+
+
+def default_root() -> Path:
+    """Plugin/installation directory containing hooks/ and scripts/."""
+    return Path(__file__).resolve().parent.parent
+
+
+def runtime_python(runtime: Path) -> Path:
+    """Interpreter inside a runtime environment."""
+    if sys.platform == "win32":
+        return runtime / "Scripts" / "python.exe"
+    return runtime / "bin" / "python"
+
+
+def create_environment(runtime: Path) -> Path:
+    """Create (or recreate) the runtime environment and return its python."""
+    if runtime.exists():
+        shutil.rmtree(runtime)
+
+    uv = shutil.which("uv")
+    if uv:
+        cmd = [uv, "venv", "--quiet", "--python", ">={}.{}".format(*MIN_PYTHON)]
+        cmd.append(str(runtime))
+    elif sys.version_info >= MIN_PYTHON:
+        cmd = [sys.executable, "-m", "venv", "--without-pip", str(runtime)]
+    else:
+        msg = "need uv or Python >= {}.{} to build the runtime".format(*MIN_PYTHON)
+        raise RuntimeError(msg)
+
+    subprocess.run(cmd, check=True, timeout=BUILD_TIMEOUT)  # noqa: S603
+    python = runtime_python(runtime)
+    if not python.exists():
+        msg = f"runtime interpreter missing after build: {python}"
+        raise RuntimeError(msg)
+    return python
+
+
+def compile_sources(python: Path, root: Path) -> None:
+    """Precompile hooks and scripts to bytecode with the runtime interpreter."""
+    targets = [str(root / d) for d in ("hooks", "scripts") if (root / d).is_dir()]
+    if not targets:
+        return
+    subprocess.run(  # noqa: S603
+        [str(python), "-m", "compileall", "-q", "-j", "0", *targets],
+        check=True,
+        timeout=BUILD_TIMEOUT,
+    )
+
+
+def write_runtime_info(python: Path, runtime: Path) -> dict[str, str]:
+    """Record what was built, for diagnostics."""
+    version = subprocess.run(  # noqa: S603
+        [str(python), "-I", "-S", "-c", "import sys; print(sys.version.split()[0])"],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=BENCH_TIMEOUT,
+    ).stdout.strip()
+    info = {
+        "python": str(python),
+        "version": version,
+        "built_at": datetime.now(UTC).isoformat(timespec="seconds"),
+    }
+    (runtime / RUNTIME_INFO).write_text(json.dumps(info, indent=2) + "\n")
+    return info
+
+
+def rewrite_command(command: str) -> str:
+    """Rewrite one `uv run --script` command to prefer the runtime.
+
+    Returns the command unchanged if it is not a uv script command or its
+    installation prefix cannot be determined.
+    """
+    match = _UV_COMMAND.match(command)
+    if not match:
+        return command
+    script = match.group("script")
+    root = _SCRIPT_ROOT.match(script.strip('"'))
+    if not root:
+        return command
+    python = f'"{root.group("prefix")}/{RUNTIME_DIR}/bin/python"'
+    rest = f"{script}{match.group('args')}"
+    return (
+        f"[ -x {python} ] && exec {python} {ISOLATION_FLAGS} {rest} "
+        f"|| exec {UV_SCRIPT_PREFIX}{rest}"
+    )
+
+
+def rewrite_commands(node: object) -> int:
+    """Rewrite every "command" string in a settings/hooks JSON tree in place."""
+    changed = 0
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "command" and isinstance(value, str):
+                new = rewrite_command(value)
+                if new != value:
+                    node[key] = new
+                    changed += 1
+            else:
+                changed += rewrite_commands(value)
+    elif isinstance(node, list):
+        for item in node:
+            changed += rewrite_commands(item)
+    return changed
+
+
+def rewrite_settings_file(path: Path) -> int:
+    """Rewrite commands in a JSON file. Returns the number changed."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    changed = rewrite_commands(data)
+    if changed:
+        path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+    return changed
+
+
+# ---------------------------------------------------------------------------
+# Cold-start benchmark
+# ---------------------------------------------------------------------------
+
+
+def _bench_targets(root: Path) -> list[Path]:
+    """Every hook script, the hook client and the statusline."""
+    targets = sorted(
+        p for p in (root / "hooks").glob("*/*.py") if p.parent.name != "lib"
+    )
+    targets += [p for p in (root / "hooks" / "hook_client.py",) if p.exists()]
+    targets += [p for p in (root / "scripts" / "statusline.py",) if p.exists()]
+    return targets
+
+
+def _time_runs(cmd: list[str], env: dict[str, str], cwd: Path, runs: int) -> float:
+    """Median wall-clock milliseconds for *runs* cold starts of *cmd*."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(  # noqa: S603
+            cmd,
+            input=b"{}",
+            capture_output=True,
+            env=env,
+            cwd=cwd,
+            timeout=BENCH_TIMEOUT,
+            check=False,
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench(root: Path, python: Path, runs: int) -> list[dict[str, object]]:
+    """Measure cold start of each hook via uv run vs the runtime.
+
+    Every hook gets an empty ``{}`` payload in a throwaway project directory
+    with the hook daemon disabled, so each run is a true cold start.
+    """
+    uv = shutil.which("uv")
+    results: list[dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as project:
+        env = os.environ.copy()
+        env.update(
+            {
+                "CLAUDE_PROJECT_DIR": project,
+                "CLAUDE_PLUGIN_ROOT": str(root),
+                "CLAUDE_HOOK_DAEMON": "0",
+            }
+        )
+        for script in _bench_targets(root):
+            row: dict[str, object] = {"script": str(script.relative_to(root))}
+            if uv:
+                uv_cmd = [uv, "run", "--no-project", "--script", str(script)]
+                row["uv_ms"] = round(_time_runs(uv_cmd, env, Path(project), runs), 1)
+            rt_cmd = [str(python), "-I", "-S", str(script)]
+            row["runtime_ms"] = round(_time_runs(rt_cmd, env, Path(project), runs), 1)
+            results.append(row)
+    return results
+
+
+def format_bench(results: list[dict[str, object]], runs: int) -> str:
+    """Markdown table of benchmark results."""
+    lines = [
+        f"Median cold start over {runs} runs (ms)",
+        "",
+        "| Script | uv run --script | runtime -I -S | Saved |",
+        "|--------|-----------------|---------------|-------|",
+    ]
+    for row in results:
+        uv_ms = row.get("uv_ms")
+        rt_ms = float(row["runtime_ms"])  # type: ignore[arg-type]
+        saved = f"{float(uv_ms) - rt_ms:.1f}" if uv_ms is not None else "n/a"  # type: ignore[arg-type]
+        uv_col = f"{uv_ms}" if uv_ms is not None else "n/a (uv not found)"
+        lines.append(f"| `{row['script']}` | {uv_col} | {rt_ms} | {saved} |")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=default_root(),
+        help="directory containing hooks/ and scripts/ (default: this checkout)",
+    )
+    parser.add_argument(
+        "--settings",
+        type=Path,
+        action="append",
+        default=[],
+        help="settings.json / plugin-hooks.json whose commands to rewrite (repeatable)",
+    )
+    parser.add_argument(
+        "--bench",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="after building, time N cold starts per hook (default 10)",
+    )
+    args = parser.parse_args()
+
+    root = args.root.resolve()
+    runtime = root / RUNTIME_DIR
+
+    try:
+        python = create_environment(runtime)
+        compile_sources(python, root)
+        info = write_runtime_info(python, runtime)
+    except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+        print(f"Runtime build failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Built hook runtime: {runtime} (Python {info['version']})")
+
+    for settings in args.settings:
+        if sys.platform == "win32":
+            print(f"Skipping {settings}: command rewrite requires a POSIX shell")
+            continue
+        try:
+            changed = rewrite_settings_file(settings)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Cannot rewrite {settings}: {e}", file=sys.stderr)
+            return 1
+        print(f"Rewrote {changed} command(s) in {settings}")
+
+    if args.bench:
+        print()
+        print(format_bench(bench(root, python, args.bench), args.bench))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Summarize compact_run compression savings (cross-platform)
+
+Reads the records compact_run appends for every wrapped command
+(.claude/state/compact_run_stats.jsonl, see hooks/lib/compression_stats.py)
+and prints two tables: savings per command family, largest first, and per
+day. Raw and shown sizes are bytes; tokens saved are estimated as one per 4
+bytes not shown. "shown %" is the share of the raw output that reached the
+context.
+
+Usage:
+    compression_report.py [--project-dir DIR | --input FILE] [--days N] [--json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+# Shared hook helpers live in hooks/lib
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "hooks" / "lib"))
+from compression_stats import STATS_FILE
+from tracing import read_events
+
+OTHER = "(other)"  # commands without a family: truncation only
+
+TOTALS = ("runs", "failed", "cached", "timeouts", "raw", "shown", "saved", "ms")
+FAMILY_COLUMNS = (
+    "family",
+    "runs",
+    "failed",
+    "cached",
+    "timeouts",
+    "raw",
+    "shown",
+    "shown %",
+    "tokens saved",
+    "avg ms",
+)
+DAY_COLUMNS = ("day", "runs", "raw", "shown", "shown %", "tokens saved")
+
+
+def _int(record: dict[str, object], name: str) -> int:
+    value = record.get(name)
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def _number(record: dict[str, object], name: str) -> float:
+    value = record.get(name)
+    return value if isinstance(value, int | float) else 0
+
+
+def aggregate(
+    records: list[dict[str, object]], key: Callable[[dict[str, object]], str]
+) -> dict[str, dict[str, float]]:
+    """Totals per *key*: runs, failures, cache hits, timeouts, bytes, tokens, time."""
+    groups: dict[str, dict[str, float]] = {}
+    for record in records:
+        group = groups.setdefault(key(record), dict.fromkeys(TOTALS, 0))
+        group["runs"] += 1
+        group["failed"] += _int(record, "exit_code") != 0
+        group["cached"] += record.get("cached") is True
+        group["timeouts"] += record.get("timed_out") is True
+        group["raw"] += _int(record, "raw_stdout") + _int(record, "raw_stderr")
+        group["shown"] += _int(record, "emitted")
+        group["saved"] += _int(record, "saved_tokens")
+        group["ms"] += _number(record, "wall_ms")
+    return groups
+
+
+def family_of(record: dict[str, object]) -> str:
+    family = record.get("family")
+    return family if isinstance(family, str) else OTHER
+
+
+def day_of(record: dict[str, object]) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(_number(record, "ts")))
+
+
+def _size(n: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if n < 1024 or unit == "MiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return ""
+
+
+def _share(group: dict[str, float]) -> str:
+    return f"{100 * group['shown'] / group['raw']:.1f}%" if group["raw"] else "-"
+
+
+def table(columns: tuple[str, ...], rows: list[tuple[object, ...]]) -> str:
+    """Plain-text table, first column left-aligned, the rest right-aligned."""
+    cells = [columns, *[tuple(str(c) for c in row) for row in rows]]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(columns))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths, strict=True))
+        ).rstrip()
+        for row in cells
+    )
+
+
+def report(records: list[dict[str, object]]) -> str:
+    """Per-family and per-day savings tables."""
+    families = aggregate(records, family_of)
+    days = aggregate(records, day_of)
+    family_rows = [
+        (
+            name,
+            int(g["runs"]),
+            int(g["failed"]),
+            int(g["cached"]),
+            int(g["timeouts"]),
+            _size(g["raw"]),
+            _size(g["shown"]),
+            _share(g),
+            f"{int(g['saved']):,}",
+            f"{g['ms'] / g['runs']:.0f}",
+        )
+        for name, g in sorted(families.items(), key=lambda item: -item[1]["saved"])
+    ]
+    day_rows = [
+        (
+            day,
+            int(g["runs"]),
+            _size(g["raw"]),
+            _size(g["shown"]),
+            _share(g),
+            f"{int(g['saved']):,}",
+        )
+        for day, g in sorted(days.items())
+    ]
+    saved = sum(int(g["saved"]) for g in families.values())
+    return (
+        f"{len(records)} wrapped commands, ~{saved:,} tokens saved\n\n"
+        f"Per family\n{table(FAMILY_COLUMNS, family_rows)}\n\n"
+        f"Per day\n{table(DAY_COLUMNS, day_rows)}"
+    )
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--project-dir",
+        type=Path,
+        default=Path.cwd(),
+        help="project whose .claude/state records to read (default: cwd)",
+    )
+    source.add_argument("--input", type=Path, help="stats file to read")
+    parser.add_argument(
+        "--days", type=float, metavar="N", help="only records from the last N days"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the aggregates as JSON"
+    )
+    args = parser.parse_args()
+
+    path = args.input or args.project_dir / ".claude" / "state" / STATS_FILE
+    records = read_events(path)
+    if args.days is not None:
+        since = time.time() - args.days * 86400
+        records = [r for r in records if _number(r, "ts") >= since]
+    if not records:
+        print(f"No compact_run records in {path}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        document = {
+            "families": aggregate(records, family_of),
+            "days": aggregate(records, day_of),
+        }
+        print(json.dumps(document, indent=2))
+    else:
+        print(report(records))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Hook startup import profiler (cross-platform)
+
+Runs every hook script under `python -X importtime` with a representative
+payload for its event, and compact_run.py wrapping a no-op command, and reports, per hook, the import time the hook adds
+on top of a bare interpreter start, plus the modules that cost the most.
+
+Each hook declares a module-level STARTUP_BUDGET_MS. With --check the script
+exits 1 when any hook's import time exceeds its budget, so regressions show
+up ranked by module instead of as a vague "hooks feel slow".
+
+Hooks run with the daemon disabled, in a throwaway project directory, with
+the same -I -S flags the materialized runtime uses (see build_runtime.py).
+
+Usage:
+    hook_startup_profile.py [--python PATH] [--runs N] [--top N] [--json] [--check]
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ISOLATION_FLAGS = ["-I", "-S"]
+RUN_TIMEOUT = 30
+BUDGET_NAME = "STARTUP_BUDGET_MS"
+
+# Representative stdin per hook event directory; anything else gets {}
+PAYLOADS: dict[str, dict[str, object]] = {
+    "PreToolUse": {
+        "tool_name": "Bash",
+        "tool_input": {"command": "git push origin main"},
+    },
+    "PostToolUse": {
+        "tool_name": "Edit",
+        "tool_input": {"file_path": "notes.md"},
+        "tool_response": {},
+    },
+    "UserPromptSubmit": {"prompt": "Summarize the open issues"},
+    "SessionStart": {"source": "startup"},
+}
+
+# Scripts in hooks/ that hooks put in front of commands: they start once per
+# wrapped command, so they are profiled (and budgeted) like hooks
+WRAPPERS = ("compact_run.py",)
+
+
+def default_root() -> Path:
+    """Plugin/installation directory containing hooks/."""
+    return Path(__file__).resolve().parent.parent
+
+
+def default_python(root: Path) -> Path:
+    """The materialized runtime if it was built, else this interpreter."""
+    runtime = root / "runtime" / "bin" / "python"
+    return runtime if runtime.exists() else Path(sys.executable)
+
+
+def hook_scripts(root: Path) -> list[Path]:
+    """Every hook entry script (hooks/<Event>/<script>.py, not hooks/lib) and wrapper."""
+    hooks = sorted(p for p in (root / "hooks").glob("*/*.py") if p.parent.name != "lib")
+    wrappers = [root / "hooks" / name for name in WRAPPERS]
+    return hooks + [p for p in wrappers if p.is_file()]
+
+
+def script_args(script: Path, python: Path) -> list[str]:
+    """Arguments a script is profiled with: a wrapper runs ``python -c pass``."""
+    if script.parent.name == "hooks" and script.name in WRAPPERS:
+        return [str(script), str(python), *ISOLATION_FLAGS, "-c", "pass"]
+    return [str(script)]
+
+
+def read_budget(script: Path) -> float | None:
+    """STARTUP_BUDGET_MS declared at module level, read without importing."""
+    try:
+        tree = ast.parse(script.read_bytes())
+    except (OSError, SyntaxError, ValueError):
+        return None
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and any(
+                isinstance(t, ast.Name) and t.id == BUDGET_NAME for t in node.targets
+            )
+            and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, (int, float))
+        ):
+            return float(node.value.value)
+    return None
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Parse `-X importtime` output into {module: (self_us, cumulative_us)}.
+
+    Lines look like ``import time:       112 |        340 |   encodings``;
+    nesting is shown by indentation of the module name and is ignored here.
+    A module imported twice keeps its first entry.
+    """
+    modules: dict[str, tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        modules.setdefault(parts[2].strip(), (self_us, cumulative_us))
+    return modules
+
+
+def run_importtime(
+    python: Path, args: list[str], stdin: bytes, env: dict[str, str], cwd: Path
+) -> dict[str, tuple[int, int]]:
+    """Run one interpreter with -X importtime and return its parsed imports."""
+    result = subprocess.run(  # noqa: S603
+        [str(python), *ISOLATION_FLAGS, "-X", "importtime", *args],
+        input=stdin,
+        capture_output=True,
+        env=env,
+        cwd=cwd,
+        timeout=RUN_TIMEOUT,
+        check=False,
+    )
+    return parse_importtime(result.stderr.decode("utf-8", "replace"))
+
+
+def profile_hook(
+    python: Path,
+    script: Path,
+    baseline: set[str],
+    env: dict[str, str],
+    cwd: Path,
+    runs: int,
+) -> dict[str, object]:
+    """Median hook-attributable import time and per-module costs for a hook."""
+    payload = json.dumps(PAYLOADS.get(script.parent.name, {})).encode()
+    totals: list[float] = []
+    per_module: dict[str, list[int]] = {}
+    for _ in range(runs):
+        modules = {
+            name: times
+            for name, times in run_importtime(
+                python, script_args(script, python), payload, env, cwd
+            ).items()
+            if name not in baseline
+        }
+        totals.append(sum(self_us for self_us, _ in modules.values()) / 1000)
+        for name, (_, cumulative_us) in modules.items():
+            per_module.setdefault(name, []).append(cumulative_us)
+    ranked = sorted(
+        ((name, statistics.median(us) / 1000) for name, us in per_module.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return {
+        "import_ms": round(statistics.median(totals), 1),
+        "modules": [{"module": m, "cumulative_ms": round(ms, 1)} for m, ms in ranked],
+    }
+
+
+def profile(root: Path, python: Path, runs: int, top: int) -> list[dict[str, object]]:
+    """Profile every hook. Rows are sorted by import time, worst first."""
+    rows: list[dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as project:
+        cwd = Path(project)
+        env = os.environ.copy()
+        env.update(
+            {
+                "CLAUDE_PROJECT_DIR": project,
+                "CLAUDE_PLUGIN_ROOT": str(root),
+                "CLAUDE_HOOK_DAEMON": "0",
+            }
+        )
+        baseline = set(run_importtime(python, ["-c", "pass"], b"", env, cwd))
+        for script in hook_scripts(root):
+            result = profile_hook(python, script, baseline, env, cwd, runs)
+            budget = read_budget(script)
+            rows.append(
+                {
+                    "script": str(script.relative_to(root)),
+                    "import_ms": result["import_ms"],
+                    "budget_ms": budget,
+                    "over_budget": budget is not None
+                    and float(result["import_ms"]) > budget,  # type: ignore[arg-type]
+                    "modules": result["modules"][:top],  # type: ignore[index]
+                }
+            )
+    rows.sort(key=lambda row: float(row["import_ms"]), reverse=True)  # type: ignore[arg-type]
+    return rows
+
+
+def format_report(rows: list[dict[str, object]], python: Path, runs: int) -> str:
+    """Human-readable ranking of hooks and their most expensive imports."""
+    lines = [f"Hook import time over a bare `{python} -I -S` (median of {runs})", ""]
+    for row in rows:
+        budget = row["budget_ms"]
+        if budget is None:
+            status = "no budget"
+        elif row["over_budget"]:
+            status = f"OVER budget {budget:g} ms"
+        else:
+            status = f"budget {budget:g} ms"
+        lines.append(f"{row['import_ms']:>7} ms  {row['script']}  ({status})")
+        for module in row["modules"]:  # type: ignore[attr-defined]
+            lines.append(f"{module['cumulative_ms']:>17} ms  {module['module']}")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=default_root(),
+        help="directory containing hooks/ (default: this checkout)",
+    )
+    parser.add_argument(
+        "--python",
+        type=Path,
+        help="interpreter to profile with (default: <root>/runtime, else this one)",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="runs per hook (default 5)")
+    parser.add_argument(
+        "--top", type=int, default=5, help="modules listed per hook (default 5)"
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON rows")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit 1 if any hook exceeds its STARTUP_BUDGET_MS or declares none",
+    )
+    args = parser.parse_args()
+
+    root = args.root.resolve()
+    python = args.python or default_python(root)
+    rows = profile(root, python, max(1, args.runs), args.top)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(format_report(rows, python, args.runs))
+
+    if args.check:
+        failing = [r for r in rows if r["over_budget"] or r["budget_ms"] is None]
+        for row in failing:
+            print(
+                f"{row['script']}: {row['import_ms']} ms "
+                f"(budget: {row['budget_ms'] or 'none'})",
+                file=sys.stderr,
+            )
+        return 1 if failing else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,6 +17,16 @@ import tempfile
 from datetime import datetime
 from pathlib import Path
 
+# Tracing and state helpers are shared with the hooks (hooks/lib)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "hooks" / "lib"))
+import tracing
+from git_meta import current_branch
+from segments import Segments
+from session_index import locate
+from session_tail import last_usage
+from state_store import StateStore
+from turn_history import HISTORY_KEY, trend
+
 # Force UTF-8 output on Windows (fixes emoji encoding errors)
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
@@ -24,6 +34,25 @@ if sys.platform == "win32":
 
 # Configuration - use system temp directory securely
 DEBUG_LOG = Path(tempfile.gettempdir()) / "statusline_debug.log"
+SESSION_INDEX = Path(tempfile.gettempdir()) / "statusline_session_index.json"
+SEGMENT_CACHE = Path(tempfile.gettempdir()) / "statusline_segments.json"
+
+# Segments are computed concurrently; the status bar is written when all
+# are done or the render deadline passes, whichever comes first. A segment
+# that misses it shows its last value marked stale, and may keep running
+# until its own timeout to refresh that value for the next render.
+RENDER_DEADLINE_ENV = "STATUSLINE_DEADLINE_MS"
+DEFAULT_RENDER_DEADLINE_MS = 250
+SEGMENT_TIMEOUTS = {
+    "claude version": 5.0,  # the `claude --version` timeout
+    "context usage": 1.0,
+    "git branch": 1.0,
+    "turn duration": 1.0,
+    "turn trend": 1.0,
+}
+# Row 2 shows the turn latency sparkline and p50/p90 from this width on
+TREND_MIN_WIDTH = 120
+STALE = "~"
 
 
 def debug_log(message: str) -> None:
@@ -109,17 +138,23 @@ def find_session_file(session_id: str, current_dir: str) -> Path | None:
         debug_log(f"Found session file (alt project): {alt_project_file}")
         return alt_project_file
 
-    # Method 4: Fallback - recursive search
-    claude_dir = home / ".claude"
-    if claude_dir.exists():
-        for jsonl_file in claude_dir.rglob(f"{session_id}.jsonl"):
-            debug_log(f"Found session file (recursive): {jsonl_file}")
-            return jsonl_file
+    # Method 4: Fallback - session index over every project directory
+    with tracing.span("locate session", cat="state"):
+        indexed = locate(session_id, home / ".claude" / "projects", SESSION_INDEX)
+    if indexed:
+        debug_log(f"Found session file (index): {indexed}")
+        return indexed
 
     debug_log(f"No session file found for {session_id}")
     return None
 
 
+def session_cursor_file(session_file: Path) -> Path:
+    """Temp file holding the incremental read cursor for *session_file*."""
+    name = "".join(c if c.isalnum() or c in "-_" else "_" for c in session_file.stem)
+    return Path(tempfile.gettempdir()) / f"statusline_cursor_{name}.json"
+
+
 def calculate_context_usage(input_data: dict) -> tuple[str | None, float]:
     """Calculate actual context usage from session file.
 
@@ -176,58 +211,25 @@ def calculate_context_usage(input_data: dict) -> tuple[str | None, float]:
     debug_log(f"Processing session file: {session_file}")
 
     try:
-        # Read session file and find token usage
-        last_reset_line = 0
-        lines = []
-
-        with open(session_file, "r", encoding="utf-8") as f:
-            for i, line in enumerate(f, 1):
-                lines.append(line)
-                # Check for context reset
-                if '"/clear"' in line or '"/compact"' in line:
-                    last_reset_line = i
-
-        debug_log(f"Total lines: {len(lines)}, Last reset at: {last_reset_line}")
-
-        # Get token entries after reset
-        token_entries = []
-        for line in lines[last_reset_line:]:
-            try:
-                entry = json.loads(line)
-                usage = entry.get("message", {}).get("usage", {})
-                if usage:
-                    token_entries.append(
-                        {
-                            "input": usage.get("input_tokens", 0),
-                            "cache_read": usage.get("cache_read_input_tokens", 0),
-                            "cache_create": usage.get("cache_creation_input_tokens", 0),
-                            "output": usage.get("output_tokens", 0),
-                        }
-                    )
-            except json.JSONDecodeError:
-                continue
-
-        debug_log(f"Token entries found: {len(token_entries)}")
-
-        if token_entries:
-            last_entry = token_entries[-1]
-            total_input = (
-                last_entry["input"]
-                + last_entry["cache_read"]
-                + last_entry["cache_create"]
-            )
-
-            debug_log(
-                f"Last entry tokens - Input: {last_entry['input']}, Cache Read: {last_entry['cache_read']}, Cache Create: {last_entry['cache_create']}, Total: {total_input}"
-            )
-
-            if total_input > 0:
-                usage_rate = total_input * 100 / max_context
-                progress_bar = create_progress_bar(usage_rate, total_input, max_context)
-                return f"🧠 {progress_bar}", usage_rate
-
+        with tracing.span("read session tail", cat="state"):
+            last_entry = last_usage(session_file, session_cursor_file(session_file))
     except OSError as e:
         debug_log(f"Error reading session file: {e}")
+        return None, 0.0
+
+    if last_entry:
+        total_input = (
+            last_entry["input"] + last_entry["cache_read"] + last_entry["cache_create"]
+        )
+
+        debug_log(
+            f"Last entry tokens - Input: {last_entry['input']}, Cache Read: {last_entry['cache_read']}, Cache Create: {last_entry['cache_create']}, Total: {total_input}"
+        )
+
+        if total_input > 0:
+            usage_rate = total_input * 100 / max_context
+            progress_bar = create_progress_bar(usage_rate, total_input, max_context)
+            return f"🧠 {progress_bar}", usage_rate
 
     return None, 0.0
 
@@ -291,19 +293,7 @@ def get_terminal_width() -> int:
 
 def get_git_branch(cwd: str | None = None) -> str:
     """Get the current git branch (raw name, no emoji)."""
-    try:
-        result = subprocess.run(
-            ["git", "branch", "--show-current"],  # noqa: S607, S603
-            capture_output=True,
-            text=True,
-            timeout=5,
-            cwd=cwd,
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
-    except (subprocess.TimeoutExpired, FileNotFoundError, OSError, TypeError):
-        pass
-    return "no-git"
+    return current_branch(cwd or os.getcwd()) or "no-git"
 
 
 def get_claude_version_cached() -> str:
@@ -348,8 +338,8 @@ def get_claude_version_cached() -> str:
 def get_turn_duration() -> str | None:
     """Get the duration of the last completed turn.
 
-    Reads from the state file written by the stop hook which calculates
-    duration from UserPromptSubmit to Stop events.
+    Reads from the state store, where the stop hook records the duration
+    from UserPromptSubmit to Stop events.
 
     Returns:
         Formatted duration string like "45s" or "1m 23s", or None if not available.
@@ -357,19 +347,31 @@ def get_turn_duration() -> str | None:
     state_dir = (
         Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd())) / ".claude" / "state"
     )
-    duration_file = state_dir / "last_turn_duration.txt"
+    duration = StateStore(state_dir).get("last_turn_duration")
+    return duration if isinstance(duration, str) and duration else None
 
-    if not duration_file.exists():
-        return None
 
+def render_deadline() -> float:
+    """Render deadline in seconds, from STATUSLINE_DEADLINE_MS."""
     try:
-        duration_str = duration_file.read_text(encoding="utf-8").strip()
-        if duration_str:
-            return duration_str
-    except OSError:
-        pass
+        ms = float(os.environ.get(RENDER_DEADLINE_ENV, DEFAULT_RENDER_DEADLINE_MS))
+    except ValueError:
+        ms = DEFAULT_RENDER_DEADLINE_MS
+    return max(ms, 0) / 1000
 
-    return None
+
+def get_turn_trend() -> str | None:
+    """Get a sparkline and p50/p90 of recent turn durations.
+
+    Reads the turn history ring the stop hook keeps in the state store.
+
+    Returns:
+        String like "▂▃▂▅▇ p50 41s p90 2m 5s", or None before two turns.
+    """
+    state_dir = (
+        Path(os.environ.get("CLAUDE_PROJECT_DIR", Path.cwd())) / ".claude" / "state"
+    )
+    return trend(StateStore(state_dir).get(HISTORY_KEY))
 
 
 def format_usage_percentages(
@@ -448,7 +450,8 @@ def main() -> None:
     input_data = {}
     if not sys.stdin.isatty():
         try:
-            input_data = json.loads(sys.stdin.read())
+            with tracing.span("parse payload"):
+                input_data = json.loads(sys.stdin.read())
             # Save for debugging
             try:
                 debug_input_path = Path(tempfile.gettempdir()) / "statusline_input.json"
@@ -481,20 +484,67 @@ def main() -> None:
         f"\U0001f4b0 ${session_cost_usd:.2f}" if session_cost_usd else "\U0001f4b0 $..."
     )
 
+    # Start the segments that may block (file reads, git, `claude --version`)
+    segments = Segments(SEGMENT_CACHE)
+    project_dir = os.environ.get("CLAUDE_PROJECT_DIR") or os.getcwd()
+
     # Get Claude version — prefer stdin JSON, fall back to cached subprocess
     stdin_version = (
         input_data.get("version", "") if isinstance(input_data, dict) else ""
     )
+    if not stdin_version:
+        segments.add(
+            "claude version",
+            get_claude_version_cached,
+            timeout=SEGMENT_TIMEOUTS["claude version"],
+            default="v?",
+            cat="subprocess",
+        )
+    segments.add(
+        "context usage",
+        lambda: calculate_context_usage(input_data),
+        key=str(input_data.get("session_id", "")),
+        timeout=SEGMENT_TIMEOUTS["context usage"],
+        default=(None, 0.0),
+    )
+    # Git branch (raw name) — use effective_cwd so worktrees show correct branch
+    segments.add(
+        "git branch",
+        lambda: get_git_branch(cwd=effective_cwd),
+        key=effective_cwd,
+        timeout=SEGMENT_TIMEOUTS["git branch"],
+        default="\u2026",
+    )
+    segments.add(
+        "turn duration",
+        get_turn_duration,
+        key=project_dir,
+        timeout=SEGMENT_TIMEOUTS["turn duration"],
+    )
+    # Detect terminal width for responsive layout
+    term_width = get_terminal_width()
+    if term_width >= TREND_MIN_WIDTH:
+        segments.add(
+            "turn trend",
+            get_turn_trend,
+            key=project_dir,
+            timeout=SEGMENT_TIMEOUTS["turn trend"],
+        )
+    with tracing.span("segments", cat="statusline") as span:
+        results = segments.collect(render_deadline())
+        span.args["stale"] = [name for name, r in results.items() if r.stale]
+
     if stdin_version:
         # Normalize: add "v" prefix if missing
         claude_version = (
             stdin_version if stdin_version.startswith("v") else f"v{stdin_version}"
         )
     else:
-        claude_version = get_claude_version_cached()
+        version, stale = results["claude version"]
+        claude_version = f"{STALE}{version}" if stale else str(version)
 
     # Get context info
-    context_info, ctx_raw_pct = calculate_context_usage(input_data)
+    (context_info, ctx_raw_pct), context_stale = results["context usage"]
     if not context_info:
         # Fallback empty progress bar
         max_context = 200000
@@ -502,15 +552,19 @@ def main() -> None:
             max_context = 1_000_000
         progress_bar = create_progress_bar(0, 0, max_context)
         context_info = f"🧠 {progress_bar}"
+    ctx_prefix = STALE if context_stale else ""
+    context_info = f"{ctx_prefix}{context_info}"
 
-    # Get git branch (raw name) — use effective_cwd so worktrees show correct branch
-    branch_raw = get_git_branch(cwd=effective_cwd)
+    branch, stale = results["git branch"]
+    branch_raw = f"{STALE}{branch}" if stale else str(branch)
 
     # Get shortened CWD
     cwd = shorten_cwd(effective_cwd)
 
     # Get turn duration if available
-    turn_duration = get_turn_duration()
+    turn_duration, stale = results["turn duration"]
+    if turn_duration and stale:
+        turn_duration = f"{STALE}{turn_duration}"
 
     # Format cost display
     cost_display = f"{GREEN}{cost_str}{RESET}"
@@ -524,9 +578,6 @@ def main() -> None:
 
     usage_display = format_usage_percentages(five_hour_pct, seven_day_pct)
 
-    # Detect terminal width for responsive layout
-    term_width = get_terminal_width()
-
     # --- Row 1: version | model | dir | branch ---
     # Apply initial truncation limits
     dir_max = 25
@@ -571,14 +622,18 @@ def main() -> None:
         f"{BLUE}{claude_version}{RESET} | {SHINY_AQUA}\U0001f916 {raw_model}{RESET} | {cwd_display} | {YELLOW}{git_status}{RESET}\n"
     )
 
-    # --- Row 2: context bar | usage | cost | duration ---
+    # --- Row 2: context bar | usage | cost | duration | latency trend ---
     # Row 2 must ALWAYS show something. At minimum: context percentage and usage.
     # Progressive compaction for narrow terminals instead of hiding elements.
     if term_width >= 100:
-        # Full layout: context bar | usage | cost | duration
+        # Full layout: context bar | usage | cost | duration | latency trend
         row2_parts = [context_info, usage_display, cost_display]
         if turn_duration:
             row2_parts.append(f"{YELLOW}\u23f1\ufe0f {turn_duration}{RESET}")
+        turn_trend, stale = results.get("turn trend", (None, False))
+        if turn_trend:
+            prefix = STALE if stale else ""
+            row2_parts.append(f"{BLUE}\U0001f4c8 {prefix}{turn_trend}{RESET}")
     elif term_width >= 80:
         # Medium: context bar | usage | cost (no duration)
         row2_parts = [context_info, usage_display, cost_display]
@@ -594,11 +649,16 @@ def main() -> None:
             five_hour_pct, seven_day_pct, compact=True
         )
         # Reuse raw percentage from calculate_context_usage() (no re-read)
-        ctx_pct = f"{ctx_raw_pct:.0f}%"
+        ctx_pct = f"{ctx_prefix}{ctx_raw_pct:.0f}%"
         row2_parts = [ctx_pct, compact_usage]
 
     sys.stdout.write(" | ".join(row2_parts) + "\n")
+    sys.stdout.flush()
+
+    # Give late segments until their own timeout to refresh the cache
+    segments.settle()
 
 
 if __name__ == "__main__":
-    main()
+    with tracing.invocation("statusline", cat="statusline"):
+        main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# ///
+"""
+Export hook traces as Chrome trace-event JSON (cross-platform)
+
+Reads the span ring written with CLAUDE_HOOK_TRACE=1
+(.claude/state/trace_events.jsonl, see hooks/lib/tracing.py) and writes a
+trace_event document that https://ui.perfetto.dev and chrome://tracing load
+directly. Each process (hook client, daemon child, compact_run, statusline)
+becomes one track named after its invocation, with its sub-stages nested
+underneath.
+
+Usage:
+    trace_export.py [--project-dir DIR | --input FILE] [--output FILE]
+                    [--last-minutes N] [--clear]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Shared hook helpers live in hooks/lib
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "hooks" / "lib"))
+from tracing import TRACE_FILE, read_events
+
+INVOCATION_CATEGORIES = ("hook", "daemon", "compact_run", "statusline")
+
+
+def to_trace_document(
+    events: list[dict[str, object]], since_us: int = 0
+) -> dict[str, object]:
+    """Chrome trace-event document with one named track per process."""
+    kept = sorted(
+        (e for e in events if int(e.get("ts", 0)) >= since_us),  # type: ignore[call-overload]
+        key=lambda e: (e.get("ts", 0), -int(e.get("dur", 0))),  # type: ignore[call-overload]
+    )
+    names: dict[object, str] = {}
+    for event in kept:
+        if event.get("cat") in INVOCATION_CATEGORIES:
+            label = str(event["name"])
+            if label != event["cat"]:
+                label = f"{event['cat']}: {label}"
+            names.setdefault(event.get("pid"), label)
+    metadata = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": pid,
+            "args": {"name": name},
+        }
+        for pid, name in names.items()
+    ]
+    return {"traceEvents": metadata + kept, "displayTimeUnit": "ms"}
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--project-dir",
+        type=Path,
+        default=Path.cwd(),
+        help="project whose .claude/state ring to export (default: cwd)",
+    )
+    source.add_argument("--input", type=Path, help="ring file to export")
+    parser.add_argument(
+        "--output", type=Path, help="trace JSON to write (default: stdout)"
+    )
+    parser.add_argument(
+        "--last-minutes",
+        type=float,
+        metavar="N",
+        help="only export spans that started in the last N minutes",
+    )
+    parser.add_argument(
+        "--clear", action="store_true", help="empty the ring after exporting"
+    )
+    args = parser.parse_args()
+
+    ring = args.input or args.project_dir / ".claude" / "state" / TRACE_FILE
+    if not ring.exists():
+        print(f"No trace file at {ring} (set CLAUDE_HOOK_TRACE=1)", file=sys.stderr)
+        return 1
+
+    since_us = 0
+    if args.last_minutes is not None:
+        since_us = int((time.time() - args.last_minutes * 60) * 1_000_000)
+    document = to_trace_document(read_events(ring), since_us)
+    text = json.dumps(document)
+
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+        spans = sum(1 for e in document["traceEvents"] if e["ph"] == "X")  # type: ignore[attr-defined, index]
+        print(f"Wrote {spans} spans to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.clear:
+        ring.write_text("", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -33,9 +33,12 @@ def load_module_from_file(name: str, path: Path) -> ModuleType:
 @pytest.fixture
 def compact_run() -> ModuleType:
     """Load compact_run.py as a module."""
-    return load_module_from_file(
+    module = load_module_from_file(
         "compact_run", PROJECT_ROOT / "hooks" / "compact_run.py"
     )
+    # Archives would land in the repository's own .claude/state; tests opt in
+    module.ARCHIVE = False
+    return module
 
 
 @pytest.fixture
@@ -90,7 +93,8 @@ def run_compact_run():
             ],
             capture_output=True,
             text=True,
-            env=os.environ.copy(),
+            # No compression stats or archives in the repository's .claude/state
+            env={**os.environ, "COMPACT_RUN_STATS": "0", "COMPACT_RUN_ARCHIVE": "0"},
             cwd=str(PROJECT_ROOT),
             timeout=timeout,
         )
@@ -0,0 +1,147 @@
+"""Tests for benchmarks/hooks/bench_hooks.py (hook latency benchmark)."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+BENCH = PROJECT_ROOT / "benchmarks" / "hooks" / "bench_hooks.py"
+
+
+@pytest.fixture
+def bench() -> ModuleType:
+    return load_module_from_file("bench_hooks", BENCH)
+
+
+class TestSummarize:
+    def test_nearest_rank_percentiles(self, bench: ModuleType) -> None:
+        summary = bench.summarize([float(i) for i in range(1, 101)])
+        assert summary["n"] == 100  # noqa: S101
+        assert (summary["p50"], summary["p95"], summary["p99"]) == (50, 95, 99)  # noqa: S101
+        assert (summary["min"], summary["max"]) == (1, 100)  # noqa: S101
+
+    def test_single_sample(self, bench: ModuleType) -> None:
+        summary = bench.summarize([7.0])
+        assert summary["p50"] == summary["p99"] == 7.0  # noqa: S101
+
+    def test_empty(self, bench: ModuleType) -> None:
+        assert bench.summarize([]) == {"n": 0}  # noqa: S101
+
+
+class TestMatcher:
+    @pytest.mark.parametrize(
+        ("matcher", "value", "expected"),
+        [
+            (None, "Bash", True),
+            ("*", "Bash", True),
+            ("Edit|Write|MultiEdit", "Write", True),
+            ("Edit|Write|MultiEdit", "NotebookEdit", False),
+            ("^(ExitPlanMode|Skill|SlashCommand)$", "Skill", True),
+            ("startup|resume|clear|compact", "startup", True),
+        ],
+    )
+    def test_matcher_accepts(
+        self, bench: ModuleType, matcher: str | None, value: str, expected: bool
+    ) -> None:
+        assert bench.matcher_accepts(matcher, value) is expected  # noqa: S101
+
+
+class TestScenarios:
+    def test_every_configured_hook_is_driven(self, bench: ModuleType) -> None:
+        hooks = bench.load_hooks(PROJECT_ROOT / "hooks" / "plugin-hooks.json")
+        configured = {f"{e}:{h['name']}" for e, hs in hooks.items() for h in hs}
+        driven = set()
+        for scenario in bench.build_scenarios().values():
+            value = scenario.get("match") or scenario["payload"].get("tool_name", "")
+            for event in scenario["events"]:
+                driven |= {
+                    f"{event}:{h['name']}"
+                    for h in bench.matching_hooks(hooks, event, value)
+                }
+        assert configured - driven == set()  # noqa: S101
+
+    def test_large_write_is_multi_megabyte(self, bench: ModuleType) -> None:
+        payload = bench.build_scenarios()["write_large"]["payload"]
+        assert len(payload["tool_input"]["content"]) >= 4 * 1024 * 1024  # noqa: S101
+
+    def test_python_launcher_argv(self, bench: ModuleType) -> None:
+        hook = {
+            "command": 'uv run --no-project --script "${CLAUDE_PLUGIN_ROOT}/hooks/'
+            'hook_client.py" PreToolUse/dispatch.py'
+        }
+        argv = bench.hook_argv(hook, Path("/plug"), "python", "/py")
+        assert argv == [  # noqa: S101
+            "/py",
+            "-I",
+            "-S",
+            "/plug/hooks/hook_client.py",
+            "PreToolUse/dispatch.py",
+        ]
+
+
+class TestCompare:
+    def _doc(self, commit: str, p50: float) -> dict[str, object]:
+        stats = {"n": 5, "p50": p50, "p95": p50 * 2, "p99": p50 * 3}
+        return {
+            "meta": {"commit": commit},
+            "tool_calls": {"bash": stats},
+            "events": {"PreToolUse": stats},
+            "hooks": {"PreToolUse:PreToolUse/dispatch.py": {"all": stats}},
+        }
+
+    def test_flags_p50_regressions_over_threshold(self, bench: ModuleType) -> None:
+        report, regressions = bench.compare(
+            self._doc("a", 10.0), self._doc("b", 12.0), 10.0
+        )
+        assert len(regressions) == 3  # noqa: S101
+        assert "+20.0%" in report  # noqa: S101
+
+    def test_within_threshold(self, bench: ModuleType) -> None:
+        _, regressions = bench.compare(self._doc("a", 10.0), self._doc("b", 10.5), 10.0)
+        assert regressions == []  # noqa: S101
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(sys.platform == "win32", reason="benchmark needs a POSIX shell")
+def test_run_writes_comparable_json(tmp_path: Path) -> None:
+    output = tmp_path / "result.json"
+    result = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            str(BENCH),
+            "run",
+            "--runs",
+            "2",
+            "--warmup",
+            "0",
+            "--scenario",
+            "user_prompt",
+            "--scenario",
+            "agent_phase",
+            "--launcher",
+            "python",
+            "--no-daemon",
+            "--output",
+            str(output),
+        ],
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr  # noqa: S101
+    data = json.loads(output.read_text())
+    assert data["tool_calls"]["agent_phase"]["n"] == 2  # noqa: S101
+    assert set(data["events"]) == {"PreToolUse", "PostToolUse", "UserPromptSubmit"}  # noqa: S101
+    assert "PostToolUse:PostToolUse/validate_task_graph_depth.py" in data["hooks"]  # noqa: S101
+
+    compared = subprocess.run(  # noqa: S603
+        [sys.executable, str(BENCH), "compare", str(output), str(output)],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert compared.returncode == 0  # noqa: S101
@@ -0,0 +1,197 @@
+"""Tests for scripts/build_runtime.py (materialized hook runtime)."""
+
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def build_runtime() -> ModuleType:
+    return load_module_from_file(
+        "build_runtime", PROJECT_ROOT / "scripts" / "build_runtime.py"
+    )
+
+
+# ---------------------------------------------------------------------------
+# rewrite_command
+# ---------------------------------------------------------------------------
+
+
+class TestRewriteCommand:
+    def test_quoted_hook_command(self, build_runtime: ModuleType) -> None:
+        cmd = (
+            'uv run --no-project --script "${CLAUDE_PLUGIN_ROOT}/hooks/hook_client.py"'
+            " PreToolUse/dispatch.py"
+        )
+        rt = '"${CLAUDE_PLUGIN_ROOT}/runtime/bin/python"'
+        assert build_runtime.rewrite_command(cmd) == (  # noqa: S101
+            f"[ -x {rt} ] && exec {rt} -I -S "
+            '"${CLAUDE_PLUGIN_ROOT}/hooks/hook_client.py" PreToolUse/dispatch.py '
+            f"|| exec {cmd}"
+        )
+
+    def test_unquoted_statusline_command(self, build_runtime: ModuleType) -> None:
+        cmd = "uv run --no-project --script $HOME/.claude/scripts/statusline.py"
+        new = build_runtime.rewrite_command(cmd)
+        assert new.startswith('[ -x "$HOME/.claude/runtime/bin/python" ]')  # noqa: S101
+        assert new.endswith(f"|| exec {cmd}")  # noqa: S101
+
+    @pytest.mark.parametrize(
+        "cmd",
+        [
+            "bash ./script.sh",
+            "uv run --no-project --script /somewhere/else.py",
+            "python3 hooks/x.py",
+        ],
+    )
+    def test_other_commands_unchanged(
+        self, build_runtime: ModuleType, cmd: str
+    ) -> None:
+        assert build_runtime.rewrite_command(cmd) == cmd  # noqa: S101
+
+    def test_idempotent(self, build_runtime: ModuleType) -> None:
+        cmd = 'uv run --no-project --script "./.claude/hooks/stop/python_stop_hook.py"'
+        once = build_runtime.rewrite_command(cmd)
+        assert build_runtime.rewrite_command(once) == once  # noqa: S101
+
+
+class TestRewriteSettingsFile:
+    def test_rewrites_every_plugin_hook(
+        self, build_runtime: ModuleType, tmp_path: Path
+    ) -> None:
+        hooks_json = tmp_path / "plugin-hooks.json"
+        shutil.copy(PROJECT_ROOT / "hooks" / "plugin-hooks.json", hooks_json)
+        original = json.loads(hooks_json.read_text())
+
+        changed = build_runtime.rewrite_settings_file(hooks_json)
+
+        commands = [
+            h["command"]
+            for entries in json.loads(hooks_json.read_text())["hooks"].values()
+            for entry in entries
+            for h in entry["hooks"]
+        ]
+        assert changed == len(commands)  # noqa: S101
+        assert all(c.startswith("[ -x ") for c in commands)  # noqa: S101
+        assert build_runtime.rewrite_settings_file(hooks_json) == 0  # noqa: S101
+        # Everything but the commands is preserved
+        rewritten = json.loads(hooks_json.read_text())
+        assert rewritten.keys() == original.keys()  # noqa: S101
+
+
+class TestMain:
+    @pytest.mark.skipif(sys.platform == "win32", reason="rewrite requires sh")
+    def test_rewrites_only_given_files(
+        self,
+        build_runtime: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        root = tmp_path / "install"
+        (root / "hooks").mkdir(parents=True)
+        manifest = root / "hooks" / "plugin-hooks.json"
+        shutil.copy(PROJECT_ROOT / "hooks" / "plugin-hooks.json", manifest)
+        original = manifest.read_text()
+        settings = root / "settings.json"
+        settings.write_text(
+            json.dumps(
+                {
+                    "statusLine": {
+                        "type": "command",
+                        "command": "uv run --no-project --script"
+                        " $HOME/.claude/scripts/statusline.py",
+                    }
+                }
+            )
+        )
+        python = root / "runtime" / "bin" / "python"
+        monkeypatch.setattr(build_runtime, "create_environment", lambda _: python)
+        monkeypatch.setattr(build_runtime, "compile_sources", lambda *_: None)
+        monkeypatch.setattr(
+            build_runtime, "write_runtime_info", lambda *_: {"version": "3.12.0"}
+        )
+        argv = ["build_runtime.py", "--root", str(root), "--settings", str(settings)]
+        monkeypatch.setattr("sys.argv", argv)
+
+        assert build_runtime.main() == 0  # noqa: S101
+        status = json.loads(settings.read_text())["statusLine"]["command"]
+        assert status.startswith('[ -x "$HOME/.claude/runtime/bin/python" ]')  # noqa: S101
+        # A tracked manifest is only rewritten when named (install.sh names its copy)
+        assert manifest.read_text() == original  # noqa: S101
+
+        monkeypatch.setattr("sys.argv", [*argv, "--settings", str(manifest)])
+        assert build_runtime.main() == 0  # noqa: S101
+        hooks = json.loads(manifest.read_text())["hooks"]
+        commands = [
+            h["command"]
+            for entries in hooks.values()
+            for entry in entries
+            for h in entry["hooks"]
+        ]
+        runtime = '"${CLAUDE_PLUGIN_ROOT}/runtime/bin/python" -I -S'
+        assert commands and all(runtime in c for c in commands)  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Rewritten commands in a real shell
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="rewritten commands need sh")
+class TestRewrittenCommandRuns:
+    def _run(self, command: str, root: Path, project: Path) -> tuple[str, int]:
+        env = os.environ.copy()
+        env.update(
+            {
+                "CLAUDE_PLUGIN_ROOT": str(root),
+                "CLAUDE_PROJECT_DIR": str(project),
+                "CLAUDE_HOOK_DAEMON": "0",
+                "CLAUDE_TOKEN_EFFICIENCY": "1",
+            }
+        )
+        payload = json.dumps({"tool_name": "Bash", "tool_input": {"command": "pytest"}})
+        result = subprocess.run(  # noqa: S603
+            ["/bin/sh", "-c", command],
+            input=payload,
+            capture_output=True,
+            text=True,
+            env=env,
+            timeout=30,
+        )
+        return result.stdout, result.returncode
+
+    def test_uses_runtime_then_falls_back_to_uv(
+        self, build_runtime: ModuleType, tmp_path: Path
+    ) -> None:
+        root = tmp_path / "plugin"
+        shutil.copytree(PROJECT_ROOT / "hooks", root / "hooks")
+        command = build_runtime.rewrite_command(
+            'uv run --no-project --script "${CLAUDE_PLUGIN_ROOT}/hooks/hook_client.py"'
+            " PreToolUse/dispatch.py"
+        )
+
+        # Stand-in runtime: a symlink to the interpreter running the tests
+        python = root / "runtime" / "bin" / "python"
+        python.parent.mkdir(parents=True)
+        python.symlink_to(sys.executable)
+        out, rc = self._run(command, root, tmp_path)
+        assert rc == 0  # noqa: S101
+        assert "compact_run.py pytest" in out  # noqa: S101
+
+        # Runtime missing: the hook runs through uv, and the rewritten command
+        # must not name uv's script environment, deleted once the hook exits
+        shutil.rmtree(root / "runtime")
+        fallback_out, rc = self._run(command, root, tmp_path)
+        assert rc == 0  # noqa: S101
+        rewritten = json.loads(fallback_out)["updatedInput"]["command"]
+        assert rewritten.endswith("compact_run.py pytest")  # noqa: S101
+        launcher = shlex.split(rewritten)[0]
+        assert launcher == "uv" or Path(launcher).is_file()  # noqa: S101
@@ -0,0 +1,222 @@
+"""Tests for hooks/lib/command_registry.py -- shared command family registry."""
+
+import json
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+PROJECT_TOML = """
+[families.terraform]
+subcommands = ["plan", "validate"]
+summary = 'Plan: \\d+ to add'
+failures = '^Error: .*'
+max_lines = 5
+
+[families.nerdctl]
+subcommands = ["logs"]
+handler = "container"
+
+[families.make]
+subcommands = ["test", "check", "lint"]
+handler = "make"
+
+[families.broken]
+handler = "nope"
+
+[families.badregex]
+failures = '(unclosed'
+
+[families.badbudget]
+budget = 0
+"""
+
+
+@pytest.fixture
+def command_registry(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    monkeypatch.syspath_prepend(str(PROJECT_ROOT / "hooks" / "lib"))  # lazy_import
+    return load_module_from_file(
+        "command_registry", PROJECT_ROOT / "hooks" / "lib" / "command_registry.py"
+    )
+
+
+def _project(tmp_path: Path, text: str = PROJECT_TOML) -> Path:
+    (tmp_path / ".claude").mkdir(exist_ok=True)
+    (tmp_path / ".claude" / "compact_run.toml").write_text(text)
+    return tmp_path
+
+
+class TestBuiltin:
+    @pytest.mark.parametrize(
+        ("command", "family"),
+        [
+            ("git push origin main", "git"),
+            ("/usr/bin/git commit -m x", "git"),
+            ("GIT.EXE push", "git"),
+            ("pytest -q tests/", "pytest"),
+            ("pytest", "pytest"),
+            ("kubectl logs pod", "kubectl"),
+            ("npx tsc --noEmit", "npx"),
+        ],
+    )
+    def test_match(
+        self, command_registry: ModuleType, command: str, family: str
+    ) -> None:
+        match = command_registry.BUILTIN.match(command.split())
+        assert match is not None and match.command == family  # noqa: S101
+
+    @pytest.mark.parametrize(
+        "command",
+        ["git status", "npx tsc --watch", "npx next dev", "npx prettier .", "ls", ""],
+    )
+    def test_no_match(self, command_registry: ModuleType, command: str) -> None:
+        assert command_registry.BUILTIN.match(command.split()) is None  # noqa: S101
+
+    def test_family_routes_any_subcommand(self, command_registry: ModuleType) -> None:
+        family = command_registry.BUILTIN.family("git")
+        assert family.handler == "git"  # noqa: S101
+        assert command_registry.BUILTIN.family("terraform") is None  # noqa: S101
+
+    def test_patterns_compiled_once(self, command_registry: ModuleType) -> None:
+        family = command_registry.BUILTIN.family("go")
+        pattern = family.pattern("keep")
+        assert pattern.search("--- FAIL: TestX")  # noqa: S101
+        assert family.pattern("keep") is pattern  # noqa: S101
+        assert family.pattern("summary") is None  # noqa: S101
+
+    def test_no_project_file_is_builtin(
+        self, command_registry: ModuleType, tmp_path: Path
+    ) -> None:
+        assert command_registry.load_registry(tmp_path) is command_registry.BUILTIN  # noqa: S101
+
+
+class TestProjectFamilies:
+    def test_families_added_and_overridden(
+        self, command_registry: ModuleType, tmp_path: Path
+    ) -> None:
+        registry = command_registry.load_registry(_project(tmp_path))
+        terraform = registry.match(["terraform", "plan"])
+        assert terraform.handler == "summary"  # noqa: S101
+        assert terraform.max_lines == 5  # noqa: S101
+        assert terraform.budget is None  # noqa: S101
+        assert registry.match(["terraform", "apply"]) is None  # noqa: S101
+        assert registry.match(["make", "lint"]).handler == "make"  # noqa: S101
+        assert registry.match(["nerdctl", "logs", "web"]).handler == "container"  # noqa: S101
+        # Built-in families are still there
+        assert registry.match(["git", "push"]).handler == "git"  # noqa: S101
+
+    def test_summary_family_keeps_its_patterns_when_streaming(
+        self, command_registry: ModuleType, tmp_path: Path
+    ) -> None:
+        keep = command_registry.load_registry(_project(tmp_path)).family("terraform")
+        assert keep.pattern("keep").search("Error: bad")  # noqa: S101
+        assert keep.pattern("keep").search("Plan: 3 to add, 0 to change")  # noqa: S101
+
+    def test_invalid_entries_dropped_with_errors(
+        self, command_registry: ModuleType, tmp_path: Path
+    ) -> None:
+        registry = command_registry.load_registry(_project(tmp_path))
+        assert registry.family("broken") is None  # noqa: S101
+        assert registry.family("badregex") is None  # noqa: S101
+        assert registry.family("badbudget") is None  # noqa: S101
+        assert len(registry.errors) == 3  # noqa: S101
+        assert registry.errors[0].startswith("broken: unknown handler")  # noqa: S101
+        assert registry.errors[2] == "badbudget: budget must be a positive integer"  # noqa: S101
+
+    def test_malformed_file_keeps_builtin(
+        self, command_registry: ModuleType, tmp_path: Path
+    ) -> None:
+        registry = command_registry.load_registry(_project(tmp_path, "[families"))
+        assert registry.match(["git", "push"]) is not None  # noqa: S101
+        assert registry.errors  # noqa: S101
+
+    def test_cache_reused_until_file_changes(
+        self,
+        command_registry: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        root = _project(tmp_path)
+        command_registry.load_registry(root)
+        cache = root / command_registry.CACHE_FILE
+        assert "terraform" in json.loads(cache.read_text())["families"]  # noqa: S101
+
+        import tomllib
+
+        def no_parse(_text: str) -> None:
+            raise AssertionError("unchanged file parsed again")
+
+        monkeypatch.setattr(tomllib, "loads", no_parse)
+        assert command_registry.load_registry(root).family("terraform")  # noqa: S101
+
+        monkeypatch.undo()
+        _project(tmp_path, '[families.tox]\nsummary = "congratulations"\n')
+        registry = command_registry.load_registry(root)
+        assert registry.family("tox") is not None  # noqa: S101
+        assert registry.family("terraform") is None  # noqa: S101
+
+    def test_builtin_lookup_never_imports_tomllib(self) -> None:
+        import subprocess
+
+        code = (
+            "import sys; sys.path.insert(0, 'hooks/lib'); import command_registry; "
+            "command_registry.BUILTIN.match(['git', 'push']); "
+            "print('tomllib' in sys.modules)"
+        )
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-I", "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=PROJECT_ROOT,
+            check=True,
+        )
+        assert result.stdout.strip() == "False"  # noqa: S101
+
+
+class TestLaunchedCommand:
+    @pytest.mark.parametrize(
+        ("command", "expected"),
+        [
+            ("FOO=1 BAR=x=y pytest -x", "pytest -x"),
+            ("env -u HOME FOO=1 cargo test", "cargo test"),
+            ("uv run pytest -x", "pytest -x"),
+            ("uv run --with rich --frozen -- pytest", "pytest"),
+            ("uv run --python=3.12 python -m pytest -q", "pytest -q"),
+            ("poetry run -q pytest", "pytest"),
+            ("pdm run go test ./...", "go test ./..."),
+            ("pipenv run pytest", "pytest"),
+            ("python3.12 -X dev -m pytest tests/", "pytest tests/"),
+            ("/usr/bin/python3 -m pytest", "pytest"),
+            ("timeout -s KILL 5m cargo test", "cargo test"),
+            ("FOO=1 timeout 300 uv run pytest", "pytest"),
+            ("npx --yes vitest run", "npx vitest run"),
+            ("git push", "git push"),
+        ],
+    )
+    def test_peeled(
+        self, command_registry: ModuleType, command: str, expected: str
+    ) -> None:
+        launched = command_registry.launched_command(command.split())
+        assert launched == expected.split()  # noqa: S101
+
+    @pytest.mark.parametrize(
+        "command",
+        [
+            "uv run --script tool.py",
+            "uv sync",
+            "timeout --unknown 5 pytest",
+            "python script.py",
+            "python -c pass",
+            "timeout 5",
+            "FOO=1",
+        ],
+    )
+    def test_unknown_launcher_options_not_peeled(
+        self, command_registry: ModuleType, command: str
+    ) -> None:
+        parts = command.split()
+        launched = command_registry.launched_command(parts)
+        assert launched == [p for p in parts if "=" not in p]  # noqa: S101
+        assert command_registry.BUILTIN.match(launched) is None  # noqa: S101
@@ -1,5 +1,11 @@
 """Tests for hooks/compact_run.py -- output compression for CLI commands."""
 
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
 from types import ModuleType
 from unittest.mock import MagicMock
 
@@ -23,14 +29,40 @@ class TestTruncatedOutput:
         lines = [f"line {i}" for i in range(total)]
         result = compact_run.truncated_output("\n".join(lines))
         expected_header = (
-            f"[truncated: {total} lines total, showing last {compact_run.MAX_LINES}]"
+            f"[truncated: {total} lines total, showing {compact_run.MAX_LINES}]"
         )
         assert result.startswith(expected_header)  # noqa: S101
         result_lines = result.splitlines()
-        # header + MAX_LINES content lines
-        assert len(result_lines) == compact_run.MAX_LINES + 1  # noqa: S101
+        # header + MAX_LINES content lines + one gap marker
+        assert len(result_lines) == compact_run.MAX_LINES + 2  # noqa: S101
+        head = compact_run.HEAD_LINES
+        assert result_lines[1 : head + 1] == lines[:head]  # noqa: S101
+        assert result_lines[head + 1] == (  # noqa: S101
+            f"[... lines {head + 1}-{head + 50} elided: 50 lines, ~100 tokens ...]"
+        )
         assert result_lines[-1] == f"line {total - 1}"  # noqa: S101
 
+    def test_long_lines_fit_the_token_budget(
+        self, compact_run: ModuleType, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(compact_run, "TOKEN_BUDGET", 400)
+        content = "\n".join(["start", "x" * 50000, *(f"line {i}" for i in range(40))])
+        result = compact_run.truncated_output(content)
+        assert "[... 49896 chars cut]" in result  # noqa: S101
+        assert result.endswith("line 39")  # noqa: S101
+        assert len(result) < 400 * 4  # noqa: S101
+
+    def test_error_far_above_the_tail_is_kept(
+        self, compact_run: ModuleType, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(compact_run, "TOKEN_BUDGET", 300)
+        lines = [f"step {i} ok" for i in range(400)]
+        lines[200] = "TypeError: cannot read properties of undefined"
+        result = compact_run.truncated_output("\n".join(lines)).splitlines()
+        region = result.index(lines[200])
+        assert result[region - 2 : region + 3] == lines[198:203]  # noqa: S101
+        assert result[region - 3].startswith("[... lines ")  # noqa: S101
+
     def test_empty_string(self, compact_run: ModuleType) -> None:
         assert compact_run.truncated_output("") == ""  # noqa: S101
 
@@ -84,12 +116,17 @@ class TestHandleGit:
         capsys: pytest.CaptureFixture[str],
         monkeypatch: pytest.MonkeyPatch,
     ) -> None:
-        mock_result = MagicMock(returncode=0, stdout="feature-x\n")
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(
+            compact_run.git_meta, "current_branch", lambda cwd: "feature-x"
+        )
         code = compact_run.handle_git(["git", "push"], "", "", 0)
         assert code == 0  # noqa: S101
         assert "feature-x" in capsys.readouterr().out  # noqa: S101
 
+        monkeypatch.setattr(compact_run.git_meta, "current_branch", lambda cwd: None)
+        compact_run.handle_git(["git", "push"], "", "", 0)
+        assert "\u2192 ?" in capsys.readouterr().out  # noqa: S101
+
     def test_pull_file_changed(
         self, compact_run: ModuleType, capsys: pytest.CaptureFixture[str]
     ) -> None:
@@ -266,8 +303,12 @@ class TestHandleContainerLogs:
         assert "line B" in out  # noqa: S101
 
     def test_tail_truncation_with_dedup(
-        self, compact_run: ModuleType, capsys: pytest.CaptureFixture[str]
+        self,
+        compact_run: ModuleType,
+        capsys: pytest.CaptureFixture[str],
+        monkeypatch: pytest.MonkeyPatch,
     ) -> None:
+        monkeypatch.setattr(compact_run, "LOG_CLUSTER", False)
         # Create enough unique lines to exceed LOG_TAIL after dedup
         lines = [f"unique line {i}" for i in range(80)]
         stdout = "\n".join(lines)
@@ -307,6 +348,59 @@ class TestHandleContainerLogs:
         assert "line 99" in out  # noqa: S101
         assert "line 0" not in out  # noqa: S101
 
+    def test_error_before_the_tail_is_kept(
+        self,
+        compact_run: ModuleType,
+        capsys: pytest.CaptureFixture[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(compact_run, "LOG_CLUSTER", False)
+        lines = [f"request {i} served" for i in range(200)]
+        lines[20] = "ERROR connection to db refused"
+        compact_run.handle_container_logs("\n".join(lines), "", 0)
+        out = capsys.readouterr().out.splitlines()
+        assert out[0] == "[truncated: 200 lines total, showing 50]"  # noqa: S101
+        assert out[1].startswith("[... lines 1-18 elided: 18 lines")  # noqa: S101
+        assert out[2:7] == lines[18:23]  # noqa: S101
+        assert out[-1] == "request 199 served"  # noqa: S101
+
+    def test_long_logs_clustered_by_template(
+        self, compact_run: ModuleType, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        lines = []
+        for i in range(300):
+            lines.append(
+                f"2026-01-01T10:00:{i % 60:02d}Z INFO GET /items/{i} 200 {i % 50}ms"
+            )
+            if i % 100 == 99:
+                lines.append(
+                    f"2026-01-01T10:01:00Z ERROR upstream 10.0.0.{i % 9}:8080 refused"
+                )
+        code = compact_run.handle_container_logs("\n".join(lines), "", 0)
+        assert code == 0  # noqa: S101
+        out = capsys.readouterr().out.splitlines()
+        assert out[0] == "[303 lines clustered into 2 templates]"  # noqa: S101
+        assert out[1] == (  # noqa: S101
+            "    300x  lines 1-302: <TS> INFO GET /items/<NUM> <NUM> <NUM>ms"
+        )
+        assert out[2].strip() == f"e.g. {lines[0]}"  # noqa: S101
+        assert out[3] == (  # noqa: S101
+            "      3x  lines 101-303: <TS> ERROR upstream <IP> refused"
+        )
+
+    def test_too_long_to_cluster_falls_back_to_tail(
+        self,
+        compact_run: ModuleType,
+        capsys: pytest.CaptureFixture[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        dedup = compact_run.LogDedup()
+        dedup.templates.max_lines = 10
+        for i in range(80):
+            dedup.feed(f"unique line {i}")
+        compact_run.handle_container_logs("", "", 0, dedup)
+        assert f"showing last {compact_run.LOG_TAIL}" in capsys.readouterr().out  # noqa: S101
+
 
 # ---------------------------------------------------------------------------
 # handle_pytest
@@ -658,6 +752,76 @@ class TestHandleMake:
 # ---------------------------------------------------------------------------
 # main() routing
 # ---------------------------------------------------------------------------
+class TestRegistryRouting:
+    PROJECT_TOML = (
+        "[families.terraform]\n"
+        'subcommands = ["plan"]\n'
+        "summary = 'Plan: \\d+ to add, \\d+ to change, \\d+ to destroy'\n"
+        "failures = '^Error: .*'\n"
+        "max_lines = 2\n"
+        "[families.tflint]\n"
+        "budget = 40\n"
+        "[families.nerdctl]\n"
+        'subcommands = ["logs"]\n'
+        'handler = "container"\n'
+    )
+
+    @pytest.fixture
+    def project(
+        self, compact_run: ModuleType, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> ModuleType:
+        (tmp_path / ".claude").mkdir()
+        (tmp_path / ".claude" / "compact_run.toml").write_text(self.PROJECT_TOML)
+        monkeypatch.setattr(
+            compact_run, "REGISTRY", compact_run.load_registry(tmp_path)
+        )
+        return compact_run
+
+    def test_every_family_has_a_handler(self, compact_run: ModuleType) -> None:
+        for family in compact_run.REGISTRY.families():
+            assert family.handler in compact_run.HANDLERS  # noqa: S101
+
+    def test_summary_success(
+        self, project: ModuleType, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        out = "Refreshing...\nPlan: 3 to add, 0 to change, 1 to destroy.\n"
+        assert project.route(["terraform", "plan"], out, "", 0) == 0  # noqa: S101
+        expected = "ok \u2192 Plan: 3 to add, 0 to change, 1 to destroy\n"
+        assert capsys.readouterr().out == expected  # noqa: S101
+
+    def test_summary_failure_lines_within_budget(
+        self, project: ModuleType, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        err = "noise\nError: one\nError: two\nmore noise\nError: three\n"
+        assert project.route(["terraform", "plan"], "", err, 1) == 1  # noqa: S101
+        out = capsys.readouterr().out
+        assert out == "[showing last 2 of 3 failure lines]\nError: two\nError: three\n"  # noqa: S101
+
+    def test_summary_failure_without_matches_truncated_to_budget(
+        self, project: ModuleType, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        assert project.route(["terraform", "plan"], "a\nb\nc\n", "", 1) == 1  # noqa: S101
+        out = capsys.readouterr().out
+        assert out.startswith("[truncated: 3 lines total, showing last 2]")  # noqa: S101
+
+    def test_family_token_budget(
+        self, project: ModuleType, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        out = "".join(f"warning {i}: rule violated\n" for i in range(60))
+        assert project.route(["tflint"], out, "", 1) == 1  # noqa: S101
+        shown = capsys.readouterr().out.splitlines()
+        assert shown[0] == "[truncated: 60 lines total, showing 5]"  # noqa: S101
+        project.route(["git", "log"], out, "", 1)
+        assert "showing 5" not in capsys.readouterr().out  # noqa: S101
+
+    def test_project_family_reuses_builtin_handler(
+        self, project: ModuleType, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        assert project.is_log_command(["nerdctl", "logs", "web"])  # noqa: S101
+        project.route(["nerdctl", "logs", "web"], "same\nsame\nsame\n", "", 0)
+        assert capsys.readouterr().out == "same\n  [repeated 3 times]\n"  # noqa: S101
+
+
 class TestMain:
     def test_no_args_returns_1(
         self,
@@ -677,7 +841,7 @@ class TestMain:
         capsys: pytest.CaptureFixture[str],
     ) -> None:
         mock_result = MagicMock(stdout="", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "git", "add", "."])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -691,7 +855,7 @@ class TestMain:
     ) -> None:
         """git invoked via full path should still route to handle_git."""
         mock_result = MagicMock(stdout="", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "/usr/bin/git", "add"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -704,12 +868,41 @@ class TestMain:
         capsys: pytest.CaptureFixture[str],
     ) -> None:
         mock_result = MagicMock(stdout="5 passed in 0.5s\n", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "pytest"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
         assert "5 passed" in capsys.readouterr().out  # noqa: S101
 
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["python3", "-m", "pytest"],
+            ["FOO=1", "uv", "run", "pytest"],
+            ["timeout", "300", "pytest"],
+        ],
+    )
+    def test_routes_launched_pytest(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        argv: list[str],
+    ) -> None:
+        calls = []
+        mock_result = MagicMock(stdout="5 passed in 0.5s\n", stderr="", returncode=0)
+
+        def run_buffered(args: list[str], *_: object, **__: object) -> MagicMock:
+            calls.append(args)
+            return mock_result
+
+        monkeypatch.setattr(compact_run, "run_buffered", run_buffered)
+        monkeypatch.setattr(compact_run, "STRUCTURED", False)
+        monkeypatch.setattr("sys.argv", ["compact_run.py", *argv])
+        assert compact_run.main() == 0  # noqa: S101
+        assert calls == [argv]  # noqa: S101
+        assert "ok → 5 passed" in capsys.readouterr().out  # noqa: S101
+
     @pytest.mark.parametrize("cmd", ["docker", "podman", "kubectl"])
     def test_routes_container_logs(
         self,
@@ -719,7 +912,7 @@ class TestMain:
         cmd: str,
     ) -> None:
         mock_result = MagicMock(stdout="log line 1\n", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", cmd, "logs", "mycontainer"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -734,7 +927,7 @@ class TestMain:
         cmd: str,
     ) -> None:
         mock_result = MagicMock(stdout="container list\n", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", cmd, "ps"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -749,7 +942,7 @@ class TestMain:
         cmd: str,
     ) -> None:
         mock_result = MagicMock(stdout="", stderr="not found", returncode=1)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", cmd, "run", "img"])
         code = compact_run.main()
         assert code == 1  # noqa: S101
@@ -763,7 +956,7 @@ class TestMain:
         cmd: str,
     ) -> None:
         mock_result = MagicMock(stdout="Tests: 3 passed\n", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", cmd, "test"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -778,7 +971,7 @@ class TestMain:
         cmd: str,
     ) -> None:
         mock_result = MagicMock(stdout="installed\n", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", cmd, "install"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -791,7 +984,7 @@ class TestMain:
         capsys: pytest.CaptureFixture[str],
     ) -> None:
         mock_result = MagicMock(stdout="Tests: 8 passed\n", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "npx", "vitest"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -806,7 +999,7 @@ class TestMain:
         mock_result = MagicMock(
             stdout="test result: ok. 5 passed; 0 failed\n", stderr="", returncode=0
         )
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "cargo", "test"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -819,7 +1012,7 @@ class TestMain:
         capsys: pytest.CaptureFixture[str],
     ) -> None:
         mock_result = MagicMock(stdout="ok  \tpkg\t0.1s\n", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "go", "test"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -832,7 +1025,7 @@ class TestMain:
         capsys: pytest.CaptureFixture[str],
     ) -> None:
         mock_result = MagicMock(stdout="done\n", stderr="", returncode=0)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "make", "test"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -847,7 +1040,7 @@ class TestMain:
         mock_result = MagicMock(
             stdout="some output\n", stderr="some warning\n", returncode=0
         )
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "ls", "-la"])
         code = compact_run.main()
         assert code == 0  # noqa: S101
@@ -864,7 +1057,7 @@ class TestMain:
         def raise_fnf(*_args: object, **_kwargs: object) -> None:
             raise FileNotFoundError("no such file")
 
-        monkeypatch.setattr(compact_run.subprocess, "run", raise_fnf)
+        monkeypatch.setattr(compact_run, "run_buffered", raise_fnf)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "nonexistent"])
         code = compact_run.main()
         assert code == 1  # noqa: S101  # Hook-compliant exit code (0/1/2 only)
@@ -879,7 +1072,7 @@ class TestMain:
         def raise_os(*_args: object, **_kwargs: object) -> None:
             raise OSError("permission denied")
 
-        monkeypatch.setattr(compact_run.subprocess, "run", raise_os)
+        monkeypatch.setattr(compact_run, "run_buffered", raise_os)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "badcmd"])
         code = compact_run.main()
         assert code == 1  # noqa: S101
@@ -892,7 +1085,695 @@ class TestMain:
         capsys: pytest.CaptureFixture[str],
     ) -> None:
         mock_result = MagicMock(stdout="", stderr="err\n", returncode=42)
-        monkeypatch.setattr(compact_run.subprocess, "run", lambda *a, **kw: mock_result)
+        monkeypatch.setattr(compact_run, "run_buffered", lambda *a, **kw: mock_result)
         monkeypatch.setattr("sys.argv", ["compact_run.py", "unknown_cmd"])
         code = compact_run.main()
         assert code == 42  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Test-result memo (COMPACT_RUN_MEMO=1)
+# ---------------------------------------------------------------------------
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+class TestMemo:
+    # Counts its runs in a file outside the repository, optionally edits a
+    # tracked file, then prints a summary the family's pattern picks up
+    SCRIPT = (
+        "import pathlib, sys\n"
+        "runs = pathlib.Path(sys.argv[1])\n"
+        "runs.write_text(runs.read_text() + 'x' if runs.exists() else 'x')\n"
+        "if len(sys.argv) > 2: pathlib.Path('src.py').write_text('x = 9\\n')\n"
+        "print('noise')\n"
+        "print('5 passed')\n"
+    )
+
+    @pytest.fixture
+    def repo(
+        self, compact_run: ModuleType, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> Path:
+        repo = tmp_path / "repo"
+        (repo / ".claude").mkdir(parents=True)
+        (repo / "src.py").write_text("x = 1\n")
+        (repo / ".claude" / "compact_run.toml").write_text(
+            f'[families."{compact_run.command_name(sys.executable)}"]\n'
+            'summary = "\\\\d+ passed"\nmemo = true\n'
+        )
+        for args in (
+            ["init", "-q"],
+            ["add", "."],
+            ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"],
+        ):
+            subprocess.run(["git", *args], cwd=repo, check=True)  # noqa: S603, S607
+        monkeypatch.chdir(repo)
+        monkeypatch.delenv("CLAUDE_PROJECT_DIR", raising=False)
+        monkeypatch.setattr(compact_run, "REGISTRY", compact_run.load_registry(repo))
+        monkeypatch.setattr(compact_run, "MEMO", True)
+        return repo
+
+    def _main(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        *extra: str,
+    ) -> tuple[int, str]:
+        runs = str(Path.cwd().parent / "runs")
+        monkeypatch.setattr(
+            "sys.argv",
+            ["compact_run.py", sys.executable, "-c", self.SCRIPT, runs, *extra],
+        )
+        code = compact_run.main()
+        return code, capsys.readouterr().out
+
+    def _runs(self, repo: Path) -> int:
+        runs = repo.parent / "runs"
+        return len(runs.read_text()) if runs.exists() else 0
+
+    def test_unchanged_tree_replays(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        repo: Path,
+    ) -> None:
+        code, out = self._main(compact_run, monkeypatch, capsys)
+        assert (code, out) == (0, "ok \u2192 5 passed\n")  # noqa: S101
+        code, out = self._main(compact_run, monkeypatch, capsys)
+        assert code == 0  # noqa: S101
+        assert out.startswith("[cached from ")  # noqa: S101
+        assert out.endswith("\nok \u2192 5 passed\n")  # noqa: S101
+        assert self._runs(repo) == 1  # noqa: S101
+
+    def test_changed_inputs_rerun(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        repo: Path,
+    ) -> None:
+        self._main(compact_run, monkeypatch, capsys)
+        (repo / "src.py").write_text("x = 2\n")
+        _, out = self._main(compact_run, monkeypatch, capsys)
+        assert "cached" not in out  # noqa: S101
+        monkeypatch.setenv("PYTEST_ADDOPTS", "-x")
+        _, out = self._main(compact_run, monkeypatch, capsys)
+        assert "cached" not in out  # noqa: S101
+        assert self._runs(repo) == 3  # noqa: S101
+
+    def test_bypass_reruns(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        repo: Path,
+    ) -> None:
+        self._main(compact_run, monkeypatch, capsys)
+        monkeypatch.setattr(compact_run, "MEMO_BYPASS", True)
+        _, out = self._main(compact_run, monkeypatch, capsys)
+        assert out == "ok \u2192 5 passed\n"  # noqa: S101
+        assert self._runs(repo) == 2  # noqa: S101
+
+    def test_run_that_edits_the_tree_not_recorded(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        repo: Path,
+    ) -> None:
+        self._main(compact_run, monkeypatch, capsys, "edit")
+        (repo / "src.py").write_text("x = 1\n")  # back to the keyed tree
+        _, out = self._main(compact_run, monkeypatch, capsys, "edit")
+        assert "cached" not in out  # noqa: S101
+        assert self._runs(repo) == 2  # noqa: S101
+
+    def test_archive_hint_not_replayed(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        repo: Path,
+    ) -> None:
+        monkeypatch.setattr(compact_run, "ARCHIVE", True)
+        monkeypatch.setattr(compact_run, "ARCHIVE_MIN_BYTES", -1000)
+        _, out = self._main(compact_run, monkeypatch, capsys)
+        assert out.splitlines()[-1].startswith("[full output archived: ")  # noqa: S101
+        # The archive may be evicted before the entry is replayed
+        _, out = self._main(compact_run, monkeypatch, capsys)
+        assert out.startswith("[cached from ")  # noqa: S101
+        assert out.endswith("\nok \u2192 5 passed\n")  # noqa: S101
+
+    def test_not_memoized_families_run(
+        self, compact_run: ModuleType, repo: Path
+    ) -> None:
+        assert compact_run.MemoRun.plan(["git", "push"]) is None  # noqa: S101
+        assert compact_run.MemoRun.plan(["go", "build"]) is None  # noqa: S101
+        assert compact_run.MemoRun.plan(["go", "test", "./..."]) is not None  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Streaming capture (COMPACT_RUN_STREAM=1)
+# ---------------------------------------------------------------------------
+def _view_of(compact_run: ModuleType, text: str, **kwargs: object) -> object:
+    view = compact_run.StreamView(**kwargs)
+    lines = text.split("\n")
+    if text.endswith("\n"):
+        lines.pop()
+        view.ends_with_newline = True
+    for line in lines:
+        view.feed_bytes(line.encode())
+    return view
+
+
+class TestStreamView:
+    @pytest.mark.parametrize("text", ["", "one", "a\nb\n", "a\r\nb", "x\n\ny\n"])
+    def test_small_output_is_exact(self, compact_run: ModuleType, text: str) -> None:
+        expected = text.replace("\r\n", "\n")
+        assert _view_of(compact_run, text).text() == expected  # noqa: S101
+
+    def test_elided_lines_counted_by_truncation(self, compact_run: ModuleType) -> None:
+        total = compact_run.MAX_LINES * 3
+        text = "\n".join(f"line {i}" for i in range(total))
+        view = _view_of(compact_run, text)
+        elided = range(compact_run.HEAD_LINES, total - compact_run.MAX_LINES)
+        tokens = sum(len(f"line {i}") // 4 + 1 for i in elided)
+        assert view.text().splitlines()[compact_run.HEAD_LINES] == (  # noqa: S101
+            f"[... {len(elided)} lines elided, ~{tokens} tokens ...]"
+        )
+        assert compact_run.truncated_output(view.text()) == (  # noqa: S101
+            compact_run.truncated_output(text)
+        )
+
+    def test_keeps_pattern_matches_outside_tail(self, compact_run: ModuleType) -> None:
+        lines = ["noise"] * 100 + ["early: 3 files changed"] + ["noise"] * 500
+        view = _view_of(
+            compact_run,
+            "\n".join(lines),
+            keep=compact_run.REGISTRY.family("git").pattern("keep"),
+        )
+        kept = view.text().splitlines()
+        head = compact_run.HEAD_LINES
+        assert kept[head] == (  # noqa: S101
+            f"[... {100 - head} lines elided, ~{200 - 2 * head} tokens ...]"
+        )
+        assert kept[head + 1] == "early: 3 files changed"  # noqa: S101
+        assert kept[head + 2] == "[... 350 lines elided, ~700 tokens ...]"  # noqa: S101
+
+    def test_keeps_error_regions_for_truncation(self, compact_run: ModuleType) -> None:
+        lines = [f"step {i} ok" for i in range(3000)]
+        lines[1200] = "Traceback (most recent call last):"
+        lines[1201] = "ValueError: bad input"
+        text = "\n".join(lines)
+        view_text = _view_of(compact_run, text).text()
+        assert "ValueError: bad input" in view_text  # noqa: S101
+        assert compact_run.truncated_output(view_text) == (  # noqa: S101
+            compact_run.truncated_output(text)
+        )
+
+    def test_pytest_failures_section_matches_full_output(
+        self, compact_run: ModuleType, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        text = "\n".join(
+            ["tests/test_a.py " + "." * 80] * 400
+            + ["=" * 20 + " FAILURES " + "=" * 20]
+            + [f"    assert {i} == 0" for i in range(60)]
+            + ["=" * 10 + " short test summary info " + "=" * 10]
+            + [f"FAILED tests/test_a.py::test_{i}" for i in range(200)]
+            + ["=" * 10 + " 200 failed, 4000 passed in 9.10s " + "=" * 10]
+        )
+        view = _view_of(
+            compact_run,
+            text,
+            keep=compact_run.REGISTRY.family("pytest").pattern("keep"),
+            section=compact_run.STREAM_SECTIONS["pytest"],
+        )
+        compact_run.handle_pytest(text, "", 1)
+        full = capsys.readouterr().out
+        compact_run.handle_pytest(view.text(), "", 1)
+        assert capsys.readouterr().out == full  # noqa: S101
+
+    def test_listeners_see_every_line(self, compact_run: ModuleType) -> None:
+        seen: list[str] = []
+        _view_of(compact_run, "a\nb\nc", listeners=(seen.append,))
+        assert seen == ["a", "b", "c"]  # noqa: S101
+
+
+class TestLogDedup:
+    @pytest.mark.parametrize(
+        "text",
+        ["", "\n\nx", "a\na\na\nb", "\n".join(f"l{i // 4}" for i in range(400))],
+    )
+    def test_matches_string_path(
+        self,
+        compact_run: ModuleType,
+        capsys: pytest.CaptureFixture[str],
+        text: str,
+    ) -> None:
+        compact_run.handle_container_logs(text, "", 0)
+        full = capsys.readouterr().out
+        dedup = compact_run.LogDedup()
+        for line in text.splitlines():
+            dedup.feed(line)
+        compact_run.handle_container_logs("", "", 0, dedup)
+        assert capsys.readouterr().out == full  # noqa: S101
+
+
+class TestStreamingMain:
+    SCRIPT = (
+        "import sys\n"
+        "for i in range(3000):\n"
+        "    print(f'line {i % 9}')\n"
+        "print('x' * 200000)\n"
+        "print('oops', file=sys.stderr)\n"
+        "sys.exit(3)\n"
+    )
+
+    def _run(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        stream: bool,
+    ) -> tuple[int, str, str]:
+        monkeypatch.setattr(compact_run, "STREAM", stream)
+        monkeypatch.setattr(
+            "sys.argv", ["compact_run.py", sys.executable, "-c", self.SCRIPT]
+        )
+        code = compact_run.main()
+        captured = capsys.readouterr()
+        return code, captured.out, captured.err
+
+    def test_output_bounded_and_equivalent(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        code, out, err = self._run(compact_run, monkeypatch, capsys, stream=True)
+        assert code == 3  # noqa: S101
+        assert err == "oops\n\n"  # noqa: S101
+        assert out.startswith("[truncated: 3001 lines total")  # noqa: S101
+        long_line = out.splitlines()[-1]
+        assert long_line.endswith(  # noqa: S101
+            f" [... {200000 - compact_run.MAX_LINE_BYTES} bytes cut]"
+        )
+        _, full_out, _ = self._run(compact_run, monkeypatch, capsys, stream=False)
+        assert out.splitlines()[:-1] == full_out.splitlines()[:-1]  # noqa: S101
+
+    def test_timeout_kills_command(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        monkeypatch.setattr(compact_run, "STREAM", True)
+        monkeypatch.setattr(compact_run, "CMD_TIMEOUT", 0.5)
+        monkeypatch.setattr(
+            "sys.argv",
+            ["compact_run.py", sys.executable, "-c", "import time; time.sleep(30)"],
+        )
+        assert compact_run.main() == 1  # noqa: S101
+        assert "timed out" in capsys.readouterr().err  # noqa: S101
+
+    def test_command_not_found(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        monkeypatch.setattr(compact_run, "STREAM", True)
+        monkeypatch.setattr("sys.argv", ["compact_run.py", "no-such-command-xyz"])
+        assert compact_run.main() == 1  # noqa: S101
+        assert "command not found" in capsys.readouterr().err  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Timeouts: process-group kill, partial output, running step
+# ---------------------------------------------------------------------------
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    status = Path(f"/proc/{pid}/status")
+    # A killed orphan may linger as a zombie until init reaps it
+    return not (status.exists() and "\nState:\tZ" in status.read_text())
+
+
+def _gone(pid: int, timeout: float = 5.0) -> bool:
+    """Whether *pid* exits within *timeout*: SIGKILL is delivered asynchronously."""
+    deadline = time.monotonic() + timeout
+    while _alive(pid):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+class TestRunningStep:
+    def test_pytest_verbose_test_without_result(self, compact_run: ModuleType) -> None:
+        out = "t.py::test_a PASSED [ 50%]\nt.py::test_hang \n\n!!! KeyboardInterrupt !!!\n"
+        assert compact_run.running_step("pytest", out, "") == "t.py::test_hang"  # noqa: S101
+
+    def test_pytest_interrupt_location(self, compact_run: ModuleType) -> None:
+        out = ".\n!!! KeyboardInterrupt !!!\n/src/t.py:3: KeyboardInterrupt\n1 passed\n"
+        assert compact_run.running_step("pytest", out, "") == "/src/t.py:3"  # noqa: S101
+
+    def test_go_last_unfinished_test(self, compact_run: ModuleType) -> None:
+        out = (
+            "=== RUN   TestA\n--- PASS: TestA (0.00s)\n=== RUN   TestB\n"
+            "=== RUN   TestB/slow\n=== PAUSE TestB/slow\n=== RUN   TestC\n"
+            "--- PASS: TestC (0.00s)\n"
+        )
+        assert compact_run.running_step("go", out, "") == "TestB"  # noqa: S101
+
+    def test_cargo_slow_test_notice(self, compact_run: ModuleType) -> None:
+        out = "test a::ok ... ok\ntest a::hangs has been running for over 60 seconds\n"
+        assert compact_run.running_step("cargo", out, "") == "a::hangs"  # noqa: S101
+
+    def test_other_commands_last_output_line(self, compact_run: ModuleType) -> None:
+        step = compact_run.running_step("make", "step 1\nstep 2\n\n", "")
+        assert step == "last output: step 2"  # noqa: S101
+        assert compact_run.running_step("make", "", "") is None  # noqa: S101
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX process groups")
+class TestTimeout:
+    # Starts a grandchild, reports its pid, prints progress, then hangs
+    SCRIPT = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        "print(f'pid {child.pid}')\n"
+        "print('step 1')\n"
+        "print('step 2', flush=True)\n"
+        "time.sleep(60)\n"
+    )
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_partial_output_kept_and_group_killed(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        stream: bool,
+    ) -> None:
+        monkeypatch.setattr(compact_run, "STREAM", stream)
+        monkeypatch.setattr(compact_run, "CMD_TIMEOUT", 1.5)
+        monkeypatch.setattr(
+            "sys.argv", ["compact_run.py", sys.executable, "-c", self.SCRIPT]
+        )
+        assert compact_run.main() == 1  # noqa: S101
+        captured = capsys.readouterr()
+        assert "timed out after 1.5s" in captured.err  # noqa: S101
+        assert "[still running at the deadline: last output: step 2]" in captured.err  # noqa: S101
+        assert "step 1\nstep 2" in captured.out  # noqa: S101
+        grandchild = int(captured.out.split("pid ")[1].split()[0])
+        assert _gone(grandchild)  # noqa: S101
+
+    @pytest.mark.integration
+    @pytest.mark.skipif(shutil.which("pytest") is None, reason="pytest not on PATH")
+    def test_hanging_pytest_names_the_test(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: Path,
+    ) -> None:
+        tests = tmp_path / "test_hang.py"
+        tests.write_text(
+            "import time\n\n"
+            "def test_quick():\n    pass\n\n"
+            "def test_hang():\n    time.sleep(60)\n"
+        )
+        monkeypatch.setattr(compact_run, "CMD_TIMEOUT", 5)
+        monkeypatch.setattr(
+            "sys.argv",
+            ["compact_run.py", "pytest", "-v", "-p", "no:cacheprovider", str(tests)],
+        )
+        assert compact_run.main() == 1  # noqa: S101
+        captured = capsys.readouterr()
+        assert "still running at the deadline: " in captured.err  # noqa: S101
+        assert "test_hang.py::test_hang]" in captured.err  # noqa: S101
+        assert "test_quick PASSED" in captured.out  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Structured test reports (COMPACT_RUN_STRUCTURED=1)
+# ---------------------------------------------------------------------------
+LIBTEST_JSON = ["-Z", "unstable-options", "--format", "json", "--report-time"]
+
+
+class TestStructuredPlan:
+    def test_pytest_gets_junitxml(self, compact_run: ModuleType) -> None:
+        run = compact_run.StructuredRun.plan(["pytest", "-q", "tests/"])
+        try:
+            assert run.args == ["pytest", f"--junitxml={run.junit}", "-q", "tests/"]  # noqa: S101
+        finally:
+            run.cleanup()
+
+    @pytest.mark.parametrize(
+        "args", [["pytest", "--junitxml", "out.xml"], ["pytest", "--junit-xml=out.xml"]]
+    )
+    def test_pytest_user_report_left_alone(
+        self, compact_run: ModuleType, args: list[str]
+    ) -> None:
+        run = compact_run.StructuredRun.plan(args)
+        assert (run.args, run.junit) == (args, "out.xml")  # noqa: S101
+
+    @pytest.mark.parametrize(
+        ("args", "expected"),
+        [
+            (["go", "test", "./..."], ["go", "test", "-json", "./..."]),
+            (["go", "test", "-json", "./..."], ["go", "test", "-json", "./..."]),
+            (["go", "test", "-json=false"], None),
+            (["go", "build"], None),
+        ],
+    )
+    def test_go(
+        self, compact_run: ModuleType, args: list[str], expected: list[str] | None
+    ) -> None:
+        run = compact_run.StructuredRun.plan(args)
+        assert (run.args if run else None) == expected  # noqa: S101
+
+    @pytest.mark.parametrize(
+        ("args", "toolchain", "expected"),
+        [
+            (["cargo", "test"], "", None),
+            (
+                ["cargo", "+nightly", "test", "--", "--nocapture"],
+                "",
+                ["cargo", "+nightly", "test", "--", "--nocapture", *LIBTEST_JSON],
+            ),
+            (
+                ["cargo", "test"],
+                "nightly-2026-01-01",
+                ["cargo", "test", "--", *LIBTEST_JSON],
+            ),
+            (["cargo", "test", "--", "--format", "terse"], "nightly", None),
+            (
+                ["cargo", "test", "--", "--format=json"],
+                "",
+                ["cargo", "test", "--", "--format=json"],
+            ),
+        ],
+    )
+    def test_cargo(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        args: list[str],
+        toolchain: str,
+        expected: list[str] | None,
+    ) -> None:
+        monkeypatch.setenv("RUSTUP_TOOLCHAIN", toolchain)
+        monkeypatch.delenv("RUSTC_BOOTSTRAP", raising=False)
+        run = compact_run.StructuredRun.plan(args)
+        assert (run.args if run else None) == expected  # noqa: S101
+
+    def test_other_commands_not_planned(self, compact_run: ModuleType) -> None:
+        assert compact_run.StructuredRun.plan(["git", "push"]) is None  # noqa: S101
+
+    def test_launcher_kept_in_front(self, compact_run: ModuleType) -> None:
+        run = compact_run.StructuredRun.plan(["uv", "run", "pytest", "-q"])
+        try:
+            expected = ["uv", "run", "pytest", f"--junitxml={run.junit}", "-q"]
+            assert run.args == expected  # noqa: S101
+        finally:
+            run.cleanup()
+        timed = compact_run.StructuredRun.plan(["timeout", "60", "go", "test"])
+        assert timed.args == ["timeout", "60", "go", "test", "-json"]  # noqa: S101
+
+
+class TestStructuredMain:
+    @pytest.fixture
+    def project(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+        (tmp_path / "test_sample.py").write_text(
+            "def test_ok():\n    pass\n\n"
+            "def test_bad():\n    assert 1 == 2, 'numbers differ'\n",
+            encoding="utf-8",
+        )
+        monkeypatch.chdir(tmp_path)
+        return tmp_path
+
+    def _main(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        *args: str,
+    ) -> int:
+        monkeypatch.setattr(compact_run, "STRUCTURED", True)
+        monkeypatch.setattr(
+            "sys.argv",
+            ["compact_run.py", "pytest", "-p", "no:cacheprovider", *args],
+        )
+        return compact_run.main()
+
+    @pytest.mark.skipif(not shutil.which("pytest"), reason="pytest not on PATH")
+    def test_failures_from_junit(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        project: Path,
+    ) -> None:
+        assert self._main(compact_run, monkeypatch, "-q") == 1  # noqa: S101
+        out = capsys.readouterr().out.splitlines()
+        assert out[0].startswith("FAILED test_sample::test_bad (")  # noqa: S101
+        assert out[1] == "  AssertionError: numbers differ"  # noqa: S101
+        assert out[-1].startswith("1 failed, 1 passed in ")  # noqa: S101
+        assert list(project.iterdir()) == [project / "test_sample.py"]  # noqa: S101
+
+    @pytest.mark.skipif(not shutil.which("pytest"), reason="pytest not on PATH")
+    def test_usage_error_falls_back(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        project: Path,
+    ) -> None:
+        assert self._main(compact_run, monkeypatch, "--no-such-option") == 4  # noqa: S101
+        assert "unrecognized arguments" in capsys.readouterr().err  # noqa: S101
+
+
+class TestArchive:
+    SCRIPT = (
+        "import sys\n"
+        "for i in range(3000):\n"
+        "    print(f'line {i}')\n"
+        "print('warning: late', file=sys.stderr)\n"
+    )
+
+    @pytest.fixture(autouse=True)
+    def _archive(
+        self, compact_run: ModuleType, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        monkeypatch.setenv("CLAUDE_PROJECT_DIR", str(tmp_path))
+        monkeypatch.setattr(compact_run, "ARCHIVE", True)
+
+    def _main(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        *argv: str,
+    ) -> tuple[int, str, str]:
+        monkeypatch.setattr("sys.argv", ["compact_run.py", *argv])
+        code = compact_run.main()
+        captured = capsys.readouterr()
+        return code, captured.out, captured.err
+
+    def _handle(self, out: str) -> str:
+        hint = out.splitlines()[-1]
+        assert hint.startswith("[full output archived: ")  # noqa: S101
+        return hint.split(" --show ")[1].split()[0]
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_dropped_lines_read_back(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        stream: bool,
+    ) -> None:
+        monkeypatch.setattr(compact_run, "STREAM", stream)
+        code, out, _ = self._main(
+            compact_run, monkeypatch, capsys, sys.executable, "-c", self.SCRIPT
+        )
+        assert code == 0 and "line 1500" not in out  # noqa: S101
+        handle = self._handle(out)
+        show = ("--show", handle)
+        code, out, _ = self._main(
+            compact_run, monkeypatch, capsys, *show, "--range", "1500-1502"
+        )
+        assert code == 0  # noqa: S101
+        assert out == "1500:line 1499\n1501:line 1500\n1502:line 1501\n"  # noqa: S101
+        _, out, _ = self._main(
+            compact_run, monkeypatch, capsys, *show, "--grep", "^line 29[0-9]$"
+        )
+        assert out.splitlines() == [f"{i + 1}:line {i}" for i in range(290, 300)]  # noqa: S101
+        _, out, _ = self._main(compact_run, monkeypatch, capsys, *show, "--stderr")
+        assert out == "1:warning: late\n"  # noqa: S101
+
+    def test_uncompressed_output_not_archived(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: Path,
+    ) -> None:
+        _, out, _ = self._main(
+            compact_run, monkeypatch, capsys, sys.executable, "-c", "print('hi')"
+        )
+        assert out.strip() == "hi"  # noqa: S101
+        state = tmp_path / ".claude" / "state"
+        assert not (state / "compact_run_archive").exists()  # noqa: S101
+
+    def test_archived_at_work_tree_top(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: Path,
+    ) -> None:
+        repo = tmp_path / "repo"
+        (repo / ".git").mkdir(parents=True)
+        (repo / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+        (repo / "sub").mkdir()
+        monkeypatch.chdir(repo / "sub")
+        monkeypatch.delenv("CLAUDE_PROJECT_DIR")
+        _, out, _ = self._main(
+            compact_run, monkeypatch, capsys, sys.executable, "-c", self.SCRIPT
+        )
+        handle = self._handle(out)
+        assert (repo / ".claude" / "state" / "compact_run_archive").is_dir()  # noqa: S101
+        assert not (repo / "sub" / ".claude").exists()  # noqa: S101
+        code, out, _ = self._main(compact_run, monkeypatch, capsys, "--show", handle)
+        assert code == 0 and "\n1:line 0\n" in out  # noqa: S101
+
+    def test_hint_uses_rewrite_interpreter(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        monkeypatch.setenv("UV_CACHE_DIR", str(tmp_path / "uv-cache"))
+        hint = compact_run.show_hint("0badf00d")
+        assert hint.startswith(f"[full output archived: {sys.executable} -I -S ")  # noqa: S101
+        # uv deletes its script environment once compact_run exits
+        ephemeral = (
+            tmp_path / "uv-cache" / "builds-v0" / ".tmpAbC123" / "bin" / "python"
+        )
+        monkeypatch.setattr(sys, "executable", str(ephemeral))
+        hint = compact_run.show_hint("0badf00d")
+        assert "archived: uv run --no-project --script " in hint  # noqa: S101
+
+    def test_show_errors(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        show = ("--show", "0badf00d")
+        code, _, err = self._main(compact_run, monkeypatch, capsys, *show)
+        assert code == 1 and "evicted or never recorded" in err  # noqa: S101
+        with pytest.raises(SystemExit):
+            self._main(compact_run, monkeypatch, capsys, *show, "--range", "9-3")
@@ -0,0 +1,157 @@
+"""Tests for hooks/lib/compression_stats.py and scripts/compression_report.py."""
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def stats(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    monkeypatch.syspath_prepend(str(PROJECT_ROOT / "hooks" / "lib"))
+    return load_module_from_file(
+        "compression_stats", PROJECT_ROOT / "hooks" / "lib" / "compression_stats.py"
+    )
+
+
+@pytest.fixture
+def reporter(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    monkeypatch.syspath_prepend(str(PROJECT_ROOT / "hooks" / "lib"))
+    return load_module_from_file(
+        "compression_report", PROJECT_ROOT / "scripts" / "compression_report.py"
+    )
+
+
+def _records(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestRecord:
+    def test_noted_fields_recorded_once(
+        self, stats: ModuleType, tmp_path: Path
+    ) -> None:
+        stats.note(raw_stdout=4000, raw_stderr=100, timed_out=True)
+        stats.record("pytest", 100, exit_code=1, wall_ms=1234.56, state=tmp_path)
+        stats.record("git", emitted=10, exit_code=0, wall_ms=5, state=tmp_path)
+        first, second = _records(tmp_path / stats.STATS_FILE)
+        assert first["family"] == "pytest"  # noqa: S101
+        assert (first["raw_stdout"], first["raw_stderr"]) == (4000, 100)  # noqa: S101
+        assert first["saved_tokens"] == 1000  # noqa: S101
+        assert first["timed_out"] is True and first["wall_ms"] == 1234.6  # noqa: S101
+        assert "timed_out" not in second and second["raw_stdout"] == 0  # noqa: S101
+
+    def test_disabled(
+        self, stats: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("COMPACT_RUN_STATS", "0")
+        stats.record("git", emitted=1, exit_code=0, wall_ms=1, state=tmp_path)
+        assert not (tmp_path / stats.STATS_FILE).exists()  # noqa: S101
+
+    def test_size_capped(
+        self, stats: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("COMPACT_RUN_STATS_MAX_KB", "1")
+        for i in range(100):
+            stats.record(f"f{i}", emitted=1, exit_code=0, wall_ms=1, state=tmp_path)
+        records = _records(tmp_path / stats.STATS_FILE)
+        assert (tmp_path / stats.STATS_FILE).stat().st_size <= 1024  # noqa: S101
+        assert records[-1]["family"] == "f99"  # noqa: S101
+
+
+class TestCompactRun:
+    def test_invocation_recorded(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        monkeypatch.setenv("CLAUDE_PROJECT_DIR", str(tmp_path))
+        monkeypatch.setattr(compact_run.compression_stats, "_fields", {})
+        script = "print('\\n'.join(f'line {i}' for i in range(1000)))"
+        argv = ["compact_run.py", sys.executable, "-c", script]
+        monkeypatch.setattr("sys.argv", argv)
+        assert compact_run.recorded_main() == 0  # noqa: S101
+        shown = capsys.readouterr().out
+        state = tmp_path / ".claude" / "state"
+        (record,) = _records(state / "compact_run_stats.jsonl")
+        raw = sum(len(f"line {i}\n") for i in range(1000))
+        assert record["family"] is None and record["raw_stdout"] == raw  # noqa: S101
+        assert record["emitted"] == len(shown.encode())  # noqa: S101
+        assert record["saved_tokens"] > 0 and record["exit_code"] == 0  # noqa: S101
+
+    def test_recorded_at_work_tree_top(
+        self,
+        compact_run: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        (tmp_path / ".git").mkdir()
+        (tmp_path / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+        (tmp_path / "sub").mkdir()
+        monkeypatch.chdir(tmp_path / "sub")
+        monkeypatch.delenv("CLAUDE_PROJECT_DIR", raising=False)
+        monkeypatch.setattr(compact_run.compression_stats, "_fields", {})
+        argv = ["compact_run.py", sys.executable, "-c", "print('hi')"]
+        monkeypatch.setattr("sys.argv", argv)
+        assert compact_run.recorded_main() == 0  # noqa: S101
+        state = tmp_path / ".claude" / "state"
+        assert len(_records(state / "compact_run_stats.jsonl")) == 1  # noqa: S101
+        assert not (tmp_path / "sub" / ".claude").exists()  # noqa: S101
+
+
+class TestReport:
+    RECORDS = (
+        {"ts": 0, "family": "git", "raw_stdout": 4096, "raw_stderr": 0,
+         "emitted": 40, "saved_tokens": 1014, "exit_code": 0, "wall_ms": 100},
+        {"ts": 0, "family": "git", "raw_stdout": 2048, "raw_stderr": 0,
+         "emitted": 2048, "saved_tokens": 0, "exit_code": 1, "wall_ms": 300},
+        {"ts": 86400 * 2, "family": None, "raw_stdout": 10, "raw_stderr": 0,
+         "emitted": 10, "saved_tokens": 0, "exit_code": 0, "wall_ms": 5,
+         "cached": True},
+    )  # fmt: skip
+
+    def test_aggregate(self, reporter: ModuleType) -> None:
+        records = list(self.RECORDS)
+        git = reporter.aggregate(records, reporter.family_of)["git"]
+        assert (git["runs"], git["failed"], git["cached"]) == (2, 1, 0)  # noqa: S101
+        assert (git["raw"], git["shown"]) == (6144, 2088)  # noqa: S101
+        assert git["saved"] == 1014  # noqa: S101
+        other = reporter.aggregate(records, reporter.family_of)[reporter.OTHER]
+        assert other["cached"] == 1  # noqa: S101
+        assert len(reporter.aggregate(records, reporter.day_of)) == 2  # noqa: S101
+
+    def test_report_tables(self, reporter: ModuleType) -> None:
+        text = reporter.report(list(self.RECORDS))
+        assert text.startswith("3 wrapped commands, ~1,014 tokens saved")  # noqa: S101
+        row = next(line for line in text.splitlines() if line.startswith("git "))
+        assert row.split() == [  # noqa: S101
+            "git", "2", "1", "0", "0", "6.0", "KiB", "2.0", "KiB", "34.0%", "1,014",
+            "200",
+        ]  # fmt: skip
+
+    def test_cli(self, tmp_path: Path) -> None:
+        path = tmp_path / "stats.jsonl"
+        recent = dict(self.RECORDS[0], ts=time.time())
+        path.write_text(
+            "\n".join(json.dumps(r) for r in (*self.RECORDS, recent)) + "\n{broken"
+        )
+        script = str(PROJECT_ROOT / "scripts" / "compression_report.py")
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, script, "--input", str(path), "--days", "1", "--json"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert json.loads(result.stdout)["families"]["git"]["runs"] == 1  # noqa: S101
+        missing = subprocess.run(  # noqa: S603
+            [sys.executable, script, "--input", str(tmp_path / "none.jsonl")],
+            capture_output=True,
+            text=True,
+        )
+        assert missing.returncode == 1  # noqa: S101
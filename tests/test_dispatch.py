@@ -0,0 +1,189 @@
+"""Tests for hooks/PreToolUse/dispatch.py (single PreToolUse dispatcher)."""
+
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+PRE_TOOL_USE = PROJECT_ROOT / "hooks" / "PreToolUse"
+DISPATCH = PRE_TOOL_USE / "dispatch.py"
+# Order matches the former plugin-hooks.json PreToolUse entries
+SEPARATE_HOOKS = [
+    PRE_TOOL_USE / "validate_task_graph_compliance.py",
+    PRE_TOOL_USE / "require_delegation.py",
+    PRE_TOOL_USE / "token_rewrite_hook.py",
+]
+_UV = shutil.which("uv") or "uv"
+
+TASK_GRAPH = {
+    "current_wave": 0,
+    "waves": [
+        {"wave_id": 0, "phases": [{"phase_id": "phase_0_0"}]},
+        {"wave_id": 1, "phases": [{"phase_id": "phase_1_0"}]},
+    ],
+}
+
+
+def _run(
+    script: Path, stdin: str, project_dir: Path, env_extra: dict[str, str]
+) -> tuple[str, str, int]:
+    env = os.environ.copy()
+    env["CLAUDE_PROJECT_DIR"] = str(project_dir)
+    env.pop("CLAUDE_PARENT_SESSION_ID", None)
+    env.pop("CLAUDE_AGENT_ID", None)
+    env.update(env_extra)
+    result = subprocess.run(  # noqa: S603
+        [_UV, "run", "--no-project", "--script", str(script)],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=str(PROJECT_ROOT),
+        timeout=10,
+    )
+    return result.stdout, result.stderr, result.returncode
+
+
+def _project(root: Path, state_files: dict[str, str]) -> Path:
+    state = root / ".claude" / "state"
+    state.mkdir(parents=True)
+    for name, content in state_files.items():
+        (state / name).write_text(content, encoding="utf-8")
+    return root
+
+
+# ---------------------------------------------------------------------------
+# Equivalence with the three separate hooks
+# ---------------------------------------------------------------------------
+
+CASES = {
+    "bash_wrappable": (
+        {"tool_name": "Bash", "tool_input": {"command": "git push origin main"}},
+        {},
+        {},
+    ),
+    "bash_cd_prefix": (
+        {"tool_name": "Bash", "tool_input": {"command": "cd /tmp && pytest -q"}},
+        {},
+        {},
+    ),
+    "bash_not_wrappable": (
+        {"tool_name": "Bash", "tool_input": {"command": "ls -la"}},
+        {},
+        {},
+    ),
+    "edit_second_violation": (
+        {"tool_name": "Edit", "tool_input": {}},
+        {"delegation_violations.json": '{"violations": 1}'},
+        {},
+    ),
+    "delegation_active": (
+        {"tool_name": "Bash", "tool_input": {"command": "pytest"}},
+        {"delegation_active": ""},
+        {},
+    ),
+    "subagent": (
+        {"tool_name": "Bash", "tool_input": {"command": "pytest"}},
+        {},
+        {"CLAUDE_AGENT_ID": "agent-1"},
+    ),
+    "token_efficiency_off": (
+        {"tool_name": "Bash", "tool_input": {"command": "pytest"}},
+        {},
+        {"CLAUDE_TOKEN_EFFICIENCY": "0"},
+    ),
+    "agent_out_of_order_wave": (
+        {"tool_name": "Agent", "prompt": "Phase ID: phase_1_0\nDo it"},
+        {"active_task_graph.json": json.dumps(TASK_GRAPH)},
+        {},
+    ),
+    "agent_missing_phase_marker": (
+        {"tool_name": "Agent", "prompt": "no marker"},
+        {"active_task_graph.json": json.dumps(TASK_GRAPH)},
+        {},
+    ),
+    "read_tool": ({"tool_name": "Read", "tool_input": {}}, {}, {}),
+}
+
+
+class TestMatchesSeparateHooks:
+    @pytest.mark.parametrize("case", sorted(CASES))
+    def test_same_output_and_state(self, tmp_path: Path, case: str) -> None:
+        payload, state_files, env = CASES[case]
+        stdin = json.dumps(payload)
+        separate = _project(tmp_path / "separate", state_files)
+        combined = _project(tmp_path / "combined", state_files)
+
+        outs, errs = [], []
+        for hook in SEPARATE_HOOKS:
+            out, err, rc = _run(hook, stdin, separate, env)
+            assert rc == 0  # noqa: S101
+            outs.append(out)
+            errs.append(err)
+
+        out, err, rc = _run(DISPATCH, stdin, combined, env)
+        assert rc == 0  # noqa: S101
+        assert out == "".join(outs)  # noqa: S101
+        assert err == "".join(errs)  # noqa: S101
+
+        counter = Path(".claude") / "state" / "state.json"
+        sep_counter = separate / counter
+        comb_counter = combined / counter
+        assert sep_counter.exists() == comb_counter.exists()  # noqa: S101
+        if sep_counter.exists():
+            assert sep_counter.read_text() == comb_counter.read_text()  # noqa: S101
+
+    @pytest.mark.parametrize("stdin", ["", "not json", "[1, 2]"])
+    def test_unparseable_payload_is_silent(self, tmp_path: Path, stdin: str) -> None:
+        out, err, rc = _run(DISPATCH, stdin, tmp_path, {})
+        assert (out, err, rc) == ("", "", 0)  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Stage error isolation
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def dispatch_module() -> ModuleType:
+    return load_module_from_file("dispatch", DISPATCH)
+
+
+def _boom(*_args: object) -> None:
+    msg = "boom"
+    raise RuntimeError(msg)
+
+
+class TestStageErrors:
+    def test_failing_hint_stage_keeps_other_stages(
+        self, dispatch_module: ModuleType, tmp_path: Path
+    ) -> None:
+        dispatch_module.HINT_STAGES[0] = ("validate_task_graph_compliance", _boom)
+        lines, updated, failed = dispatch_module.dispatch(
+            {"tool_name": "Bash", "tool_input": {"command": "pytest"}}, tmp_path
+        )
+        assert failed  # noqa: S101
+        assert lines[0] == "validate_task_graph_compliance hook error: boom"  # noqa: S101
+        assert updated is not None  # noqa: S101
+        assert updated["command"].endswith("compact_run.py pytest")  # noqa: S101
+
+    def test_failing_rewrite_stage_reports_error(
+        self,
+        dispatch_module: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(
+            dispatch_module.token_rewrite_hook, "rewrite_command", _boom
+        )
+        lines, updated, failed = dispatch_module.dispatch(
+            {"tool_name": "Read"}, tmp_path
+        )
+        assert failed  # noqa: S101
+        assert updated is None  # noqa: S101
+        assert lines == ["token_rewrite_hook hook error: boom"]  # noqa: S101
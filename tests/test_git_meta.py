@@ -0,0 +1,222 @@
+"""Tests for hooks/lib/git_meta.py -- git metadata read without spawning git."""
+
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+    "GIT_CONFIG_NOSYSTEM": "1",
+}
+
+
+@pytest.fixture
+def git_meta(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> ModuleType:
+    monkeypatch.syspath_prepend(str(PROJECT_ROOT / "hooks" / "lib"))  # lazy_import
+    module = load_module_from_file(
+        "git_meta", PROJECT_ROOT / "hooks" / "lib" / "git_meta.py"
+    )
+    for name in module.GIT_ENV:
+        monkeypatch.delenv(name, raising=False)
+    for name, value in GIT_ENV.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("HOME", str(tmp_path))  # no user config
+    return module
+
+
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.run(  # noqa: S603
+        ["git", *args],  # noqa: S607
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def _repo(tmp_path: Path) -> Path:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    (repo / "a.py").write_text("a = 1\n")
+    (repo / "sub").mkdir()
+    (repo / "sub" / "b.py").write_text("b = 1\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "initial")
+    return repo
+
+
+def _expected_staged(repo: Path) -> list[tuple[str, str]]:
+    fields = _git(repo, "diff", "--cached", "--name-status", "-z").split("\0")
+    changes, i = [], 0
+    while i < len(fields) and fields[i]:
+        paths = 2 if fields[i][0] in "RC" else 1
+        changes.append((fields[i], fields[i + paths]))
+        i += 1 + paths
+    return changes
+
+
+def _no_git(git_meta: ModuleType, monkeypatch: pytest.MonkeyPatch) -> list:
+    calls: list[tuple] = []
+
+    def recording(cwd: object, *args: str) -> None:
+        calls.append(args)
+        return None
+
+    monkeypatch.setattr(git_meta, "_run_git", recording)
+    return calls
+
+
+class TestBranch:
+    def test_branch_matches_git(
+        self, git_meta: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        repo = _repo(tmp_path)
+        _git(repo, "checkout", "-q", "-b", "feature/x")
+        head = _git(repo, "rev-parse", "HEAD").strip()
+        _git(repo, "pack-refs", "--all")  # refs only in packed-refs now
+        calls = _no_git(git_meta, monkeypatch)
+
+        assert git_meta.current_branch(repo / "sub") == "feature/x"  # noqa: S101
+        assert git_meta.head_commit(repo) == head  # noqa: S101
+        assert git_meta.in_git_repo(repo / "sub")  # noqa: S101
+        _git(repo, "checkout", "-q", "--detach")
+        assert git_meta.current_branch(repo) == ""  # noqa: S101
+        assert git_meta.head_commit(repo) == head  # noqa: S101
+        assert calls == []  # noqa: S101
+
+    def test_unborn_branch(self, git_meta: ModuleType, tmp_path: Path) -> None:
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        _git(repo, "init", "-q", "-b", "trunk")
+        assert git_meta.current_branch(repo) == "trunk"  # noqa: S101
+        assert git_meta.head_commit(repo) is None  # noqa: S101
+
+    def test_worktree(self, git_meta: ModuleType, tmp_path: Path) -> None:
+        repo = _repo(tmp_path)
+        _git(repo, "worktree", "add", "-q", "-b", "wt", str(tmp_path / "wt"))
+        (tmp_path / "wt" / "a.py").write_text("a = 2\n")
+        _git(tmp_path / "wt", "add", "a.py")
+
+        git = git_meta.find_git_dir(tmp_path / "wt")
+        assert git.common == repo / ".git"  # noqa: S101
+        assert git_meta.work_tree(repo / "sub") == repo  # noqa: S101
+        assert git_meta.work_tree(tmp_path / "wt") == tmp_path / "wt"  # noqa: S101
+        assert git_meta.current_branch(tmp_path / "wt") == "wt"  # noqa: S101
+        assert git_meta.current_branch(repo) == "main"  # noqa: S101
+        assert git_meta.staged_changes(tmp_path / "wt") == [("M", "a.py")]  # noqa: S101
+        assert git_meta.staged_changes(repo) == []  # noqa: S101
+
+    def test_outside_repository(self, git_meta: ModuleType, tmp_path: Path) -> None:
+        assert git_meta.find_git_dir(tmp_path) is None  # noqa: S101
+        assert git_meta.work_tree(tmp_path) is None  # noqa: S101
+        assert git_meta.current_branch(tmp_path) is None  # noqa: S101
+        assert not git_meta.in_git_repo(tmp_path)  # noqa: S101
+        assert git_meta.staged_changes(tmp_path) is None  # noqa: S101
+
+    def test_git_dir_in_environment_falls_back(
+        self, git_meta: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        repo = _repo(tmp_path)
+        elsewhere = tmp_path / "elsewhere"
+        elsewhere.mkdir()
+        monkeypatch.setenv("GIT_DIR", str(repo / ".git"))
+        assert git_meta.current_branch(elsewhere) == "main"  # noqa: S101
+
+
+class TestIndex:
+    @pytest.mark.parametrize("version", [2, 3, 4])
+    def test_entries_match_ls_files(
+        self, git_meta: ModuleType, tmp_path: Path, version: int
+    ) -> None:
+        repo = _repo(tmp_path)
+        for name in ("sub/b2.py", "sub/deeper/c.py", "z" * 70 + ".txt"):
+            (repo / name).parent.mkdir(parents=True, exist_ok=True)
+            (repo / name).write_text(name)
+        _git(repo, "add", ".")
+        _git(repo, "update-index", "--index-version", str(version))
+        if version == 3:
+            (repo / "later.py").write_text("")
+            _git(repo, "add", "--intent-to-add", "later.py")  # extended flags
+
+        entries, _ = git_meta.read_index(repo / ".git" / "index")
+        listed = [
+            line.split("\t")[1] for line in _git(repo, "ls-files", "-s").splitlines()
+        ]
+        assert [entry.path for entry in entries] == listed  # noqa: S101
+
+
+class TestStagedChanges:
+    def test_nothing_staged_read_natively(
+        self, git_meta: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        repo = _repo(tmp_path)
+        calls = _no_git(git_meta, monkeypatch)
+        assert git_meta.staged_changes(repo) == []  # noqa: S101
+        # The HEAD commit in a pack rather than a loose object
+        _git(repo, "gc", "-q")
+        assert git_meta.staged_changes(repo) == []  # noqa: S101
+        assert calls == []  # noqa: S101
+
+    def test_unborn_branch_stages_additions(
+        self, git_meta: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        _git(repo, "init", "-q")
+        (repo / "new.py").write_text("x = 1\n")
+        _git(repo, "add", "new.py")
+        calls = _no_git(git_meta, monkeypatch)
+        assert git_meta.staged_changes(repo) == [("A", "new.py")]  # noqa: S101
+        assert calls == []  # noqa: S101
+
+    def test_changes_match_git(self, git_meta: ModuleType, tmp_path: Path) -> None:
+        repo = _repo(tmp_path)
+        (repo / "a.py").write_text("a = 2\n")
+        (repo / "new file.py").write_text("n = 1\n")
+        _git(repo, "mv", "sub/b.py", "sub/renamed.py")
+        _git(repo, "add", ".")
+        expected = _expected_staged(repo)
+        assert {status[0] for status, _ in expected} == {"A", "M", "R"}  # noqa: S101
+        assert git_meta.staged_changes(repo) == expected  # noqa: S101
+
+    def test_diff_cached_until_index_changes(
+        self, git_meta: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        repo = _repo(tmp_path)
+        cache = tmp_path / "state" / "git_staged.json"
+        (repo / "a.py").write_text("a = 2\n")
+        _git(repo, "add", "a.py")
+        assert git_meta.staged_changes(repo, cache) == [("M", "a.py")]  # noqa: S101
+        assert json.loads(cache.read_text())["changes"] == [["M", "a.py"]]  # noqa: S101
+
+        run_git = git_meta._run_git
+        calls: list[tuple] = []
+
+        def recording(cwd: object, *args: str) -> object:
+            calls.append(args)
+            return run_git(cwd, *args)
+
+        monkeypatch.setattr(git_meta, "_run_git", recording)
+        assert git_meta.staged_changes(repo, cache) == [("M", "a.py")]  # noqa: S101
+        assert calls == []  # noqa: S101
+
+        (repo / "sub" / "b.py").write_text("b = 2\n")
+        _git(repo, "add", "sub/b.py")
+        index = repo / ".git" / "index"
+        st = index.stat()
+        os.utime(index, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        expected = [("M", "a.py"), ("M", "sub/b.py")]
+        assert git_meta.staged_changes(repo, cache) == expected  # noqa: S101
+        assert len(calls) == 1  # noqa: S101
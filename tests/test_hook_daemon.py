@@ -0,0 +1,267 @@
+"""Tests for hooks/hook_daemon.py and hooks/hook_client.py (persistent hook server)."""
+
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="hook daemon requires Unix sockets"
+)
+
+ECHO_HOOK = """\
+import os
+import sys
+
+CALLS = []
+CALLS.append(1)
+data = sys.stdin.read()
+print(f"stdin={data} var={os.environ.get('HOOK_TEST_VAR', '')} "
+      f"cwd={os.path.basename(os.getcwd())} calls={len(CALLS)} argv={sys.argv[1:]}")
+print("stderr ✓", file=sys.stderr)
+sys.exit(3)
+"""
+
+
+class Plugin:
+    """An isolated plugin install with the daemon, client and one test hook."""
+
+    def __init__(self, root: Path) -> None:
+        self.hooks = root / "plugin" / "hooks"
+        (self.hooks / "Test").mkdir(parents=True)
+        for name in ("hook_daemon.py", "hook_client.py"):
+            shutil.copy(PROJECT_ROOT / "hooks" / name, self.hooks / name)
+        shutil.copytree(PROJECT_ROOT / "hooks" / "lib", self.hooks / "lib")
+        (self.hooks / "Test" / "echo_hook.py").write_text(ECHO_HOOK, encoding="utf-8")
+        self.project = root / "p"
+        self.project.mkdir()
+        self.state = self.project / ".claude" / "state"
+
+    def env(self, **extra: str) -> dict[str, str]:
+        env = os.environ.copy()
+        env["CLAUDE_PROJECT_DIR"] = str(self.project)
+        env["CLAUDE_HOOK_DAEMON_IDLE"] = "30"
+        env.update(extra)
+        return env
+
+    def client(self, stdin: str = "", *args: str, **env: str) -> tuple[str, str, int]:
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, str(self.hooks / "hook_client.py"), *args],
+            input=stdin.encode(),
+            capture_output=True,
+            env=self.env(**env),
+            cwd=str(self.project),
+            timeout=10,
+        )
+        return result.stdout.decode(), result.stderr.decode(), result.returncode
+
+    def start_daemon(self) -> None:
+        subprocess.Popen(  # noqa: S603
+            [
+                sys.executable,
+                str(self.hooks / "hook_daemon.py"),
+                "--project-dir",
+                str(self.project),
+            ],
+            env=self.env(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        self.wait_for_socket()
+
+    def wait_for_socket(self, timeout: float = 10.0) -> None:
+        deadline = time.monotonic() + timeout
+        while not (self.state / "hook_daemon.sock").exists():
+            if time.monotonic() > deadline:
+                pytest.fail("hook daemon did not start")
+            time.sleep(0.05)
+
+    def stop_daemon(self) -> None:
+        lock = self.state / "hook_daemon.lock"
+        try:
+            os.kill(int(lock.read_text()), signal.SIGTERM)
+        except (OSError, ValueError):
+            return
+        deadline = time.monotonic() + 5
+        while (self.state / "hook_daemon.sock").exists():
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+
+
+@pytest.fixture
+def plugin() -> Iterator[Plugin]:
+    # Short base path: AF_UNIX socket paths are limited to ~104 bytes.
+    root = Path(tempfile.mkdtemp(prefix="hd-"))
+    p = Plugin(root)
+    try:
+        yield p
+    finally:
+        p.stop_daemon()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Local fallback
+# ---------------------------------------------------------------------------
+
+
+class TestLocalFallback:
+    def test_disabled_daemon_runs_hook_in_process(self, plugin: Plugin) -> None:
+        out, err, rc = plugin.client(
+            "payload", "Test/echo_hook.py", "x", CLAUDE_HOOK_DAEMON="0"
+        )
+        assert rc == 3  # noqa: S101
+        assert "stdin=payload" in out  # noqa: S101
+        assert "argv=['x']" in out  # noqa: S101
+        assert "stderr ✓" in err  # noqa: S101
+        assert not (plugin.state / "hook_daemon.sock").exists()  # noqa: S101
+
+    def test_missing_daemon_autostarts_one(self, plugin: Plugin) -> None:
+        out, _, rc = plugin.client("first", "Test/echo_hook.py")
+        assert rc == 3  # noqa: S101
+        assert "stdin=first" in out  # noqa: S101
+        plugin.wait_for_socket()
+
+    def test_usage_error(self, plugin: Plugin) -> None:
+        _, err, rc = plugin.client("", CLAUDE_HOOK_DAEMON="0")
+        assert rc == 1  # noqa: S101
+        assert "Usage" in err  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Daemon round trip
+# ---------------------------------------------------------------------------
+
+
+class TestDaemon:
+    def test_relays_exit_code_and_streams(self, plugin: Plugin) -> None:
+        plugin.start_daemon()
+        out, err, rc = plugin.client(
+            '{"k": "é"}', "Test/echo_hook.py", "a", HOOK_TEST_VAR="v1"
+        )
+        assert rc == 3  # noqa: S101
+        assert 'stdin={"k": "é"}' in out  # noqa: S101
+        assert "var=v1" in out  # noqa: S101
+        assert "cwd=p" in out  # noqa: S101
+        assert "argv=['a']" in out  # noqa: S101
+        assert err == "stderr ✓\n"  # noqa: S101
+
+    def test_each_call_gets_fresh_module_globals(self, plugin: Plugin) -> None:
+        plugin.start_daemon()
+        for _ in range(3):
+            out, _, _ = plugin.client("", "Test/echo_hook.py")
+            assert "calls=1" in out  # noqa: S101
+
+    def test_environment_is_per_request(self, plugin: Plugin) -> None:
+        plugin.start_daemon()
+        out1, _, _ = plugin.client("", "Test/echo_hook.py", HOOK_TEST_VAR="one")
+        out2, _, _ = plugin.client("", "Test/echo_hook.py", HOOK_TEST_VAR="two")
+        assert "var=one" in out1  # noqa: S101
+        assert "var=two" in out2  # noqa: S101
+
+    def test_picks_up_edited_hook(self, plugin: Plugin) -> None:
+        plugin.start_daemon()
+        hook = plugin.hooks / "Test" / "echo_hook.py"
+        hook.write_text("print('edited')\n", encoding="utf-8")
+        os.utime(hook, ns=(time.time_ns(), time.time_ns() + 10**9))
+        out, _, rc = plugin.client("", "Test/echo_hook.py")
+        assert rc == 0  # noqa: S101
+        assert out == "edited\n"  # noqa: S101
+
+    def test_real_hook_behaves_like_direct_run(self, plugin: Plugin) -> None:
+        """require_delegation.py through the daemon keeps its per-turn counter."""
+        shutil.copytree(PROJECT_ROOT / "hooks" / "PreToolUse", plugin.hooks / "Pre")
+        plugin.start_daemon()
+        payload = json.dumps({"tool_name": "Bash", "tool_input": {}})
+        env = {"CLAUDE_PARENT_SESSION_ID": "", "CLAUDE_AGENT_ID": ""}
+        _, err1, rc1 = plugin.client(payload, "Pre/require_delegation.py", **env)
+        _, err2, rc2 = plugin.client(payload, "Pre/require_delegation.py", **env)
+        assert (rc1, rc2) == (0, 0)  # noqa: S101
+        assert "STOP" in err1  # noqa: S101
+        assert "2nd direct tool call" in err2  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Script resolution
+# ---------------------------------------------------------------------------
+
+
+class TestDaemonCommand:
+    @pytest.fixture
+    def client(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> ModuleType:
+        monkeypatch.syspath_prepend(str(PROJECT_ROOT / "hooks" / "lib"))
+        module = load_module_from_file(
+            "hook_client", PROJECT_ROOT / "hooks" / "hook_client.py"
+        )
+        monkeypatch.setattr(module, "HOOKS_DIR", str(tmp_path / "hooks"))
+        monkeypatch.setenv("UV_CACHE_DIR", str(tmp_path / "uv-cache"))
+        return module
+
+    def test_runtime_preferred(self, client: ModuleType, tmp_path: Path) -> None:
+        runtime = tmp_path / "runtime" / "bin" / "python"
+        runtime.parent.mkdir(parents=True)
+        runtime.touch()
+        cmd = client.daemon_command("/p")
+        daemon = str(tmp_path / "hooks" / "hook_daemon.py")
+        assert cmd == [str(runtime), "-I", "-S", daemon, "--project-dir", "/p"]  # noqa: S101
+
+    def test_current_interpreter(self, client: ModuleType) -> None:
+        assert client.daemon_command("/p")[0] == sys.executable  # noqa: S101
+
+    def test_never_uv_script_environment(
+        self, client: ModuleType, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        # uv deletes its script environment when the client exits
+        ephemeral = (
+            tmp_path / "uv-cache" / "builds-v0" / ".tmpAbC123" / "bin" / "python"
+        )
+        monkeypatch.setattr(sys, "executable", str(ephemeral))
+        cmd = client.daemon_command("/p")
+        assert cmd[:4] == ["uv", "run", "--no-project", "--script"]  # noqa: S101
+
+
+class TestHookRegistry:
+    def test_rejects_scripts_outside_hooks_dir(self, tmp_path: Path) -> None:
+        daemon = load_module_from_file(
+            "hook_daemon", PROJECT_ROOT / "hooks" / "hook_daemon.py"
+        )
+        hooks = tmp_path / "hooks"
+        (hooks / "Ev").mkdir(parents=True)
+        (hooks / "Ev" / "ok.py").write_text("", encoding="utf-8")
+        (tmp_path / "evil.py").write_text("", encoding="utf-8")
+        registry = daemon.HookRegistry(hooks.resolve())
+        assert registry.resolve(str(hooks / "Ev" / "ok.py")) is not None  # noqa: S101
+        assert registry.resolve(str(hooks / "Ev" / ".." / ".." / "evil.py")) is None  # noqa: S101
+        assert registry.resolve(str(hooks / "Ev" / "missing.py")) is None  # noqa: S101
+
+
+class TestPreload:
+    def test_lazy_imports_are_preloaded(self, tmp_path: Path) -> None:
+        daemon = load_module_from_file(
+            "hook_daemon", PROJECT_ROOT / "hooks" / "hook_daemon.py"
+        )
+        script = tmp_path / "hook.py"
+        script.write_text(
+            "import json\n"
+            "from lazy_import import lazy_import\n"
+            'shlex = lazy_import("shlex")\n'
+            "other = lazy_import(name)\n",
+            encoding="utf-8",
+        )
+        assert daemon._imported_names(script) == {  # noqa: S101
+            "json",
+            "lazy_import",
+            "shlex",
+        }
@@ -0,0 +1,132 @@
+"""Tests for hooks/lib/lazy_import.py and scripts/hook_startup_profile.py."""
+
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def lazy() -> ModuleType:
+    return load_module_from_file(
+        "lazy_import", PROJECT_ROOT / "hooks" / "lib" / "lazy_import.py"
+    )
+
+
+@pytest.fixture
+def profiler() -> ModuleType:
+    return load_module_from_file(
+        "hook_startup_profile", PROJECT_ROOT / "scripts" / "hook_startup_profile.py"
+    )
+
+
+@pytest.fixture
+def probe_module(tmp_path: Path) -> Iterator[str]:
+    """A throwaway importable module that records when it is executed."""
+    name = "startup_probe_mod"
+    (tmp_path / f"{name}.py").write_text(
+        "import sys\nsys.startup_probe_ran = True\nVALUE = 42\n", encoding="utf-8"
+    )
+    sys.path.insert(0, str(tmp_path))
+    try:
+        yield name
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop(name, None)
+        if hasattr(sys, "startup_probe_ran"):
+            del sys.startup_probe_ran
+
+
+# ---------------------------------------------------------------------------
+# lazy_import
+# ---------------------------------------------------------------------------
+
+
+class TestLazyImport:
+    def test_defers_execution_until_attribute_access(
+        self, lazy: ModuleType, probe_module: str
+    ) -> None:
+        module = lazy.lazy_import(probe_module)
+        assert not hasattr(sys, "startup_probe_ran")  # noqa: S101
+        assert module.VALUE == 42  # noqa: S101
+        assert sys.startup_probe_ran is True  # noqa: S101
+
+    def test_returns_already_imported_module(self, lazy: ModuleType) -> None:
+        assert lazy.lazy_import("json") is sys.modules["json"]  # noqa: S101
+
+    def test_missing_module_raises(self, lazy: ModuleType) -> None:
+        with pytest.raises(ModuleNotFoundError):
+            lazy.lazy_import("no_such_module_for_hooks")
+
+
+class TestLazyLogger:
+    def test_records_below_level_never_configure_logging(
+        self, lazy: ModuleType
+    ) -> None:
+        calls: list[object] = []
+        logger = lazy.LazyLogger("t", lazy.WARNING, calls.append)
+        logger.debug("quiet %s", 1)
+        logger.info("quiet")
+        assert calls == []  # noqa: S101
+
+    def test_first_emitted_record_runs_setup_once(
+        self, lazy: ModuleType, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        calls: list[object] = []
+        logger = lazy.LazyLogger("lazy_logger_test", lazy.WARNING, calls.append)
+        logger.warning("first %s", "one")
+        logger.error("second")
+        assert len(calls) == 1  # noqa: S101
+        assert [r.getMessage() for r in caplog.records] == ["first one", "second"]  # noqa: S101
+
+
+# ---------------------------------------------------------------------------
+# Profiler
+# ---------------------------------------------------------------------------
+
+
+class TestParseImporttime:
+    def test_parses_self_and_cumulative(self, profiler: ModuleType) -> None:
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     _json\n"
+            "import time:       900 |       1020 |   json.decoder\n"
+            "import time:       300 |       1320 | json\n"
+            "some unrelated hook output\n"
+            "import time:        50 |         50 | json\n"
+        )
+        assert profiler.parse_importtime(stderr) == {  # noqa: S101
+            "_json": (120, 120),
+            "json.decoder": (900, 1020),
+            "json": (300, 1320),
+        }
+
+
+class TestBudgets:
+    def test_every_hook_declares_a_budget(self, profiler: ModuleType) -> None:
+        scripts = profiler.hook_scripts(PROJECT_ROOT)
+        assert scripts  # noqa: S101
+        missing = [str(s) for s in scripts if profiler.read_budget(s) is None]
+        assert missing == []  # noqa: S101
+
+    def test_shared_lib_is_not_a_hook(self, profiler: ModuleType) -> None:
+        scripts = profiler.hook_scripts(PROJECT_ROOT)
+        assert all(s.parent.name != "lib" for s in scripts)  # noqa: S101
+
+    def test_compact_run_is_profiled_wrapping_a_command(
+        self, profiler: ModuleType
+    ) -> None:
+        script = PROJECT_ROOT / "hooks" / "compact_run.py"
+        assert script in profiler.hook_scripts(PROJECT_ROOT)  # noqa: S101
+        args = profiler.script_args(script, Path("py"))
+        assert args == [str(script), "py", "-I", "-S", "-c", "pass"]  # noqa: S101
+
+    def test_read_budget(self, profiler: ModuleType, tmp_path: Path) -> None:
+        script = tmp_path / "hook.py"
+        script.write_text("import os\n\nSTARTUP_BUDGET_MS = 12.5\n", encoding="utf-8")
+        assert profiler.read_budget(script) == 12.5  # noqa: S101
+        script.write_text("def f():\n    STARTUP_BUDGET_MS = 1\n", encoding="utf-8")
+        assert profiler.read_budget(script) is None  # noqa: S101
@@ -0,0 +1,77 @@
+"""Tests for hooks/lib/log_templates.py -- single-pass log template clustering."""
+
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def log_templates() -> ModuleType:
+    return load_module_from_file(
+        "log_templates", PROJECT_ROOT / "hooks" / "lib" / "log_templates.py"
+    )
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        ("2026-01-01T10:00:00.123Z start", "<TS> start"),
+        ("at 10:04:05,9 took 12.5ms", "at <TS> took <NUM>ms"),
+        ("req 550e8400-e29b-41d4-a716-446655440000 done", "req <UUID> done"),
+        ("peer=192.168.1.20:443 ok", "peer=<IP> ok"),
+        ("addr 0x7ffd12 id=deadbeef99", "addr <HEX> id=<HEX>"),
+        ("GET /api/v1/items/42 -> 404", "GET /api/v1/items/<NUM> -> <NUM>"),
+        ("no variables here", "no variables here"),
+    ],
+)
+def test_mask(log_templates: ModuleType, line: str, expected: str) -> None:
+    assert log_templates.mask(line) == expected  # noqa: S101
+
+
+class TestTemplateMiner:
+    def test_groups_non_consecutive_lines(self, log_templates: ModuleType) -> None:
+        miner = log_templates.TemplateMiner()
+        for line in [
+            "worker 1 started",
+            "cache warmed",
+            "worker 2 started",
+            "",
+            "worker 3 started",
+        ]:
+            miner.feed(line)
+        worker, cache = miner.clusters()
+        assert (worker.count, worker.first, worker.last) == (3, 0, 4)  # noqa: S101
+        assert worker.template == "worker <NUM> started"  # noqa: S101
+        assert worker.exemplar == "worker 1 started"  # noqa: S101
+        assert cache.count == 1  # noqa: S101
+        assert miner.lines == 5  # noqa: S101
+
+    def test_differing_words_become_wildcards(self, log_templates: ModuleType) -> None:
+        miner = log_templates.TemplateMiner()
+        for user in ("alice", "bob", "carol"):
+            miner.feed(f"login ok for user {user}")
+        (cluster,) = miner.clusters()
+        assert cluster.template == "login ok for user <*>"  # noqa: S101
+
+    def test_dissimilar_lines_stay_apart(self, log_templates: ModuleType) -> None:
+        miner = log_templates.TemplateMiner()
+        miner.feed("connection refused by upstream")
+        miner.feed("connection pool exhausted, retrying")
+        miner.feed("connection reset during handshake")
+        assert len(miner.clusters()) == 3  # noqa: S101
+
+    def test_cluster_limit(self, log_templates: ModuleType) -> None:
+        miner = log_templates.TemplateMiner(max_clusters=2)
+        for word in ("alpha", "beta", "gamma", "delta"):
+            miner.feed(word)
+        assert len(miner.clusters()) == 2  # noqa: S101
+        assert miner.overflow == 2  # noqa: S101
+
+    def test_line_limit(self, log_templates: ModuleType) -> None:
+        miner = log_templates.TemplateMiner(max_lines=3)
+        for i in range(5):
+            miner.feed(f"tick {i}")
+        assert not miner.complete  # noqa: S101
+        assert (miner.lines, miner.skipped) == (5, 2)  # noqa: S101
+        assert miner.clusters()[0].count == 3  # noqa: S101
@@ -0,0 +1,76 @@
+"""Tests for hooks/lib/output_archive.py -- raw output archive for compact_run."""
+
+import gzip
+import os
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def output_archive(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    monkeypatch.syspath_prepend(str(PROJECT_ROOT / "hooks" / "lib"))
+    return load_module_from_file(
+        "output_archive", PROJECT_ROOT / "hooks" / "lib" / "output_archive.py"
+    )
+
+
+def test_small_output_buffered_until_kept(
+    output_archive: ModuleType, tmp_path: Path
+) -> None:
+    archive = output_archive.OutputArchive(tmp_path)
+    writer = archive.writer()
+    writer.write("stdout", b"one\n")
+    writer.write("stdout", b"two\n")
+    assert list(tmp_path.iterdir()) == []  # noqa: S101
+    assert writer.keep()  # noqa: S101
+    assert archive.read(writer.handle, "stdout") == "one\ntwo\n"  # noqa: S101
+    assert archive.read(writer.handle, "stderr") == ""  # noqa: S101
+    assert archive.read("00000000", "stdout") is None  # noqa: S101
+    assert archive.read("../x", "stdout") is None  # noqa: S101
+
+
+def test_large_output_spilled_and_discarded(
+    output_archive: ModuleType, tmp_path: Path
+) -> None:
+    writer = output_archive.OutputArchive(tmp_path).writer()
+    writer.write("stderr", b"x" * (output_archive.SPILL_BYTES + 1))
+    assert writer.file("stderr").exists()  # noqa: S101
+    writer.discard()
+    assert list(tmp_path.iterdir()) == []  # noqa: S101
+    assert not output_archive.OutputArchive(tmp_path).writer().keep()  # noqa: S101
+
+
+def test_stream_capped(output_archive: ModuleType, tmp_path: Path) -> None:
+    writer = output_archive.ArchiveWriter(tmp_path, "cafe", limit=10)
+    writer.write("stdout", b"0123456")
+    writer.write("stdout", b"789abc")
+    writer.write("stdout", b"more")
+    assert writer.keep()  # noqa: S101
+    with gzip.open(writer.file("stdout")) as f:
+        data = f.read()
+    assert data == b"0123456789\n[... archive stopped after 10 bytes]\n"  # noqa: S101
+
+
+def test_evicts_least_recently_used(output_archive: ModuleType, tmp_path: Path) -> None:
+    archive = output_archive.OutputArchive(tmp_path, max_bytes=1)
+    handles = []
+    for age in (300, 200, 100):
+        writer = archive.writer()
+        writer.write("stdout", os.urandom(1000))
+        writer.keep()
+        path = writer.file("stdout")
+        os.utime(path, (0, path.stat().st_mtime - age))
+        handles.append(writer.handle)
+    assert archive.read(handles[0], "stdout") is not None  # noqa: S101
+    archive.max_bytes = 2500
+    archive.evict()
+    kept = {path.name.split(".")[0] for path in tmp_path.iterdir()}
+    assert kept == {handles[0], handles[2]}  # noqa: S101
+    archive.max_bytes = 1
+    archive.evict(keep=handles[2])
+    assert [path.name for path in tmp_path.iterdir()] == [  # noqa: S101
+        f"{handles[2]}.stdout.gz"
+    ]
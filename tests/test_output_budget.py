@@ -0,0 +1,83 @@
+"""Tests for hooks/lib/output_budget.py -- token-budgeted output selection."""
+
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def output_budget() -> ModuleType:
+    return load_module_from_file(
+        "output_budget", PROJECT_ROOT / "hooks" / "lib" / "output_budget.py"
+    )
+
+
+def test_estimate_tokens(output_budget: ModuleType) -> None:
+    assert output_budget.estimate_tokens("") == 0  # noqa: S101
+    assert output_budget.estimate_tokens("abc") == 1  # noqa: S101
+    assert output_budget.estimate_tokens("abcdefgh\nab\n") == 4  # noqa: S101
+
+
+def test_clip_line_keeps_both_ends(output_budget: ModuleType) -> None:
+    line = "a" * 100 + "b" * 1000 + "z" * 100
+    clipped = output_budget.clip_line(line, 50)
+    assert clipped.startswith("a" * 88) and clipped.endswith("z" * 88)  # noqa: S101
+    assert "[... 1024 chars cut]" in clipped  # noqa: S101
+    assert output_budget.clip_line("short", 50) == "short"  # noqa: S101
+
+
+class TestSelect:
+    def test_within_limits_unchanged(self, output_budget: ModuleType) -> None:
+        text = "one\ntwo\n"
+        assert output_budget.select(text, 10, 2) is text  # noqa: S101
+
+    def test_tail_only_keeps_the_old_header(self, output_budget: ModuleType) -> None:
+        text = "\n".join(f"l{i}" for i in range(10))
+        result = output_budget.select(text, 1000, 3, head_share=0.0)
+        assert result.splitlines() == [  # noqa: S101
+            "[truncated: 10 lines total, showing last 3]",
+            "[... lines 1-7 elided: 7 lines, ~7 tokens ...]",
+            "l7",
+            "l8",
+            "l9",
+        ]
+
+    def test_gap_markers_account_for_every_line(
+        self, output_budget: ModuleType
+    ) -> None:
+        lines = [f"line {i:04d}" for i in range(1000)]  # 3 tokens each
+        lines[500] = "error: disk full"
+        result = output_budget.select("\n".join(lines), 300, 150).splitlines()
+        shown = [line for line in result[1:] if not line.startswith("[... ")]
+        gaps = [line for line in result if line.startswith("[... lines ")]
+        elided = sum(int(gap.split(": ")[1].split()[0]) for gap in gaps)
+        assert len(shown) + elided == 1000  # noqa: S101
+        header = f"[truncated: 1000 lines total, showing {len(shown)}]"
+        assert result[0] == header  # noqa: S101
+        assert sum(len(line) // 4 + 1 for line in shown) <= 300  # noqa: S101
+        region = shown.index("error: disk full")
+        assert shown[region - 2 : region + 3] == lines[498:503]  # noqa: S101
+
+    def test_earliest_errors_win(self, output_budget: ModuleType) -> None:
+        lines = ["ok"] * 400
+        lines[100] = "error: first cause"
+        lines[250] = "error: cascade"
+        result = output_budget.select("\n".join(lines), 100, 15)
+        assert "error: first cause" in result  # noqa: S101
+        assert "error: cascade" not in result  # noqa: S101
+
+    def test_stream_markers_count_as_what_they_replace(
+        self, output_budget: ModuleType
+    ) -> None:
+        marker = output_budget.ELIDED_MARKER.format(500, 2000)
+        text = "\n".join(["first", marker, *(f"t{i}" for i in range(5))])
+        result = output_budget.select(text, 1000, 4, head_share=0.0).splitlines()
+        assert result == [  # noqa: S101
+            "[truncated: 506 lines total, showing last 4]",
+            "[... lines 1-502 elided: 502 lines, ~2003 tokens ...]",
+            "t1",
+            "t2",
+            "t3",
+            "t4",
+        ]
@@ -0,0 +1,235 @@
+"""Tests for hooks/lib/phase_index.py and the task graph hooks that use it."""
+
+import json
+import os
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+GRAPH = {
+    "current_wave": 1,
+    "waves": [
+        {
+            "wave_id": 0,
+            "phases": [
+                {"phase_id": "phase_0_0", "depth": 3, "is_atomic": True},
+                {"phase_id": "phase_0_1", "depth": 1, "is_atomic": True},
+            ],
+        },
+        {
+            "wave_id": 1,
+            "phases": [
+                {
+                    "phase_id": "phase_1_0",
+                    "depth": 2,
+                    "is_atomic": False,
+                    "dependencies": ["phase_0_0", "phase_0_1"],
+                },
+            ],
+        },
+        {"wave_id": 2, "phases": [{"phase_id": "phase_2_0"}]},
+    ],
+}
+
+
+@pytest.fixture
+def phase_index() -> ModuleType:
+    return load_module_from_file(
+        "phase_index", PROJECT_ROOT / "hooks" / "lib" / "phase_index.py"
+    )
+
+
+def _write_graph(state_dir: Path, graph: dict) -> Path:
+    state_dir.mkdir(parents=True, exist_ok=True)
+    path = state_dir / "active_task_graph.json"
+    path.write_text(json.dumps(graph), encoding="utf-8")
+    return path
+
+
+class TestIndex:
+    def test_lookups(self, phase_index: ModuleType, tmp_path: Path) -> None:
+        _write_graph(tmp_path, GRAPH)
+        index = phase_index.load_index(tmp_path)
+        assert index.current_wave == 1  # noqa: S101
+        assert index.phase("phase_1_0") == (  # noqa: S101
+            1,
+            2,
+            False,
+            ["phase_0_0", "phase_0_1"],
+        )
+        assert index.phase("phase_2_0") == (2, 0, False, [])  # noqa: S101
+        assert index.phase("phase_0") is None  # noqa: S101
+        assert index.phase("phase_9_9") is None  # noqa: S101
+        assert index.shallow == [("phase_0_1", 1)]  # noqa: S101
+        assert index.shallow_total == 1  # noqa: S101
+
+    def test_no_graph(self, phase_index: ModuleType, tmp_path: Path) -> None:
+        assert phase_index.load_index(tmp_path) is None  # noqa: S101
+        (tmp_path / "active_task_graph.json").write_text("{not json")
+        assert phase_index.load_index(tmp_path) is None  # noqa: S101
+
+    def test_rebuilt_only_when_graph_changes(
+        self,
+        phase_index: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        _write_graph(tmp_path, GRAPH)
+        phase_index.load_index(tmp_path)
+        builds = []
+        build = phase_index.build_index
+        monkeypatch.setattr(
+            phase_index, "build_index", lambda *a: builds.append(a) or build(*a)
+        )
+
+        assert phase_index.load_index(tmp_path).current_wave == 1  # noqa: S101
+        assert builds == []  # noqa: S101
+
+        _write_graph(tmp_path, {**GRAPH, "current_wave": 2})
+        assert phase_index.load_index(tmp_path).current_wave == 2  # noqa: S101
+        assert len(builds) == 1  # noqa: S101
+
+    def test_same_size_rewrite_detected_by_mtime(
+        self, phase_index: ModuleType, tmp_path: Path
+    ) -> None:
+        graph_file = _write_graph(tmp_path, GRAPH)
+        phase_index.load_index(tmp_path)
+        _write_graph(tmp_path, {**GRAPH, "current_wave": 2})
+        st = graph_file.stat()
+        os.utime(graph_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert phase_index.load_index(tmp_path).current_wave == 2  # noqa: S101
+
+    def test_corrupt_index_rebuilt(
+        self, phase_index: ModuleType, tmp_path: Path
+    ) -> None:
+        _write_graph(tmp_path, GRAPH)
+        (tmp_path / phase_index.INDEX_FILE).write_text("garbage\n")
+        assert phase_index.load_index(tmp_path).phase("phase_0_0")  # noqa: S101
+        assert list(tmp_path.glob("*.tmp")) == []  # noqa: S101
+
+    def test_nested_execution_plan(
+        self, phase_index: ModuleType, tmp_path: Path
+    ) -> None:
+        _write_graph(tmp_path, {"execution_plan": GRAPH})
+        index = phase_index.load_index(tmp_path)
+        assert index.current_wave == 1  # noqa: S101
+        assert index.phase("phase_2_0").wave == 2  # noqa: S101
+
+    def test_first_listing_with_a_wave_wins(
+        self, phase_index: ModuleType, tmp_path: Path
+    ) -> None:
+        graph = {
+            "waves": [
+                {"phases": [{"phase_id": "phase_0_0"}]},
+                {"wave_id": 1, "phases": [{"phase_id": "phase_0_0"}]},
+                {"wave_id": 2, "phases": [{"phase_id": "phase_0_0"}]},
+            ]
+        }
+        _write_graph(tmp_path, graph)
+        index = phase_index.load_index(tmp_path)
+        assert index.phase("phase_0_0").wave == 1  # noqa: S101
+
+    def test_shallow_phases_capped(
+        self, phase_index: ModuleType, tmp_path: Path
+    ) -> None:
+        phases = [
+            {"phase_id": f"phase_0_{p}", "depth": 1, "is_atomic": True}
+            for p in range(8)
+        ]
+        _write_graph(tmp_path, {"waves": [{"wave_id": 0, "phases": phases}]})
+        index = phase_index.load_index(tmp_path)
+        assert len(index.shallow) == phase_index.SHALLOW_KEPT  # noqa: S101
+        assert index.shallow_total == 8  # noqa: S101
+
+
+# --- The hooks read the index instead of the graph ---
+
+
+class TestComplianceHint:
+    @pytest.fixture
+    def hook(self) -> ModuleType:
+        return load_module_from_file(
+            "validate_task_graph_compliance",
+            PROJECT_ROOT / "hooks" / "PreToolUse" / "validate_task_graph_compliance.py",
+        )
+
+    @pytest.mark.parametrize(
+        ("prompt", "expected"),
+        [
+            ("Phase ID: phase_1_0\nDo it", None),
+            ("Phase ID: phase_0_1", None),
+            (
+                "Phase ID: phase_2_0",
+                "hint: spawning phase_2_0 (wave 2) while wave 1 is incomplete "
+                "— out-of-order execution.",
+            ),
+            (
+                "Phase ID: phase_7_7",
+                "hint: phase ID 'phase_7_7' not found in active task graph.",
+            ),
+        ],
+    )
+    def test_hints(
+        self, hook: ModuleType, tmp_path: Path, prompt: str, expected: str | None
+    ) -> None:
+        _write_graph(tmp_path, GRAPH)
+        payload = {"tool_name": "Agent", "prompt": prompt}
+        assert hook.compliance_hint(payload, tmp_path) == expected  # noqa: S101
+
+    def test_no_graph(self, hook: ModuleType, tmp_path: Path) -> None:
+        payload = {"tool_name": "Agent", "prompt": "no marker"}
+        assert hook.compliance_hint(payload, tmp_path) is None  # noqa: S101
+
+
+class TestDepthHint:
+    @pytest.fixture
+    def hook(self) -> ModuleType:
+        return load_module_from_file(
+            "validate_task_graph_depth",
+            PROJECT_ROOT / "hooks" / "PostToolUse" / "validate_task_graph_depth.py",
+        )
+
+    def _hint(
+        self,
+        hook: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> str:
+        monkeypatch.setenv("CLAUDE_PROJECT_DIR", str(tmp_path))
+        assert hook.main() == 0  # noqa: S101
+        return capsys.readouterr().err
+
+    def test_lists_first_five(
+        self,
+        hook: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        phases = [
+            {"phase_id": f"phase_0_{p}", "depth": p % 3, "is_atomic": True}
+            for p in range(9)
+        ]
+        graph = {"waves": [{"wave_id": 0, "phases": phases}]}
+        _write_graph(tmp_path / ".claude" / "state", graph)
+        assert self._hint(hook, tmp_path, monkeypatch, capsys) == (  # noqa: S101
+            "hint: 9 atomic task(s) shallower than depth 3: phase_0_0 (depth: 0), "
+            "phase_0_1 (depth: 1), phase_0_2 (depth: 2), phase_0_3 (depth: 0), "
+            "phase_0_4 (depth: 1) (+4 more). Deeper decomposition improves "
+            "parallelization.\n"
+        )
+
+    def test_silent_without_shallow_phases(
+        self,
+        hook: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        assert self._hint(hook, tmp_path, monkeypatch, capsys) == ""  # noqa: S101
+        graph = {"execution_plan": {"waves": GRAPH["waves"][1:]}}
+        _write_graph(tmp_path / ".claude" / "state", graph)
+        assert self._hint(hook, tmp_path, monkeypatch, capsys) == ""  # noqa: S101
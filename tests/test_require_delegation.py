@@ -42,6 +42,11 @@ def _input(tool_name: str) -> str:
     return json.dumps({"tool_name": tool_name, "tool_input": {}})
 
 
+def _state(project_dir: Path) -> Path:
+    """The shared state store record (hooks/lib/state_store.py)."""
+    return project_dir / ".claude" / "state" / "state.json"
+
+
 # ---------------------------------------------------------------------------
 # Always returns 0
 # ---------------------------------------------------------------------------
@@ -175,18 +180,25 @@ class TestCounterPersistence:
     def test_counter_persists_across_calls(self, tmp_path: Path) -> None:
         for _ in range(3):
             _run(_input("Bash"), tmp_path)
-        counter = json.loads(
-            (tmp_path / ".claude" / "state" / "delegation_violations.json").read_text()
-        )
+        counter = json.loads(_state(tmp_path).read_text())["values"]
         assert counter["violations"] == 3  # noqa: S101
 
     def test_fresh_project_starts_at_zero(self, tmp_path: Path) -> None:
         _run(_input("Bash"), tmp_path)
-        counter = json.loads(
-            (tmp_path / ".claude" / "state" / "delegation_violations.json").read_text()
-        )
+        counter = json.loads(_state(tmp_path).read_text())["values"]
         assert counter["violations"] == 1  # noqa: S101
 
+    def test_legacy_counter_migrated(self, tmp_path: Path) -> None:
+        state = tmp_path / ".claude" / "state"
+        state.mkdir(parents=True)
+        legacy = state / "delegation_violations.json"
+        legacy.write_text('{"violations": 2, "delegations": 1, "turn_id": "t"}')
+        _, stderr, _ = _run(_input("Bash"), tmp_path)
+        assert "3 direct tool calls" in stderr  # noqa: S101
+        counter = json.loads(_state(tmp_path).read_text())["values"]
+        assert (counter["violations"], counter["delegations"]) == (3, 1)  # noqa: S101
+        assert not legacy.exists()  # noqa: S101
+
 
 # ---------------------------------------------------------------------------
 # Subagent immunity
@@ -218,8 +230,7 @@ class TestSubagentImmunity:
             tmp_path,
             env_extra={"CLAUDE_PARENT_SESSION_ID": "x"},
         )
-        counter_file = tmp_path / ".claude" / "state" / "delegation_violations.json"
-        assert not counter_file.exists()  # noqa: S101
+        assert not _state(tmp_path).exists()  # noqa: S101
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,163 @@
+"""Tests for hooks/lib/run_memo.py -- content-addressed test-run memo."""
+
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+@pytest.fixture
+def run_memo() -> ModuleType:
+    return load_module_from_file(
+        "run_memo", PROJECT_ROOT / "hooks" / "lib" / "run_memo.py"
+    )
+
+
+def git_repo(path: Path) -> Path:
+    """A repository with one committed file, src.py."""
+    path.mkdir(exist_ok=True)
+    (path / "src.py").write_text("x = 1\n")
+    for args in (
+        ["init", "-q"],
+        ["add", "src.py"],
+        ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"],
+    ):
+        subprocess.run(["git", *args], cwd=path, check=True)  # noqa: S603, S607
+    return path
+
+
+class TestTreeFingerprint:
+    def test_outside_git_is_none(self, run_memo: ModuleType, tmp_path: Path) -> None:
+        assert run_memo.tree_fingerprint(tmp_path) is None  # noqa: S101
+
+    def test_stable_and_found_from_subdirectory(
+        self, run_memo: ModuleType, tmp_path: Path
+    ) -> None:
+        repo = git_repo(tmp_path / "repo")
+        (repo / "sub").mkdir()
+        first = run_memo.tree_fingerprint(repo)
+        assert first.root == repo.resolve()  # noqa: S101
+        assert run_memo.tree_fingerprint(repo / "sub").digest == first.digest  # noqa: S101
+
+    @pytest.mark.parametrize(
+        "change",
+        ["edit", "edit_same_size", "stage", "untracked", "delete"],
+    )
+    def test_changes_invalidate(
+        self, run_memo: ModuleType, tmp_path: Path, change: str
+    ) -> None:
+        repo = git_repo(tmp_path / "repo")
+        before = run_memo.tree_fingerprint(repo).digest
+        if change == "edit":
+            (repo / "src.py").write_text("x = 22\n")
+        elif change == "edit_same_size":
+            (repo / "src.py").write_text("x = 2\n")
+        elif change == "stage":
+            (repo / "src.py").write_text("x = 2\n")
+            subprocess.run(["git", "add", "src.py"], cwd=repo, check=True)  # noqa: S603, S607
+        elif change == "untracked":
+            (repo / "test_new.py").write_text("def test(): pass\n")
+        else:
+            (repo / "src.py").unlink()
+        assert run_memo.tree_fingerprint(repo).digest != before  # noqa: S101
+
+    def test_dirty_content_not_just_status(
+        self, run_memo: ModuleType, tmp_path: Path
+    ) -> None:
+        repo = git_repo(tmp_path / "repo")
+        (repo / "src.py").write_text("x = 2\n")
+        dirty = run_memo.tree_fingerprint(repo).digest
+        (repo / "src.py").write_text("x = 3\n")  # still " M src.py"
+        assert run_memo.tree_fingerprint(repo).digest != dirty  # noqa: S101
+
+    def test_ignored_and_state_files_do_not_count(
+        self, run_memo: ModuleType, tmp_path: Path
+    ) -> None:
+        repo = git_repo(tmp_path / "repo")
+        (repo / ".gitignore").write_text("build/\n")
+        before = run_memo.tree_fingerprint(repo).digest
+        (repo / "build").mkdir()
+        (repo / "build" / "out.o").write_text("obj")
+        (repo / ".claude" / "state").mkdir(parents=True)
+        (repo / ".claude" / "state" / "memo.json").write_text("{}")
+        assert run_memo.tree_fingerprint(repo).digest == before  # noqa: S101
+
+
+class TestMemoKey:
+    def test_relevant_env(self, run_memo: ModuleType) -> None:
+        env = {
+            "PYTEST_ADDOPTS": "-x",
+            "PATH": "/bin",
+            "HOME": "/root",
+            "COMPACT_RUN_STRUCTURED": "1",
+            "COMPACT_RUN_MEMO_BYPASS": "1",
+            "TERM": "xterm",
+        }
+        assert run_memo.relevant_env(env) == {  # noqa: S101
+            "COMPACT_RUN_STRUCTURED": "1",
+            "PATH": "/bin",
+            "PYTEST_ADDOPTS": "-x",
+        }
+
+    def test_every_input_changes_the_key(self, run_memo: ModuleType) -> None:
+        base = (["pytest", "-q"], "/p", {"PYTEST_ADDOPTS": ""}, "tree")
+        key = run_memo.memo_key(*base)
+        assert run_memo.memo_key(*base) == key  # noqa: S101
+        assert run_memo.memo_key(["pytest", "-x"], *base[1:]) != key  # noqa: S101
+        assert run_memo.memo_key(base[0], "/q", *base[2:]) != key  # noqa: S101
+        assert run_memo.memo_key(*base[:2], {"PYTEST_ADDOPTS": "-x"}, "tree") != key  # noqa: S101
+        assert run_memo.memo_key(*base[:3], "other") != key  # noqa: S101
+        assert run_memo.memo_key(*base, salt="v2") != key  # noqa: S101
+        # Irrelevant environment does not
+        irrelevant = {"PYTEST_ADDOPTS": "", "HOME": "/x"}
+        assert run_memo.memo_key(*base[:2], irrelevant, "tree") == key  # noqa: S101
+
+
+class TestMemoStore:
+    def test_put_get(self, run_memo: ModuleType, tmp_path: Path) -> None:
+        store = run_memo.MemoStore(tmp_path / "memo")
+        assert store.get("k") is None  # noqa: S101
+        store.put("k", {"exit_code": 1, "stdout": "FAILED t"})
+        entry = store.get("k")
+        assert entry["stdout"] == "FAILED t"  # noqa: S101
+        assert entry["created"] <= time.time()  # noqa: S101
+
+    def test_expired_files_evicted_on_put(
+        self, run_memo: ModuleType, tmp_path: Path
+    ) -> None:
+        store = run_memo.MemoStore(tmp_path / "memo", max_age=60)
+        store.put("old", {"stdout": ""})
+        old = tmp_path / "memo" / "old.json"
+        past = time.time() - 120
+        os.utime(old, (past, past))
+        store.put("new", {"stdout": ""})
+        assert not old.exists()  # noqa: S101
+        assert store.get("new") is not None  # noqa: S101
+
+    def test_entry_age_is_checked_on_read(
+        self, run_memo: ModuleType, tmp_path: Path
+    ) -> None:
+        (tmp_path / "memo").mkdir()
+        (tmp_path / "memo" / "k.json").write_text(
+            '{"created": %f, "stdout": ""}' % (time.time() - 120)
+        )
+        assert run_memo.MemoStore(tmp_path / "memo", max_age=60).get("k") is None  # noqa: S101
+
+    def test_size_eviction_drops_oldest(
+        self, run_memo: ModuleType, tmp_path: Path
+    ) -> None:
+        store = run_memo.MemoStore(tmp_path / "memo", max_bytes=2500)
+        for i, name in enumerate(("a", "b", "c")):
+            store.put(name, {"stdout": "x" * 1000})
+            stamp = time.time() - 10 + i
+            os.utime(tmp_path / "memo" / f"{name}.json", (stamp, stamp))
+        store.evict()
+        assert store.get("a") is None  # noqa: S101
+        assert store.get("b") is not None and store.get("c") is not None  # noqa: S101
@@ -0,0 +1,113 @@
+"""Tests for hooks/lib/segments.py -- concurrent statusline segments."""
+
+import json
+import threading
+import time
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def segments(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    monkeypatch.syspath_prepend(str(PROJECT_ROOT / "hooks" / "lib"))  # tracing
+    return load_module_from_file(
+        "segments", PROJECT_ROOT / "hooks" / "lib" / "segments.py"
+    )
+
+
+def _blocked(release: threading.Event, value: object) -> object:
+    release.wait(5)
+    return value
+
+
+def test_providers_run_concurrently(segments: ModuleType) -> None:
+    barrier = threading.Barrier(3, timeout=2)
+
+    def provider(value: str) -> str:
+        barrier.wait()  # returns only once all three are running
+        return value
+
+    run = segments.Segments()
+    for name in ("a", "b", "c"):
+        run.add(name, lambda name=name: provider(name))
+    results = run.collect(deadline=3)
+    assert results == {  # noqa: S101
+        name: segments.Result(name, stale=False) for name in ("a", "b", "c")
+    }
+
+
+def test_slow_provider_bounded_by_deadline(
+    segments: ModuleType, tmp_path: Path
+) -> None:
+    cache = tmp_path / "segments.json"
+    release = threading.Event()
+    first = segments.Segments(cache)
+    first.add("branch", lambda: "main", key="/repo")
+    assert first.collect(deadline=1)["branch"] == ("main", False)  # noqa: S101
+
+    run = segments.Segments(cache)
+    run.add("branch", lambda: _blocked(release, "dev"), key="/repo", timeout=5)
+    run.add("version", lambda: _blocked(release, "v2"), default="v?", timeout=5)
+    run.add("fast", lambda: 42)
+    start = time.monotonic()
+    results = run.collect(deadline=0.1)
+    assert time.monotonic() - start < 1  # noqa: S101
+    assert results == {  # noqa: S101
+        "branch": ("main", True),  # last cached value, marked stale
+        "version": ("v?", True),  # nothing cached yet
+        "fast": (42, False),
+    }
+
+    # Late values are cached for the next render
+    release.set()
+    run.settle()
+    saved = json.loads(cache.read_text())
+    assert saved["branch"] == {"/repo": "dev"}  # noqa: S101
+    assert saved["version"] == {"": "v2"}  # noqa: S101
+
+
+def test_own_timeout_shorter_than_deadline(segments: ModuleType) -> None:
+    release = threading.Event()
+    run = segments.Segments()
+    run.add("slow", lambda: _blocked(release, 1), timeout=0.05, default=0)
+    start = time.monotonic()
+    assert run.collect(deadline=5)["slow"] == (0, True)  # noqa: S101
+    assert time.monotonic() - start < 1  # noqa: S101
+    release.set()
+
+
+def test_failing_provider_is_stale(segments: ModuleType, tmp_path: Path) -> None:
+    cache = tmp_path / "segments.json"
+    cache.write_text(json.dumps({"ctx": {"s1": ["🧠 50%", 50.0]}}))
+
+    def broken() -> object:
+        raise OSError("transcript unreadable")
+
+    run = segments.Segments(cache)
+    run.add("ctx", broken, key="s1", default=(None, 0.0))
+    run.add("other", broken, key="s2", default=(None, 0.0))
+    results = run.collect(deadline=1)
+    assert results["ctx"] == (["🧠 50%", 50.0], True)  # noqa: S101
+    assert results["other"] == ((None, 0.0), True)  # noqa: S101
+
+
+def test_cache_keeps_recent_keys(
+    segments: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(segments, "MAX_KEYS", 2)
+    cache = tmp_path / "segments.json"
+    for cwd in ("/a", "/b", "/a", "/c"):
+        run = segments.Segments(cache)
+        run.add("branch", lambda cwd=cwd: cwd.upper(), key=cwd)
+        run.collect(deadline=1)
+    saved = json.loads(cache.read_text())["branch"]
+    assert list(saved.items()) == [("/a", "/A"), ("/c", "/C")]  # noqa: S101
+
+    cache.write_text("{corrupt")
+    run = segments.Segments(cache)
+    run.add("branch", lambda: "x", key="/d")
+    assert run.collect(deadline=1)["branch"] == ("x", False)  # noqa: S101
+    assert json.loads(cache.read_text()) == {"branch": {"/d": "x"}}  # noqa: S101
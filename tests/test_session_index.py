@@ -0,0 +1,122 @@
+"""Tests for hooks/lib/session_index.py -- locating session transcripts."""
+
+import os
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def session_index(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    module = load_module_from_file(
+        "session_index", PROJECT_ROOT / "hooks" / "lib" / "session_index.py"
+    )
+    # Test directories are fresh; treat their mtimes as settled
+    monkeypatch.setattr(module, "MTIME_SETTLE_SECONDS", -3600)
+    return module
+
+
+def _transcript(projects: Path, project: str, session_id: str) -> Path:
+    path = projects / project / f"{session_id}.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("{}\n")
+    return path
+
+
+def _listings(session_index: ModuleType, monkeypatch: pytest.MonkeyPatch) -> list:
+    listed: list[str] = []
+    transcripts = session_index._transcripts
+
+    def recording(directory: str) -> dict[str, str]:
+        listed.append(os.path.basename(directory))
+        return transcripts(directory)
+
+    monkeypatch.setattr(session_index, "_transcripts", recording)
+    return listed
+
+
+def test_found_then_served_from_index(
+    session_index: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    projects, index = tmp_path / "projects", tmp_path / "index.json"
+    _transcript(projects, "-work-a", "s1")
+    wanted = _transcript(projects, "-work-b", "s2")
+    listed = _listings(session_index, monkeypatch)
+
+    assert session_index.locate("s2", projects, index) == wanted  # noqa: S101
+    assert sorted(listed) == ["-work-a", "-work-b"]  # noqa: S101
+    assert session_index.locate("s2", projects, index) == wanted  # noqa: S101
+    assert session_index.locate("s1", projects, index).name == "s1.jsonl"  # noqa: S101
+    assert len(listed) == 2  # noqa: S101
+
+
+def test_miss_lists_only_changed_directories(
+    session_index: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    projects, index = tmp_path / "projects", tmp_path / "index.json"
+    for n in range(5):
+        _transcript(projects, f"-p{n}", f"old{n}")
+    assert session_index.locate("missing", projects, index) is None  # noqa: S101
+    listed = _listings(session_index, monkeypatch)
+
+    # Nothing changed: no directory is listed again
+    assert session_index.locate("missing", projects, index) is None  # noqa: S101
+    assert listed == []  # noqa: S101
+
+    mtime = (projects / "-p3").stat().st_mtime_ns
+    new = _transcript(projects, "-p3", "new")
+    os.utime(new.parent, ns=(mtime, mtime + 10**9))  # visible on coarse clocks
+    assert session_index.locate("new", projects, index) == new  # noqa: S101
+    assert listed == ["-p3"]  # noqa: S101
+
+
+def test_moved_transcript_relocated(session_index: ModuleType, tmp_path: Path) -> None:
+    projects, index = tmp_path / "projects", tmp_path / "index.json"
+    old = _transcript(projects, "-repo", "s1")
+    assert session_index.locate("s1", projects, index) == old  # noqa: S101
+    (projects / "-repo").rename(projects / "-repo-renamed")
+    new = projects / "-repo-renamed" / "s1.jsonl"
+    assert session_index.locate("s1", projects, index) == new  # noqa: S101
+
+
+def test_rescan_bounded_newest_first(
+    session_index: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(session_index, "MAX_RESCAN_DIRS", 2)
+    projects, index = tmp_path / "projects", tmp_path / "index.json"
+    for n in range(5):
+        _transcript(projects, f"-p{n}", f"s{n}")
+        os.utime(projects / f"-p{n}", ns=(n, n * 10**9))
+    listed = _listings(session_index, monkeypatch)
+
+    assert session_index.locate("s4", projects, index).name == "s4.jsonl"  # noqa: S101
+    assert listed == ["-p4", "-p3"]  # noqa: S101
+    assert session_index.locate("s0", projects, index) is None  # noqa: S101
+    assert session_index.locate("s0", projects, index).name == "s0.jsonl"  # noqa: S101
+    assert listed == ["-p4", "-p3", "-p2", "-p1", "-p0"]  # noqa: S101
+
+
+def test_unsettled_directory_listed_again(
+    session_index: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(session_index, "MTIME_SETTLE_SECONDS", 3600)
+    projects, index = tmp_path / "projects", tmp_path / "index.json"
+    _transcript(projects, "-busy", "s1")
+    mtime = (projects / "-busy").stat().st_mtime_ns
+    assert session_index.locate("later", projects, index) is None  # noqa: S101
+    # Created within the same mtime tick as the listing above
+    later = _transcript(projects, "-busy", "later")
+    os.utime(projects / "-busy", ns=(mtime, mtime))
+    assert session_index.locate("later", projects, index) == later  # noqa: S101
+
+
+def test_corrupt_index_and_missing_projects(
+    session_index: ModuleType, tmp_path: Path
+) -> None:
+    projects, index = tmp_path / "projects", tmp_path / "index.json"
+    assert session_index.locate("s1", projects, index) is None  # noqa: S101
+    index.write_text("[1, 2")
+    wanted = _transcript(projects, "-repo", "s1")
+    assert session_index.locate("s1", projects, index) == wanted  # noqa: S101
@@ -0,0 +1,198 @@
+"""Tests for hooks/lib/session_tail.py -- last usage of a session transcript."""
+
+import json
+import random
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def session_tail() -> ModuleType:
+    return load_module_from_file(
+        "session_tail", PROJECT_ROOT / "hooks" / "lib" / "session_tail.py"
+    )
+
+
+def _usage(tokens: int) -> str:
+    return json.dumps(
+        {
+            "type": "assistant",
+            "message": {
+                "usage": {
+                    "input_tokens": tokens,
+                    "cache_read_input_tokens": 10,
+                    "cache_creation_input_tokens": 1,
+                    "output_tokens": 5,
+                }
+            },
+        }
+    )
+
+
+CLEAR = json.dumps({"type": "user", "message": {"content": "/clear"}})
+TEXT = json.dumps({"type": "user", "message": {"content": "hello"}})
+
+
+def _counts(tokens: int) -> dict[str, int]:
+    return {"input": tokens, "cache_read": 10, "cache_create": 1, "output": 5}
+
+
+def _append(path: Path, *lines: str, newline: bool = True) -> None:
+    with path.open("a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + ("\n" if newline else ""))
+
+
+def _reference(path: Path) -> dict[str, int] | None:
+    """What the statusline computed before: a full forward read."""
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    last_reset = 0
+    for i, line in enumerate(lines, 1):
+        if '"/clear"' in line or '"/compact"' in line:
+            last_reset = i
+    found = None
+    for line in lines[last_reset:]:
+        try:
+            usage = json.loads(line).get("message", {}).get("usage", {})
+        except ValueError:
+            continue
+        if usage:
+            found = {
+                "input": usage.get("input_tokens", 0),
+                "cache_read": usage.get("cache_read_input_tokens", 0),
+                "cache_create": usage.get("cache_creation_input_tokens", 0),
+                "output": usage.get("output_tokens", 0),
+            }
+    return found
+
+
+class TestLastUsage:
+    def test_last_entry_after_reset(
+        self, session_tail: ModuleType, tmp_path: Path
+    ) -> None:
+        path = tmp_path / "s.jsonl"
+        _append(path, _usage(100), TEXT, _usage(200), TEXT)
+        assert session_tail.last_usage(path) == _counts(200)  # noqa: S101
+        _append(path, CLEAR, TEXT)
+        assert session_tail.last_usage(path) is None  # noqa: S101
+        _append(path, _usage(7))
+        assert session_tail.last_usage(path) == _counts(7)  # noqa: S101
+
+    def test_line_still_being_written(
+        self, session_tail: ModuleType, tmp_path: Path
+    ) -> None:
+        path = tmp_path / "s.jsonl"
+        cursor = tmp_path / "cursor.json"
+        _append(path, _usage(100))
+        _append(path, _usage(300), newline=False)
+        assert session_tail.last_usage(path, cursor) == _counts(300)  # noqa: S101
+        # The cursor only covers the complete line
+        assert json.loads(cursor.read_text())["usage"] == _counts(100)  # noqa: S101
+        _append(path, "", CLEAR[:20], newline=False)
+        assert session_tail.last_usage(path, cursor) == _counts(300)  # noqa: S101
+        assert json.loads(cursor.read_text())["usage"] == _counts(300)  # noqa: S101
+
+    def test_missing_file(self, session_tail: ModuleType, tmp_path: Path) -> None:
+        with pytest.raises(OSError):
+            session_tail.last_usage(tmp_path / "missing.jsonl")
+
+
+class TestCursor:
+    def test_only_appended_bytes_scanned(
+        self,
+        session_tail: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        path = tmp_path / "s.jsonl"
+        cursor = tmp_path / "cursor.json"
+        _append(path, *[_usage(n) for n in range(1, 50)])
+        assert session_tail.last_usage(path, cursor) == _counts(49)  # noqa: S101
+        covered = path.stat().st_size
+
+        scans = []
+        scan_back = session_tail.scan_back
+
+        def recording(f: object, start: int, end: int) -> object:
+            scans.append((start, end))
+            return scan_back(f, start, end)
+
+        monkeypatch.setattr(session_tail, "scan_back", recording)
+        _append(path, TEXT)
+        assert session_tail.last_usage(path, cursor) == _counts(49)  # noqa: S101
+        _append(path, CLEAR)
+        assert session_tail.last_usage(path, cursor) is None  # noqa: S101
+        assert session_tail.last_usage(path, cursor) is None  # noqa: S101
+        end = path.stat().st_size
+        assert scans == [  # noqa: S101
+            (covered, covered + len(TEXT) + 1),
+            (covered + len(TEXT) + 1, end),
+            (end, end),
+        ]
+        saved = json.loads(cursor.read_text())
+        assert saved["reset"] == end - len(CLEAR) - 1  # noqa: S101
+
+    @pytest.mark.parametrize("change", ["replaced", "truncated", "rewritten"])
+    def test_stale_cursor_rescanned(
+        self, session_tail: ModuleType, tmp_path: Path, change: str
+    ) -> None:
+        path = tmp_path / "s.jsonl"
+        cursor = tmp_path / "cursor.json"
+        _append(path, _usage(1), _usage(2), _usage(3))
+        assert session_tail.last_usage(path, cursor) == _counts(3)  # noqa: S101
+        if change == "replaced":
+            replacement = tmp_path / "new.jsonl"
+            _append(replacement, _usage(4), CLEAR, TEXT)
+            replacement.replace(path)
+            expected = None
+        elif change == "truncated":
+            path.write_text(_usage(5) + "\n", encoding="utf-8")
+            expected = _counts(5)
+        else:  # same inode, longer, no line ends where the cursor does
+            size = path.stat().st_size
+            line = _usage(6).replace(",", "," + " " * size, 1)
+            path.write_text(line + "\n", encoding="utf-8")
+            expected = _counts(6)
+        assert session_tail.last_usage(path, cursor) == expected  # noqa: S101
+
+    def test_corrupt_cursor_ignored(
+        self, session_tail: ModuleType, tmp_path: Path
+    ) -> None:
+        path = tmp_path / "s.jsonl"
+        cursor = tmp_path / "cursor.json"
+        cursor.write_text("{not json")
+        _append(path, _usage(8))
+        assert session_tail.last_usage(path, cursor) == _counts(8)  # noqa: S101
+        saved = json.loads(cursor.read_text())
+        assert saved["offset"] == path.stat().st_size  # noqa: S101
+
+
+def test_matches_full_read_as_transcript_grows(
+    session_tail: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tail reads with and without a cursor agree with a full forward read."""
+    monkeypatch.setattr(session_tail, "BLOCK_SIZE", 37)  # lines span blocks
+    rng = random.Random(4242)  # noqa: S311
+    path = tmp_path / "s.jsonl"
+    cursor = tmp_path / "cursor.json"
+    for _ in range(60):
+        path.write_text("")
+        cursor.unlink(missing_ok=True)
+        for _ in range(rng.randint(1, 8)):
+            lines = []
+            for _ in range(rng.randint(0, 5)):
+                roll = rng.random()
+                if roll < 0.1:
+                    lines.append(CLEAR)
+                elif roll < 0.5:
+                    lines.append(_usage(rng.randint(1, 999)))
+                elif roll < 0.6:
+                    lines.append("")
+                else:
+                    lines.append(json.dumps({"pad": "x" * rng.randint(0, 90)}))
+            _append(path, *lines, newline=rng.random() < 0.8)
+            expected = _reference(path)
+            assert session_tail.last_usage(path, cursor) == expected  # noqa: S101
+            assert session_tail.last_usage(path) == expected  # noqa: S101
@@ -0,0 +1,199 @@
+"""Tests for hooks/lib/shell_lexer.py -- splitting shell command lists."""
+
+import random
+import shutil
+import subprocess
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture(scope="module")
+def shell_lexer() -> ModuleType:
+    return load_module_from_file(
+        "shell_lexer", PROJECT_ROOT / "hooks" / "lib" / "shell_lexer.py"
+    )
+
+
+def _split(shell_lexer: ModuleType, command: str) -> list[tuple[str, bool]] | None:
+    segments = shell_lexer.split_list(command)
+    if segments is None:
+        return None
+    for segment in segments:
+        assert command[segment.start : segment.end] == segment.text  # noqa: S101
+    return [(segment.text, segment.simple) for segment in segments]
+
+
+@pytest.mark.parametrize(
+    ("command", "expected"),
+    [
+        ("git status", [("git status", True)]),
+        (
+            "cd a && git add . && git commit -m 'x; y' || true",
+            [
+                ("cd a", True),
+                ("git add .", True),
+                ("git commit -m 'x; y'", True),
+                ("true", True),
+            ],
+        ),
+        (
+            'git commit -m "a && b | c" ; git push;',
+            [('git commit -m "a && b | c"', True), ("git push", True)],
+        ),
+        ("uv sync\n\npytest -x\n", [("uv sync", True), ("pytest -x", True)]),
+        ("pytest &&\n  git push", [("pytest", True), ("git push", True)]),
+        (
+            "pytest 2>&1 | tail -5; make",
+            [("pytest 2>&1 | tail -5", False), ("make", True)],
+        ),
+        ("pytest > out.txt", [("pytest > out.txt", False)]),
+        ("pytest &> out.txt && ls", [("pytest &> out.txt", False), ("ls", True)]),
+        ("npm run dev & pytest", [("npm run dev", False), ("pytest", True)]),
+        (
+            'echo "$(date; ls)"; go test',
+            [('echo "$(date; ls)"', False), ("go test", True)],
+        ),
+        ("echo `a; b` && ls", [("echo `a; b`", False), ("ls", True)]),
+        (
+            "diff <(ls a) <(ls b); ls",
+            [("diff <(ls a) <(ls b)", False), ("ls", True)],
+        ),
+        ("x=$(echo ')'); git push", [("x=$(echo ')')", False), ("git push", True)]),
+        ("echo $'it\\'s; ok' && ls", [("echo $'it\\'s; ok'", True), ("ls", True)]),
+        ("echo a\\;b && ls", [("echo a\\;b", True), ("ls", True)]),
+        ("git push # deploy; now", [("git push # deploy; now", True)]),
+        ("echo a#b; ls", [("echo a#b", True), ("ls", True)]),
+        ("echo ${X:-a && pytest -q}", [("echo ${X:-a && pytest -q}", True)]),
+        ("echo ${A/;/x} && pytest", [("echo ${A/;/x}", True), ("pytest", True)]),
+        ("echo ${A:-{x};y}", [("echo ${A:-{x}", True), ("y}", True)]),
+        (
+            'echo "${A:-"}"}" && ls',
+            [('echo "${A:-"}"}"', True), ("ls", True)],
+        ),
+        (
+            "echo ${A:-$(date; ls)} && ls",
+            [("echo ${A:-$(date; ls)}", False), ("ls", True)],
+        ),
+    ],
+)
+def test_split(
+    shell_lexer: ModuleType, command: str, expected: list[tuple[str, bool]]
+) -> None:
+    assert _split(shell_lexer, command) == expected  # noqa: S101
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "echo 'unterminated",
+        'echo "unterminated',
+        "echo $(unterminated",
+        "echo ${unterminated && ls",
+        "(cd a && make)",
+        "{ make; make test; }",
+        "cat <<EOF\npytest; ls\nEOF",
+        "case $x in a) ls;; esac",
+        "echo trailing\\",
+    ],
+)
+def test_unsplittable(shell_lexer: ModuleType, command: str) -> None:
+    assert shell_lexer.split_list(command) is None  # noqa: S101
+
+
+# --- Generated corpus: wrapping every simple command must not change behavior ---
+
+WORDS = (
+    "a",
+    "'x; y'",
+    '"p && q"',
+    "'|'",
+    '">"',
+    "a\\;b",
+    "'#'",
+    "x#y",
+    '"$HOME"',
+    '"it\'s"',
+    "'a\nb'",
+    '"\\""',
+    "$'t\\'\\n'",
+    "'&'",
+    "'('",
+    "${LEXER_UNSET:-a && b}",
+    "${HOME/;/x}",
+    "${LEXER_UNSET:-{x}}",
+    '"${LEXER_UNSET:-p; q}"',
+)
+NOT_SIMPLE = (
+    "echo $(echo sub; echo x)",
+    "echo `echo tick`",
+    "echo piped | cat",
+    "echo to-null > /dev/null",
+    "echo err 2>&1 | tr a-z A-Z",
+    "echo \"$(printf '%s' 'q;r')\"",
+    "echo ${LEXER_UNSET:-$(echo sub; echo x)}",
+)
+SEPARATORS = (" && ", " || ", "; ", ";", "\n", " &&\n ", " ; ")
+
+
+def _command(rng: random.Random) -> tuple[str, int]:
+    """A random list and how many of its commands are simple."""
+    parts: list[str] = []
+    simple = 0
+    for n in range(rng.randint(1, 5)):
+        if n:
+            parts.append(rng.choice(SEPARATORS))
+        roll = rng.random()
+        if roll < 0.2:
+            parts.append(rng.choice(NOT_SIMPLE))
+        elif roll < 0.35:
+            parts.append(rng.choice(("true", "false")))
+            simple += 1
+        else:
+            words = rng.choices(WORDS, k=rng.randint(0, 3))
+            parts.append(" ".join(("echo", *words)))
+            simple += 1
+    if rng.random() < 0.2:
+        parts.append(rng.choice((" # tail; comment", ";")))
+    return "".join(parts), simple
+
+
+@pytest.mark.skipif(not shutil.which("bash"), reason="bash not on PATH")
+def test_wrapping_simple_commands_preserves_behavior(shell_lexer: ModuleType) -> None:
+    """Prefixing each simple command with a pass-through wrapper changes nothing.
+
+    A split inside a quote, comment or substitution would put the wrapper's
+    name into an argument or break the syntax, which changes the output.
+    """
+    rng = random.Random(20240611)  # noqa: S311
+    scripts: list[str] = []
+    for _ in range(300):
+        command, simple = _command(rng)
+        segments = shell_lexer.split_list(command)
+        assert segments is not None, command  # noqa: S101
+        assert sum(s.simple for s in segments) == simple, command  # noqa: S101
+        wrapped = command
+        for segment in reversed(segments):
+            if segment.simple:
+                wrapped = f"{wrapped[: segment.start]}w {wrapped[segment.start :]}"
+        scripts.append(command)
+        scripts.append(wrapped)
+
+    # One bash process for the whole corpus: each script runs in a subshell
+    # and reports its output and exit status
+    program = ['w() { "$@"; }']
+    for script in scripts:
+        program.append(f'( {script}\n) 2>&1; echo "<<$?>>"')
+    result = subprocess.run(  # noqa: S603
+        [shutil.which("bash") or "bash", "--norc", "--noprofile"],
+        input="\n".join(program),
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=False,
+    )
+    runs = result.stdout.split(">>\n")
+    assert len(runs) == len(scripts) + 1, result.stderr  # noqa: S101
+    for i in range(0, len(scripts), 2):
+        assert runs[i] == runs[i + 1], (scripts[i], scripts[i + 1])  # noqa: S101
@@ -0,0 +1,172 @@
+"""Tests for hooks/lib/state_store.py -- the shared .claude/state store."""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def state_store() -> ModuleType:
+    return load_module_from_file(
+        "state_store", PROJECT_ROOT / "hooks" / "lib" / "state_store.py"
+    )
+
+
+class TestStore:
+    def test_set_get_incr_pop(self, state_store: ModuleType, tmp_path: Path) -> None:
+        store = state_store.StateStore(tmp_path / "state")
+        assert store.get("missing", 7) == 7  # noqa: S101
+        assert not (tmp_path / "state").exists()  # noqa: S101
+        store.set("plan", {"waves": [1, 2]})
+        assert store.incr("violations") == 1  # noqa: S101
+        assert store.incr("violations", 2) == 3  # noqa: S101
+        assert store.snapshot() == {"plan": {"waves": [1, 2]}, "violations": 3}  # noqa: S101
+        assert store.pop("plan") == {"waves": [1, 2]}  # noqa: S101
+        assert store.pop("plan", "gone") == "gone"  # noqa: S101
+
+    def test_ttl(
+        self,
+        state_store: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        store = state_store.StateStore(tmp_path)
+        store.set("request", "continue", ttl=60)
+        store.set("kept", 1)
+        assert store.get("request") == "continue"  # noqa: S101
+        later = time.time() + 61
+        monkeypatch.setattr(state_store.time, "time", lambda: later)
+        assert store.get("request") is None  # noqa: S101
+        store.incr("kept")
+        record = json.loads((tmp_path / state_store.STATE_FILE).read_text())
+        assert record == {"values": {"kept": 2}, "expires": {}}  # noqa: S101
+
+    def test_failed_transaction_not_committed(
+        self, state_store: ModuleType, tmp_path: Path
+    ) -> None:
+        store = state_store.StateStore(tmp_path)
+        store.set("violations", 1)
+        with pytest.raises(RuntimeError), store.transaction() as txn:
+            txn.set("violations", 5)
+            raise RuntimeError
+        assert store.get("violations") == 1  # noqa: S101
+
+    def test_corrupt_record_starts_fresh(
+        self, state_store: ModuleType, tmp_path: Path
+    ) -> None:
+        (tmp_path / state_store.STATE_FILE).write_text("{not json")
+        store = state_store.StateStore(tmp_path)
+        assert store.snapshot() == {}  # noqa: S101
+        assert store.incr("violations") == 1  # noqa: S101
+
+
+class TestMigration:
+    LEGACY = {
+        "delegation_violations.json": '{"violations": 2, "delegations": 1, '
+        '"turn_id": "17"}',
+        "turn_start_timestamp.txt": "1700000000.5\n",
+        "last_turn_duration.txt": "1m 5s\n",
+        "turn_durations.json": '{"durations": [3.5, 65.0]}',
+        "workflow_continuation_needed.json": '{"reason": "plan mode completed"}',
+    }
+
+    def test_legacy_files_folded_in_on_first_commit(
+        self, state_store: ModuleType, tmp_path: Path
+    ) -> None:
+        for name, text in self.LEGACY.items():
+            (tmp_path / name).write_text(text)
+        (tmp_path / "delegation_active").touch()
+        store = state_store.StateStore(tmp_path)
+        expected = {
+            "violations": 2,
+            "delegations": 1,
+            "turn_id": "17",
+            "turn_start": 1700000000.5,
+            "last_turn_duration": "1m 5s",
+            "turn_durations": [3.5, 65.0],
+            "workflow_continuation": {"reason": "plan mode completed"},
+        }
+        # Reads see the old files without migrating them
+        assert store.snapshot() == expected  # noqa: S101
+        assert all((tmp_path / name).exists() for name in self.LEGACY)  # noqa: S101
+
+        assert store.incr("violations") == 3  # noqa: S101
+        assert store.snapshot() == {**expected, "violations": 3}  # noqa: S101
+        assert not any((tmp_path / name).exists() for name in self.LEGACY)  # noqa: S101
+        assert (tmp_path / "delegation_active").exists()  # noqa: S101
+
+    def test_unreadable_legacy_file_skipped(
+        self, state_store: ModuleType, tmp_path: Path
+    ) -> None:
+        (tmp_path / "turn_start_timestamp.txt").write_text("yesterday")
+        (tmp_path / "last_turn_duration.txt").write_text("45s")
+        store = state_store.StateStore(tmp_path)
+        assert store.snapshot() == {"last_turn_duration": "45s"}  # noqa: S101
+
+
+# --- Concurrency: parallel hook processes must not lose updates ---
+
+WORKER = """
+import sys
+sys.path.insert(0, {lib!r})
+from pathlib import Path
+from state_store import StateStore
+
+store = StateStore(Path({state!r}))
+for _ in range({updates}):
+    with store.transaction() as txn:
+        txn.incr("count")
+        txn.set("last", {worker})
+"""
+
+
+def test_parallel_processes_lose_no_increments(tmp_path: Path) -> None:
+    workers, updates = 8, 25
+    lib = str(PROJECT_ROOT / "hooks" / "lib")
+    procs = [
+        subprocess.Popen(  # noqa: S603
+            [
+                sys.executable,
+                "-c",
+                WORKER.format(lib=lib, state=str(tmp_path), updates=updates, worker=i),
+            ]
+        )
+        for i in range(workers)
+    ]
+    assert all(p.wait(timeout=60) == 0 for p in procs)  # noqa: S101
+    record = json.loads((tmp_path / "state.json").read_text())
+    assert record["values"]["count"] == workers * updates  # noqa: S101
+    assert list(tmp_path.glob("*.tmp")) == []  # noqa: S101
+
+
+def test_parallel_hook_processes_count_every_violation(tmp_path: Path) -> None:
+    """require_delegation.py fired N times at once counts N violations."""
+    hook = PROJECT_ROOT / "hooks" / "PreToolUse" / "require_delegation.py"
+    env = {**os.environ, "CLAUDE_PROJECT_DIR": str(tmp_path)}
+    env.pop("CLAUDE_PARENT_SESSION_ID", None)
+    env.pop("CLAUDE_AGENT_ID", None)
+    payload = json.dumps({"tool_name": "Bash", "tool_input": {}}).encode()
+    hooks = 16
+    procs = [
+        subprocess.Popen(  # noqa: S603
+            [sys.executable, str(hook)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        for _ in range(hooks)
+    ]
+    for p in procs:
+        p.stdin.write(payload)
+        p.stdin.close()
+    assert all(p.wait(timeout=60) == 0 for p in procs)  # noqa: S101
+    record = json.loads((tmp_path / ".claude" / "state" / "state.json").read_text())
+    assert record["values"]["violations"] == hooks  # noqa: S101
@@ -0,0 +1,149 @@
+"""Tests for hooks/lib/test_reports.py -- machine-readable test report parsing."""
+
+import json
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def reports() -> ModuleType:
+    return load_module_from_file(
+        "test_reports", PROJECT_ROOT / "hooks" / "lib" / "test_reports.py"
+    )
+
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="1" failures="1" skipped="1" tests="4" time="1.25">
+<testcase classname="tests.test_a" name="test_ok" time="0.010"/>
+<testcase classname="tests.test_a.TestB" name="test_bad" time="0.020">
+<failure message="AssertionError: assert 1 == 2">traceback...</failure></testcase>
+<testcase classname="tests.test_a" name="test_skip" time="0.000"><skipped message="later"/></testcase>
+<testcase classname="tests.test_a" name="test_err" time="0.001">
+<error message="">long setup traceback
+RuntimeError: boom</error></testcase>
+</testsuite></testsuites>
+"""
+
+
+class TestJunit:
+    def test_parse_and_render(self, reports: ModuleType, tmp_path: Path) -> None:
+        path = tmp_path / "junit.xml"
+        path.write_text(JUNIT, encoding="utf-8")
+        report = reports.parse_junit(path)
+        assert (report.passed, report.failed, report.errors, report.skipped) == (  # noqa: S101
+            1,
+            1,
+            1,
+            1,
+        )
+        assert reports.render(report) == [  # noqa: S101
+            "FAILED tests.test_a.TestB::test_bad (0.02s)",
+            "  AssertionError: assert 1 == 2",
+            "ERROR tests.test_a::test_err (0.00s)",
+            "  RuntimeError: boom",
+            "1 failed, 1 passed, 1 skipped, 1 error in 1.25s",
+        ]
+
+    @pytest.mark.parametrize("content", [None, "<testsuites><testcase"])
+    def test_missing_or_malformed(
+        self, reports: ModuleType, tmp_path: Path, content: str | None
+    ) -> None:
+        path = tmp_path / "junit.xml"
+        if content is not None:
+            path.write_text(content, encoding="utf-8")
+        assert reports.parse_junit(path) is None  # noqa: S101
+
+
+def _go(action: str, test: str | None = None, **fields: object) -> str:
+    event = {"Action": action, "Package": "example.com/m", **fields}
+    if test:
+        event["Test"] = test
+    return json.dumps(event)
+
+
+class TestGoEvents:
+    def test_failures_and_subtests(self, reports: ModuleType) -> None:
+        events = reports.GoTestEvents()
+        for line in [
+            _go("run", "TestOK"),
+            _go("output", "TestOK", Output="=== RUN   TestOK\n"),
+            _go("pass", "TestOK", Elapsed=0.01),
+            _go("output", "TestBad", Output="    x_test.go:6: want 1, got 2\n"),
+            _go("output", "TestBad", Output="--- FAIL: TestBad (0.00s)\n"),
+            _go("fail", "TestBad", Elapsed=0.02),
+            _go("output", "TestTable/b", Output="    x_test.go:12: broke\n"),
+            _go("fail", "TestTable/b", Elapsed=0),
+            _go("fail", "TestTable", Elapsed=0),
+            _go("skip", "TestSkip"),
+            "not json",
+            _go("output", Output="FAIL\texample.com/m\t0.5s\n"),
+            _go("fail", Elapsed=0.5),
+        ]:
+            events.feed(line)
+        assert reports.render(events.report) == [  # noqa: S101
+            "FAILED example.com/m::TestBad (0.02s)",
+            "  x_test.go:6: want 1, got 2",
+            "FAILED example.com/m::TestTable/b (0.00s)",
+            "  x_test.go:12: broke",
+            "2 failed, 1 passed, 1 skipped in 0.50s",
+        ]
+
+    def test_package_failure_without_tests(self, reports: ModuleType) -> None:
+        events = reports.GoTestEvents()
+        events.feed(_go("output", Output="panic: init failed\n"))
+        events.feed(_go("fail", Elapsed=0.1))
+        (failure,) = events.report.failures
+        assert (failure.test_id, failure.message) == (  # noqa: S101
+            "example.com/m",
+            ["panic: init failed"],
+        )
+
+    def test_text_recovered_from_events(self, reports: ModuleType) -> None:
+        stdout = "\n".join(
+            [_go("output", "TestA", Output="--- FAIL: TestA\n"), "# build noise"]
+        )
+        assert reports.go_json_text(stdout) == "--- FAIL: TestA\n# build noise\n"  # noqa: S101
+
+
+def test_libtest_events(reports: ModuleType) -> None:
+    events = reports.LibtestEvents()
+    for event in [
+        {"type": "suite", "event": "started", "test_count": 3},
+        {"type": "test", "event": "ok", "name": "tests::ok", "exec_time": 0.001},
+        {
+            "type": "test",
+            "event": "failed",
+            "name": "tests::bad",
+            "exec_time": 0.01,
+            "stdout": "thread 'tests::bad' panicked at src/lib.rs:4:24:\n"
+            "assertion failed\nnote: run with `RUST_BACKTRACE=1`\n",
+        },
+        {"type": "test", "event": "ignored", "name": "tests::later"},
+        {
+            "type": "suite",
+            "event": "failed",
+            "passed": 1,
+            "failed": 1,
+            "exec_time": 0.02,
+        },
+    ]:
+        events.feed(json.dumps(event))
+    assert reports.render(events.report) == [  # noqa: S101
+        "FAILED tests::bad (0.01s)",
+        "  thread 'tests::bad' panicked at src/lib.rs:4:24:",
+        "  assertion failed",
+        "1 failed, 1 passed, 1 skipped in 0.02s",
+    ]
+
+
+def test_failure_list_and_messages_bounded(reports: ModuleType) -> None:
+    report = reports.TestReport()
+    for i in range(reports.MAX_FAILURES + 5):
+        report.fail(reports.Failure(f"t{i}", [f"line {n}" for n in range(50)]))
+    lines = reports.render(report)
+    assert len(report.failures) == reports.MAX_FAILURES  # noqa: S101
+    assert lines[-2] == "[... 5 more failures]"  # noqa: S101
+    assert lines[reports.MESSAGE_LINES + 1] == "FAILED t1"  # noqa: S101
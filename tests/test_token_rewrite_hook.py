@@ -3,6 +3,11 @@
 
 import io
 import json
+import os
+import shlex
+import subprocess
+import sys
+from pathlib import Path
 from types import ModuleType
 
 import pytest  # pyright: ignore[reportMissingImports]
@@ -236,7 +241,35 @@ class TestMain:
         cmd = result["updatedInput"]["command"]
         assert "compact_run.py" in cmd
         assert cmd.endswith("git push origin main")
-        assert cmd.startswith("uv run --no-project --script ")
+        root = token_rewrite_hook.get_plugin_root()
+        runner = token_rewrite_hook.compact_run_runner(root)
+        assert cmd == runner + "git push origin main"
+
+    def test_project_family_wrapped(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: Path,
+    ) -> None:
+        (tmp_path / ".claude").mkdir()
+        (tmp_path / ".claude" / "compact_run.toml").write_text(
+            '[families.terraform]\nsubcommands = ["plan"]\nsummary = "Plan: .*"\n'
+        )
+        payload = {"tool_name": "Bash", "tool_input": {"command": "terraform plan"}}
+        monkeypatch.setattr("sys.stdin", _make_stdin(payload))
+        monkeypatch.setenv("CLAUDE_TOKEN_EFFICIENCY", "1")
+        monkeypatch.setenv("CLAUDE_PROJECT_DIR", str(tmp_path))
+
+        assert token_rewrite_hook.main() == 0
+        cmd = json.loads(capsys.readouterr().out)["updatedInput"]["command"]
+        assert cmd.endswith("compact_run.py terraform plan")
+
+        # Not a registered subcommand
+        payload["tool_input"]["command"] = "terraform apply"
+        monkeypatch.setattr("sys.stdin", _make_stdin(payload))
+        assert token_rewrite_hook.main() == 0
+        assert capsys.readouterr().out.strip() == ""
 
     def test_piped_command_passthrough(
         self,
@@ -425,7 +458,9 @@ class TestMain:
         # updatedInput has exactly one key: command
         assert set(result["updatedInput"].keys()) == {"command"}
         cmd = result["updatedInput"]["command"]
-        assert cmd.startswith("uv run --no-project --script ")
+        assert cmd.startswith(
+            token_rewrite_hook.compact_run_runner(token_rewrite_hook.get_plugin_root())
+        )
         assert "compact_run.py" in cmd
         assert cmd.endswith("cargo test")
 
@@ -443,3 +478,211 @@ class TestMain:
         rc = token_rewrite_hook.main()
         assert rc == 0
         assert capsys.readouterr().out.strip() == ""
+
+
+# ---------------------------------------------------------------------------
+# Compound commands
+# ---------------------------------------------------------------------------
+
+
+class TestCompoundCommands:
+    """rewrite_command() wraps the eligible commands of a list individually."""
+
+    W = "<W> "  # stands in for the compact_run runner
+
+    def _rewrite(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        command: str,
+    ) -> str | None:
+        monkeypatch.setenv("CLAUDE_TOKEN_EFFICIENCY", "1")
+        monkeypatch.setenv("CLAUDE_PLUGIN_ROOT", "/plugin")
+        result = token_rewrite_hook.rewrite_command(
+            {"tool_name": "Bash", "tool_input": {"command": command}}
+        )
+        if result is None:
+            return None
+        runner = token_rewrite_hook.compact_run_runner(Path("/plugin"))
+        return result["command"].replace(runner, self.W)
+
+    @pytest.mark.parametrize(
+        ("command", "expected"),
+        [
+            ("uv sync && pytest -x", "uv sync && <W> pytest -x"),
+            ("cd /tmp && pytest -q", "cd /tmp && <W> pytest -q"),
+            (
+                "cd a && git add . && git commit -m 'fix; again' && git push",
+                "cd a && <W> git add . && <W> git commit -m 'fix; again' "
+                "&& <W> git push",
+            ),
+            ('git commit -m "a > b"', '<W> git commit -m "a > b"'),
+            ("npm install\nnpm test", "npm install\n<W> npm test"),
+            ("pytest > out.txt; git push", "pytest > out.txt; <W> git push"),
+            ("pytest | tail -5 || git stash", "pytest | tail -5 || <W> git stash"),
+            ("git fetch & cargo test", "git fetch & <W> cargo test"),
+            (
+                'git commit -m "$(cat msg)" && git push',
+                'git commit -m "$(cat msg)" && <W> git push',
+            ),
+        ],
+    )
+    def test_eligible_commands_wrapped(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        command: str,
+        expected: str,
+    ) -> None:
+        assert self._rewrite(token_rewrite_hook, monkeypatch, command) == expected
+
+    @pytest.mark.parametrize(
+        "command",
+        [
+            "git push | head",
+            "ls && echo done",
+            "(cd a && pytest)",
+            "cat <<EOF | git apply\ndiff\nEOF",
+            "git commit -m 'unterminated && pytest",
+        ],
+    )
+    def test_nothing_eligible_passthrough(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        command: str,
+    ) -> None:
+        assert self._rewrite(token_rewrite_hook, monkeypatch, command) is None
+
+    @pytest.mark.parametrize(
+        ("command", "expected"),
+        [
+            ("uv run pytest -x", "<W> uv run pytest -x"),
+            ("python -m pytest -q", "<W> python -m pytest -q"),
+            ("poetry run pytest", "<W> poetry run pytest"),
+            ("FOO=1 pytest", "FOO=1 <W> pytest"),
+            ("FOO=1 BAR=2 uv run pytest", "FOO=1 BAR=2 <W> uv run pytest"),
+            ("env FOO=1 cargo test", "<W> env FOO=1 cargo test"),
+            ("timeout 300 go test ./...", "<W> timeout 300 go test ./..."),
+            ("npx --yes vitest run", "<W> npx --yes vitest run"),
+            (
+                "FOO=1 uv sync && FOO=2 pytest",
+                "FOO=1 uv sync && FOO=2 <W> pytest",
+            ),
+        ],
+    )
+    def test_launched_commands_wrapped(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        command: str,
+        expected: str,
+    ) -> None:
+        assert self._rewrite(token_rewrite_hook, monkeypatch, command) == expected
+
+    @pytest.mark.parametrize(
+        "command",
+        ["uv run --script tool.py", "python script.py", "FOO=1 ls", "timeout 5 ls"],
+    )
+    def test_launched_ineligible_passthrough(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        command: str,
+    ) -> None:
+        assert self._rewrite(token_rewrite_hook, monkeypatch, command) is None
+
+
+class TestCompactRunRunner:
+    """compact_run_runner() calls an interpreter directly, uv only as fallback."""
+
+    @pytest.fixture(autouse=True)
+    def _uv_cache(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        # The suite may itself run in a uv environment (uvx pytest)
+        monkeypatch.setenv("UV_CACHE_DIR", str(tmp_path / "uv-cache"))
+
+    def test_runtime_preferred(
+        self, token_rewrite_hook: ModuleType, tmp_path: Path
+    ) -> None:
+        runtime = tmp_path / "runtime" / "bin" / "python"
+        runtime.parent.mkdir(parents=True)
+        runtime.touch()
+        runner = token_rewrite_hook.compact_run_runner(tmp_path)
+        script = tmp_path / "hooks" / "compact_run.py"
+        assert runner == f"{runtime} -I -S {script} "
+
+    def test_current_interpreter(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        monkeypatch.setattr(token_rewrite_hook, "MIN_PYTHON", (3, 0))
+        root = tmp_path / "plugin root"
+        runner = token_rewrite_hook.compact_run_runner(root)
+        script = shlex.quote(str(root / "hooks" / "compact_run.py"))
+        assert runner == f"{shlex.quote(sys.executable)} -I -S {script} "
+
+    def test_uv_fallback(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        monkeypatch.setattr(token_rewrite_hook, "MIN_PYTHON", (99,))
+        runner = token_rewrite_hook.compact_run_runner(tmp_path)
+        script = tmp_path / "hooks" / "compact_run.py"
+        assert runner == f"uv run --no-project --script {script} "
+
+    def test_uv_environment_not_used(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        # uv deletes its script environment when the hook exits
+        monkeypatch.setattr(token_rewrite_hook, "MIN_PYTHON", (3, 0))
+        monkeypatch.setenv("UV_CACHE_DIR", str(tmp_path / "cache"))
+        ephemeral = tmp_path / "cache" / "builds-v0" / ".tmpAbC123" / "bin" / "python"
+        monkeypatch.setattr(sys, "executable", str(ephemeral))
+        runner = token_rewrite_hook.compact_run_runner(tmp_path)
+        assert runner.startswith("uv run --no-project --script ")
+
+    def test_runtime_built_later_is_used(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        monkeypatch.setattr(token_rewrite_hook, "MIN_PYTHON", (99,))
+        assert token_rewrite_hook.compact_run_python(tmp_path) is None
+        runtime = tmp_path / "runtime" / "bin" / "python"
+        runtime.parent.mkdir(parents=True)
+        runtime.touch()
+        assert token_rewrite_hook.compact_run_python(tmp_path) == str(runtime)
+
+    def test_rewritten_command_runs(
+        self,
+        token_rewrite_hook: ModuleType,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(token_rewrite_hook, "MIN_PYTHON", (3, 0))
+        monkeypatch.setenv("CLAUDE_TOKEN_EFFICIENCY", "1")
+        monkeypatch.delenv("CLAUDE_PLUGIN_ROOT", raising=False)
+        command = f"{shlex.quote(sys.executable)} -m pytest --version"
+        result = token_rewrite_hook.rewrite_command(
+            {"tool_name": "Bash", "tool_input": {"command": command}}
+        )
+        assert result is not None
+        assert not result["command"].startswith("uv ")
+        proc = subprocess.run(  # noqa: S602
+            result["command"],
+            shell=True,
+            capture_output=True,
+            text=True,
+            timeout=30,
+            env={**os.environ, "COMPACT_RUN_STATS": "0", "COMPACT_RUN_ARCHIVE": "0"},
+            check=False,
+        )
+        assert proc.returncode == 0, proc.stderr
+        assert proc.stdout.startswith("ok")
@@ -0,0 +1,204 @@
+"""Tests for hooks/lib/tracing.py and scripts/trace_export.py."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def tracing() -> ModuleType:
+    return load_module_from_file(
+        "tracing", PROJECT_ROOT / "hooks" / "lib" / "tracing.py"
+    )
+
+
+@pytest.fixture
+def exporter() -> ModuleType:
+    return load_module_from_file(
+        "trace_export", PROJECT_ROOT / "scripts" / "trace_export.py"
+    )
+
+
+@pytest.fixture
+def traced(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Enable tracing for a throwaway project; returns its state dir."""
+    monkeypatch.setenv("CLAUDE_HOOK_TRACE", "1")
+    monkeypatch.setenv("CLAUDE_PROJECT_DIR", str(tmp_path))
+    return tmp_path / ".claude" / "state"
+
+
+class TestDisabled:
+    def test_no_file_written(
+        self, tracing: ModuleType, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        monkeypatch.delenv("CLAUDE_HOOK_TRACE", raising=False)
+        monkeypatch.setenv("CLAUDE_PROJECT_DIR", str(tmp_path))
+        with tracing.invocation("hook"), tracing.span("stage") as stage:
+            stage.args["ignored"] = True
+        assert not (tmp_path / ".claude").exists()  # noqa: S101
+        assert tracing.span("again").args == {}  # noqa: S101
+
+
+class TestInvocation:
+    def test_spans_flushed_on_exit(self, tracing: ModuleType, traced: Path) -> None:
+        with tracing.invocation("PreToolUse/dispatch.py", event="PreToolUse"):
+            with tracing.span("parse payload"):
+                pass
+            tracing.annotate(tool="Bash")
+        events = tracing.read_events(traced / "trace_events.jsonl")
+        assert [e["name"] for e in events] == [  # noqa: S101
+            "parse payload",
+            "PreToolUse/dispatch.py",
+        ]
+        outer = events[1]
+        assert outer["ph"] == "X" and outer["cat"] == "hook"  # noqa: S101
+        assert outer["args"] == {"event": "PreToolUse", "tool": "Bash"}  # noqa: S101
+        assert outer["ts"] <= events[0]["ts"]  # noqa: S101
+
+    def test_records_exit_code(self, tracing: ModuleType, traced: Path) -> None:
+        with pytest.raises(SystemExit), tracing.invocation("hook"):
+            sys.exit(2)
+        (event,) = tracing.read_events(traced / "trace_events.jsonl")
+        assert event["args"] == {"exit_code": 2}  # noqa: S101
+
+    def test_records_error(self, tracing: ModuleType, traced: Path) -> None:
+        with pytest.raises(ValueError), tracing.invocation("hook"):
+            raise ValueError
+        (event,) = tracing.read_events(traced / "trace_events.jsonl")
+        assert event["args"] == {"error": "ValueError"}  # noqa: S101
+
+
+class TestRing:
+    def test_bounded(
+        self, tracing: ModuleType, traced: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("CLAUDE_HOOK_TRACE_MAX_KB", "4")
+        for i in range(200):
+            with tracing.invocation(f"hook-{i}"):
+                pass
+        ring = traced / "trace_events.jsonl"
+        assert ring.stat().st_size <= 4 * 1024  # noqa: S101
+        events = tracing.read_events(ring)
+        assert events[-1]["name"] == "hook-199"  # noqa: S101
+        assert len(events) == len(ring.read_text().splitlines())  # noqa: S101
+
+    def test_skips_torn_lines(self, tracing: ModuleType, tmp_path: Path) -> None:
+        ring = tmp_path / "ring.jsonl"
+        ring.write_text('{"name": "a"}\n{"name": "b', encoding="utf-8")
+        assert tracing.read_events(ring) == [{"name": "a"}]  # noqa: S101
+
+
+@pytest.mark.parametrize(
+    ("stdin", "expected"),
+    [
+        (
+            b'{"hook_event_name": "PostToolUse", "tool_name": "Edit"}',
+            {"event": "PostToolUse", "tool": "Edit"},
+        ),
+        (b'{"prompt": "hi"}', {}),
+        (b"not json", {}),
+        (b"", {}),
+    ],
+)
+def test_payload_args(tracing: ModuleType, stdin: bytes, expected: dict) -> None:
+    assert tracing.payload_args(stdin) == expected  # noqa: S101
+
+
+class TestExport:
+    def test_names_tracks_by_invocation(self, exporter: ModuleType) -> None:
+        events = [
+            {
+                "name": "parse payload",
+                "cat": "stage",
+                "ph": "X",
+                "ts": 5,
+                "dur": 1,
+                "pid": 7,
+            },
+            {
+                "name": "Stop/hook.py",
+                "cat": "hook",
+                "ph": "X",
+                "ts": 4,
+                "dur": 9,
+                "pid": 7,
+            },
+            {
+                "name": "statusline",
+                "cat": "statusline",
+                "ph": "X",
+                "ts": 1,
+                "dur": 2,
+                "pid": 8,
+            },
+        ]
+        doc = exporter.to_trace_document(events)
+        meta = {
+            e["pid"]: e["args"]["name"] for e in doc["traceEvents"] if e["ph"] == "M"
+        }
+        assert meta == {7: "hook: Stop/hook.py", 8: "statusline"}  # noqa: S101
+        spans = [e["name"] for e in doc["traceEvents"] if e["ph"] == "X"]
+        assert spans == ["statusline", "Stop/hook.py", "parse payload"]  # noqa: S101
+
+    def test_since_filter(self, exporter: ModuleType) -> None:
+        events = [
+            {"name": "old", "cat": "hook", "ph": "X", "ts": 1, "dur": 1, "pid": 1},
+            {"name": "new", "cat": "hook", "ph": "X", "ts": 10, "dur": 1, "pid": 2},
+        ]
+        doc = exporter.to_trace_document(events, since_us=5)
+        assert [e["name"] for e in doc["traceEvents"] if e["ph"] == "X"] == ["new"]  # noqa: S101
+
+
+@pytest.mark.integration
+def test_hook_client_trace_round_trip(tmp_path: Path) -> None:
+    env = {
+        "PATH": "/usr/bin:/bin",
+        "CLAUDE_HOOK_TRACE": "1",
+        "CLAUDE_HOOK_DAEMON": "0",
+        "CLAUDE_PROJECT_DIR": str(tmp_path),
+    }
+    payload = {"hook_event_name": "PreToolUse", "tool_name": "Read", "tool_input": {}}
+    result = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            str(PROJECT_ROOT / "hooks" / "hook_client.py"),
+            "PreToolUse/dispatch.py",
+        ],
+        input=json.dumps(payload),
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=tmp_path,
+        timeout=30,
+    )
+    assert result.returncode == 0, result.stderr  # noqa: S101
+
+    output = tmp_path / "trace.json"
+    exported = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            str(PROJECT_ROOT / "scripts" / "trace_export.py"),
+            "--project-dir",
+            str(tmp_path),
+            "--output",
+            str(output),
+        ],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert exported.returncode == 0, exported.stderr  # noqa: S101
+    spans = {e["name"]: e for e in json.loads(output.read_text())["traceEvents"]}
+    assert {"parse payload", "require_delegation", "token_rewrite_hook"} <= spans.keys()  # noqa: S101
+    hook = spans["PreToolUse/dispatch.py"]
+    assert hook["args"] == {  # noqa: S101
+        "event": "PreToolUse",
+        "tool": "Read",
+        "mode": "local",
+        "exit_code": 0,
+    }
@@ -0,0 +1,142 @@
+"""Tests for hooks/lib/turn_history.py -- turn latency ring and sparkline."""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+
+import pytest  # pyright: ignore[reportMissingImports]
+from conftest import PROJECT_ROOT, load_module_from_file
+
+
+@pytest.fixture
+def turn_history(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    monkeypatch.syspath_prepend(str(PROJECT_ROOT / "hooks" / "lib"))  # state_store
+    monkeypatch.delenv("CLAUDE_TURN_HISTORY_SIZE", raising=False)
+    return load_module_from_file(
+        "turn_history", PROJECT_ROOT / "hooks" / "lib" / "turn_history.py"
+    )
+
+
+def _store(tmp_path: Path) -> object:
+    state_store = load_module_from_file(
+        "state_store", PROJECT_ROOT / "hooks" / "lib" / "state_store.py"
+    )
+    return state_store.StateStore(tmp_path / "state")
+
+
+class TestRing:
+    def test_bounded_by_configured_size(
+        self,
+        turn_history: ModuleType,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setenv("CLAUDE_TURN_HISTORY_SIZE", "3")
+        store = _store(tmp_path)
+        store.set("turn_durations", [3.5, 65.0])
+        for n in range(5):
+            with store.transaction() as txn:
+                turn_history.record_turn(txn, 1000.0 + n, 1010.04 + 2 * n, n)
+        assert store.get("turn_history") == [  # noqa: S101
+            [1002.0, 1014.0, 2],
+            [1003.0, 1016.0, 3],
+            [1004.0, 1018.0, 4],
+        ]
+        assert store.get("turn_durations") is None  # noqa: S101
+        durations = turn_history.durations(store.get("turn_history"))
+        assert durations == [12, 13, 14]  # noqa: S101
+
+    def test_malformed_entries_skipped(self, turn_history: ModuleType) -> None:
+        history = [[1, 5, 0], "x", [1, 2], [True, 3, 0], [10, 4, 1], [2, 9, 3]]
+        assert turn_history.durations(history) == [4, 7]  # noqa: S101
+        assert turn_history.durations({"not": "a list"}) == []  # noqa: S101
+
+
+class TestTrend:
+    def test_percentiles_nearest_rank(self, turn_history: ModuleType) -> None:
+        values = [float(n) for n in range(1, 11)]
+        assert turn_history.percentile(values, 50) == 5  # noqa: S101
+        assert turn_history.percentile(values, 90) == 9  # noqa: S101
+        assert turn_history.percentile([7.0], 90) == 7  # noqa: S101
+
+    def test_sparkline_scaled_to_window(self, turn_history: ModuleType) -> None:
+        assert turn_history.sparkline([1, 5, 9]) == "▁▅█"  # noqa: S101
+        assert turn_history.sparkline([4, 4]) == "▁▁"  # noqa: S101
+        last_four = turn_history.sparkline(list(range(30)), width=4)
+        assert last_four == "▁▃▆█"  # noqa: S101
+
+    def test_trend(self, turn_history: ModuleType) -> None:
+        history = [[0, d, 1] for d in (30, 45, 40, 125, 50)]
+        assert turn_history.trend(history) == "▁▂▂█▂ p50 45s p90 2m 5s"  # noqa: S101
+        assert turn_history.trend(history[:1]) is None  # noqa: S101
+
+
+class TestToolCalls:
+    def test_counted_and_reset(self, turn_history: ModuleType, tmp_path: Path) -> None:
+        state = tmp_path / "missing" / "state"
+        assert turn_history.tool_calls_this_turn(state) == 0  # noqa: S101
+        for _ in range(3):
+            turn_history.count_tool_call({}, state)
+        assert turn_history.tool_calls_this_turn(state) == 3  # noqa: S101
+        turn_history.reset_tool_calls(state)
+        assert turn_history.tool_calls_this_turn(state) == 0  # noqa: S101
+
+    def test_unwritable_state_loses_only_the_count(self, tmp_path: Path) -> None:
+        (tmp_path / ".claude").mkdir()
+        (tmp_path / ".claude" / "state").write_text("", encoding="utf-8")
+        result = subprocess.run(  # noqa: S603
+            [
+                sys.executable,
+                str(PROJECT_ROOT / "hooks" / "PreToolUse" / "dispatch.py"),
+            ],
+            input=json.dumps({"tool_name": "Read", "tool_input": {}}).encode(),
+            capture_output=True,
+            env={**os.environ, "CLAUDE_PROJECT_DIR": str(tmp_path)},
+            timeout=60,
+            check=False,
+        )
+        assert result.returncode == 0, result.stderr  # noqa: S101
+
+    def test_parallel_dispatch_counts_every_call(self, tmp_path: Path) -> None:
+        dispatch = PROJECT_ROOT / "hooks" / "PreToolUse" / "dispatch.py"
+        env = {**os.environ, "CLAUDE_PROJECT_DIR": str(tmp_path)}
+        payload = json.dumps({"tool_name": "Read", "tool_input": {}}).encode()
+        calls = 12
+        procs = [
+            subprocess.Popen(  # noqa: S603
+                [sys.executable, str(dispatch)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                env=env,
+            )
+            for _ in range(calls)
+        ]
+        for p in procs:
+            p.stdin.write(payload)
+            p.stdin.close()
+        assert all(p.wait(timeout=60) == 0 for p in procs)  # noqa: S101
+        counter = tmp_path / ".claude" / "state" / "turn_tool_calls"
+        assert counter.stat().st_size == calls  # noqa: S101
+
+
+def test_stop_hook_records_turn(turn_history: ModuleType, tmp_path: Path) -> None:
+    stop_hook = load_module_from_file(
+        "python_stop_hook", PROJECT_ROOT / "hooks" / "stop" / "python_stop_hook.py"
+    )
+    store = stop_hook.StateStore(tmp_path / "state")
+    start = time.time() - 83
+    store.set("turn_start", start)
+    for _ in range(4):
+        turn_history.count_tool_call({}, store.path)
+
+    stop_hook.calculate_and_record_turn_duration(store)
+    assert store.get("last_turn_duration") == "1m 23s"  # noqa: S101
+    [(recorded_start, end, tool_calls)] = store.get("turn_history")
+    assert recorded_start == round(start, 1)  # noqa: S101
+    assert end - recorded_start == pytest.approx(83, abs=1)  # noqa: S101
+    assert tool_calls == 4  # noqa: S101